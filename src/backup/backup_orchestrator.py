@@ -2,8 +2,11 @@
 
 This orchestrator provides different backup and restore options with a user-friendly menu.
 """
+import contextlib
 import os
 import sys
+import threading
+import time
 
 # Add parent src directory to path for imports
 src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -11,6 +14,15 @@ if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
 from step_result import StepResult
+from step_runner import current_token
+from backup.restore_engine import find_latest_archive, load_manifest, restore_archive, restore_sources, sources_step_result
+from backup.backup_pipeline import run_backup, scope_sources
+from backup.frame_archive import FrameArchiveError, FrameArchiveReader, is_frame_archive
+from backup.catalog import Catalog, catalog_path_for
+from backup.verify import verify_archive
+from backup.throttle import ConfigWatcher, IOThrottle, background_priority, load_throttle_config
+from backup.snapshots import RetentionPolicy, create_snapshot, prune_snapshots
+from backup.wsl.export_distro import export_distros, list_distros
 
 # Import UI library for consistent interface
 try:
@@ -33,11 +45,118 @@ except ImportError:
         input("Press Enter to continue...")
 
 
+# Backup/restore limits live in the "backup" section of the repository config file.
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(src_path), "wsl_docker_config.json")
+DEFAULT_BACKUP_DIR = "C:\\DockerBackup"
+BACKUP_SCOPES = ("full", "containers", "volumes", "config")
+
+
+def _make_throttle(max_mbps=None, max_iops=None, low_priority=None, config_path: str = DEFAULT_CONFIG_PATH):
+    """Build an IOThrottle from config plus overrides and watch the config for live changes.
+
+    Overridden limits stay as given when the config is edited. Low priority is only
+    recorded on the throttle; the workers apply it (see `_run_in_worker`).
+    Returns (throttle, watcher); the watcher is None when there is no config file.
+    """
+    cfg = load_throttle_config(config_path)
+    throttle = IOThrottle(
+        max_mbps=max_mbps if max_mbps is not None else cfg.get("max_mbps"),
+        max_iops=max_iops if max_iops is not None else cfg.get("max_iops"),
+        low_priority=bool(low_priority if low_priority is not None else cfg.get("low_priority")),
+    )
+    pinned = [name for name, value in (("max_mbps", max_mbps), ("max_iops", max_iops)) if value is not None]
+    watcher = ConfigWatcher(config_path, throttle, pinned=pinned).start() if os.path.exists(config_path) else None
+    return throttle, watcher
+
+
+def _run_in_worker(func, throttle=None):
+    """Call `func()`, on a background-priority worker thread when the throttle asks for low priority."""
+    if not (throttle and throttle.low_priority):
+        return func()
+    outcome = {}
+
+    def _target():
+        with background_priority():
+            try:
+                outcome["result"] = func()
+            except BaseException as e:
+                outcome["error"] = e
+
+    worker = threading.Thread(target=_target, name="low-priority-worker", daemon=True)
+    worker.start()
+    # short joins keep the main thread responsive to Ctrl+C
+    while worker.is_alive():
+        worker.join(0.2)
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+
+def _format_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def _print_progress(event, event_type) -> None:
+    """Console progress line for backups: percent, throughput and ETA."""
+    if event_type != "step-progress" or "bytes_total" not in event:
+        return
+    rate = event.get("throughput_bps")
+    eta = event.get("eta_seconds")
+    line = (f"  {event['percent']:5.1f}%  {_format_bytes(event['bytes_done'])} / {_format_bytes(event['bytes_total'])}"
+            f"  {_format_bytes(rate) + '/s' if rate is not None else '--'}"
+            f"  ETA {time.strftime('%H:%M:%S', time.gmtime(eta)) if eta is not None else '--:--:--'}")
+    print(f"\r{line}", end="", flush=True)
+
+
+def _run_throttled_backup(scope: str, backup_path: str, dry_run: bool = False, **kwargs) -> StepResult:
+    throttle, watcher = _make_throttle()
+    try:
+        return _run_cancellable_backup(scope, backup_path, dry_run=dry_run, throttle=throttle, **kwargs)
+    finally:
+        if watcher:
+            watcher.stop()
+
+
+def _run_cancellable_backup(scope: str, backup_path: str, **kwargs) -> StepResult:
+    """Run a backup on a worker thread so Ctrl+C cancels it cleanly (pre-scan included).
+
+    Inside a flow (see FlowExecutor) the flow's CancellationToken is the cancel event, so
+    cancelling the flow stops the backup mid-way too. It is read here because the worker
+    thread does not inherit the caller's context.
+    """
+    token = current_token()
+    cancel = token if token is not None else threading.Event()
+    outcome = {}
+    kwargs.setdefault("progress_cb", None if kwargs.get("dry_run") else _print_progress)
+    throttle = kwargs.get("throttle")
+
+    def _target():
+        # only this worker drops to background priority; the pools it starts lower their own
+        # threads (see `pool_initializer`), as Windows threads do not inherit the mode
+        with background_priority() if throttle and throttle.low_priority else contextlib.nullcontext():
+            outcome["result"] = run_backup(scope, backup_path, cancel=cancel, **kwargs)
+
+    worker = threading.Thread(target=_target, name="backup", daemon=True)
+    worker.start()
+    while worker.is_alive():
+        try:
+            worker.join(0.2)
+        except KeyboardInterrupt:
+            cancel.set()
+    print()
+    return outcome.get("result") or StepResult.now(name=f"{scope}_backup", status="Error", message="Backup did not finish")
+
+
 def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=None, progress_cb=None, interactive: bool = False):
     """Top-level entrypoint for the backup orchestrator.
 
-    If interactive=True, show backup options menu. Otherwise use provided args.
-    Returns StepResult objects.
+    If interactive=True, show backup options menu. Otherwise back up each scope in
+    `targets` (default: full) into `log_path` (default: DEFAULT_BACKUP_DIR) without
+    prompting. Returns StepResult objects.
     """
     if interactive:
         try:
@@ -47,7 +166,9 @@ def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=
                 "📦 Containers & Images Only", 
                 "🗂️ Volumes & Data Only",
                 "⚙️ Configuration Only",
+                "🐧 WSL Distro Backup",
                 "🔄 Restore from Backup",
+                "🔍 Verify Backup",
                 "🔙 Back to Main Menu"
             ]
             
@@ -70,14 +191,33 @@ def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=
                 return _handle_volumes_backup()
             elif "Configuration Only" in choice:
                 return _handle_config_backup()
+            elif "WSL Distro Backup" in choice:
+                return _handle_wsl_distro_backup()
             elif "Restore from Backup" in choice:
                 return _handle_restore()
+            elif "Verify Backup" in choice:
+                return _handle_verify()
                 
         except Exception as e:
             return StepResult.now(name="backup_orchestrator", status="Error", message=f"UI error: {str(e)}")
 
-    # Non-interactive mode - run full backup
-    return _handle_full_backup(dry_run=dry_run, backup_path=log_path)
+    # Non-interactive mode - no prompts, so flows (FlowExecutor, adapter.run_flow) can run it
+    return _headless_backup(targets or ["full"], log_path or DEFAULT_BACKUP_DIR, dry_run=dry_run,
+                            progress_cb=progress_cb)
+
+
+def _headless_backup(scopes, backup_path: str, dry_run: bool = False, progress_cb=None) -> list:
+    """Back up each scope in turn; stops after a cancelled one."""
+    results = []
+    for scope in scopes:
+        if scope not in BACKUP_SCOPES:
+            results.append(StepResult.now(name=f"{scope}_backup", status="Failed",
+                                          message=f"Unknown backup scope: {scope}"))
+            continue
+        results.append(_run_throttled_backup(scope, backup_path, dry_run=dry_run, progress_cb=progress_cb))
+        if results[-1].status == "Cancelled":
+            break
+    return results
 
 
 def _handle_full_backup(dry_run: bool = False, backup_path: str = None):
@@ -109,8 +249,7 @@ def _handle_full_backup(dry_run: bool = False, backup_path: str = None):
             return StepResult.now(name="full_backup", status="Cancelled", message="Full backup cancelled by user")
         
         # Execute backup
-        results = backup_sequence(dry_run=dry_run)
-        return StepResult.now(name="full_backup", status="Success", message=f"Full backup completed to {backup_path}")
+        return _run_throttled_backup("full", backup_path, dry_run=dry_run)
         
     except Exception as e:
         return StepResult.now(name="full_backup", status="Error", message=f"Full backup failed: {str(e)}")
@@ -140,8 +279,7 @@ def _handle_containers_backup():
         if not confirm:
             return StepResult.now(name="containers_backup", status="Cancelled", message="Containers backup cancelled")
         
-        # TODO: Implement containers-only backup logic
-        return StepResult.now(name="containers_backup", status="Success", message=f"MOCK: Containers backup completed to {backup_path}")
+        return _run_throttled_backup("containers", backup_path)
         
     except Exception as e:
         return StepResult.now(name="containers_backup", status="Error", message=f"Containers backup failed: {str(e)}")
@@ -171,8 +309,7 @@ def _handle_volumes_backup():
         if not confirm:
             return StepResult.now(name="volumes_backup", status="Cancelled", message="Volumes backup cancelled")
         
-        # TODO: Implement volumes-only backup logic
-        return StepResult.now(name="volumes_backup", status="Success", message=f"MOCK: Volumes backup completed to {backup_path}")
+        return _run_throttled_backup("volumes", backup_path)
         
     except Exception as e:
         return StepResult.now(name="volumes_backup", status="Error", message=f"Volumes backup failed: {str(e)}")
@@ -199,17 +336,94 @@ def _handle_config_backup():
         if not backup_path:
             return StepResult.now(name="config_backup", status="Cancelled", message="Backup cancelled")
         
+        mode = questionary.select(
+            "Backup mode:",
+            choices=["Archive (compressed frame archive)", "Snapshot (hardlinked point-in-time tree)"]
+        ).ask()
+        if mode is None:
+            return StepResult.now(name="config_backup", status="Cancelled", message="Backup cancelled")
+        
+        if mode.startswith("Snapshot"):
+            bind_mounts = questionary.text("Bind-mount directories to include (comma separated, optional):").ask()
+            sources = dict(scope_sources("config"))
+            for folder in filter(None, (p.strip() for p in (bind_mounts or "").split(","))):
+                sources[f"bind-{os.path.basename(os.path.normpath(folder))}"] = folder
+            confirm = questionary.confirm(f"Snapshot configuration to {backup_path}?").ask()
+            if not confirm:
+                return StepResult.now(name="config_backup", status="Cancelled", message="Configuration backup cancelled")
+            return _run_snapshot(sources, backup_path)
+        
         confirm = questionary.confirm(f"Backup configuration to {backup_path}?").ask()
         if not confirm:
             return StepResult.now(name="config_backup", status="Cancelled", message="Configuration backup cancelled")
         
-        # TODO: Implement config-only backup logic
-        return StepResult.now(name="config_backup", status="Success", message=f"MOCK: Configuration backup completed to {backup_path}")
+        return _run_throttled_backup("config", backup_path)
         
     except Exception as e:
         return StepResult.now(name="config_backup", status="Error", message=f"Configuration backup failed: {str(e)}")
 
 
+def _run_snapshot(sources, snapshot_root: str, policy: RetentionPolicy = RetentionPolicy()) -> StepResult:
+    """Take a hardlink snapshot, then prune the series to the retention policy."""
+    result = create_snapshot(sources, snapshot_root)
+    if result.status == "Success":
+        result.details["pruned"] = prune_snapshots(snapshot_root, policy)
+    return result
+
+
+def _combine_exports(results) -> StepResult:
+    """Fold per-distro export results into one StepResult for the menu."""
+    failed = [r for r in results if r.status != "Success"]
+    details = {"exports": [r.to_dict() for r in results]}
+    if failed:
+        names = ", ".join(r.name.split(":", 1)[-1] for r in failed)
+        return StepResult.now(name="wsl_distro_backup", status="Failed",
+                              message=f"{len(failed)} of {len(results)} export(s) failed: {names}", details=details)
+    return StepResult.now(name="wsl_distro_backup", status="Success",
+                          message=f"Exported {len(results)} distro(s)", details=details)
+
+
+def _handle_wsl_distro_backup():
+    """Handle streaming export of one or more WSL distros."""
+    try:
+        import questionary  # type: ignore
+        
+        print("🐧 WSL Distro Backup")
+        print("Streams 'wsl --export' into compressed, checksummed parts (no temporary tar on disk).")
+        print()
+        
+        distros = list_distros()
+        if not distros:
+            return StepResult.now(name="wsl_distro_backup", status="Skipped", message="No WSL distros registered")
+        
+        selected = questionary.checkbox("Distros to export:", choices=distros).ask()
+        if not selected:
+            return StepResult.now(name="wsl_distro_backup", status="Cancelled", message="Backup cancelled")
+        
+        backup_path = questionary.text(
+            "Backup path (default: C:\\DockerBackup\\wsl):",
+            default="C:\\DockerBackup\\wsl"
+        ).ask()
+        if not backup_path:
+            return StepResult.now(name="wsl_distro_backup", status="Cancelled", message="Backup cancelled")
+        
+        confirm = questionary.confirm(f"Export {', '.join(selected)} to {backup_path}?").ask()
+        if not confirm:
+            return StepResult.now(name="wsl_distro_backup", status="Cancelled", message="WSL distro backup cancelled")
+        
+        throttle, watcher = _make_throttle()
+        try:
+            return _combine_exports(_run_in_worker(
+                lambda: export_distros(selected, backup_path, throttle=throttle, low_priority=throttle.low_priority),
+                throttle))
+        finally:
+            if watcher:
+                watcher.stop()
+        
+    except Exception as e:
+        return StepResult.now(name="wsl_distro_backup", status="Error", message=f"WSL distro backup failed: {str(e)}")
+
+
 def _handle_restore():
     """Handle restore from backup."""
     try:
@@ -228,8 +442,38 @@ def _handle_restore():
         if not backup_path:
             return StepResult.now(name="restore", status="Cancelled", message="Restore cancelled")
         
+        # Pick a snapshot (or a single file) from the catalog without opening any archive
+        archive = None
+        if os.path.exists(catalog_path_for(backup_path)):
+            with Catalog.for_backup_dir(backup_path) as catalog:
+                picked = _pick_from_catalog(catalog)
+            if picked is None:
+                return StepResult.now(name="restore", status="Cancelled", message="Restore cancelled")
+            if "path" in picked:
+                return _restore_single_file(picked)
+            archive = picked["archive"]
+        else:
+            archive = find_latest_archive(backup_path)
+        if not archive:
+            return StepResult.now(name="restore", status="Failed", message=f"No backup archive found in {backup_path}")
+        
+        manifest = load_manifest(archive)
+        # pipeline archives hold one tree per source label; each goes back to its own root
+        sources = manifest.get("sources") or {}
+        targets = {}
+        for label in sorted(sources) or [None]:
+            target = questionary.text(
+                f"Restore {label} into directory:" if label else "Restore into directory:",
+                default=sources[label] if label else manifest.get("source", "")
+            ).ask()
+            if not target:
+                return StepResult.now(name="restore", status="Cancelled", message="Restore cancelled - no target provided")
+            targets[label] = target
+        
         # Show warning and get confirmation
-        print(f"📂 Restore source: {backup_path}")
+        print(f"📂 Restore source: {archive}")
+        for label, target in targets.items():
+            print(f"📁 Restore target: {target}" + (f" ({label})" if label else ""))
         print("⚠️  This will:")
         print("• Stop all running containers")
         print("• Replace current Docker data")
@@ -240,13 +484,123 @@ def _handle_restore():
         if not confirm:
             return StepResult.now(name="restore", status="Cancelled", message="Restore cancelled by user")
         
-        # TODO: Implement restore logic
-        return StepResult.now(name="restore", status="Success", message=f"MOCK: Restore completed from {backup_path}")
+        # Extract into a staging directory; the live tree is only replaced once every file verified
+        throttle, watcher = _make_throttle()
+        try:
+            if sources:
+                return sources_step_result(_run_in_worker(lambda: restore_sources(archive, targets, throttle=throttle),
+                                                          throttle))
+            return _run_in_worker(lambda: restore_archive(archive, targets[None], manifest=manifest, staging=True,
+                                                          throttle=throttle), throttle).to_step_result()
+        finally:
+            if watcher:
+                watcher.stop()
         
     except Exception as e:
         return StepResult.now(name="restore", status="Error", message=f"Restore failed: {str(e)}")
 
 
+def _expected_root_for(archive: str):
+    """Return the Merkle root the catalog recorded for `archive`, if any."""
+    backup_dir = os.path.dirname(os.path.abspath(archive))
+    if not os.path.exists(catalog_path_for(backup_dir)):
+        return None
+    with Catalog.for_backup_dir(backup_dir) as catalog:
+        run = catalog.run_for_archive(archive)
+    return run.get("merkle_root") if run else None
+
+
+def _handle_verify():
+    """Handle backup integrity verification."""
+    try:
+        import questionary  # type: ignore
+        
+        print("🔍 Verify Backup")
+        print("Checks the archive against the Merkle root recorded at backup time.")
+        print()
+        
+        backup_path = questionary.text(
+            "Backup archive or directory (default: C:\\DockerBackup):",
+            default="C:\\DockerBackup"
+        ).ask()
+        if not backup_path:
+            return StepResult.now(name="backup_verify", status="Cancelled", message="Verify cancelled")
+        
+        archive = find_latest_archive(backup_path)
+        if not archive or not is_frame_archive(archive):
+            return StepResult.now(name="backup_verify", status="Failed", message=f"No frame archive found in {backup_path}")
+        
+        mode = questionary.select(
+            "Verification mode:",
+            choices=["Full (every frame)", "Quick (random 5% of frames)"]
+        ).ask()
+        if mode is None:
+            return StepResult.now(name="backup_verify", status="Cancelled", message="Verify cancelled")
+        
+        sample = 0.05 if mode.startswith("Quick") else None
+        return verify_archive(archive, expected_root=_expected_root_for(archive), sample=sample).to_step_result()
+        
+    except Exception as e:
+        return StepResult.now(name="backup_verify", status="Error", message=f"Verify failed: {str(e)}")
+
+
+def _pick_from_catalog(catalog: Catalog):
+    """Let the user choose a snapshot, or search the catalog for one file.
+
+    Returns the chosen run dict, a search hit dict (has a "path" key) or None.
+    """
+    import questionary  # type: ignore
+
+    runs = catalog.runs()
+    if not runs:
+        return None
+    search_choice = "🔎 Search for a file"
+    labels = {
+        f"#{r['id']} {r['scope']} {time.strftime('%Y-%m-%d %H:%M', time.localtime(r['started']))} "
+        f"({r['files']} files, {r['bytes'] / (1 << 20):.1f} MB)": r
+        for r in runs
+    }
+    choice = questionary.select("Choose a snapshot to restore:", choices=list(labels) + [search_choice]).ask()
+    if choice is None:
+        return None
+    if choice != search_choice:
+        return labels[choice]
+
+    pattern = questionary.text("Path contains (wildcards * and ? allowed):").ask()
+    if not pattern:
+        return None
+    hits = catalog.search(pattern)
+    if not hits:
+        print(f"No catalog entries match '{pattern}'")
+        return None
+    by_label = {
+        f"{h['path']}  [#{h['run_id']} {h['scope']} {time.strftime('%Y-%m-%d %H:%M', time.localtime(h['started']))}]": h
+        for h in hits
+    }
+    choice = questionary.select("Choose the file to restore:", choices=list(by_label)).ask()
+    if choice is None:
+        return None
+    hit = dict(by_label[choice])
+    run = catalog.run(hit["run_id"]) or {}
+    hit["sources"] = run.get("sources", {})
+    return hit
+
+
+def _restore_single_file(hit) -> StepResult:
+    """Restore one file picked from the catalog, seeking straight to it in the archive."""
+    import questionary  # type: ignore
+
+    label, _, rest = hit["path"].partition("/")
+    source_root = hit.get("sources", {}).get(label)
+    default_dest = os.path.join(source_root, *rest.split("/")) if source_root and rest else ""
+    dest = questionary.text("Restore file to:", default=default_dest).ask()
+    if not dest:
+        return StepResult.now(name="restore", status="Cancelled", message="Restore cancelled - no target provided")
+    with FrameArchiveReader(hit["archive"]) as reader:
+        reader.extract(hit["path"], dest)
+    return StepResult.now(name="restore", status="Success", message=f"Restored {hit['path']} to {dest}")
+
+
 def backup_sequence(dry_run=True):
     """Legacy backup sequence function for backward compatibility."""
     if dry_run:
@@ -254,7 +608,132 @@ def backup_sequence(dry_run=True):
     return [StepResult.now(name="backup_data", status="Success", message="MOCK: backup data")]
 
 
+def _cli(argv) -> int:
+    """Non-interactive command line: backup, restore (whole archive or one --path), snapshot, export-wsl, list and verify."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="backup_orchestrator")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_backup = sub.add_parser("backup", help="Back up a scope into a frame archive")
+    p_backup.add_argument("--scope", choices=["full", "containers", "volumes", "config"], default="full")
+    p_backup.add_argument("--output", required=True, help="Directory receiving the archive")
+    p_backup.add_argument("--dry-run", action="store_true")
+    p_restore = sub.add_parser("restore", help="Restore an archive, or a single file with --path")
+    p_restore.add_argument("archive")
+    p_restore.add_argument("--path", help="Restore only this archive path (frame archives seek straight to it)")
+    p_restore.add_argument("--target", help="Directory (or, with --path, file) to restore into; for archives with "
+                                            "several sources, the directory holding one folder per source")
+    p_restore.add_argument("--map", action="append", default=[], metavar="LABEL=DIR",
+                           help="Restore source LABEL into DIR instead of its recorded root; repeatable")
+    p_export = sub.add_parser("export-wsl", help="Stream WSL distros into chunked compressed parts")
+    p_export.add_argument("distros", nargs="+")
+    p_export.add_argument("--output", required=True, help="Directory receiving the parts and manifests")
+    p_export.add_argument("--part-size-mb", type=int, default=1024, help="Size of each part in MiB")
+    p_export.add_argument("--max-concurrent", type=int, default=2, help="Distros exported at the same time")
+    p_export.add_argument("--memory-mb", type=int, default=256, help="Memory budget for in-flight chunks in MiB")
+    p_snapshot = sub.add_parser("snapshot", help="Hardlink snapshot of the config scope (plus extra sources)")
+    p_snapshot.add_argument("--output", required=True, help="Directory holding the snapshot series")
+    p_snapshot.add_argument("--source", action="append", default=[], metavar="LABEL=DIR",
+                            help="Extra source such as a bind-mount directory; repeatable")
+    p_snapshot.add_argument("--only-sources", action="store_true", help="Snapshot only the --source directories")
+    p_snapshot.add_argument("--keep-hourly", type=int, default=RetentionPolicy.hourly)
+    p_snapshot.add_argument("--keep-daily", type=int, default=RetentionPolicy.daily)
+    p_snapshot.add_argument("--keep-weekly", type=int, default=RetentionPolicy.weekly)
+    for p in (p_backup, p_restore, p_export):
+        p.add_argument("--max-mbps", type=float, help="Bandwidth limit in MB/s (default: config, else unlimited)")
+        p.add_argument("--max-iops", type=float, help="I/O operations per second limit")
+        p.add_argument("--low-priority", action="store_true", default=None,
+                       help="Run at background CPU and I/O priority")
+        p.add_argument("--config", default=DEFAULT_CONFIG_PATH,
+                       help="Config file whose 'backup' section sets limits; edits apply while running")
+    p_list = sub.add_parser("list", help="List archive contents from the index only")
+    p_list.add_argument("archive")
+    p_verify = sub.add_parser("verify", help="Verify an archive against its Merkle root")
+    p_verify.add_argument("archive")
+    p_verify.add_argument("--quick", type=float, metavar="N",
+                          help="Check a random sample: a count of frames, or a fraction below 1")
+    p_verify.add_argument("--deep", action="store_true", help="Also decompress and hash every file")
+    p_verify.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    throttle = watcher = None
+    if args.command in ("backup", "restore", "export-wsl"):
+        throttle, watcher = _make_throttle(args.max_mbps, args.max_iops, args.low_priority, args.config)
+
+    if args.command == "backup":
+        result = _run_cancellable_backup(args.scope, args.output, dry_run=args.dry_run, throttle=throttle)
+    elif args.command == "snapshot":
+        sources = {} if args.only_sources else dict(scope_sources("config"))
+        for spec in args.source:
+            label, _, folder = spec.partition("=")
+            if not folder:
+                print(f"--source expects LABEL=DIR: {spec}")
+                return 1
+            sources[label] = folder
+        result = _run_snapshot(sources, args.output,
+                               RetentionPolicy(args.keep_hourly, args.keep_daily, args.keep_weekly))
+    elif args.command == "export-wsl":
+        result = _combine_exports(_run_in_worker(
+            lambda: export_distros(args.distros, args.output, max_concurrent=args.max_concurrent,
+                                   memory_budget=args.memory_mb << 20, part_size=args.part_size_mb << 20,
+                                   throttle=throttle, low_priority=throttle.low_priority),
+            throttle))
+    elif args.command == "verify":
+        sample = None
+        if args.quick:
+            sample = args.quick if args.quick < 1 else int(args.quick)
+        result = verify_archive(args.archive, expected_root=_expected_root_for(args.archive), sample=sample,
+                                deep=args.deep, seed=args.seed).to_step_result()
+    elif args.command == "list":
+        if not is_frame_archive(args.archive):
+            print(f"Not a frame archive: {args.archive}")
+            return 1
+        with FrameArchiveReader(args.archive) as reader:
+            for entry in reader.list():
+                print(f"{entry['size']:>14}  {entry['path']}")
+        return 0
+    elif args.path:
+        if not args.target:
+            print("--path needs --target")
+            return 1
+        if not is_frame_archive(args.archive):
+            print(f"--path needs a frame archive: {args.archive}")
+            return 1
+        try:
+            with FrameArchiveReader(args.archive) as reader:
+                entry = reader.extract(args.path, args.target)
+            result = StepResult.now(name="restore", status="Success",
+                                    message=f"Restored {entry['path']} to {args.target}")
+        except (FrameArchiveError, KeyError, OSError) as e:
+            result = StepResult.now(name="restore", status="Failed", message=f"Could not restore {args.path}",
+                                    error=e)
+    else:
+        sources = load_manifest(args.archive).get("sources") or {}
+        if sources:
+            targets = {label: os.path.join(args.target, label) for label in sources} if args.target else {}
+            for spec in args.map:
+                label, _, folder = spec.partition("=")
+                if not folder or label not in sources:
+                    print(f"--map expects LABEL=DIR with LABEL one of {', '.join(sorted(sources))}: {spec}")
+                    return 1
+                targets[label] = folder
+            result = sources_step_result(_run_in_worker(lambda: restore_sources(args.archive, targets, throttle=throttle),
+                                                        throttle))
+        elif not args.target:
+            print(f"{args.archive} records no source roots; pass --target")
+            return 1
+        else:
+            result = _run_in_worker(lambda: restore_archive(args.archive, args.target, staging=True, throttle=throttle),
+                                    throttle).to_step_result()
+    if watcher:
+        watcher.stop()
+    print(result.to_dict())
+    return 0 if result.status in ("Success", "Skipped") else 1
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(_cli(sys.argv[1:]))
     result = main(interactive=True)
     if result:
         print(f"\nResult: {result.to_dict()}")
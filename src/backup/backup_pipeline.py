@@ -0,0 +1,159 @@
+"""Backup pipeline: write the sources of a backup scope into a frame archive.
+
+Each scope (full, containers, volumes, config) maps labels to source directories;
+every source is stored under its label inside the archive so one archive can hold
+several roots and still be restored per label.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from backup.frame_archive import ARCHIVE_SUFFIX, FrameArchiveWriter
+from backup.catalog import Catalog
+from backup.throttle import IOThrottle
+from backup.prescan import ProgressMeter, ScanCache, ScanCancelled, prescan
+
+# Docker Desktop keeps its engine data inside the docker-desktop WSL distro; override
+# with DOCKER_DATA_ROOT when the engine runs elsewhere.
+DEFAULT_DOCKER_DATA_ROOT = r"\\wsl.localhost\docker-desktop\mnt\docker-desktop-disk\data\docker"
+
+
+def docker_data_root() -> str:
+    return os.environ.get("DOCKER_DATA_ROOT", DEFAULT_DOCKER_DATA_ROOT)
+
+
+def scope_sources(scope: str) -> Dict[str, str]:
+    """Return the {label: directory} sources for a backup scope."""
+    data_root = docker_data_root()
+    home = os.path.expanduser("~")
+    appdata = os.environ.get("APPDATA", os.path.join(home, "AppData", "Roaming"))
+    config = {
+        "docker-config": os.path.join(home, ".docker"),
+        "docker-desktop-settings": os.path.join(appdata, "Docker"),
+    }
+    containers = {
+        "containers": os.path.join(data_root, "containers"),
+        "image": os.path.join(data_root, "image"),
+    }
+    volumes = {
+        "volumes": os.path.join(data_root, "volumes"),
+    }
+    scopes = {
+        "config": config,
+        "containers": containers,
+        "volumes": volumes,
+        "full": {**config, "docker-data": data_root},
+    }
+    if scope not in scopes:
+        raise ValueError(f"Unknown backup scope: {scope}")
+    return scopes[scope]
+
+
+def archive_name(scope: str, when: Optional[float] = None) -> str:
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(when or time.time()))
+    return f"{scope}-{stamp}{ARCHIVE_SUFFIX}"
+
+
+def run_backup(scope: str, backup_dir: str, sources: Optional[Dict[str, str]] = None,
+               dry_run: bool = False, progress_cb: Optional[Callable[[Dict[str, Any], str], None]] = None,
+               catalog: Optional[Catalog] = None, throttle: Optional[IOThrottle] = None,
+               cancel: Optional[threading.Event] = None) -> StepResult:
+    """Back up a scope into ``<backup_dir>/<scope>-<timestamp>.farc``.
+
+    Args:
+        scope: One of full, containers, volumes, config.
+        backup_dir: Directory receiving the archive.
+        sources: Override the {label: directory} sources of the scope.
+        dry_run: Only report what would be archived.
+        progress_cb: Optional ``progress_cb(event, event_type)``. When given, the sources are
+            pre-scanned first and ``step-progress`` events carry bytes done, throughput and ETA.
+        catalog: Catalog to record the run in (default: the catalog in `backup_dir`).
+        throttle: Optional IOThrottle limiting source reads; its limits may change mid-backup.
+        cancel: Optional event; setting it stops the pre-scan or backup with a Cancelled result.
+
+    Returns:
+        StepResult with the archive path and totals in `details`.
+    """
+    name = f"{scope}_backup"
+    sources = sources if sources is not None else scope_sources(scope)
+    present = {label: path for label, path in sources.items() if os.path.isdir(path)}
+    missing = sorted(set(sources) - set(present))
+    if dry_run:
+        return StepResult.now(name=name, status="Skipped", message=f"Dry-run: would back up {', '.join(sorted(present)) or 'nothing'}",
+                              details={"sources": present, "missing": missing})
+    if not present:
+        return StepResult.now(name=name, status="Failed", message=f"No {scope} backup sources found", details={"missing": missing})
+
+    os.makedirs(backup_dir, exist_ok=True)
+    scan = None
+    if progress_cb:
+        try:
+            scan = prescan(present, cancel=cancel, cache=ScanCache.for_backup_dir(backup_dir),
+                           low_priority=bool(throttle and throttle.low_priority))
+        except ScanCancelled:
+            return StepResult.now(name=name, status="Cancelled", message=f"{scope} backup cancelled during pre-scan")
+    meter = ProgressMeter(scan.bytes, name, progress_cb) if scan else None
+
+    def _on_bytes(n: int) -> None:
+        if cancel is not None and cancel.is_set():
+            raise ScanCancelled(f"{scope} backup cancelled")
+        if meter:
+            meter.advance(n)
+
+    archive = os.path.join(backup_dir, archive_name(scope))
+    owns_catalog = catalog is None
+    if owns_catalog:
+        catalog = Catalog.for_backup_dir(backup_dir)
+    run_id = catalog.begin_run(scope, archive, present)
+    started = time.monotonic()
+    try:
+        with FrameArchiveWriter(archive, metadata={"scope": scope, "sources": present, "catalog_run": run_id},
+                                on_entry=lambda entry: catalog.add_entry(run_id, entry), throttle=throttle,
+                                on_bytes=_on_bytes) as writer:
+            for label, path in sorted(present.items()):
+                if progress_cb:
+                    try:
+                        progress_cb({"step_id": name, "source": label}, "step-progress")
+                    except Exception:
+                        # never let UI callback failures abort the backup
+                        pass
+                writer.add_directory(path, prefix=label)
+            files = len(writer.files)
+            total = sum(e["size"] for e in writer.files)
+        root = writer.index["merkle_root"]
+    except Exception as e:
+        cancelled = isinstance(e, ScanCancelled)
+        catalog.finish_run(run_id, "Cancelled" if cancelled else "Failed", elapsed=time.monotonic() - started)
+        if owns_catalog:
+            catalog.close()
+        if cancelled:
+            return StepResult.now(name=name, status="Cancelled", message=f"{scope} backup cancelled")
+        return StepResult.now(name=name, status="Failed", message=f"{scope} backup failed", error=e)
+    if meter:
+        meter.finish()
+    elapsed = time.monotonic() - started
+    catalog.finish_run(run_id, "Success", files=files, bytes_total=total, elapsed=elapsed, merkle_root=root)
+    if owns_catalog:
+        catalog.close()
+    details = {
+        "archive": archive,
+        "catalog_run": run_id,
+        "merkle_root": root,
+        "files": files,
+        "bytes": total,
+        "archive_bytes": os.path.getsize(archive),
+        "elapsed": round(elapsed, 3),
+        "missing": missing,
+        "throttled_seconds": round(throttle.throttled_seconds, 3) if throttle else 0.0,
+        "prescan": {"files": scan.files, "bytes": scan.bytes, "cached_dirs": scan.cached_dirs,
+                    "elapsed": round(scan.elapsed, 3)} if scan else None,
+    }
+    return StepResult.now(name=name, status="Success", message=f"Backed up {files} files to {archive}", details=details)
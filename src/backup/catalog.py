@@ -0,0 +1,199 @@
+"""SQLite catalog of backup runs and their file entries.
+
+The catalog lives next to the backups (``<backup_dir>/backup-catalog.sqlite3``) so
+snapshots can be listed and searched without opening any archive. Entries are
+buffered and written with ``executemany`` in one transaction per batch, which keeps
+catalog overhead negligible even for backups with millions of files.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+CATALOG_NAME = "backup-catalog.sqlite3"
+DEFAULT_BATCH = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    archive TEXT NOT NULL,
+    sources TEXT,
+    status TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    files INTEGER DEFAULT 0,
+    bytes INTEGER DEFAULT 0,
+    elapsed REAL,
+    merkle_root TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS entries_run_path ON entries(run_id, path);
+CREATE INDEX IF NOT EXISTS entries_path ON entries(path);
+"""
+
+
+def catalog_path_for(backup_dir: str) -> str:
+    return os.path.join(backup_dir, CATALOG_NAME)
+
+
+class Catalog:
+    """Small wrapper around the catalog database. Safe to share between threads."""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH):
+        self.path = path
+        self.batch_size = batch_size
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending: List[tuple] = []
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+
+    def _migrate(self) -> None:
+        """Bring catalogs created by older versions up to the current schema."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        if "merkle_root" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE runs ADD COLUMN merkle_root TEXT")
+
+    @classmethod
+    def for_backup_dir(cls, backup_dir: str, **kwargs) -> "Catalog":
+        return cls(catalog_path_for(backup_dir), **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    # -- writes ---------------------------------------------------------
+
+    def begin_run(self, scope: str, archive: str, sources: Optional[Dict[str, str]] = None) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (scope, archive, sources, status, started) VALUES (?, ?, ?, 'Running', ?)",
+                (scope, archive, json.dumps(sources or {}), time.time()),
+            )
+            return cur.lastrowid
+
+    def add_entry(self, run_id: int, entry: Dict[str, Any]) -> None:
+        """Buffer one file entry; the buffer is written once it reaches `batch_size`."""
+        with self._pending_lock:
+            self._pending.append((run_id, entry["path"], entry["size"], entry.get("sha256"), entry.get("mtime")))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def add_entries(self, run_id: int, entries: Iterable[Dict[str, Any]]) -> None:
+        for entry in entries:
+            self.add_entry(run_id, entry)
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO entries (run_id, path, size, sha256, mtime) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def finish_run(self, run_id: int, status: str, files: int = 0, bytes_total: int = 0, elapsed: Optional[float] = None,
+                   merkle_root: Optional[str] = None) -> None:
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, finished = ?, files = ?, bytes = ?, elapsed = ?, merkle_root = ? WHERE id = ?",
+                (status, time.time(), files, bytes_total, elapsed, merkle_root, run_id),
+            )
+
+    def run_for_archive(self, archive: str) -> Optional[Dict[str, Any]]:
+        """Return the newest run that wrote `archive`, matched by absolute path."""
+        target = os.path.abspath(archive)
+        for run in self.runs(status=None):
+            if os.path.abspath(run["archive"]) == target:
+                return run
+        return None
+
+    def delete_run(self, run_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+
+    # -- reads ----------------------------------------------------------
+
+    def _rows(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    def runs(self, scope: Optional[str] = None, status: Optional[str] = "Success") -> List[Dict[str, Any]]:
+        """Return runs newest first, optionally filtered by scope and status."""
+        sql = "SELECT * FROM runs WHERE 1 = 1"
+        params: list = []
+        if scope:
+            sql += " AND scope = ?"
+            params.append(scope)
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY started DESC, id DESC"
+        runs = self._rows(sql, tuple(params))
+        for run in runs:
+            run["sources"] = json.loads(run["sources"] or "{}")
+        return runs
+
+    def run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        rows = self._rows("SELECT * FROM runs WHERE id = ?", (run_id,))
+        if not rows:
+            return None
+        rows[0]["sources"] = json.loads(rows[0]["sources"] or "{}")
+        return rows[0]
+
+    def search(self, pattern: str, run_id: Optional[int] = None, limit: int = 200,
+               status: Optional[str] = "Success") -> List[Dict[str, Any]]:
+        """Find entries whose path contains `pattern` (``*``/``?`` wildcards are honored).
+
+        Only runs with `status` are searched by default: failed and cancelled runs have
+        had their archives removed.
+        """
+        if any(ch in pattern for ch in "*?["):
+            # GLOB matches the whole path; pad it so wildcards still mean "contains"
+            clause, arg = "e.path GLOB ?", f"*{pattern}*"
+        else:
+            clause, arg = "e.path LIKE ? ESCAPE '\\'", "%" + pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sql = ("SELECT e.run_id, e.path, e.size, e.sha256, e.mtime, r.archive, r.scope, r.started "
+               "FROM entries e JOIN runs r ON r.id = e.run_id WHERE " + clause)
+        params: list = [arg]
+        if status:
+            sql += " AND r.status = ?"
+            params.append(status)
+        if run_id is not None:
+            sql += " AND e.run_id = ?"
+            params.append(run_id)
+        sql += " ORDER BY r.started DESC, e.path LIMIT ?"
+        params.append(limit)
+        return self._rows(sql, tuple(params))
+
+    def entries(self, run_id: int, prefix: str = "") -> List[Dict[str, Any]]:
+        return self._rows(
+            "SELECT path, size, sha256, mtime FROM entries WHERE run_id = ? AND path >= ? AND path < ? ORDER BY path",
+            (run_id, prefix, prefix + "\U0010ffff"),
+        )
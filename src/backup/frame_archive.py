@@ -0,0 +1,338 @@
+"""Seekable backup archive made of independently compressed frames.
+
+Layout::
+
+    MAGIC | frame 0 | frame 1 | ... | index | footer
+
+File contents are concatenated into one logical stream which is cut into frames of
+``frame_size`` uncompressed bytes; every frame is a standalone zlib stream. The index
+(zlib-compressed JSON) records each frame's compressed position and SHA-256, each
+file's offset and size within the logical stream plus its SHA-256, and the snapshot's
+Merkle root over both. The fixed-size footer points at the index, so listing an archive
+reads only the footer and the index, and reading one file decompresses only the frames
+that overlap it.
+"""
+import bisect
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from backup.merkle import snapshot_root
+from backup.throttle import pool_initializer
+
+MAGIC = b"WDFA\x01\x00\x00\x00"
+FOOTER_MAGIC = b"WDFAIDX1"
+_FOOTER = struct.Struct("<QQ8s")
+ARCHIVE_SUFFIX = ".farc"
+
+DEFAULT_FRAME_SIZE = 4 << 20
+READ_BLOCK = 1 << 20
+
+
+class FrameArchiveError(Exception):
+    """Raised for malformed frame archives or unknown paths."""
+
+
+def is_frame_archive(path: str) -> bool:
+    """Return True if `path` starts with the frame archive magic."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _compress_frame(data: bytes, level: int) -> Tuple[bytes, str]:
+    """Compress one frame and hash the compressed bytes (runs on a pool thread)."""
+    blob = zlib.compress(data, level)
+    return blob, hashlib.sha256(blob).hexdigest()
+
+
+def _normalize(path: str) -> str:
+    name = path.replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+class FrameArchiveWriter:
+    """Write a frame archive; frames are compressed on a thread pool and written in order.
+
+    Use as a context manager, or call `close()` to write the index and footer.
+    """
+
+    def __init__(self, path: str, frame_size: Optional[int] = None, level: int = 6,
+                 workers: Optional[int] = None, metadata: Optional[Dict[str, Any]] = None,
+                 on_entry: Optional[Callable[[Dict[str, Any]], None]] = None, throttle=None,
+                 on_bytes: Optional[Callable[[int], None]] = None):
+        self.path = path
+        self.on_entry = on_entry
+        # called with the size of every source block read, for byte-level progress
+        self.on_bytes = on_bytes
+        # optional backup.throttle.IOThrottle applied to every source read
+        self.throttle = throttle
+        self.frame_size = frame_size or DEFAULT_FRAME_SIZE
+        self.level = level
+        self.metadata = dict(metadata or {})
+        self.files: List[Dict[str, Any]] = []
+        self.dirs: List[str] = []
+        self.frames: List[List[int]] = []
+        self._fh = open(path, "wb")
+        self._fh.write(MAGIC)
+        self._pos = len(MAGIC)
+        self._buf = bytearray()
+        self._ustart = 0
+        self._logical = 0
+        self._workers = workers or min(8, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=self._workers,
+                                        initializer=pool_initializer(bool(throttle and throttle.low_priority)))
+        self._pending: deque = deque()
+        self._closed = False
+        self.index: Optional[Dict[str, Any]] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _submit_frame(self, data: bytes) -> None:
+        ustart = self._ustart
+        self._ustart += len(data)
+        self._pending.append((ustart, len(data), self._pool.submit(_compress_frame, data, self.level)))
+        # bound in-flight frames so memory stays at a few frames per worker
+        while len(self._pending) > self._workers * 2:
+            self._drain_one()
+
+    def _drain_one(self) -> None:
+        ustart, ulen, fut = self._pending.popleft()
+        blob, digest = fut.result()
+        self._fh.write(blob)
+        self.frames.append([self._pos, len(blob), ustart, ulen, digest])
+        self._pos += len(blob)
+
+    def write(self, data) -> None:
+        """Append raw bytes to the logical stream."""
+        self._buf += data
+        self._logical += len(data)
+        while len(self._buf) >= self.frame_size:
+            chunk = bytes(self._buf[:self.frame_size])
+            del self._buf[:self.frame_size]
+            self._submit_frame(chunk)
+
+    def add_stream(self, arcname: str, fileobj, mode: int = 0o644, mtime: Optional[float] = None) -> Dict[str, Any]:
+        """Add a file from an open binary stream and return its index entry."""
+        offset = self._logical
+        hasher = hashlib.sha256()
+        size = 0
+        while True:
+            block = fileobj.read(READ_BLOCK)
+            if not block:
+                break
+            if self.throttle:
+                self.throttle.throttle(len(block))
+            hasher.update(block)
+            self.write(block)
+            size += len(block)
+            if self.on_bytes:
+                self.on_bytes(len(block))
+        entry = {
+            "path": _normalize(arcname),
+            "offset": offset,
+            "size": size,
+            "sha256": hasher.hexdigest(),
+            "mode": mode & 0o7777,
+            "mtime": time.time() if mtime is None else mtime,
+        }
+        self.files.append(entry)
+        if self.on_entry:
+            self.on_entry(entry)
+        return entry
+
+    def add_file(self, src_path: str, arcname: str) -> Dict[str, Any]:
+        st = os.stat(src_path)
+        with open(src_path, "rb") as f:
+            return self.add_stream(arcname, f, mode=st.st_mode, mtime=st.st_mtime)
+
+    def add_directory(self, root: str, prefix: str = "") -> int:
+        """Add every file below `root` (sorted, symlinks not followed); returns files added."""
+        added = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            rel_dir = os.path.relpath(dirpath, root)
+            rel_dir = "" if rel_dir == "." else rel_dir
+            arc_dir = _normalize(os.path.join(prefix, rel_dir)) if (prefix or rel_dir) else ""
+            if arc_dir:
+                self.dirs.append(arc_dir)
+            for name in sorted(filenames):
+                full = os.path.join(dirpath, name)
+                if os.path.islink(full):
+                    continue
+                self.add_file(full, os.path.join(arc_dir, name))
+                added += 1
+        return added
+
+    def close(self) -> Dict[str, Any]:
+        """Flush frames, write the index and footer; returns the index."""
+        if self._closed:
+            raise FrameArchiveError("archive already closed")
+        if self._buf:
+            self._submit_frame(bytes(self._buf))
+            self._buf.clear()
+        while self._pending:
+            self._drain_one()
+        self._pool.shutdown()
+        index = {
+            "version": 1,
+            "created": time.time(),
+            "frame_size": self.frame_size,
+            "frames": self.frames,
+            "dirs": self.dirs,
+            "files": self.files,
+            "merkle_root": snapshot_root((f[4] for f in self.frames), self.files),
+        }
+        index.update(self.metadata)
+        blob = zlib.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"), self.level)
+        self._fh.write(blob)
+        self._fh.write(_FOOTER.pack(self._pos, len(blob), FOOTER_MAGIC))
+        self._fh.close()
+        self._closed = True
+        self.index = index
+        return index
+
+    def abort(self) -> None:
+        """Discard a partially written archive."""
+        self._pool.shutdown(cancel_futures=True)
+        self._fh.close()
+        self._closed = True
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class FrameArchiveReader:
+    """Random-access reader; only the footer and index are read on open."""
+
+    def __init__(self, path: str, index: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            # callers opening many readers on one archive can share an already parsed index
+            self.index = index if index is not None else self._read_index()
+        except Exception:
+            self._fh.close()
+            raise
+        self._starts = [f[2] for f in self.index["frames"]]
+        self._by_path = {e["path"]: e for e in self.index["files"]}
+        self._cached: Tuple[int, bytes] = (-1, b"")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def _read_index(self) -> Dict[str, Any]:
+        fh = self._fh
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise FrameArchiveError(f"Not a frame archive: {self.path}")
+        fh.seek(-_FOOTER.size, os.SEEK_END)
+        index_offset, index_length, magic = _FOOTER.unpack(fh.read(_FOOTER.size))
+        if magic != FOOTER_MAGIC:
+            raise FrameArchiveError(f"Missing index footer (truncated archive?): {self.path}")
+        fh.seek(index_offset)
+        return json.loads(zlib.decompress(fh.read(index_length)).decode("utf-8"))
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return the file entries (path, size, sha256, ...) without touching any frame."""
+        return list(self.index["files"])
+
+    def entry(self, path: str) -> Dict[str, Any]:
+        try:
+            return self._by_path[_normalize(path)]
+        except KeyError:
+            raise FrameArchiveError(f"Path not in archive: {path}") from None
+
+    def frame(self, i: int) -> bytes:
+        """Decompress frame `i`, reusing the last decompressed frame when possible."""
+        if self._cached[0] == i:
+            return self._cached[1]
+        coff, clen = self.index["frames"][i][:2]
+        self._fh.seek(coff)
+        data = zlib.decompress(self._fh.read(clen))
+        self._cached = (i, data)
+        return data
+
+    def iter_range(self, offset: int, size: int) -> Iterator[bytes]:
+        """Yield the logical stream bytes [offset, offset + size), frame by frame."""
+        if size <= 0:
+            return
+        i = bisect.bisect_right(self._starts, offset) - 1
+        end = offset + size
+        pos = offset
+        while pos < end:
+            ustart, ulen = self.index["frames"][i][2:4]
+            data = self.frame(i)
+            lo = pos - ustart
+            hi = min(end, ustart + ulen) - ustart
+            yield data[lo:hi]
+            pos = ustart + hi
+            i += 1
+
+    def iter_file(self, path: str) -> Iterator[bytes]:
+        e = self.entry(path)
+        return self.iter_range(e["offset"], e["size"])
+
+    def read(self, path: str) -> bytes:
+        return b"".join(self.iter_file(path))
+
+    def extract(self, path: str, dest: str) -> Dict[str, Any]:
+        """Extract one file to `dest`, verifying its SHA-256; returns the index entry.
+
+        The bytes go to a temp file beside `dest` first, so a corrupt frame leaves
+        an existing `dest` untouched.
+        """
+        e = self.entry(path)
+        parent = os.path.dirname(os.path.abspath(dest))
+        os.makedirs(parent, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(dest)}.", suffix=".tmp", dir=parent)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in self.iter_range(e["offset"], e["size"]):
+                    hasher.update(chunk)
+                    out.write(chunk)
+            if hasher.hexdigest() != e["sha256"]:
+                raise FrameArchiveError(f"Checksum mismatch for {path}")
+            try:
+                os.utime(tmp, (e["mtime"], e["mtime"]))
+            except OSError:
+                pass
+            os.replace(tmp, dest)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return e
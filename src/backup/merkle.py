@@ -0,0 +1,45 @@
+"""Merkle tree helpers for backup snapshots.
+
+Leaves and interior nodes are domain-separated (0x00 / 0x01 prefixes) so a leaf can
+never be confused with a node. A snapshot root commits to two subtrees: the frame
+(chunk) hashes of the archive and the per-file content hashes.
+"""
+import hashlib
+from typing import Iterable, List, Sequence
+
+_LEAF = b"\x00"
+_NODE = b"\x01"
+_SNAPSHOT = b"\x02"
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(_LEAF + data).digest()
+
+
+def merkle_root(leaves: Sequence[bytes]) -> bytes:
+    """Return the root over already-hashed leaves (odd nodes are promoted unchanged)."""
+    if not leaves:
+        return EMPTY_ROOT
+    level: List[bytes] = list(leaves)
+    while len(level) > 1:
+        nxt = [hashlib.sha256(_NODE + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+    return level[0]
+
+
+def frame_leaves(frame_hashes: Iterable[str]) -> List[bytes]:
+    return [leaf_hash(bytes.fromhex(h)) for h in frame_hashes]
+
+
+def file_leaves(files: Iterable[dict]) -> List[bytes]:
+    return [leaf_hash(f["path"].encode("utf-8") + b"\x00" + bytes.fromhex(f["sha256"])) for f in files]
+
+
+def snapshot_root(frame_hashes: Iterable[str], files: Iterable[dict]) -> str:
+    """Root committing to every frame hash and every (path, file hash) pair, as hex."""
+    frames_root = merkle_root(frame_leaves(frame_hashes))
+    files_root = merkle_root(file_leaves(files))
+    return hashlib.sha256(_SNAPSHOT + frames_root + files_root).hexdigest()
@@ -0,0 +1,232 @@
+"""Parallel pre-scan of backup sources, and a progress meter with throughput and ETA.
+
+The pre-scan walks every source with ``os.scandir`` on a thread pool (one task per
+directory) to count files and bytes before the backup starts, so progress can be
+reported against a real total. It checks a cancellation event between directories.
+
+Results are cached per directory, keyed by the directory's mtime: a directory whose
+entries have not been added, removed or renamed since the last scan reuses its
+cached counts without being listed again. Files rewritten in place do not change
+the directory mtime, so cached totals are an estimate; they only drive the ETA,
+never what gets backed up.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from backup.throttle import pool_initializer
+
+CACHE_NAME = ".prescan-cache.json"
+
+
+class ScanCancelled(Exception):
+    """Raised when the cancellation event is set during a scan or backup."""
+
+
+@dataclass
+class ScanResult:
+    """Totals of a pre-scan, overall and per source label."""
+    files: int = 0
+    bytes: int = 0
+    dirs: int = 0
+    cached_dirs: int = 0
+    elapsed: float = 0.0
+    per_source: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+class ScanCache:
+    """Per-directory scan results keyed by directory mtime, persisted as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._seen: set = set()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+
+    @classmethod
+    def for_backup_dir(cls, backup_dir: str) -> "ScanCache":
+        return cls(os.path.join(backup_dir, CACHE_NAME))
+
+    def get(self, directory: str, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            hit = self._data.get(directory)
+            self._seen.add(directory)
+            return hit if hit and hit["mtime_ns"] == mtime_ns else None
+
+    def put(self, directory: str, mtime_ns: int, files: int, nbytes: int, subdirs: List[str]) -> None:
+        with self._lock:
+            self._data[directory] = {"mtime_ns": mtime_ns, "files": files, "bytes": nbytes, "subdirs": subdirs}
+            self._seen.add(directory)
+
+    def save(self) -> None:
+        """Write the cache, dropping directories not seen in this run (deleted or out of scope)."""
+        with self._lock:
+            data = {d: v for d, v in self._data.items() if d in self._seen}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+def _scan_dir(directory: str, cache: Optional[ScanCache]) -> Tuple[int, int, List[str], bool]:
+    """Return (files, bytes, subdirectories, from_cache) for one directory."""
+    mtime_ns = os.stat(directory).st_mtime_ns
+    if cache:
+        hit = cache.get(directory, mtime_ns)
+        if hit:
+            return hit["files"], hit["bytes"], [os.path.join(directory, d) for d in hit["subdirs"]], True
+    files = nbytes = 0
+    subdirs: List[str] = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    files += 1
+                    nbytes += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue  # vanished or unreadable entry: the backup will report it
+    if cache:
+        cache.put(directory, mtime_ns, files, nbytes, subdirs)
+    return files, nbytes, [os.path.join(directory, d) for d in subdirs], False
+
+
+def prescan(sources: Dict[str, str], workers: Optional[int] = None, cancel: Optional[threading.Event] = None,
+            cache: Optional[ScanCache] = None, low_priority: bool = False) -> ScanResult:
+    """Count files and bytes below every source directory in parallel.
+
+    Args:
+        sources: {label: directory}; missing directories count as empty.
+        workers: Scanning threads (scandir is I/O bound, so more than the CPU count helps).
+        cancel: Event checked between directories; raises ScanCancelled when set.
+        cache: Optional ScanCache to reuse results for directories whose mtime is unchanged.
+        low_priority: Run the scanning threads at background priority.
+
+    Returns:
+        ScanResult with overall and per-label totals.
+    """
+    started = time.monotonic()
+    result = ScanResult(per_source={label: {"files": 0, "bytes": 0} for label in sources})
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4),
+                            initializer=pool_initializer(low_priority)) as pool:
+        pending = {}
+        for label, root in sources.items():
+            if os.path.isdir(root):
+                pending[pool.submit(_scan_dir, root, cache)] = label
+        try:
+            while pending:
+                if cancel is not None and cancel.is_set():
+                    raise ScanCancelled("pre-scan cancelled")
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    label = pending.pop(fut)
+                    try:
+                        files, nbytes, subdirs, cached = fut.result()
+                    except OSError:
+                        continue
+                    result.files += files
+                    result.bytes += nbytes
+                    result.dirs += 1
+                    result.cached_dirs += cached
+                    result.per_source[label]["files"] += files
+                    result.per_source[label]["bytes"] += nbytes
+                    for sub in subdirs:
+                        pending[pool.submit(_scan_dir, sub, cache)] = label
+        except ScanCancelled:
+            for fut in pending:
+                fut.cancel()
+            raise
+    if cache:
+        cache.save()
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+class ProgressMeter:
+    """Turn byte counts into ``step-progress`` events with throughput and ETA.
+
+    Throughput is an exponential moving average of the rate between samples, so the
+    ETA follows the current speed without jumping on every block. Events are
+    rate-limited to one per `interval` seconds; `finish()` always emits a final one.
+    """
+
+    def __init__(self, total_bytes: int, step_id: str, progress_cb: Optional[Callable[[Dict[str, Any], str], None]],
+                 alpha: float = 0.3, interval: float = 0.5, clock: Callable[[], float] = time.monotonic):
+        self.total_bytes = total_bytes
+        self.step_id = step_id
+        self.progress_cb = progress_cb
+        self.alpha = alpha
+        self.interval = interval
+        self.clock = clock
+        self.bytes_done = 0
+        self.throughput: Optional[float] = None
+        self._lock = threading.Lock()
+        self._last_time = clock()
+        self._last_bytes = 0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        if not self.throughput:
+            return None
+        return max(0.0, self.total_bytes - self.bytes_done) / self.throughput
+
+    def advance(self, nbytes: int) -> None:
+        with self._lock:
+            self.bytes_done += nbytes
+            now = self.clock()
+            if now - self._last_time < self.interval:
+                return
+            self._sample(now)
+            event = self._event()
+        self._emit(event)
+
+    def finish(self) -> None:
+        with self._lock:
+            now = self.clock()
+            if now > self._last_time:
+                self._sample(now)
+            event = self._event()
+        self._emit(event)
+
+    def _sample(self, now: float) -> None:
+        rate = (self.bytes_done - self._last_bytes) / (now - self._last_time)
+        self.throughput = rate if self.throughput is None else self.alpha * rate + (1 - self.alpha) * self.throughput
+        self._last_time = now
+        self._last_bytes = self.bytes_done
+
+    def _event(self) -> Dict[str, Any]:
+        eta = self.eta_seconds
+        return {
+            "step_id": self.step_id,
+            "bytes_done": self.bytes_done,
+            "bytes_total": self.total_bytes,
+            "percent": round(100.0 * self.bytes_done / self.total_bytes, 1) if self.total_bytes else 100.0,
+            "throughput_bps": int(self.throughput) if self.throughput is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        if not self.progress_cb:
+            return
+        try:
+            self.progress_cb(event, "step-progress")
+        except Exception:
+            # never let UI callback failures abort the backup
+            pass
@@ -0,0 +1,585 @@
+"""Parallel, verified, sparse-aware restore engine.
+
+Backup archives are tar files with a sidecar manifest (``<archive>.manifest.json``)
+that maps each member path to its SHA-256 digest. The engine:
+
+* reads the tar index once, then extracts regular files with a pool of workers,
+  each worker seeking straight to its member's data with its own file handle;
+* hashes every block as it is written, so verification needs no second read pass;
+* recreates holes (GNU sparse members and all-zero blocks) by seeking instead of
+  writing zeros;
+* restores into a sibling staging directory and swaps it into place only after
+  every file verified, so a failed restore leaves the live data untouched.
+
+Pipeline archives store each source under a label (``docker-config/...``) and
+record the label's root in the index ``sources``; `restore_sources` restores
+every label into its own root, swapping them in only once all of them verified.
+
+Frame archives (see `backup.frame_archive`) carry their digests in their own index;
+their files are split into contiguous slices, one per worker, so each frame is
+decompressed about once. Compressed tars (``.tar.gz`` etc.) cannot be seeked into,
+so they are streamed sequentially through the same write/verify path.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from backup.frame_archive import ARCHIVE_SUFFIX as FRAME_SUFFIX, FrameArchiveReader, is_frame_archive
+from backup.throttle import IOThrottle, pool_initializer
+
+MANIFEST_SUFFIX = ".manifest.json"
+ARCHIVE_SUFFIXES = (FRAME_SUFFIX, ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# Read size per I/O call and the granularity at which zero runs become holes.
+COPY_BLOCK = 1 << 20
+HOLE_BLOCK = 64 << 10
+_ZEROS = bytes(COPY_BLOCK)
+
+
+class RestoreError(Exception):
+    """Raised when an archive cannot be restored safely."""
+
+
+@dataclass
+class RestoreReport:
+    """Outcome of a restore run."""
+    target: str
+    files: int = 0
+    bytes_written: int = 0
+    hole_bytes: int = 0
+    verified: int = 0
+    unverified: int = 0
+    mismatches: List[str] = field(default_factory=list)
+    swapped: bool = False
+    staging: Optional[str] = None
+    elapsed: float = 0.0
+    throttled_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches
+
+    def to_step_result(self, name: str = "restore") -> StepResult:
+        details = {
+            "target": self.target,
+            "files": self.files,
+            "bytes_written": self.bytes_written,
+            "hole_bytes": self.hole_bytes,
+            "verified": self.verified,
+            "unverified": self.unverified,
+            "mismatches": list(self.mismatches),
+            "elapsed": round(self.elapsed, 3),
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+        if not self.ok:
+            return StepResult.now(name=name, status="Failed",
+                                  message=f"{len(self.mismatches)} file(s) failed verification; live data left untouched",
+                                  error=", ".join(self.mismatches[:5]), details=details)
+        return StepResult.now(name=name, status="Success",
+                              message=f"Restored {self.files} files ({self.bytes_written} bytes) to {self.target}",
+                              details=details)
+
+
+def manifest_path_for(archive_path: str) -> str:
+    return archive_path + MANIFEST_SUFFIX
+
+
+def load_manifest(archive_path: str) -> Dict[str, Any]:
+    """Load the manifest for an archive, or an empty manifest if there is none.
+
+    Frame archives carry their manifest in the index; tars use a sidecar file.
+    """
+    if is_frame_archive(archive_path):
+        with FrameArchiveReader(archive_path) as reader:
+            index = reader.index
+        manifest = {k: v for k, v in index.items() if k not in ("frames", "files", "dirs")}
+        manifest["files"] = {e["path"]: e["sha256"] for e in index["files"]}
+        return manifest
+    path = manifest_path_for(archive_path)
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    data.setdefault("files", {})
+    return data
+
+
+def find_latest_archive(path: str) -> Optional[str]:
+    """Return `path` if it is an archive, else the newest archive inside the directory."""
+    if os.path.isfile(path):
+        return path
+    if not os.path.isdir(path):
+        return None
+    candidates = [
+        os.path.join(path, name) for name in os.listdir(path)
+        if name.endswith(ARCHIVE_SUFFIXES)
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
+
+
+def _safe_join(root: str, member_name: str) -> str:
+    """Join a member name under root, refusing absolute paths and traversal."""
+    name = member_name.replace("\\", "/").lstrip("/")
+    dest = os.path.normpath(os.path.join(root, name))
+    if os.path.commonpath([os.path.abspath(root), os.path.abspath(dest)]) != os.path.abspath(root):
+        raise RestoreError(f"Refusing to restore outside target: {member_name}")
+    return dest
+
+
+def _member_key(member_name: str) -> str:
+    """Normalize a member name to the form used as a manifest key."""
+    name = member_name.replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+def _mark_sparse(fh) -> None:
+    """Flag a file as sparse on NTFS so seeks leave holes; no-op elsewhere."""
+    if os.name != "nt":
+        return
+    try:
+        import ctypes
+        import msvcrt
+        FSCTL_SET_SPARSE = 0x900C4
+        handle = msvcrt.get_osfhandle(fh.fileno())
+        returned = ctypes.c_ulong(0)
+        ctypes.windll.kernel32.DeviceIoControl(handle, FSCTL_SET_SPARSE, None, 0, None, 0, ctypes.byref(returned), None)
+    except Exception:
+        pass
+
+
+class _SparseWriter:
+    """Write a file sequentially, turning all-zero blocks into holes and hashing as it goes."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.hasher = hashlib.sha256()
+        self.pos = 0
+        self.written = 0
+        self.holes = 0
+        self._sparse_marked = False
+
+    def _skip(self, n: int) -> None:
+        if not self._sparse_marked:
+            _mark_sparse(self.fh)
+            self._sparse_marked = True
+        self.pos += n
+        self.holes += n
+        self.fh.seek(self.pos)
+
+    def write(self, block) -> None:
+        self.hasher.update(block)
+        view = memoryview(block)
+        size = len(view)
+        start = 0
+        run_start = 0
+        while start < size:
+            end = min(start + HOLE_BLOCK, size)
+            if view[start:end] == _ZEROS[:end - start]:
+                if run_start < start:
+                    self.fh.write(view[run_start:start])
+                    self.pos += start - run_start
+                    self.written += start - run_start
+                self._skip(end - start)
+                run_start = end
+            start = end
+        if run_start < size:
+            self.fh.write(view[run_start:size])
+            self.pos += size - run_start
+            self.written += size - run_start
+
+    def hole(self, n: int) -> None:
+        """Record an explicit hole of n bytes (from a sparse member map)."""
+        remaining = n
+        while remaining:
+            step = min(remaining, COPY_BLOCK)
+            self.hasher.update(_ZEROS[:step])
+            remaining -= step
+        self._skip(n)
+
+    def finish(self, size: int) -> str:
+        # a trailing hole needs an explicit length, seek alone does not extend the file
+        self.fh.truncate(size)
+        return self.hasher.hexdigest()
+
+
+def _copy_exact(src, writer: _SparseWriter, n: int, throttle: Optional[IOThrottle] = None) -> None:
+    remaining = n
+    while remaining:
+        block = src.read(min(COPY_BLOCK, remaining))
+        if not block:
+            raise RestoreError("Unexpected end of archive")
+        if throttle:
+            throttle.throttle(len(block))
+        writer.write(block)
+        remaining -= len(block)
+
+
+def _restore_member_seekable(archive_path: str, member: tarfile.TarInfo, dest: str,
+                             throttle: Optional[IOThrottle] = None) -> Dict[str, Any]:
+    """Extract one regular/sparse member using a private handle on the archive."""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(archive_path, "rb") as src, open(dest, "wb") as out:
+        src.seek(member.offset_data)
+        writer = _SparseWriter(out)
+        if member.sparse:
+            cursor = 0
+            for offset, numbytes in member.sparse:
+                if offset > cursor:
+                    writer.hole(offset - cursor)
+                _copy_exact(src, writer, numbytes, throttle)
+                cursor = offset + numbytes
+            if member.size > cursor:
+                writer.hole(member.size - cursor)
+        else:
+            _copy_exact(src, writer, member.size, throttle)
+        digest = writer.finish(member.size)
+    _apply_metadata(dest, member.mode, member.mtime)
+    return {"digest": digest, "written": writer.written, "holes": writer.holes}
+
+
+def _restore_member_stream(fileobj, member: tarfile.TarInfo, dest: str,
+                           throttle: Optional[IOThrottle] = None) -> Dict[str, Any]:
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest, "wb") as out:
+        writer = _SparseWriter(out)
+        _copy_exact(fileobj, writer, member.size, throttle)
+        digest = writer.finish(member.size)
+    _apply_metadata(dest, member.mode, member.mtime)
+    return {"digest": digest, "written": writer.written, "holes": writer.holes}
+
+
+def _apply_metadata(dest: str, mode: int, mtime: float) -> None:
+    try:
+        os.chmod(dest, mode & 0o7777)
+        os.utime(dest, (mtime, mtime))
+    except OSError:
+        pass
+
+
+def _restore_frame_slice(archive_path: str, index: Dict[str, Any], entries: List[Dict[str, Any]],
+                         root: str, on_done: Callable[[str, Dict[str, Any]], None],
+                         throttle: Optional[IOThrottle] = None) -> None:
+    """Extract a contiguous run of frame-archive entries with one reader and frame cache."""
+    with FrameArchiveReader(archive_path, index=index) as reader:
+        for e in entries:
+            dest = _safe_join(root, e.get("rel", e["path"]))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(dest, "wb") as out:
+                writer = _SparseWriter(out)
+                for chunk in reader.iter_range(e["offset"], e["size"]):
+                    if throttle:
+                        throttle.throttle(len(chunk))
+                    writer.write(chunk)
+                digest = writer.finish(e["size"])
+            _apply_metadata(dest, e.get("mode", 0o644), e.get("mtime", time.time()))
+            on_done(e["path"], {"digest": digest, "written": writer.written, "holes": writer.holes})
+
+
+def _split_by_bytes(entries: List[Dict[str, Any]], parts: int) -> List[List[Dict[str, Any]]]:
+    """Cut offset-ordered entries into at most `parts` contiguous slices of similar size."""
+    total = sum(e["size"] for e in entries)
+    share = max(1, total // max(1, parts))
+    slices: List[List[Dict[str, Any]]] = [[]]
+    acc = 0
+    for e in entries:
+        if acc >= share and len(slices) < parts:
+            slices.append([])
+            acc = 0
+        slices[-1].append(e)
+        acc += e["size"]
+    return [s for s in slices if s]
+
+
+def _strip_prefix(name: str, prefix: Optional[str]) -> Optional[str]:
+    """Member name relative to `prefix`, or None when the member lies outside it."""
+    key = _member_key(name)
+    if not prefix:
+        return key
+    head = prefix.strip("/") + "/"
+    return key[len(head):] if key.startswith(head) and len(key) > len(head) else None
+
+
+def _is_seekable_tar(archive_path: str) -> bool:
+    return archive_path.endswith(".tar")
+
+
+def _staging_dir_for(target: str) -> str:
+    parent, name = os.path.split(os.path.abspath(target).rstrip(os.sep))
+    return os.path.join(parent, f".{name}.restore-staging-{os.getpid()}")
+
+
+def swap_into_place(staging: str, target: str, keep_previous: bool = False) -> Optional[str]:
+    """Move `staging` to `target`, keeping the old target aside until the swap succeeded.
+
+    Both renames stay on one filesystem, so each is atomic; if the second fails the
+    previous target is moved back. Returns the path of the kept previous tree, if any.
+    """
+    target = os.path.abspath(target)
+    previous = None
+    if os.path.exists(target):
+        previous = f"{target}.pre-restore-{int(time.time())}"
+        os.replace(target, previous)
+    try:
+        os.replace(staging, target)
+    except OSError:
+        if previous:
+            os.replace(previous, target)
+        raise
+    if previous and not keep_previous:
+        shutil.rmtree(previous, ignore_errors=True)
+        return None
+    return previous
+
+
+def restore_archive(archive_path: str, target: str, manifest: Optional[Dict[str, Any]] = None,
+                    workers: Optional[int] = None, staging: bool = True, keep_previous: bool = False,
+                    progress_cb: Optional[Callable[[Dict[str, Any], str], None]] = None,
+                    throttle: Optional[IOThrottle] = None, prefix: Optional[str] = None,
+                    swap: bool = True) -> RestoreReport:
+    """Restore an archive into `target`, verifying every file against the manifest.
+
+    Args:
+        archive_path: Path to a frame archive or tar archive.
+        target: Directory to restore into.
+        manifest: Parsed manifest; defaults to the archive's own (index or sidecar) manifest.
+        workers: Extraction worker count (default: ThreadPoolExecutor's I/O-friendly default).
+        staging: Extract into a sibling staging directory and swap it in atomically.
+        keep_previous: When staging, keep the replaced tree as ``<target>.pre-restore-<ts>``.
+        progress_cb: Optional ``progress_cb(event, event_type)`` receiving ``step-progress`` events.
+        throttle: Optional IOThrottle shared by all workers; its limits may change mid-restore.
+        prefix: Restore only the members under this archive directory (e.g. a source label),
+            relative to it.
+        swap: When staging, swap the verified tree into place; False leaves it in
+            ``report.staging`` for the caller to swap.
+
+    Returns:
+        RestoreReport describing what was written and verified.
+
+    Raises:
+        RestoreError: A whole multi-source archive would replace an existing `target`;
+            use `restore_sources` or `prefix` instead.
+    """
+    started = time.monotonic()
+    if manifest is None:
+        manifest = load_manifest(archive_path)
+    if (staging and not prefix and manifest.get("sources") and os.path.isdir(target)
+            and os.listdir(target)):
+        # the archive holds <label>/... trees, not a mirror of `target`: swapping would wipe it
+        raise RestoreError(f"{archive_path} holds sources {', '.join(sorted(manifest['sources']))}; "
+                           f"restore them per source instead of replacing {target}")
+    expected = {}
+    for k, v in manifest.get("files", {}).items():
+        rel = _strip_prefix(k, prefix)
+        if rel is not None:
+            expected[rel] = v
+    root = _staging_dir_for(target) if staging else os.path.abspath(target)
+    if staging and os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+
+    report = RestoreReport(target=os.path.abspath(target))
+    lock = threading.Lock()
+
+    def _emit(event: Dict[str, Any]):
+        if not progress_cb:
+            return
+        try:
+            progress_cb(event, "step-progress")
+        except Exception:
+            # never let UI callback failures abort the restore
+            pass
+
+    def _record(name: str, outcome: Dict[str, Any], bytes_total: int):
+        key = _strip_prefix(name, prefix)
+        with lock:
+            report.files += 1
+            report.bytes_written += outcome["written"]
+            report.hole_bytes += outcome["holes"]
+            want = expected.get(key)
+            if want is None:
+                report.unverified += 1
+            elif want == outcome["digest"]:
+                report.verified += 1
+            else:
+                report.mismatches.append(key)
+            done = report.bytes_written + report.hole_bytes
+            files_done = report.files
+        _emit({"step_id": "restore", "files_done": files_done, "bytes_done": done, "bytes_total": bytes_total})
+
+    links: List[tarfile.TarInfo] = []
+    dirs: List[tarfile.TarInfo] = []
+    initializer = pool_initializer(bool(throttle and throttle.low_priority))
+    try:
+        if is_frame_archive(archive_path):
+            with FrameArchiveReader(archive_path) as reader:
+                index = reader.index
+            for d in index.get("dirs", []):
+                rel = _strip_prefix(d, prefix)
+                if rel is not None:
+                    os.makedirs(_safe_join(root, rel), exist_ok=True)
+            entries = [dict(e, rel=_strip_prefix(e["path"], prefix)) for e in index["files"]]
+            entries = sorted((e for e in entries if e["rel"] is not None), key=lambda e: e["offset"])
+            bytes_total = sum(e["size"] for e in entries)
+            slices = _split_by_bytes(entries, workers or min(32, (os.cpu_count() or 1) + 4))
+            with ThreadPoolExecutor(max_workers=max(1, len(slices)), initializer=initializer) as pool:
+                futures = [
+                    pool.submit(_restore_frame_slice, archive_path, index, chunk, root,
+                                lambda name, outcome: _record(name, outcome, bytes_total), throttle)
+                    for chunk in slices
+                ]
+                for fut in as_completed(futures):
+                    fut.result()
+        elif _is_seekable_tar(archive_path):
+            with tarfile.open(archive_path, "r:") as tf:
+                members = [m for m in tf.getmembers() if _strip_prefix(m.name, prefix) is not None]
+            files = [m for m in members if m.isreg()]
+            dirs = [m for m in members if m.isdir()]
+            links = [m for m in members if m.issym() or m.islnk()]
+            for d in dirs:
+                os.makedirs(_safe_join(root, _strip_prefix(d.name, prefix)), exist_ok=True)
+            bytes_total = sum(m.size for m in files)
+            # largest first so one big file does not start last and serialize the tail
+            files.sort(key=lambda m: m.size, reverse=True)
+            with ThreadPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+                futures = {
+                    pool.submit(_restore_member_seekable, archive_path, m,
+                                _safe_join(root, _strip_prefix(m.name, prefix)), throttle): m
+                    for m in files
+                }
+                for fut in as_completed(futures):
+                    _record(futures[fut].name, fut.result(), bytes_total)
+        else:
+            with tarfile.open(archive_path, "r|*") as tf:
+                for member in tf:
+                    rel = _strip_prefix(member.name, prefix)
+                    if rel is None:
+                        continue
+                    dest = _safe_join(root, rel)
+                    if member.isdir():
+                        os.makedirs(dest, exist_ok=True)
+                        dirs.append(member)
+                    elif member.isreg():
+                        outcome = _restore_member_stream(tf.extractfile(member), member, dest, throttle)
+                        _record(member.name, outcome, 0)
+                    elif member.issym() or member.islnk():
+                        links.append(member)
+
+        for link in links:
+            dest = _safe_join(root, _strip_prefix(link.name, prefix))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if link.issym():
+                os.symlink(link.linkname, dest)
+            else:
+                linked = _strip_prefix(link.linkname, prefix)
+                if linked is None:
+                    raise RestoreError(f"Hard link {link.name} points outside {prefix}: {link.linkname}")
+                os.link(_safe_join(root, linked), dest)
+        # directory mtimes last: creating children above would have bumped them
+        for d in sorted(dirs, key=lambda m: m.name.count("/"), reverse=True):
+            _apply_metadata(_safe_join(root, _strip_prefix(d.name, prefix)), d.mode, d.mtime)
+    except Exception:
+        if staging:
+            shutil.rmtree(root, ignore_errors=True)
+        raise
+
+    if staging:
+        if not report.ok:
+            shutil.rmtree(root, ignore_errors=True)
+        elif swap:
+            swap_into_place(root, target, keep_previous=keep_previous)
+            report.swapped = True
+        else:
+            report.staging = root
+    report.elapsed = time.monotonic() - started
+    if throttle:
+        report.throttled_seconds = throttle.throttled_seconds
+    return report
+
+
+def restore_sources(archive_path: str, targets: Optional[Dict[str, str]] = None,
+                    labels: Optional[List[str]] = None, workers: Optional[int] = None,
+                    keep_previous: bool = False,
+                    progress_cb: Optional[Callable[[Dict[str, Any], str], None]] = None,
+                    throttle: Optional[IOThrottle] = None) -> Dict[str, RestoreReport]:
+    """Restore each source label of a pipeline archive into its own root.
+
+    Every label is extracted and verified in staging first; the trees are swapped
+    into place only when all of them verified, otherwise nothing is touched.
+
+    Args:
+        archive_path: Archive whose index records ``sources`` ({label: root}).
+        targets: Per-label root overrides (default: the roots recorded at backup time).
+        labels: Restore only these labels (default: all recorded ones).
+
+    Returns:
+        {label: RestoreReport}; ``swapped`` is set on each report once its tree is live.
+    """
+    manifest = load_manifest(archive_path)
+    sources = manifest.get("sources") or {}
+    if not sources:
+        raise RestoreError(f"{archive_path} records no sources; use restore_archive with a target")
+    roots = {label: (targets or {}).get(label) or sources[label] for label in (labels or sorted(sources))
+             if label in sources}
+    unknown = sorted(set(labels or []) - set(sources))
+    if unknown:
+        raise RestoreError(f"{archive_path} has no source(s) {', '.join(unknown)}")
+    if len({os.path.normcase(os.path.abspath(r)) for r in roots.values()}) < len(roots):
+        raise RestoreError("Two sources cannot be restored into the same directory")
+
+    reports: Dict[str, RestoreReport] = {}
+    try:
+        for label, root in roots.items():
+            reports[label] = restore_archive(archive_path, root, manifest=manifest, workers=workers,
+                                             keep_previous=keep_previous, progress_cb=progress_cb,
+                                             throttle=throttle, prefix=label, swap=False)
+            if not reports[label].ok:
+                break
+    except Exception:
+        for report in reports.values():
+            if report.staging:
+                shutil.rmtree(report.staging, ignore_errors=True)
+        raise
+    if all(r.ok for r in reports.values()) and len(reports) == len(roots):
+        for label, report in reports.items():
+            swap_into_place(report.staging, roots[label], keep_previous=keep_previous)
+            report.swapped, report.staging = True, None
+    else:
+        for report in reports.values():
+            if report.staging:
+                shutil.rmtree(report.staging, ignore_errors=True)
+                report.staging = None
+    return reports
+
+
+def sources_step_result(reports: Dict[str, RestoreReport], name: str = "restore") -> StepResult:
+    """Fold per-source restore reports into one StepResult."""
+    details = {label: r.to_step_result(name).details for label, r in reports.items()}
+    failed = sorted(label for label, r in reports.items() if not r.ok)
+    if failed:
+        mismatches = [f"{label}/{m}" for label in failed for m in reports[label].mismatches]
+        return StepResult.now(name=name, status="Failed",
+                              message=f"{', '.join(failed)} failed verification; live data left untouched",
+                              error=", ".join(mismatches[:5]), details=details)
+    files = sum(r.files for r in reports.values())
+    return StepResult.now(name=name, status="Success",
+                          message=f"Restored {files} files into {len(reports)} source(s): "
+                                  + ", ".join(f"{label} -> {r.target}" for label, r in reports.items()),
+                          details=details)
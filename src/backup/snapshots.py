@@ -0,0 +1,227 @@
+"""Hardlink snapshots (rsnapshot style) for configuration and bind-mount data.
+
+Every snapshot is a complete directory tree ``<snapshot_root>/<timestamp>/<label>/...``
+that can be browsed or copied back with ordinary tools. Files whose size and
+modification time match the previous snapshot are hardlinked to it instead of
+copied, so a snapshot of thousands of mostly unchanged config files costs little
+more than the directory entries.
+
+Snapshots are built in a ``.partial`` directory and renamed into place, so an
+interrupted run never looks like a complete snapshot. The builder touches the
+partial directory as it works; pruning reclaims only partials that have been
+idle for a grace period, never one a concurrent run is still filling. Retention keeps the newest
+snapshot of each recent hour, day and ISO week; pruning renames doomed snapshots
+into a trash directory (instant) before deleting them.
+"""
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+
+STAMP_FORMAT = "%Y-%m-%dT%H-%M-%S"
+PARTIAL_SUFFIX = ".partial"
+TRASH_DIR = ".trash"
+# a partial untouched for this long belongs to a run that died
+PARTIAL_GRACE_SECONDS = 3600
+HEARTBEAT_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """How many hourly, daily and weekly snapshots to keep (0 disables a tier)."""
+    hourly: int = 24
+    daily: int = 7
+    weekly: int = 4
+
+
+def list_snapshots(snapshot_root: str) -> List[Tuple[datetime, str]]:
+    """Return complete snapshots as (time, path), oldest first."""
+    try:
+        names = os.listdir(snapshot_root)
+    except FileNotFoundError:
+        return []
+    snaps = []
+    for name in names:
+        try:
+            when = datetime.strptime(name, STAMP_FORMAT)
+        except ValueError:
+            continue  # partials, trash and unrelated files
+        snaps.append((when, os.path.join(snapshot_root, name)))
+    return sorted(snaps)
+
+
+def plan_retention(stamps: Iterable[datetime], now: datetime,
+                   policy: RetentionPolicy = RetentionPolicy()) -> Set[datetime]:
+    """Return the stamps to keep: the newest snapshot in each of the last N hours, days and weeks.
+
+    Pure function of its inputs. The newest snapshot overall is always kept.
+    """
+    stamps = sorted(set(stamps), reverse=True)
+    keep: Set[datetime] = set(stamps[:1])
+    tiers = (
+        (policy.hourly, lambda t: t.replace(minute=0, second=0, microsecond=0), timedelta(hours=1)),
+        (policy.daily, lambda t: t.replace(hour=0, minute=0, second=0, microsecond=0), timedelta(days=1)),
+        (policy.weekly,
+         lambda t: (t - timedelta(days=t.weekday())).replace(hour=0, minute=0, second=0, microsecond=0),
+         timedelta(weeks=1)),
+    )
+    for count, bucket_of, width in tiers:
+        if count <= 0:
+            continue
+        oldest = bucket_of(now) - width * (count - 1)
+        seen = set()
+        for t in stamps:  # newest first, so the first hit per bucket is the one kept
+            bucket = bucket_of(t)
+            if bucket < oldest or bucket in seen:
+                continue
+            seen.add(bucket)
+            keep.add(t)
+    return keep
+
+
+def _unchanged(src: os.stat_result, prev_path: str) -> bool:
+    try:
+        prev = os.lstat(prev_path)
+    except OSError:
+        return False
+    return prev.st_size == src.st_size and prev.st_mtime_ns == src.st_mtime_ns
+
+
+def _snapshot_file(src: str, dest: str, prev: Optional[str]) -> Tuple[bool, int]:
+    """Link or copy one file; returns (linked, bytes_copied)."""
+    st = os.lstat(src)
+    if prev and _unchanged(st, prev):
+        try:
+            os.link(prev, dest)
+            return True, 0
+        except OSError:
+            pass  # cross-device or link limit reached: fall back to a copy
+    shutil.copy2(src, dest, follow_symlinks=False)
+    return False, st.st_size
+
+
+def create_snapshot(sources: Dict[str, str], snapshot_root: str, now: Optional[datetime] = None,
+                    workers: Optional[int] = None, dry_run: bool = False) -> StepResult:
+    """Create ``<snapshot_root>/<timestamp>`` holding every source under its label.
+
+    Args:
+        sources: {label: directory} to snapshot; missing directories are reported, not fatal.
+        snapshot_root: Directory holding the snapshot series.
+        now: Snapshot time (default: now).
+        workers: Threads linking and copying files.
+        dry_run: Only report what would be snapshotted.
+
+    Returns:
+        StepResult with linked/copied counts and bytes copied in `details`.
+    """
+    name = "config_snapshot"
+    now = (now or datetime.now()).replace(microsecond=0)
+    stamp = now.strftime(STAMP_FORMAT)
+    final = os.path.join(snapshot_root, stamp)
+    if dry_run:
+        return StepResult.now(name=name, status="Skipped", message=f"Dry-run: would snapshot {', '.join(sources)} to {final}")
+    if os.path.exists(final):
+        return StepResult.now(name=name, status="Failed", message=f"Snapshot {stamp} already exists")
+
+    previous = list_snapshots(snapshot_root)
+    prev_root = previous[-1][1] if previous else None
+    partial = final + PARTIAL_SUFFIX
+    started = time.monotonic()
+    missing = []
+    jobs = []
+    last_beat = [time.monotonic()]
+
+    def _heartbeat():
+        # keep the partial's mtime fresh so a concurrent prune leaves it alone
+        now_mono = time.monotonic()
+        if now_mono - last_beat[0] >= HEARTBEAT_SECONDS:
+            last_beat[0] = now_mono
+            try:
+                os.utime(partial)
+            except OSError:
+                pass
+
+    def _job(job):
+        outcome = _snapshot_file(*job)
+        _heartbeat()
+        return outcome
+
+    try:
+        shutil.rmtree(partial, ignore_errors=True)
+        os.makedirs(partial)
+        for label, root in sources.items():
+            if not os.path.isdir(root):
+                missing.append(label)
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                rel = os.path.relpath(dirpath, root)
+                rel = "" if rel == "." else rel
+                os.makedirs(os.path.join(partial, label, rel), exist_ok=True)
+                _heartbeat()
+                for fname in filenames:
+                    rel_file = os.path.join(label, rel, fname)
+                    prev = os.path.join(prev_root, rel_file) if prev_root else None
+                    jobs.append((os.path.join(dirpath, fname), os.path.join(partial, rel_file), prev))
+        with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+            outcomes = list(pool.map(_job, jobs))
+        os.replace(partial, final)
+    except Exception as e:
+        shutil.rmtree(partial, ignore_errors=True)
+        return StepResult.now(name=name, status="Failed", message=f"Snapshot failed: {e}", error=e)
+
+    linked = sum(1 for was_linked, _ in outcomes if was_linked)
+    details = {
+        "snapshot": final,
+        "previous": prev_root,
+        "files": len(outcomes),
+        "linked": linked,
+        "copied": len(outcomes) - linked,
+        "bytes_copied": sum(n for _, n in outcomes),
+        "missing": missing,
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+    return StepResult.now(name=name, status="Success",
+                          message=f"Snapshot {stamp}: {details['copied']} copied, {linked} hardlinked", details=details)
+
+
+def prune_snapshots(snapshot_root: str, policy: RetentionPolicy = RetentionPolicy(),
+                    now: Optional[datetime] = None, partial_grace: float = PARTIAL_GRACE_SECONDS) -> List[str]:
+    """Remove snapshots outside the retention policy; returns the removed snapshot names.
+
+    Doomed snapshots (and partials idle for more than `partial_grace` seconds) are
+    first renamed into a trash directory, which is atomic and instant, then deleted;
+    a crash mid-delete only leaves trash behind for the next prune to clear.
+    """
+    snaps = list_snapshots(snapshot_root)
+    keep = plan_retention([t for t, _ in snaps], now or datetime.now(), policy)
+    trash = os.path.join(snapshot_root, TRASH_DIR)
+    os.makedirs(trash, exist_ok=True)
+    removed = []
+    for when, path in snaps:
+        if when not in keep:
+            os.replace(path, os.path.join(trash, os.path.basename(path)))
+            removed.append(os.path.basename(path))
+    for name in os.listdir(snapshot_root):
+        if not name.endswith(PARTIAL_SUFFIX):
+            continue
+        path = os.path.join(snapshot_root, name)
+        try:
+            idle = time.time() - os.path.getmtime(path)
+        except OSError:
+            continue
+        if idle > partial_grace:
+            os.replace(path, os.path.join(trash, name))
+    for name in os.listdir(trash):
+        shutil.rmtree(os.path.join(trash, name), ignore_errors=True)
+    return removed
@@ -0,0 +1,304 @@
+"""I/O rate limiting and priority control for backup and restore.
+
+`IOThrottle` combines two token buckets, one for bandwidth (MB/s) and one for
+operations (IOPS). Pipelines call ``throttle(nbytes)`` once per read or write; the
+call sleeps just long enough to respect both limits and adds the sleep to
+``throttled_seconds`` so it can be reported in step results. Limits can be changed
+at any time with `update()`, or picked up from the config file by `ConfigWatcher`.
+
+Low priority is applied per worker, never to the interactive process:
+`background_priority()` lowers only the calling thread for the duration of a
+block, and `low_priority_popen_kwargs()` starts a child process at low priority.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+MB = 1 << 20
+
+
+class TokenBucket:
+    """Token bucket that allows debt, so a single large request is delayed rather than refused."""
+
+    def __init__(self, rate: Optional[float], burst: Optional[float] = None):
+        self._cond = threading.Condition()
+        self._rate: Optional[float] = None
+        self._burst = 0.0
+        self._tokens = 0.0
+        self._stamp = time.monotonic()
+        self.set_rate(rate, burst)
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self._rate
+
+    def set_rate(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        """Change the rate (None or 0 = unlimited); sleepers pick up the new rate immediately."""
+        with self._cond:
+            self._refill()
+            self._rate = rate if rate and rate > 0 else None
+            # default burst: a quarter second's worth keeps latency low while smoothing bursts
+            self._burst = burst if burst is not None else (self._rate or 0) / 4
+            self._tokens = min(self._tokens, self._burst)
+            self._cond.notify_all()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self._rate:
+            self._tokens = min(self._burst, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+    def consume(self, amount: float) -> float:
+        """Take `amount` tokens, sleeping while in debt; returns the seconds slept."""
+        waited = 0.0
+        with self._cond:
+            if not self._rate:
+                return 0.0
+            self._refill()
+            self._tokens -= amount
+            while self._rate and self._tokens < 0:
+                delay = -self._tokens / self._rate
+                start = time.monotonic()
+                self._cond.wait(delay)
+                waited += time.monotonic() - start
+                self._refill()
+            if not self._rate:
+                self._tokens = 0.0
+        return waited
+
+
+class IOThrottle:
+    """Bandwidth and IOPS limiter shared by every worker of one pipeline.
+
+    `low_priority` tells the pipeline's workers to run under `background_priority()`.
+    """
+
+    def __init__(self, max_mbps: Optional[float] = None, max_iops: Optional[float] = None,
+                 low_priority: bool = False):
+        self._bytes = TokenBucket(None)
+        self._ops = TokenBucket(None)
+        self._lock = threading.Lock()
+        self.low_priority = low_priority
+        self.throttled_seconds = 0.0
+        self.update(max_mbps=max_mbps, max_iops=max_iops)
+
+    @property
+    def max_mbps(self) -> Optional[float]:
+        return self._bytes.rate / MB if self._bytes.rate else None
+
+    @property
+    def max_iops(self) -> Optional[float]:
+        return self._ops.rate
+
+    def update(self, max_mbps: Optional[float] = None, max_iops: Optional[float] = None) -> None:
+        """Set both limits; None means unlimited."""
+        self._bytes.set_rate(max_mbps * MB if max_mbps else None)
+        self._ops.set_rate(max_iops, burst=max(1.0, (max_iops or 0) / 4) if max_iops else None)
+
+    def throttle(self, nbytes: int) -> float:
+        """Account for one I/O of `nbytes`; returns the seconds this call slept."""
+        waited = self._ops.consume(1) + self._bytes.consume(nbytes)
+        if waited:
+            with self._lock:
+                self.throttled_seconds += waited
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_mbps": self.max_mbps,
+            "max_iops": self.max_iops,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+
+def load_throttle_config(path: str) -> Dict[str, Any]:
+    """Read the ``backup`` section (max_mbps, max_iops, low_priority) of the config file."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            section = json.load(f).get("backup", {}) or {}
+    except (OSError, ValueError):
+        return {}
+    return {k: section.get(k) for k in ("max_mbps", "max_iops", "low_priority") if k in section}
+
+
+class ConfigWatcher:
+    """Poll the config file and apply changed limits to a running throttle.
+
+    Limits named in `pinned` (set on the command line) keep their value; config
+    edits only change the others.
+    """
+
+    def __init__(self, path: str, throttle: IOThrottle, interval: float = 1.0,
+                 pinned: Iterable[str] = ()):
+        self.path = path
+        self.throttle = throttle
+        self.interval = interval
+        self.pinned = frozenset(pinned)
+        self._stop = threading.Event()
+        self._mtime = self._current_mtime()
+        self._thread = threading.Thread(target=self._run, name="throttle-config-watcher", daemon=True)
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self) -> bool:
+        """Apply the config if the file changed since the last poll; returns True if applied."""
+        mtime = self._current_mtime()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        cfg = load_throttle_config(self.path)
+        limits = {k: getattr(self.throttle, k) if k in self.pinned else cfg.get(k) for k in ("max_mbps", "max_iops")}
+        self.throttle.update(**limits)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def start(self) -> "ConfigWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _ioprio_syscalls():
+    """(ioprio_set, ioprio_get) syscall numbers for this Linux machine, or None."""
+    import platform
+    return {"x86_64": (251, 252), "aarch64": (30, 31)}.get(platform.machine())
+
+
+@contextlib.contextmanager
+def background_priority() -> Iterator[bool]:
+    """Run the block with only the calling thread at background CPU and I/O priority.
+
+    Windows pairs THREAD_MODE_BACKGROUND_BEGIN with _END on exit. Linux lowers the
+    thread's nice value and I/O class (both per thread there) and puts back what it
+    can on exit: an unprivileged thread cannot raise its nice value again, so use
+    this on worker threads that end with the work. Elsewhere it does nothing.
+    Yields whether the priority was lowered.
+    """
+    if os.name == "nt":
+        try:
+            import ctypes
+            THREAD_MODE_BACKGROUND_BEGIN, THREAD_MODE_BACKGROUND_END = 0x00010000, 0x00020000
+            kernel32 = ctypes.windll.kernel32
+            lowered = bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN))
+        except Exception:
+            lowered = False
+        try:
+            yield lowered
+        finally:
+            if lowered:
+                kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_END)
+        return
+    if not sys.platform.startswith("linux"):
+        yield False  # nice values are per process here
+        return
+    tid = threading.get_native_id()
+    lowered = False
+    old_nice = old_ioprio = None
+    try:
+        old_nice = os.getpriority(os.PRIO_PROCESS, tid)
+        os.setpriority(os.PRIO_PROCESS, tid, 19)
+        lowered = True
+    except (AttributeError, OSError):
+        pass
+    libc = nrs = None
+    try:
+        import ctypes
+        nrs = _ioprio_syscalls()
+        if nrs is not None:
+            IOPRIO_WHO_PROCESS, IOPRIO_CLASS_IDLE = 1, 3
+            libc = ctypes.CDLL(None, use_errno=True)
+            old_ioprio = libc.syscall(nrs[1], IOPRIO_WHO_PROCESS, 0)
+            if old_ioprio >= 0 and libc.syscall(nrs[0], IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << 13) == 0:
+                lowered = True
+            else:
+                old_ioprio = None
+    except Exception:
+        pass
+    try:
+        yield lowered
+    finally:
+        if old_ioprio is not None:
+            libc.syscall(nrs[0], 1, 0, old_ioprio)
+        if old_nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, tid, old_nice)
+            except OSError:
+                pass  # needs CAP_SYS_NICE; the worker thread ends soon anyway
+
+
+_pool_thread = threading.local()
+
+
+def _enter_background_priority() -> None:
+    cm = background_priority()
+    cm.__enter__()
+    _pool_thread.priority = cm  # keep it alive: collecting the generator would restore the priority
+
+
+def pool_initializer(low_priority: bool):
+    """``initializer`` for a ThreadPoolExecutor doing low-priority work, or None.
+
+    Windows threads do not inherit THREAD_MODE_BACKGROUND_BEGIN, so pools started
+    from a `background_priority()` worker run at normal priority unless each pool
+    thread lowers itself. Pool threads keep the priority until they exit.
+    """
+    return _enter_background_priority if low_priority else None
+
+
+def lower_process_priority() -> bool:
+    """Drop this whole process to background CPU and I/O priority, for good.
+
+    Only for child processes (see `low_priority_popen_kwargs`); in-process
+    workers use `background_priority()` so the interactive process keeps its
+    priority.
+
+    Windows uses PROCESS_MODE_BACKGROUND_BEGIN, which lowers CPU, I/O and memory
+    priority together. Elsewhere the process is niced and, on Linux, moved to the
+    idle I/O scheduling class. Best effort: returns False if nothing could be changed.
+    """
+    if os.name == "nt":
+        try:
+            import ctypes
+            PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), PROCESS_MODE_BACKGROUND_BEGIN))
+        except Exception:
+            return False
+    changed = False
+    try:
+        os.nice(19 - os.nice(0))
+        changed = True
+    except OSError:
+        pass
+    if sys.platform.startswith("linux"):
+        try:
+            import ctypes
+            nrs = _ioprio_syscalls()
+            if nrs is not None:
+                IOPRIO_WHO_PROCESS, IOPRIO_CLASS_IDLE = 1, 3
+                libc = ctypes.CDLL(None, use_errno=True)
+                changed = libc.syscall(nrs[0], IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << 13) == 0 or changed
+        except Exception:
+            pass
+    return changed
+
+
+def low_priority_popen_kwargs() -> Dict[str, Any]:
+    """subprocess.Popen kwargs that start a child at low CPU/I/O priority."""
+    if os.name == "nt":
+        import subprocess
+        return {"creationflags": subprocess.IDLE_PRIORITY_CLASS}
+    return {"preexec_fn": lambda: lower_process_priority()}
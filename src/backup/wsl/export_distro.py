@@ -0,0 +1,288 @@
+"""Stream `wsl --export <distro> -` into chunked, checksummed, compressed parts.
+
+Nothing is staged on disk: the tar stream is read from the pipe in fixed-size
+chunks, every chunk is gzip-compressed on a thread pool (independent gzip members
+concatenate into one valid ``.tar.gz``), and the compressed stream is written in
+order into ``<name>.tar.gz.partNNNN`` files of a fixed size, each with its SHA-256
+in a manifest. A `MemoryBudget` shared by concurrent exports caps the bytes held
+in flight, so several distros can be exported side by side.
+"""
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from backup.throttle import IOThrottle, low_priority_popen_kwargs, pool_initializer
+
+DEFAULT_CHUNK = 8 << 20
+DEFAULT_PART = 1 << 30
+DEFAULT_BUDGET = 256 << 20
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+class MemoryBudget:
+    """Counting semaphore over bytes; `peak` records the highest reservation seen."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int, blocking: bool = True) -> bool:
+        n = min(n, self.limit)
+        with self._cond:
+            while self.in_use + n > self.limit:
+                if not blocking:
+                    return False
+                self._cond.wait()
+            self.in_use += n
+            self.peak = max(self.peak, self.in_use)
+            return True
+
+    def release(self, n: int) -> None:
+        n = min(n, self.limit)
+        with self._cond:
+            self.in_use -= n
+            self._cond.notify_all()
+
+
+def list_distros(wsl_exe: str = "wsl") -> List[str]:
+    """Return registered distro names from `wsl -l -q` (which prints UTF-16 on Windows)."""
+    out = subprocess.run([wsl_exe, "-l", "-q"], capture_output=True, check=True).stdout
+    text = out.decode("utf-16-le") if b"\x00" in out else out.decode("utf-8", errors="replace")
+    names = (line.strip().lstrip("\ufeff") for line in text.splitlines())
+    return [n for n in names if n]
+
+
+class _PartWriter:
+    """Write a byte stream into fixed-size part files, hashing each part."""
+
+    def __init__(self, base_path: str, part_size: int):
+        self.base_path = base_path
+        self.part_size = part_size
+        self.parts: List[Dict[str, Any]] = []
+        self._fh = None
+        self._hasher = None
+        self._size = 0
+
+    def _open_next(self) -> None:
+        name = f"{os.path.basename(self.base_path)}.part{len(self.parts) + 1:04d}"
+        self._fh = open(os.path.join(os.path.dirname(self.base_path), name), "wb")
+        self._hasher = hashlib.sha256()
+        self._size = 0
+        self.parts.append({"name": name})
+
+    def _close_current(self) -> None:
+        if self._fh is None:
+            return
+        self._fh.close()
+        self.parts[-1].update(size=self._size, sha256=self._hasher.hexdigest())
+        self._fh = None
+
+    def write(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            if self._fh is None or self._size >= self.part_size:
+                self._close_current()
+                self._open_next()
+            take = min(len(view), self.part_size - self._size)
+            piece = view[:take]
+            self._fh.write(piece)
+            self._hasher.update(piece)
+            self._size += take
+            view = view[take:]
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._close_current()
+        return self.parts
+
+    def discard(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        for part in self.parts:
+            try:
+                os.remove(os.path.join(os.path.dirname(self.base_path), part["name"]))
+            except OSError:
+                pass
+
+
+def _read_exact(stream, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        block = stream.read(n - len(buf))
+        if not block:
+            break
+        buf += block
+    return bytes(buf)
+
+
+def export_distro(distro: str, dest_dir: str, part_size: int = DEFAULT_PART, chunk_size: int = DEFAULT_CHUNK,
+                  level: int = 6, pool: Optional[ThreadPoolExecutor] = None, budget: Optional[MemoryBudget] = None,
+                  wsl_exe: str = "wsl", throttle: Optional[IOThrottle] = None, low_priority: bool = False,
+                  progress_cb: Optional[Callable[[Dict[str, Any], str], None]] = None) -> StepResult:
+    """Export one distro into ``<dest_dir>/<distro>-<timestamp>.tar.gz.partNNNN`` plus a manifest.
+
+    Args:
+        distro: Registered distro name.
+        dest_dir: Directory receiving the parts and manifest.
+        part_size: Size of every part except the last.
+        chunk_size: Uncompressed bytes per gzip member (the unit of parallel work).
+        level: gzip compression level.
+        pool: Compression pool; pass one pool to share CPU between concurrent exports.
+        budget: MemoryBudget bounding raw and compressed chunks held in flight.
+        wsl_exe: The `wsl` executable (tests substitute a fake).
+        throttle: Optional IOThrottle applied to the export stream.
+        low_priority: Start the export process at background priority.
+        progress_cb: Optional ``progress_cb(event, event_type)``.
+
+    Returns:
+        StepResult with the manifest path, part list and sizes in `details`.
+    """
+    step_id = f"wsl_export:{distro}"
+    os.makedirs(dest_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    base = os.path.join(dest_dir, f"{distro}-{stamp}.tar.gz")
+    budget = budget or MemoryBudget(DEFAULT_BUDGET)
+    own_pool = pool is None
+    if own_pool:
+        pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, initializer=pool_initializer(low_priority))
+    popen_kwargs = low_priority_popen_kwargs() if low_priority else {}
+    started = time.monotonic()
+    writer = _PartWriter(base, part_size)
+    pending: deque = deque()
+    raw_total = 0
+    compressed_total = 0
+    proc = None
+    # stderr goes to a temp file so a chatty export cannot fill a pipe nobody reads
+    errlog = tempfile.TemporaryFile()
+
+    def _drain_one():
+        nonlocal compressed_total
+        fut, reserved = pending.popleft()
+        try:
+            blob = fut.result()
+            writer.write(blob)
+            compressed_total += len(blob)
+        finally:
+            budget.release(reserved)
+
+    try:
+        proc = subprocess.Popen([wsl_exe, "--export", distro, "-"], stdout=subprocess.PIPE,
+                                stderr=errlog, **popen_kwargs)
+        while True:
+            # reserve for the raw chunk and its compressed copy before reading
+            reserved = chunk_size * 2
+            # write out our own finished work before waiting, or a shared budget could deadlock
+            while not budget.acquire(reserved, blocking=False):
+                if pending:
+                    _drain_one()
+                else:
+                    budget.acquire(reserved)
+                    break
+            chunk = _read_exact(proc.stdout, chunk_size)
+            if not chunk:
+                budget.release(reserved)
+                break
+            if throttle:
+                throttle.throttle(len(chunk))
+            raw_total += len(chunk)
+            pending.append((pool.submit(gzip.compress, chunk, level, mtime=0), reserved))
+            while pending and pending[0][0].done():
+                _drain_one()
+            if progress_cb:
+                try:
+                    progress_cb({"step_id": step_id, "bytes_done": raw_total}, "step-progress")
+                except Exception:
+                    # never let UI callback failures abort the export
+                    pass
+        while pending:
+            _drain_one()
+        rc = proc.wait()
+        if rc != 0:
+            errlog.seek(0)
+            stderr = errlog.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"wsl --export exited {rc}: {stderr}")
+        parts = writer.close()
+    except Exception as e:
+        if proc and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        while pending:
+            fut, reserved = pending.popleft()
+            fut.cancel()
+            budget.release(reserved)
+        writer.discard()
+        return StepResult.now(name=step_id, status="Failed", message=f"Export of {distro} failed", error=e)
+    finally:
+        errlog.close()
+        if proc and proc.stdout:
+            proc.stdout.close()
+        if own_pool:
+            pool.shutdown()
+
+    manifest = {
+        "distro": distro,
+        "created": time.time(),
+        "format": "tar.gz",
+        "chunk_size": chunk_size,
+        "part_size": part_size,
+        "raw_bytes": raw_total,
+        "compressed_bytes": compressed_total,
+        "parts": parts,
+    }
+    manifest_path = base + MANIFEST_SUFFIX
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    details = dict(manifest, manifest=manifest_path, elapsed=round(time.monotonic() - started, 3))
+    return StepResult.now(name=step_id, status="Success",
+                          message=f"Exported {distro}: {raw_total} bytes into {len(parts)} part(s)", details=details)
+
+
+def export_distros(distros: List[str], dest_dir: str, max_concurrent: int = 2, memory_budget: int = DEFAULT_BUDGET,
+                   workers: Optional[int] = None, **kwargs) -> List[StepResult]:
+    """Export several distros concurrently, sharing one compression pool and memory budget."""
+    budget = MemoryBudget(memory_budget)
+    chunk = kwargs.get("chunk_size", DEFAULT_CHUNK)
+    if chunk * 2 > memory_budget:
+        raise ValueError("memory_budget must hold at least one raw and one compressed chunk")
+    initializer = pool_initializer(kwargs.get("low_priority", False))
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=initializer) as pool, \
+            ThreadPoolExecutor(max_workers=max(1, max_concurrent), initializer=initializer) as exporters:
+        futures = [exporters.submit(export_distro, d, dest_dir, pool=pool, budget=budget, **kwargs) for d in distros]
+        return [f.result() for f in futures]
+
+
+def verify_parts(manifest_path: str) -> List[str]:
+    """Return the names of parts that are missing or whose checksum does not match."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    folder = os.path.dirname(os.path.abspath(manifest_path))
+    bad = []
+    for part in manifest["parts"]:
+        h = hashlib.sha256()
+        try:
+            with open(os.path.join(folder, part["name"]), "rb") as pf:
+                for block in iter(lambda: pf.read(1 << 20), b""):
+                    h.update(block)
+        except OSError:
+            bad.append(part["name"])
+            continue
+        if h.hexdigest() != part["sha256"]:
+            bad.append(part["name"])
+    return bad
@@ -0,0 +1 @@
+"""Cleanup package."""
@@ -0,0 +1,141 @@
+"""Cleanup orchestrator: reclaim Docker disk space by policy.
+
+Lighter than an uninstall or a full reset: it removes only objects a policy
+selects (old images per repository, long-unused objects, or enough of the least
+recently used ones to free a target amount) and shows the simulated result
+before deleting anything.
+"""
+import json
+import os
+import sys
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from cleanup.docker_space import KINDS, PrunePolicy, format_bytes, prune
+
+# Import UI library for consistent interface
+try:
+    from ui.ui_library import render_header, render_selection_menu, get_icon_color, press_enter_to_continue
+except ImportError:
+    # Fallback if UI library not available
+    def render_header(title, **kwargs):
+        print(f"\n=== {title} ===")
+    def render_selection_menu(title, choices, **kwargs):
+        import questionary
+        return questionary.select(title, choices=choices).ask()
+    def get_icon_color(icon):
+        return None
+    def press_enter_to_continue():
+        input("Press Enter to continue...")
+
+
+# Default policy lives in the "cleanup" section of the repository config file.
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(src_path), "wsl_docker_config.json")
+
+
+def load_policy(config_path: str = DEFAULT_CONFIG_PATH) -> PrunePolicy:
+    """Read keep_per_repo, unused_days, free_gb and kinds from the ``cleanup`` config section."""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            section = json.load(f).get("cleanup", {}) or {}
+    except (OSError, ValueError):
+        section = {}
+    return PrunePolicy(
+        keep_per_repo=section.get("keep_per_repo"),
+        unused_days=section.get("unused_days"),
+        free_gb=section.get("free_gb"),
+        kinds=tuple(section.get("kinds") or KINDS),
+    )
+
+
+def _print_plan(plan_result: StepResult) -> None:
+    details = plan_result.details or {}
+    for kind in KINDS:
+        group = details.get(kind) or {}
+        if group.get("count"):
+            print(f"• {kind.replace('_', ' ')}: {group['count']} objects, {format_bytes(group['bytes'])}")
+            for item in group["items"][:5]:
+                print(f"    {item['name']}  {format_bytes(item['size'])}")
+            if group["count"] > 5:
+                print(f"    … and {group['count'] - 5} more")
+    print(plan_result.message)
+
+
+def _ask_policy(questionary, default: PrunePolicy) -> PrunePolicy:
+    choice = render_selection_menu(
+        title="Cleanup Policy",
+        choices=[
+            "⚙️ Configured policy",
+            "📦 Keep N most recent images per repository",
+            "⏳ Remove objects unused for more than X days",
+            "🎯 Free at least Y GB",
+            "🔙 Back",
+        ],
+        icon="🧹",
+        icon_color=get_icon_color("🧹"),
+        prompt="How should space be reclaimed?",
+    )
+    if choice is None or "Back" in choice:
+        return None
+    if "Configured" in choice:
+        return default
+    if "Keep N" in choice:
+        n = questionary.text("Images to keep per repository:", default=str(default.keep_per_repo or 3)).ask()
+        return PrunePolicy(keep_per_repo=int(n), kinds=("image",))
+    if "unused" in choice:
+        days = questionary.text("Unused for more than (days):", default=str(default.unused_days or 30)).ask()
+        return PrunePolicy(unused_days=float(days), kinds=default.kinds)
+    gb = questionary.text("Space to free (GB):", default=str(default.free_gb or 10)).ask()
+    return PrunePolicy(free_gb=float(gb), kinds=default.kinds)
+
+
+def _handle_cleanup():
+    """Pick a policy, show what it would remove, then delete on confirmation."""
+    try:
+        import questionary  # type: ignore
+
+        render_header("Docker Cleanup", icon="🧹", icon_color=get_icon_color("🧹"))
+        policy = _ask_policy(questionary, load_policy())
+        if policy is None:
+            return StepResult.now(name="cleanup", status="Cancelled", message="Cleanup cancelled by user")
+        print("Taking inventory...")
+        preview = prune(policy, dry_run=True)
+        _print_plan(preview[0])
+        if preview[0].status != "Skipped":
+            return preview[0]
+        if not questionary.confirm("Remove these objects now?", default=False).ask():
+            return StepResult.now(name="cleanup", status="Cancelled", message="Cleanup cancelled by user")
+
+        def _print_step(event, event_type):
+            if event_type == "step-progress":
+                print(f"  {event['step_id']}: {event['done']}/{event['total']}")
+
+        results = prune(policy, dry_run=False, yes=True, progress_cb=_print_step)
+        for r in results[1:]:
+            print(f"• {r.message}")
+        freed = sum((r.details or {}).get("freed_bytes") or 0 for r in results[1:])
+        failed = [r for r in results if r.status == "Failed"]
+        return StepResult.now(name="cleanup", status="Failed" if failed else "Success",
+                              message=f"Freed {format_bytes(freed)}",
+                              details={"results": [r.to_dict() for r in results]})
+    except Exception as e:
+        return StepResult.now(name="cleanup", status="Error", message=f"Cleanup failed: {str(e)}")
+
+
+def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=None, progress_cb=None, interactive: bool = False):
+    """Top-level entrypoint for the cleanup orchestrator.
+
+    Interactive mode asks for a policy; otherwise the configured policy is used, limited
+    to the object kinds in `targets` when given. Returns StepResult objects.
+    """
+    if interactive:
+        return _handle_cleanup()
+    policy = load_policy()
+    if targets:
+        policy = PrunePolicy(policy.keep_per_repo, policy.unused_days, policy.free_gb,
+                             kinds=tuple(k for k in KINDS if k in targets))
+    return prune(policy, dry_run=dry_run, yes=yes, progress_cb=progress_cb)
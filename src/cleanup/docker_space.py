@@ -0,0 +1,370 @@
+"""Reclaim Docker disk space by policy instead of a full reset.
+
+`inventory()` lists what can be reclaimed — images, stopped containers, dangling
+volumes and build cache — with the space each holds and when it was last used
+(one ``/system/df`` call plus an inspect per stopped container). `plan_prune()`
+is a pure function from that inventory and a `PrunePolicy` to the objects to
+delete, so the result can be shown before anything is removed. `prune()`
+simulates first and, outside dry-run, deletes the plan in batches through the
+Engine API: containers before the images they pin, images newest first so
+children go before their parents.
+
+Nothing in use is ever selected: images of running containers, build cache
+records marked in use, and images still referenced by a container that is not
+itself being deleted.
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from cleanup.engine_api import EngineClient, EngineError
+
+GB = 1 << 30
+DAY = 86400
+# deletion order; containers first because they pin their images
+KINDS = ("container", "image", "volume", "build_cache")
+STOPPED_STATES = ("exited", "created", "dead")
+
+
+@dataclass
+class SpaceItem:
+    """One reclaimable object and the space deleting it is expected to free."""
+    kind: str
+    id: str
+    name: str
+    size: int
+    last_used: Optional[float] = None
+    created: Optional[float] = None
+    in_use: bool = False
+    repos: Tuple[str, ...] = ()
+    containers: Tuple[str, ...] = ()  # images: containers (any state) created from it
+    tags: int = 0
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.kind, self.id)
+
+
+@dataclass(frozen=True)
+class PrunePolicy:
+    """What to reclaim; unset rules (None) do not apply.
+
+    keep_per_repo: Protect the N most recently used images of every repository and
+        select the older ones.
+    unused_days: Select objects not used for more than this many days.
+    free_gb: After the rules above, add the least recently used objects until at
+        least this much space is selected.
+    kinds: Object kinds the policy may touch.
+    """
+    keep_per_repo: Optional[int] = None
+    unused_days: Optional[float] = None
+    free_gb: Optional[float] = None
+    kinds: Tuple[str, ...] = KINDS
+
+
+@dataclass
+class PrunePlan:
+    """The simulated result of a policy: what would be deleted and what it frees."""
+    selected: List[SpaceItem] = field(default_factory=list)
+    kept: int = 0
+    target_bytes: Optional[int] = None
+
+    @property
+    def reclaim_bytes(self) -> int:
+        return sum(i.size for i in self.selected)
+
+    @property
+    def shortfall_bytes(self) -> int:
+        return max(0, (self.target_bytes or 0) - self.reclaim_bytes)
+
+    def by_kind(self) -> Dict[str, List[SpaceItem]]:
+        groups: Dict[str, List[SpaceItem]] = {k: [] for k in KINDS}
+        for item in self.selected:
+            groups[item.kind].append(item)
+        return groups
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Engine times are unix seconds or RFC 3339 with nanoseconds; zero times mean never."""
+    if value in (None, "", 0):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value)
+    if text.startswith("0001-01-01"):
+        return None
+    text = text.replace("Z", "+00:00")
+    if "." in text:
+        # trim nanoseconds to the microseconds fromisoformat accepts
+        head, rest = text.split(".", 1)
+        digits = len(rest) - len(rest.lstrip("0123456789"))
+        text = f"{head}.{rest[:min(digits, 6)].ljust(6, '0')}{rest[digits:]}"
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+def _repo_of(tag: str) -> str:
+    # registry ports contain ':' too, so split on the last ':' after the last '/'
+    slash = tag.rfind("/")
+    colon = tag.rfind(":")
+    return tag[:colon] if colon > slash else tag
+
+
+def inventory(client: EngineClient, workers: int = 8) -> List[SpaceItem]:
+    """List reclaimable objects with sizes and last-used times.
+
+    Docker records no last-use time for images, so an image counts as used when it
+    was created or when a container created from it last ran.
+    """
+    df = client.get("/system/df") or {}
+    items: List[SpaceItem] = []
+    running_images: Set[str] = set()
+    image_containers: Dict[str, List[str]] = {}
+    stopped = []
+    for c in df.get("Containers") or []:
+        image_containers.setdefault(c.get("ImageID", ""), []).append(c["Id"])
+        if c.get("State") in STOPPED_STATES:
+            stopped.append(c)
+        else:
+            running_images.add(c.get("ImageID", ""))
+
+    def _finished(c):
+        try:
+            state = (client.get(f"/containers/{c['Id']}/json") or {}).get("State") or {}
+        except EngineError:
+            return None
+        return _timestamp(state.get("FinishedAt"))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        finished = list(pool.map(_finished, stopped))
+    last_run: Dict[str, float] = {}
+    for c, when in zip(stopped, finished):
+        when = when or _timestamp(c.get("Created"))
+        name = ((c.get("Names") or [c["Id"][:12]])[0]).lstrip("/")
+        items.append(SpaceItem("container", c["Id"], name, int(c.get("SizeRw") or 0), last_used=when,
+                               created=_timestamp(c.get("Created"))))
+        if when:
+            image = c.get("ImageID", "")
+            last_run[image] = max(last_run.get(image, 0.0), when)
+
+    for img in df.get("Images") or []:
+        tags = [t for t in img.get("RepoTags") or [] if t != "<none>:<none>"]
+        created = _timestamp(img.get("Created"))
+        shared = img.get("SharedSize")
+        size = int(img.get("Size") or 0)
+        if isinstance(shared, int) and shared > 0:
+            size -= shared  # layers shared with other images stay until those go too
+        last = max(filter(None, (created, last_run.get(img["Id"]))), default=None)
+        items.append(SpaceItem("image", img["Id"], tags[0] if tags else img["Id"][7:19], max(0, size),
+                               last_used=last, created=created, in_use=img["Id"] in running_images,
+                               repos=tuple(sorted({_repo_of(t) for t in tags})),
+                               containers=tuple(image_containers.get(img["Id"], ())), tags=len(tags)))
+
+    for vol in df.get("Volumes") or []:
+        usage = vol.get("UsageData") or {}
+        if usage.get("RefCount", 0) != 0:
+            continue  # only dangling volumes are reclaimable
+        created = _timestamp(vol.get("CreatedAt"))
+        items.append(SpaceItem("volume", vol["Name"], vol["Name"], max(0, int(usage.get("Size") or 0)),
+                               last_used=created, created=created))
+
+    for rec in df.get("BuildCache") or []:
+        created = _timestamp(rec.get("CreatedAt"))
+        items.append(SpaceItem("build_cache", rec["ID"], rec.get("Description") or rec.get("Type") or rec["ID"],
+                               int(rec.get("Size") or 0), last_used=_timestamp(rec.get("LastUsedAt")) or created,
+                               created=created, in_use=bool(rec.get("InUse"))))
+    return items
+
+
+def plan_prune(items: Iterable[SpaceItem], policy: PrunePolicy, now: Optional[float] = None) -> PrunePlan:
+    """Select what `policy` would delete from `items` (no I/O)."""
+    now = time.time() if now is None else now
+    items = list(items)
+    eligible = [i for i in items if i.kind in policy.kinds and not i.in_use]
+
+    protected: Set[Tuple[str, str]] = set()
+    if policy.keep_per_repo is not None:
+        # images of running containers count towards the N kept for their repo
+        by_repo: Dict[str, List[SpaceItem]] = {}
+        for item in items:
+            for repo in item.repos:
+                by_repo.setdefault(repo, []).append(item)
+        for group in by_repo.values():
+            group.sort(key=lambda i: (i.in_use, i.last_used or 0), reverse=True)
+            protected.update(i.key for i in group[:policy.keep_per_repo])
+    candidates = [i for i in eligible if i.key not in protected]
+
+    selected: Dict[Tuple[str, str], SpaceItem] = {}
+    if policy.unused_days is not None:
+        cutoff = now - policy.unused_days * DAY
+        for item in candidates:
+            if item.last_used is not None and item.last_used < cutoff:
+                selected[item.key] = item
+    elif policy.keep_per_repo is not None:
+        for item in candidates:
+            if item.kind == "image":
+                selected[item.key] = item
+
+    target = int(policy.free_gb * GB) if policy.free_gb is not None else None
+    if target is not None:
+        total = sum(i.size for i in selected.values())
+        # least recently used first; containers before images at equal age so images can follow them
+        for item in sorted(candidates, key=lambda i: (i.last_used or 0, KINDS.index(i.kind))):
+            if total >= target:
+                break
+            if item.key in selected or not _deps_selected(item, selected):
+                continue
+            selected[item.key] = item
+            total += item.size
+
+    # an image can only go when every container created from it goes first
+    selected = {k: i for k, i in selected.items() if _deps_selected(i, selected)}
+
+    ordered = sorted(selected.values(), key=lambda i: (KINDS.index(i.kind), -(i.created or 0)))
+    return PrunePlan(selected=ordered, kept=len(items) - len(ordered), target_bytes=target)
+
+
+def _deps_selected(item: SpaceItem, selected: Dict[Tuple[str, str], SpaceItem]) -> bool:
+    return all(("container", c) in selected for c in item.containers)
+
+
+def _delete(client: EngineClient, item: SpaceItem) -> int:
+    """Delete one object; returns the bytes the engine reports (or the estimate)."""
+    if item.kind == "container":
+        client.delete(f"/containers/{item.id}")
+    elif item.kind == "image":
+        # deleting by ID refuses images tagged into several repositories unless forced;
+        # running containers still block a forced delete
+        client.delete(f"/images/{item.id}", force="true" if item.tags > 1 else None)
+    elif item.kind == "volume":
+        client.delete(f"/volumes/{item.id}")
+    else:
+        report = client.post("/build/prune", filters={"id": [item.id]}) or {}
+        return int(report.get("SpaceReclaimed") or 0)
+    return item.size
+
+
+def _emit(progress_cb, event: Dict[str, Any], event_type: str) -> None:
+    if not progress_cb:
+        return
+    try:
+        progress_cb(event, event_type)
+    except Exception:
+        # never let UI callback failures abort the cleanup
+        pass
+
+
+def _plan_details(items: List[SpaceItem]) -> Dict[str, Any]:
+    return {"count": len(items), "bytes": sum(i.size for i in items),
+            "items": [{"id": i.id, "name": i.name, "size": i.size, "last_used": i.last_used} for i in items]}
+
+
+def execute_plan(client: EngineClient, plan: PrunePlan, batch_size: int = 20, workers: int = 4,
+                 progress_cb=None) -> List[StepResult]:
+    """Delete the plan kind by kind in batches; one ``cleanup:<kind>`` StepResult per kind."""
+    results = []
+    for kind, items in plan.by_kind().items():
+        if not items:
+            continue
+        step_id = f"cleanup:{kind}"
+        _emit(progress_cb, {"step_id": step_id, "name": step_id, "total": len(items)}, "step-start")
+        freed, deleted, failures = 0, 0, []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+
+                def _one(item):
+                    try:
+                        return item, _delete(client, item), None
+                    except EngineError as e:
+                        if e.status == 404:
+                            return item, 0, None  # already gone
+                        return item, 0, e
+
+                for item, size, err in pool.map(_one, batch):
+                    if err is None:
+                        deleted += 1
+                        freed += size
+                    else:
+                        failures.append({"id": item.id, "name": item.name, "error": str(err)})
+                _emit(progress_cb, {"step_id": step_id, "done": start + len(batch), "total": len(items),
+                                    "freed_bytes": freed}, "step-progress")
+        details = {"deleted": deleted, "freed_bytes": freed, "failures": failures}
+        if failures:
+            res = StepResult.now(name=step_id, status="Failed",
+                                 message=f"Removed {deleted}/{len(items)} {kind} objects, freed {format_bytes(freed)}",
+                                 error=failures[0]["error"], details=details)
+        else:
+            res = StepResult.now(name=step_id, status="Success",
+                                 message=f"Removed {deleted} {kind} objects, freed {format_bytes(freed)}",
+                                 details=details)
+        _emit(progress_cb, {"step_id": step_id, "status": res.status, "freed_bytes": freed}, "step-end")
+        results.append(res)
+    return results
+
+
+def prune(policy: PrunePolicy, dry_run: bool = True, yes: bool = False, client: Optional[EngineClient] = None,
+          batch_size: int = 20, workers: int = 4, now: Optional[float] = None,
+          progress_cb=None) -> List[StepResult]:
+    """Inventory, simulate and (with `yes`, outside dry-run) delete according to `policy`.
+
+    The first result is always ``cleanup_plan`` with the simulated outcome; per-kind
+    ``cleanup:<kind>`` results follow when the plan was executed.
+    """
+    own_client = client is None
+    client = client or EngineClient()
+    try:
+        return _prune(client, policy, dry_run, yes, batch_size, workers, now, progress_cb)
+    finally:
+        if own_client:
+            client.close()
+
+
+def _prune(client: EngineClient, policy: PrunePolicy, dry_run: bool, yes: bool, batch_size: int, workers: int,
+           now: Optional[float], progress_cb) -> List[StepResult]:
+    _emit(progress_cb, {"step_id": "cleanup_plan", "name": "cleanup_plan"}, "step-start")
+    try:
+        plan = plan_prune(inventory(client, workers=workers), policy, now=now)
+    except EngineError as e:
+        res = StepResult.now(name="cleanup_plan", status="Failed", message="Docker engine not reachable", error=e)
+        _emit(progress_cb, {"step_id": "cleanup_plan", "status": res.status}, "step-end")
+        return [res]
+    details = {kind: _plan_details(items) for kind, items in plan.by_kind().items()}
+    details.update({"reclaim_bytes": plan.reclaim_bytes, "kept": plan.kept, "target_bytes": plan.target_bytes,
+                    "shortfall_bytes": plan.shortfall_bytes})
+    summary = f"{len(plan.selected)} objects, {format_bytes(plan.reclaim_bytes)}"
+    if plan.shortfall_bytes:
+        summary += f" ({format_bytes(plan.shortfall_bytes)} short of the target)"
+    if not plan.selected:
+        status, message = "Success", "Nothing to reclaim under this policy"
+    elif dry_run:
+        status, message = "Skipped", f"Dry-run: would remove {summary}"
+    elif not yes:
+        status, message = "Skipped", f"Requires -Yes to remove {summary}"
+    else:
+        status, message = "Success", f"Removing {summary}"
+    plan_result = StepResult.now(name="cleanup_plan", status=status, message=message, details=details)
+    _emit(progress_cb, {"step_id": "cleanup_plan", "status": status, "reclaim_bytes": plan.reclaim_bytes}, "step-end")
+    if dry_run or not yes or not plan.selected:
+        return [plan_result]
+    return [plan_result] + execute_plan(client, plan, batch_size, workers, progress_cb)
@@ -0,0 +1,223 @@
+"""Minimal Docker Engine API client over the engine's local endpoint.
+
+Talks HTTP/1.1 to the daemon directly instead of shelling out to the ``docker``
+CLI once per object: listing and deleting hundreds of images through the CLI
+costs a process start per call, while the Engine API answers over one local
+connection. The endpoint comes from ``DOCKER_HOST`` (``npipe://``, ``unix://``
+or ``tcp://``), defaulting to Docker Desktop's named pipe on Windows and the
+unix socket elsewhere. Only the standard library is used.
+"""
+import http.client
+import json
+import os
+import socket
+import threading
+import urllib.parse
+from typing import Any, Dict, Iterator, Optional
+
+DEFAULT_NPIPE = "npipe:////./pipe/docker_engine"
+DEFAULT_UNIX = "unix:///var/run/docker.sock"
+
+
+class EngineError(Exception):
+    """The daemon could not be reached or answered with an error status."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def default_host() -> str:
+    return os.environ.get("DOCKER_HOST") or (DEFAULT_NPIPE if os.name == "nt" else DEFAULT_UNIX)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._path)
+        self.sock = sock
+
+
+def _open_pipe(path: str):
+    # a named pipe opens like a file; one unbuffered handle serves both directions
+    return open(path, "r+b", buffering=0)
+
+
+class _PipeReader:
+    """Response stream over the pipe handle for http.client.
+
+    http.client closes the file it got from ``makefile()`` once a response is
+    read; closing this wrapper leaves the shared handle open for the next
+    request on the kept-alive connection. Reads stay unbuffered, so no bytes
+    of the next response are swallowed.
+    """
+
+    def __init__(self, handle):
+        self._handle = handle
+        self.closed = False
+
+    def read(self, *args) -> bytes:
+        return self._handle.read(*args)
+
+    def readinto(self, buf) -> int:
+        return self._handle.readinto(buf)
+
+    def readline(self, *args) -> bytes:
+        return self._handle.readline(*args)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _PipeSocket:
+    """Just enough of the socket interface for http.client on a Windows named pipe."""
+
+    def __init__(self, path: str):
+        self._file = _open_pipe(path)
+
+    def sendall(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def makefile(self, mode: str, *args, **kwargs):
+        return _PipeReader(self._file)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _PipeConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = _PipeSocket(self._path)
+
+
+class EngineClient:
+    """JSON requests against the Docker Engine API.
+
+    One connection per thread is kept open and reused, so batched deletes
+    from a thread pool do not reconnect for every object.
+    """
+
+    def __init__(self, host: Optional[str] = None, timeout: float = 60.0):
+        self.host = host or default_host()
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open: list = []
+
+    def _connect(self) -> http.client.HTTPConnection:
+        url = urllib.parse.urlparse(self.host)
+        if url.scheme == "npipe":
+            # npipe:////./pipe/docker_engine -> \\.\pipe\docker_engine
+            return _PipeConnection(url.path.replace("/", "\\"), self.timeout)
+        if url.scheme == "unix":
+            return _UnixConnection(url.path, self.timeout)
+        if url.scheme in ("tcp", "http"):
+            return http.client.HTTPConnection(url.hostname, url.port or 2375, timeout=self.timeout)
+        raise EngineError(f"Unsupported DOCKER_HOST {self.host!r}")
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._lock:
+                self._open.append(conn)
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            with self._lock:
+                if conn in self._open:
+                    self._open.remove(conn)
+            conn.close()
+
+    def _send(self, method: str, path: str, params: Optional[Dict[str, Any]]) -> http.client.HTTPResponse:
+        query = {k: (json.dumps(v) if isinstance(v, (dict, list)) else v)
+                 for k, v in (params or {}).items() if v is not None}
+        target = path + ("?" + urllib.parse.urlencode(query) if query else "")
+        for attempt in (1, 2):
+            try:
+                conn = self._connection()
+                conn.request(method, target, headers={"Host": "docker"})
+                resp = conn.getresponse()
+                break
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                # ValueError: I/O on a handle that was closed under the connection
+                self._drop_connection()
+                # a kept-alive connection the daemon already closed fails once; retry on a fresh one
+                if attempt == 2:
+                    raise EngineError(f"{method} {path}: {e}") from e
+        if resp.status >= 300:
+            try:
+                body = resp.read()
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                self._drop_connection()
+                raise EngineError(f"{method} {path}: {e}", status=resp.status) from e
+            try:
+                message = json.loads(body).get("message") or body.decode("utf-8", "replace")
+            except (ValueError, AttributeError):
+                message = body.decode("utf-8", "replace")
+            raise EngineError(f"{method} {path}: {message.strip()}", status=resp.status)
+        return resp
+
+    def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Send a request and return the decoded JSON body (None when empty).
+
+        Raises:
+            EngineError: Connection failure or a non-2xx status (`status` is set for the latter).
+        """
+        resp = self._send(method, path, params)
+        try:
+            body = resp.read()
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self._drop_connection()
+            raise EngineError(f"{method} {path}: {e}") from e
+        return json.loads(body) if body.strip() else None
+
+    def stream(self, method: str, path: str, **params) -> Iterator[Any]:
+        """Yield the JSON messages of a streaming endpoint (one per line, e.g. image pulls).
+
+        Raises:
+            EngineError: As for `request`, or when the stream breaks off.
+        """
+        resp = self._send(method, path, params)
+        try:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise EngineError(f"{method} {path}: {e}") from e
+        finally:
+            if not resp.isclosed():
+                # abandoned mid-stream: the connection cannot be reused
+                self._drop_connection()
+
+    def get(self, path: str, **params) -> Any:
+        return self.request("GET", path, params)
+
+    def delete(self, path: str, **params) -> Any:
+        return self.request("DELETE", path, params)
+
+    def post(self, path: str, **params) -> Any:
+        return self.request("POST", path, params)
+
+    def close(self) -> None:
+        """Close the connections of every thread that used this client."""
+        with self._lock:
+            conns, self._open = self._open, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
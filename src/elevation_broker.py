@@ -0,0 +1,233 @@
+"""Elevate once and run a batch of privileged steps through a broker process.
+
+Every `_run_elevated_script` call is a separate UAC prompt and a separate process
+round-trip. The broker inverts this: the (non-elevated) orchestrator opens a local
+authenticated listener, launches this module elevated once, and sends the whole
+batch of privileged operations over the connection. The broker runs them in order
+and streams events back as they happen:
+
+    {"type": "step-start", "step_id": ...}
+    {"type": "step-progress", "step_id": ..., "stream": "stdout", "line": ...}
+    {"type": "step-end", "step_id": ..., "status": ..., "result": StepResult.to_dict()}
+    {"type": "done"}
+
+The broker connects back to the orchestrator, so the elevated process never listens
+on a socket. The one-time auth key is handed over in a file only the user can read
+and deleted by the broker after use. `local_launcher` starts the broker without
+elevation, which is how the protocol is tested.
+"""
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, List, Optional
+
+from step_result import StepResult
+
+# A launcher starts argv (elevated or not) and returns a Popen-like handle or None.
+Launcher = Callable[[List[str]], Any]
+
+SE_ERR_ACCESSDENIED = 5
+
+
+class BrokerError(Exception):
+    """The broker could not be started or did not connect back."""
+
+
+class BrokerDeclined(BrokerError):
+    """The user refused the UAC prompt for the broker."""
+
+
+@dataclass
+class BrokerOp:
+    """One privileged operation: a PowerShell script, or a plain command when `argv` is set."""
+    step_id: str
+    script: Optional[str] = None
+    args: List[str] = field(default_factory=list)
+    argv: Optional[List[str]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"step_id": self.step_id, "script": self.script, "args": list(self.args), "argv": self.argv}
+
+
+def elevated_launcher(argv: List[str]) -> None:
+    """Start argv elevated through the UAC `runas` verb (one prompt for the whole batch)."""
+    if os.name != "nt":
+        raise BrokerError("elevation is only supported on Windows")
+    import ctypes
+    params = subprocess.list2cmdline(argv[1:])
+    # ShellExecuteW returns a value <= 32 on failure; SE_ERR_ACCESSDENIED when the prompt is declined
+    code = ctypes.windll.shell32.ShellExecuteW(None, "runas", argv[0], params, None, 0)
+    if code == SE_ERR_ACCESSDENIED:
+        raise BrokerDeclined("elevation was declined")
+    if code <= 32:
+        raise BrokerError(f"elevation failed (code {code})")
+    return None
+
+
+def local_launcher(argv: List[str]) -> subprocess.Popen:
+    """Start the broker without elevation (tests, or when already elevated)."""
+    return subprocess.Popen(argv)
+
+
+def _write_key(authkey: bytes) -> str:
+    fd, path = tempfile.mkstemp(prefix="elev_broker_", suffix=".key")
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+    os.chmod(path, 0o600)
+    return path
+
+
+def _accept(listener: Listener, authkey: bytes, timeout: float, handle: Any):
+    """Wait for the broker to connect back, giving up early if its process exits."""
+    box: Dict[str, Any] = {}
+    ready = threading.Event()
+
+    def _run():
+        try:
+            box["conn"] = listener.accept()
+        except Exception as e:
+            box["error"] = e
+        ready.set()
+
+    threading.Thread(target=_run, name="broker-accept", daemon=True).start()
+    waited = 0.0
+    while not ready.wait(0.1):
+        waited += 0.1
+        exited = handle is not None and hasattr(handle, "poll") and handle.poll() is not None
+        if exited or waited >= timeout:
+            # wake the blocked accept() with a throwaway connection, then discard it
+            try:
+                Client(listener.address, authkey=authkey).close()
+            except Exception:
+                pass
+            ready.wait(5)
+            if "conn" in box:
+                box["conn"].close()
+            reason = f"exited with code {handle.poll()}" if exited else f"did not connect within {timeout:.0f}s"
+            raise BrokerError(f"elevation broker {reason}")
+    if "error" in box:
+        raise BrokerError(f"broker connection failed: {box['error']}")
+    return box["conn"]
+
+
+class ElevationBroker:
+    """Client side: launch the broker once per batch and collect streamed results."""
+
+    def __init__(self, launcher: Optional[Launcher] = None, connect_timeout: float = 120.0):
+        self.launcher = launcher or elevated_launcher
+        self.connect_timeout = connect_timeout
+        self.launches = 0
+
+    def run_batch(self, ops: List[BrokerOp], progress_cb=None, stop_on_failure: bool = False) -> List[StepResult]:
+        """Run `ops` in one elevated broker; returns one StepResult per op, in order.
+
+        Raises:
+            BrokerDeclined: The user refused the UAC prompt.
+            BrokerError: The broker could not be launched or never connected.
+        """
+        if not ops:
+            return []
+        authkey = secrets.token_bytes(32)
+        results: Dict[str, StepResult] = {}
+        with Listener(("127.0.0.1", 0), authkey=authkey) as listener:
+            host, port = listener.address
+            key_file = _write_key(authkey)
+            argv = [sys.executable, os.path.abspath(__file__), "--serve", f"{host}:{port}", "--key-file", key_file]
+            try:
+                handle = self.launcher(argv)
+                self.launches += 1
+                conn = _accept(listener, authkey, self.connect_timeout, handle)
+            finally:
+                try:
+                    os.remove(key_file)
+                except OSError:
+                    pass
+            with conn:
+                conn.send({"op": "batch", "steps": [op.to_dict() for op in ops], "stop_on_failure": stop_on_failure})
+                while True:
+                    try:
+                        msg = conn.recv()
+                    except (EOFError, OSError):
+                        break
+                    event_type = msg.pop("type", None)
+                    if event_type == "done":
+                        break
+                    if event_type == "step-end":
+                        results[msg["step_id"]] = StepResult(**msg.pop("result"))
+                    _emit(progress_cb, msg, event_type)
+        return [results.get(op.step_id) or StepResult.now(name=op.step_id, status="Failed",
+                                                           message="broker exited before the step ran")
+                for op in ops]
+
+
+def _emit(progress_cb, event: Dict[str, Any], event_type: str) -> None:
+    if not progress_cb:
+        return
+    try:
+        progress_cb(event, event_type)
+    except Exception:
+        # never let UI callback failures abort the batch
+        pass
+
+
+def _run_op(op: Dict[str, Any], on_line: Callable[[str, str], None]) -> StepResult:
+    step_id = op["step_id"]
+    if op.get("argv"):
+        try:
+            proc = subprocess.Popen(op["argv"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                    encoding="utf-8", errors="replace")
+        except OSError as e:
+            return StepResult.now(name=step_id, status="Failed", message="could not start command", error=e)
+        for line in proc.stdout:
+            on_line("stdout", line.rstrip("\r\n"))
+        code = proc.wait()
+        status = "Success" if code == 0 else "Failed"
+        return StepResult.now(name=step_id, status=status, message=f"exit {code}",
+                              error=None if code == 0 else f"exit {code}", details={"exit_code": code})
+    from ps_worker import WorkerError, shared_pool
+    try:
+        return shared_pool().run(script=op["script"], args=op.get("args") or [], on_output=on_line) \
+            .to_step_result(step_id)
+    except WorkerError as e:
+        return StepResult.now(name=step_id, status="Failed", message="PowerShell worker failed", error=e)
+
+
+def serve(address, authkey: bytes) -> int:
+    """Broker side: connect back, run the received batch and stream events."""
+    with Client(address, authkey=authkey) as conn:
+        request = conn.recv()
+        for op in request.get("steps", []):
+            step_id = op["step_id"]
+            conn.send({"type": "step-start", "step_id": step_id, "name": step_id})
+            result = _run_op(op, lambda stream, line: conn.send(
+                {"type": "step-progress", "step_id": step_id, "stream": stream, "line": line}))
+            conn.send({"type": "step-end", "step_id": step_id, "status": result.status, "result": result.to_dict()})
+            if result.status == "Failed" and request.get("stop_on_failure"):
+                break
+        conn.send({"type": "done"})
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Elevated broker for batched privileged steps")
+    parser.add_argument("--serve", required=True, help="HOST:PORT of the orchestrator's listener")
+    parser.add_argument("--key-file", required=True, help="file holding the one-time auth key")
+    args = parser.parse_args(argv)
+    with open(args.key_file, "rb") as f:
+        authkey = f.read()
+    try:
+        os.remove(args.key_file)
+    except OSError:
+        pass
+    host, port = args.serve.rsplit(":", 1)
+    return serve((host, int(port)), authkey)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
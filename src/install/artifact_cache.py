@@ -0,0 +1,454 @@
+"""Content-addressed download cache for installer artifacts.
+
+Installers (Docker Desktop, the WSL kernel MSI) are stored once under their SHA-256
+in ``<cache>/sha256/<aa>/<digest>``, so every run and every machine pointed at the
+same (e.g. network) cache directory reuses them. Downloads are split into HTTP
+Range segments fetched in parallel into a preallocated ``.part`` file; segment
+progress is persisted next to it so an interrupted download resumes where each
+segment stopped. The finished file is hashed before it is moved into the store.
+
+Artifacts published under a moving "latest" URL have no pinned digest; for those
+the cache remembers url -> digest together with the server's ETag and size and
+reuses the blob while they are unchanged. That only notices changes and
+authenticates nothing, so an installer is only run once its digest is pinned in
+the config (``installation.artifact_sha256.<name>``, see `artifact_digest`).
+"""
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+
+CACHE_ENV = "WSL_DOCKER_ARTIFACT_CACHE"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(src_path), "wsl_docker_config.json")
+BLOCK = 1 << 20
+MIN_SEGMENT = 4 << 20
+STATE_FLUSH_BYTES = 8 << 20
+LOCK_STALE_SECONDS = 600
+# the lock holder refreshes the lock's mtime this often, so only a dead holder's lock goes stale
+LOCK_HEARTBEAT_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """A downloadable file; `sha256` pins the content when the publisher provides it."""
+    name: str
+    url: str
+    sha256: Optional[str] = None
+    filename: Optional[str] = None
+
+
+ARTIFACTS: Dict[str, Artifact] = {
+    "docker_desktop": Artifact(
+        name="docker_desktop",
+        url="https://desktop.docker.com/win/main/amd64/Docker%20Desktop%20Installer.exe",
+        filename="Docker Desktop Installer.exe",
+    ),
+    "wsl_kernel": Artifact(
+        name="wsl_kernel",
+        url="https://wslstorestorage.blob.core.windows.net/wslblob/wsl_update_x64.msi",
+        filename="wsl_update_x64.msi",
+    ),
+}
+
+
+class ArtifactError(Exception):
+    """Download failed or the content did not match its expected digest."""
+
+
+def artifact_digest(name: str, config_path: str = DEFAULT_CONFIG_PATH) -> Optional[str]:
+    """Pinned SHA-256 of ARTIFACTS[name]: installation.artifact_sha256 in config, else the built-in pin."""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            configured = ((json.load(f).get("installation") or {}).get("artifact_sha256") or {}).get(name)
+    except (OSError, ValueError, AttributeError):
+        configured = None
+    digest = configured or ARTIFACTS[name].sha256
+    return digest.lower() if digest else None
+
+
+def require_digest(name: str, config_path: str = DEFAULT_CONFIG_PATH) -> str:
+    """Pinned SHA-256 of an artifact about to be installed; raises ArtifactError when there is none."""
+    digest = artifact_digest(name, config_path)
+    if not digest:
+        raise ArtifactError(f"No pinned SHA-256 for {name}; set installation.artifact_sha256.{name} in "
+                            f"{os.path.basename(config_path)} before installing it")
+    return digest
+
+
+class _ServerChanged(ArtifactError):
+    """The server ignored If-Range: the remote file changed since the partial download began."""
+
+
+def default_cache_dir(config_path: str = DEFAULT_CONFIG_PATH) -> str:
+    """Cache directory: $WSL_DOCKER_ARTIFACT_CACHE, else installation.artifact_cache in config, else per user."""
+    env = os.environ.get(CACHE_ENV)
+    if env:
+        return env
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            configured = (json.load(f).get("installation") or {}).get("artifact_cache")
+        if configured:
+            return os.path.expandvars(os.path.expanduser(configured))
+    except (OSError, ValueError):
+        pass
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wsl-docker-manager", "artifacts")
+
+
+def _atomic_write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _file_sha256(path: str, on_block: Optional[Callable[[], None]] = None) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK), b""):
+            h.update(block)
+            if on_block:
+                on_block()
+    return h.hexdigest()
+
+
+class _Segments:
+    """Persisted download state: byte ranges and how much of each is done."""
+
+    def __init__(self, path: str, url: str, size: int, etag: Optional[str], count: int):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("url") == url and saved.get("size") == size and saved.get("etag") == etag:
+                self.data = saved
+        except (OSError, ValueError):
+            pass
+        self.resumed = self.data is not None
+        if self.data is None:
+            step = -(-size // count)
+            ranges = [[start, min(size, start + step), 0] for start in range(0, size, step)]
+            self.data = {"url": url, "size": size, "etag": etag, "segments": ranges}
+        self._unsaved = 0
+
+    def restart(self) -> None:
+        """Forget progress (the partial file is missing or being recreated)."""
+        for seg in self.segments:
+            seg[2] = 0
+
+    @property
+    def segments(self) -> List[List[int]]:
+        return self.data["segments"]
+
+    @property
+    def done(self) -> int:
+        return sum(seg[2] for seg in self.segments)
+
+    def advance(self, i: int, n: int) -> None:
+        with self.lock:
+            self.segments[i][2] += n
+            self._unsaved += n
+            if self._unsaved >= STATE_FLUSH_BYTES:
+                self._save_locked()
+
+    def save(self) -> None:
+        with self.lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        _atomic_write_json(self.path, self.data)
+        self._unsaved = 0
+
+
+class ArtifactCache:
+    """Content-addressed artifact store with segmented, resumable downloads."""
+
+    def __init__(self, root: Optional[str] = None, segments: int = 4, timeout: float = 30.0, retries: int = 3):
+        self.root = root or default_cache_dir()
+        self.segments = max(1, segments)
+        self.timeout = timeout
+        self.retries = retries
+        for sub in ("sha256", "partial"):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+        self._refs_path = os.path.join(self.root, "refs.json")
+
+    # -- store -------------------------------------------------------------
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "sha256", digest[:2], digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.isfile(self.blob_path(digest))
+
+    def _load_refs(self) -> Dict[str, Any]:
+        try:
+            with open(self._refs_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_ref(self, url: str, digest: str, size: int, etag: Optional[str]) -> None:
+        refs = self._load_refs()
+        refs[url] = {"sha256": digest, "size": size, "etag": etag, "fetched": time.time()}
+        _atomic_write_json(self._refs_path, refs)
+
+    def _store(self, part: str, digest: str) -> str:
+        dest = self.blob_path(digest)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        # identical content under the same name: a concurrent writer on another machine is harmless
+        os.replace(part, dest)
+        return dest
+
+    # -- HTTP --------------------------------------------------------------
+
+    def _open(self, url: str, method: str = "GET", headers: Optional[Dict[str, str]] = None):
+        req = urllib.request.Request(url, method=method, headers=headers or {})
+        return urllib.request.urlopen(req, timeout=self.timeout)
+
+    def _probe(self, url: str) -> Dict[str, Any]:
+        """Return size, range support and ETag (HEAD, falling back to a one-byte range GET)."""
+        try:
+            with self._open(url, "HEAD") as resp:
+                headers = resp.headers
+        except urllib.error.HTTPError as e:
+            if e.code not in (403, 405, 501):
+                raise
+            with self._open(url, headers={"Range": "bytes=0-0"}) as resp:
+                headers = resp.headers
+                if resp.status == 206 and "/" in headers.get("Content-Range", ""):
+                    return {"size": int(headers["Content-Range"].rsplit("/", 1)[1]), "ranges": True,
+                            "etag": headers.get("ETag")}
+        size = headers.get("Content-Length")
+        return {
+            "size": int(size) if size is not None else None,
+            "ranges": headers.get("Accept-Ranges", "").lower() == "bytes",
+            "etag": headers.get("ETag"),
+        }
+
+    # -- download ----------------------------------------------------------
+
+    def _fetch_segment(self, url: str, part: str, state: _Segments, i: int, etag: Optional[str],
+                       on_bytes: Callable[[int], None]) -> None:
+        for attempt in range(self.retries + 1):
+            start, end, done = state.segments[i]
+            if start + done >= end:
+                return
+            headers = {"Range": f"bytes={start + done}-{end - 1}"}
+            if etag:
+                headers["If-Range"] = etag
+            try:
+                with self._open(url, headers=headers) as resp, open(part, "r+b") as f:
+                    if resp.status != 206:
+                        raise _ServerChanged(f"{url} changed on the server (no partial content)")
+                    f.seek(start + done)
+                    while True:
+                        block = resp.read(min(BLOCK, end - start - state.segments[i][2]))
+                        if not block:
+                            break
+                        f.write(block)
+                        state.advance(i, len(block))
+                        on_bytes(len(block))
+                if start + state.segments[i][2] >= end:
+                    return
+            except ArtifactError:
+                raise
+            except (OSError, http.client.HTTPException):
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(5.0, 0.2 * 2 ** attempt))
+        raise ArtifactError(f"Segment {i} of {url} did not complete")
+
+    def _download_whole(self, url: str, part: str, on_bytes: Callable[[int], None]) -> None:
+        with self._open(url) as resp, open(part, "wb") as f:
+            for block in iter(lambda: resp.read(BLOCK), b""):
+                f.write(block)
+                on_bytes(len(block))
+
+    def _acquire_lock(self, lock_path: str, wait_for: Optional[str]) -> bool:
+        """Take the partial-download lock; while another process holds it, wait for its result.
+
+        Returns False if the blob `wait_for` appeared while waiting.
+        """
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                if wait_for and os.path.isfile(wait_for):
+                    return False
+                time.sleep(0.5)
+
+    def fetch(self, url: str, sha256: Optional[str] = None,
+              progress_cb: Optional[Callable[[Dict[str, Any], str], None]] = None,
+              step_id: str = "artifact_download") -> str:
+        """Return the path of the cached artifact, downloading it if needed.
+
+        Args:
+            url: Download URL.
+            sha256: Expected digest; when cached, no network access is made at all.
+            progress_cb: Optional ``progress_cb(event, event_type)`` receiving ``step-progress`` events.
+            step_id: step_id carried by progress events.
+
+        Raises:
+            ArtifactError: The download failed or the digest did not match.
+        """
+        sha256 = sha256.lower() if sha256 else None
+        if sha256 and self.has(sha256):
+            return self.blob_path(sha256)
+
+        info = self._probe(url)
+        if not sha256:
+            ref = self._load_refs().get(url)
+            if ref and self.has(ref["sha256"]) and ref.get("size") == info["size"] \
+                    and info["etag"] and ref.get("etag") == info["etag"]:
+                return self.blob_path(ref["sha256"])
+
+        key = sha256 or hashlib.sha256(url.encode("utf-8")).hexdigest()
+        part = os.path.join(self.root, "partial", f"{key}.part")
+        state_path = os.path.join(self.root, "partial", f"{key}.json")
+        lock_path = os.path.join(self.root, "partial", f"{key}.lock")
+        if not self._acquire_lock(lock_path, self.blob_path(sha256) if sha256 else None):
+            return self.blob_path(sha256)
+        try:
+            if sha256 and self.has(sha256):
+                return self.blob_path(sha256)
+            size = info["size"]
+            done = [0]
+            done_lock = threading.Lock()
+            last_emit = [0.0]
+            last_touch = [time.monotonic()]
+
+            def keep_lock() -> None:
+                # a slow multi-GB download outlives LOCK_STALE_SECONDS; show the lock is still held
+                now = time.monotonic()
+                if now - last_touch[0] >= LOCK_HEARTBEAT_SECONDS:
+                    last_touch[0] = now
+                    try:
+                        os.utime(lock_path)
+                    except OSError:
+                        pass
+
+            def on_bytes(n: int) -> None:
+                with done_lock:
+                    done[0] += n
+                    keep_lock()
+                    now = time.monotonic()
+                    if now - last_emit[0] < 0.25 and (size is None or done[0] < size):
+                        return
+                    last_emit[0] = now
+                    event = {"step_id": step_id, "url": url, "bytes_done": done[0], "bytes_total": size}
+                if progress_cb:
+                    try:
+                        progress_cb(event, "step-progress")
+                    except Exception:
+                        # never let UI callback failures abort the download
+                        pass
+
+            if info["ranges"] and size:
+                count = max(1, min(self.segments, -(-size // MIN_SEGMENT)))
+                state = _Segments(state_path, url, size, info["etag"], count)
+                if not (state.resumed and os.path.isfile(part)):
+                    state.restart()
+                    with open(part, "wb") as f:
+                        f.truncate(size)
+                done[0] = state.done
+                try:
+                    with ThreadPoolExecutor(max_workers=len(state.segments)) as pool:
+                        futures = [pool.submit(self._fetch_segment, url, part, state, i, info["etag"], on_bytes)
+                                   for i in range(len(state.segments))]
+                        for fut in futures:
+                            fut.result()
+                finally:
+                    state.save()
+            else:
+                self._download_whole(url, part, on_bytes)
+
+            digest = _file_sha256(part, keep_lock)
+            if sha256 and digest != sha256:
+                self._discard(part, state_path)
+                raise ArtifactError(f"SHA-256 mismatch for {url}: expected {sha256}, got {digest}")
+            path = self._store(part, digest)
+            self._discard(part, state_path)
+            self._save_ref(url, digest, os.path.getsize(path), info["etag"])
+            return path
+        except _ServerChanged:
+            self._discard(part, state_path)
+            raise
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _discard(*paths: str) -> None:
+        for p in paths:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def materialize(self, blob: str, dest_dir: str, filename: str) -> str:
+        """Copy (or hardlink) a cached blob to a named file, e.g. for an installer that checks its own name."""
+        os.makedirs(dest_dir, exist_ok=True)
+        dest = os.path.join(dest_dir, filename)
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(blob, dest)
+        except OSError:
+            shutil.copyfile(blob, dest)
+        return dest
+
+
+def ensure_artifacts(names: List[str], cache: Optional[ArtifactCache] = None,
+                     progress_cb: Optional[Callable[[Dict[str, Any], str], None]] = None,
+                     dry_run: bool = False, config_path: str = DEFAULT_CONFIG_PATH) -> List[StepResult]:
+    """Make sure the named ARTIFACTS are in the cache; one StepResult per artifact.
+
+    Artifacts without a pinned digest are still cached but reported as unverified.
+    """
+    results = []
+    for name in names:
+        artifact = ARTIFACTS[name]
+        step = f"fetch_{name}"
+        if dry_run:
+            results.append(StepResult.now(name=step, status="Skipped", message=f"Dry-run: would fetch {artifact.url}"))
+            continue
+        cache = cache or ArtifactCache()
+        started = time.monotonic()
+        digest = artifact_digest(name, config_path)
+        try:
+            path = cache.fetch(artifact.url, digest, progress_cb=progress_cb, step_id=step)
+        except Exception as e:
+            results.append(StepResult.now(name=step, status="Failed", message=f"Could not fetch {name}", error=e))
+            continue
+        check = "SHA-256 verified" if digest else "unverified: no pinned SHA-256"
+        results.append(StepResult.now(name=step, status="Success", message=f"{name} ready ({check}): {path}",
+                                      details={"path": path, "size": os.path.getsize(path), "verified": bool(digest),
+                                               "elapsed": round(time.monotonic() - started, 3)}))
+    return results
@@ -0,0 +1,268 @@
+"""Idempotent install convergence.
+
+Instead of running every install step unconditionally, the installer gathers the
+current host state, compares it with a desired-state spec and plans only the steps
+that close the gap. `plan()` is a pure function of (desired, current); `converge()`
+executes the plan through StepRunner, so dry-run shows exactly what would change.
+On a machine that is already configured the plan is empty and a re-run costs only
+the state gathering.
+"""
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from step_runner import StepRunner
+from status.host_facts import FactsError, HostFacts, default_facts
+
+# A command runner takes argv and returns (returncode, decoded output).
+CommandRunner = Callable[[List[str]], Tuple[int, str]]
+
+WSL_FEATURES = ("Microsoft-Windows-Subsystem-Linux", "VirtualMachinePlatform")
+
+
+def docker_settings_path() -> str:
+    appdata = os.environ.get("APPDATA", os.path.join(os.path.expanduser("~"), "AppData", "Roaming"))
+    return os.path.join(appdata, "Docker", "settings-store.json")
+
+
+def run_command(args: List[str], timeout: float = 120.0) -> Tuple[int, str]:
+    """Default CommandRunner; decodes the UTF-16 output wsl.exe produces."""
+    try:
+        proc = subprocess.run(args, capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return 127, str(e)
+    out = proc.stdout
+    text = out.decode("utf-16-le") if b"\x00" in out else out.decode("utf-8", errors="replace")
+    return proc.returncode, text.replace("\ufeff", "")
+
+
+def _version_tuple(version: Optional[str]) -> Tuple[int, ...]:
+    parts = []
+    for piece in (version or "").split("."):
+        digits = "".join(ch for ch in piece if ch.isdigit())
+        if not digits:
+            break
+        parts.append(int(digits))
+    return tuple(parts)
+
+
+@dataclass
+class DesiredState:
+    """What a converged machine looks like."""
+    wsl_features: Tuple[str, ...] = WSL_FEATURES
+    wsl_default_version: int = 2
+    distros: Tuple[str, ...] = ("Ubuntu-22.04",)
+    docker_installed: bool = True
+    docker_min_version: Optional[str] = None
+    docker_settings: Dict[str, Any] = field(default_factory=lambda: {"wslEngineEnabled": True})
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "DesiredState":
+        """Build from ``installation.desired_state`` in wsl_docker_config.json (missing keys keep defaults)."""
+        section = (config.get("installation") or {}).get("desired_state") or {}
+        desired = cls()
+        if "wsl_features" in section:
+            desired.wsl_features = tuple(section["wsl_features"])
+        if "wsl_default_version" in section:
+            desired.wsl_default_version = int(section["wsl_default_version"])
+        if "distros" in section:
+            desired.distros = tuple(section["distros"])
+        if "docker_installed" in section:
+            desired.docker_installed = bool(section["docker_installed"])
+        if section.get("docker_min_version"):
+            desired.docker_min_version = section["docker_min_version"]
+        if "docker_settings" in section:
+            desired.docker_settings = dict(section["docker_settings"])
+        return desired
+
+
+@dataclass
+class HostState:
+    """What the machine looks like now; None means the fact could not be determined."""
+    features: Dict[str, bool] = field(default_factory=dict)
+    wsl_default_version: Optional[int] = None
+    distros: List[str] = field(default_factory=list)
+    docker_version: Optional[str] = None
+    docker_settings: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class PlannedStep:
+    """One step needed to close the gap between current and desired state."""
+    id: str
+    description: str
+    reason: str
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+def gather_state(facts: Optional[HostFacts] = None, settings_path: Optional[str] = None) -> HostState:
+    """Collect the facts convergence compares against (one batched facts query).
+
+    Raises:
+        FactsError: The facts query failed (no PowerShell, unreadable output).
+    """
+    facts = facts or default_facts()
+    got = facts.get("windows_features", "wsl_default_version", "wsl_distros", "docker_version")
+    state = HostState(
+        features=dict(got["windows_features"] or {}),
+        wsl_default_version=got["wsl_default_version"],
+        distros=list(got["wsl_distros"] or []),
+        docker_version=got["docker_version"] or None,
+    )
+    try:
+        with open(settings_path or docker_settings_path(), "r", encoding="utf-8") as f:
+            state.docker_settings = json.load(f)
+    except (OSError, ValueError):
+        state.docker_settings = {}
+    return state
+
+
+def plan(desired: DesiredState, state: HostState) -> List[PlannedStep]:
+    """Return the steps needed to move `state` to `desired`, in execution order."""
+    steps: List[PlannedStep] = []
+    for feature in desired.wsl_features:
+        if not state.features.get(feature):
+            steps.append(PlannedStep(f"enable_feature:{feature}", f"Enable Windows feature {feature}",
+                                     "feature disabled or unknown", {"feature": feature}))
+    if state.wsl_default_version != desired.wsl_default_version:
+        steps.append(PlannedStep("set_wsl_default_version", f"Set WSL default version to {desired.wsl_default_version}",
+                                 f"current default is {state.wsl_default_version}",
+                                 {"version": desired.wsl_default_version}))
+    installed = {d.lower() for d in state.distros}
+    for distro in desired.distros:
+        if distro.lower() not in installed:
+            steps.append(PlannedStep(f"install_distro:{distro}", f"Install WSL distro {distro}", "not registered",
+                                     {"distro": distro}))
+    if desired.docker_installed:
+        if not state.docker_version:
+            steps.append(PlannedStep("install_docker", "Install Docker Desktop", "not installed"))
+        elif desired.docker_min_version and \
+                _version_tuple(state.docker_version) < _version_tuple(desired.docker_min_version):
+            steps.append(PlannedStep("install_docker", "Upgrade Docker Desktop",
+                                     f"{state.docker_version} is older than {desired.docker_min_version}"))
+        drift = {k: v for k, v in desired.docker_settings.items() if state.docker_settings.get(k) != v}
+        if drift:
+            steps.append(PlannedStep("configure_docker", f"Update Docker Desktop settings: {', '.join(sorted(drift))}",
+                                     "settings differ", {"settings": drift}))
+    return steps
+
+
+def default_actions(run: CommandRunner = run_command, settings_path: Optional[str] = None,
+                    progress_cb=None) -> Dict[str, Callable[..., Any]]:
+    """Map step kinds (the part of the step id before ':') to callables."""
+
+    def _check(args: List[str]) -> str:
+        rc, out = run(args)
+        # dism returns 3010 for "succeeded, reboot required"
+        if rc not in (0, 3010):
+            raise RuntimeError(f"{' '.join(args)} exited {rc}: {out.strip()}")
+        return out.strip() or "ok"
+
+    def enable_feature(feature: str) -> str:
+        return _check(["dism.exe", "/online", "/enable-feature", f"/featurename:{feature}", "/all", "/norestart"])
+
+    def set_wsl_default_version(version: int) -> str:
+        return _check(["wsl.exe", "--set-default-version", str(version)])
+
+    def install_distro(distro: str) -> str:
+        return _check(["wsl.exe", "--install", "-d", distro, "--no-launch"])
+
+    def install_docker() -> str:
+        from install.artifact_cache import ARTIFACTS, ArtifactCache, require_digest
+        artifact = ARTIFACTS["docker_desktop"]
+        # the installer runs elevated, so it must match a pinned digest, not just whatever the URL serves
+        digest = require_digest(artifact.name)
+        cache = ArtifactCache()
+        blob = cache.fetch(artifact.url, digest, progress_cb=progress_cb, step_id="install_docker")
+        installer = cache.materialize(blob, os.path.join(cache.root, "staging"), artifact.filename)
+        return _check([installer, "install", "--quiet", "--accept-license"])
+
+    def configure_docker(settings: Dict[str, Any]) -> str:
+        path = settings_path or docker_settings_path()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            current = {}
+        current.update(settings)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        os.replace(tmp, path)
+        return f"updated {', '.join(sorted(settings))}"
+
+    return {
+        "enable_feature": enable_feature,
+        "set_wsl_default_version": set_wsl_default_version,
+        "install_distro": install_distro,
+        "install_docker": install_docker,
+        "configure_docker": configure_docker,
+    }
+
+
+def converge(desired: DesiredState, state: Optional[HostState] = None, dry_run: bool = True,
+             run: CommandRunner = run_command, actions: Optional[Dict[str, Callable[..., Any]]] = None,
+             progress_cb=None, name: str = "converge", settings_path: Optional[str] = None,
+             facts: Optional[HostFacts] = None) -> List[StepResult]:
+    """Gather state (unless given), plan, and run only the needed steps.
+
+    Args:
+        desired: Target state.
+        state: Pre-gathered host state (gathered from `facts` when None).
+        dry_run: Report the plan as Skipped steps without changing anything.
+        run: CommandRunner used by the default actions.
+        actions: Override step implementations, keyed by step kind.
+        progress_cb: Optional ``progress_cb(event, event_type)`` receiving step-start/step-end events.
+        name: Name of the summary result when nothing needs to change.
+        settings_path: Docker Desktop settings file (default: the per-user settings store).
+        facts: HostFacts to gather state from (default: the shared instance).
+
+    Returns:
+        One StepResult per planned step, a single Success result when already converged,
+        or a single Failed ``plan`` result when the host facts could not be read.
+    """
+    facts = facts or default_facts()
+    if state is None:
+        try:
+            state = gather_state(facts, settings_path)
+        except FactsError as e:
+            return [StepResult.now(name="plan", status="Failed", message="Could not read host facts", error=e)]
+    steps = plan(desired, state)
+    if not steps:
+        return [StepResult.now(name=name, status="Success", message="Already converged; nothing to do")]
+    actions = actions or default_actions(run, settings_path, progress_cb=progress_cb)
+    runner = StepRunner(dry_run=dry_run)
+    results: List[StepResult] = []
+    for step in steps:
+        _emit(progress_cb, {"step_id": step.id, "description": step.description, "reason": step.reason}, "step-start")
+        kind = step.id.split(":", 1)[0]
+        result = runner.invoke(step.id, actions[kind], **step.args)
+        result.details = {"description": step.description, "reason": step.reason}
+        results.append(result)
+        _emit(progress_cb, {"step_id": step.id, "status": result.status}, "step-end")
+        if result.status == "Success":
+            # the host changed: the next gather must not reuse cached facts
+            facts.invalidate()
+        if result.status == "Failed":
+            break  # later steps depend on earlier ones; re-running converges the rest
+    return results
+
+
+def _emit(progress_cb, event: Dict[str, Any], event_type: str) -> None:
+    if not progress_cb:
+        return
+    try:
+        progress_cb(event, event_type)
+    except Exception:
+        # never let UI callback failures abort the install
+        pass
@@ -0,0 +1,205 @@
+"""Named profiles for Docker's ``daemon.json``.
+
+The engine defaults hurt throughput on our hosts: json-file logs grow without
+bound, image pulls use 3 concurrent layer downloads, and the BuildKit cache is
+only collected when the disk is nearly full. A profile is a partial daemon.json
+that is deep-merged over the existing file (keys the profile does not mention
+are kept), validated, and written atomically with the previous file kept as
+``daemon.json.bak``. The result lists every setting that changed.
+"""
+import copy
+import ipaddress
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "balanced": {
+        "log-driver": "json-file",
+        "log-opts": {"max-size": "10m", "max-file": "3"},
+        "max-concurrent-downloads": 6,
+        "max-concurrent-uploads": 5,
+        "builder": {"gc": {"enabled": True, "defaultKeepStorage": "20GB"}},
+        "features": {"buildkit": True},
+    },
+    "build_heavy": {
+        "log-driver": "json-file",
+        "log-opts": {"max-size": "20m", "max-file": "5"},
+        "max-concurrent-downloads": 10,
+        "max-concurrent-uploads": 10,
+        "builder": {"gc": {"enabled": True, "defaultKeepStorage": "60GB"}},
+        "features": {"buildkit": True},
+        "storage-driver": "overlay2",
+    },
+    "low_disk": {
+        "log-driver": "local",
+        "log-opts": {"max-size": "5m", "max-file": "2"},
+        "max-concurrent-downloads": 3,
+        "max-concurrent-uploads": 3,
+        "builder": {"gc": {"enabled": True, "defaultKeepStorage": "8GB"}},
+        "features": {"buildkit": True},
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+_SIZE = re.compile(r"^\d+(\.\d+)?\s*([kmgt]i?b?|b)?$", re.IGNORECASE)
+
+
+class DaemonConfigError(ValueError):
+    """The merged daemon.json would be rejected by dockerd."""
+
+
+def default_daemon_json_path() -> str:
+    """Docker Desktop reads the engine config from ``~/.docker/daemon.json``."""
+    home = os.environ.get("USERPROFILE") or os.path.expanduser("~")
+    return os.path.join(home, ".docker", "daemon.json")
+
+
+def deep_merge(base: Dict[str, Any], overlay: Dict[str, Any]) -> Dict[str, Any]:
+    """Return `base` with `overlay` merged in; nested dicts merge, everything else is replaced."""
+    merged = copy.deepcopy(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def diff_settings(old: Dict[str, Any], new: Dict[str, Any], prefix: str = "") -> List[Tuple[str, Any, Any]]:
+    """List (dotted.key, old, new) for every leaf that differs."""
+    changes = []
+    for key in sorted(set(old) | set(new)):
+        path = f"{prefix}{key}"
+        a, b = old.get(key), new.get(key)
+        if isinstance(a, dict) and isinstance(b, dict):
+            changes.extend(diff_settings(a, b, f"{path}."))
+        elif a != b:
+            changes.append((path, a, b))
+    return changes
+
+
+def validate(config: Dict[str, Any]) -> List[str]:
+    """Check the settings profiles touch; returns problems (empty when valid)."""
+    problems = []
+    for key in ("max-concurrent-downloads", "max-concurrent-uploads"):
+        value = config.get(key)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+            problems.append(f"{key} must be a positive integer")
+    log_opts = config.get("log-opts", {})
+    if not isinstance(log_opts, dict):
+        problems.append("log-opts must be an object")
+    else:
+        # dockerd refuses to start when a log-opts value is not a string
+        for k, v in log_opts.items():
+            if not isinstance(v, str):
+                problems.append(f"log-opts.{k} must be a string")
+        if isinstance(log_opts.get("max-size"), str) and not _SIZE.match(log_opts["max-size"]):
+            problems.append("log-opts.max-size must be a size such as 10m")
+        if isinstance(log_opts.get("max-file"), str) and not log_opts["max-file"].isdigit():
+            problems.append("log-opts.max-file must be a number")
+    if "log-driver" in config and not isinstance(config["log-driver"], str):
+        problems.append("log-driver must be a string")
+    for key in ("dns", "dns-search", "dns-opts", "storage-opts"):
+        if key in config and not (isinstance(config[key], list) and all(isinstance(v, str) for v in config[key])):
+            problems.append(f"{key} must be a list of strings")
+    for server in config.get("dns", []) if isinstance(config.get("dns"), list) else []:
+        try:
+            ipaddress.ip_address(server)
+        except ValueError:
+            problems.append(f"dns entry {server!r} is not an IP address")
+    gc = (config.get("builder") or {}).get("gc") if isinstance(config.get("builder"), dict) else None
+    if gc is not None:
+        if not isinstance(gc, dict):
+            problems.append("builder.gc must be an object")
+        elif "defaultKeepStorage" in gc and not (isinstance(gc["defaultKeepStorage"], str)
+                                                  and _SIZE.match(gc["defaultKeepStorage"])):
+            problems.append("builder.gc.defaultKeepStorage must be a size such as 20GB")
+    return problems
+
+
+def load_daemon_json(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return {}
+    if not text.strip():
+        return {}
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise DaemonConfigError(f"{path} does not contain a JSON object")
+    return data
+
+
+def plan_profile(name: str, path: Optional[str] = None, overrides: Optional[Dict[str, Any]] = None
+                 ) -> Tuple[Dict[str, Any], Dict[str, Any], List[Tuple[str, Any, Any]]]:
+    """Return (current, merged, changes) for applying profile `name` (plus `overrides`) to `path`.
+
+    Raises:
+        DaemonConfigError: Unknown profile, unreadable file, or a merged config that fails validation.
+    """
+    if name not in PROFILES:
+        raise DaemonConfigError(f"Unknown daemon profile {name!r}; expected one of {', '.join(PROFILES)}")
+    path = path or default_daemon_json_path()
+    try:
+        current = load_daemon_json(path)
+    except json.JSONDecodeError as e:
+        raise DaemonConfigError(f"{path} is not valid JSON: {e}") from e
+    merged = deep_merge(deep_merge(current, PROFILES[name]), overrides or {})
+    problems = validate(merged)
+    if problems:
+        raise DaemonConfigError("; ".join(problems))
+    return current, merged, diff_settings(current, merged)
+
+
+def apply_profile(name: str = DEFAULT_PROFILE, path: Optional[str] = None, dry_run: bool = True,
+                  overrides: Optional[Dict[str, Any]] = None) -> StepResult:
+    """Apply a profile to daemon.json; `details["changes"]` lists what changed.
+
+    Args:
+        name: Profile from PROFILES.
+        path: daemon.json to update (default: Docker Desktop's ``~/.docker/daemon.json``).
+        dry_run: Report the changes without writing.
+        overrides: Extra settings merged after the profile, e.g. {"dns": ["10.0.0.2"]}.
+    """
+    path = path or default_daemon_json_path()
+    try:
+        _, merged, changes = plan_profile(name, path, overrides)
+    except DaemonConfigError as e:
+        return StepResult.now(name="daemon_config", status="Failed", message="daemon.json not changed", error=e)
+    details = {"path": path, "profile": name,
+               "changes": [{"setting": k, "old": old, "new": new} for k, old, new in changes]}
+    if not changes:
+        return StepResult.now(name="daemon_config", status="Success", message=f"daemon.json already matches '{name}'",
+                              details=details)
+    summary = ", ".join(k for k, _, _ in changes)
+    if dry_run:
+        return StepResult.now(name="daemon_config", status="Skipped", message=f"Dry-run: would change {summary}",
+                              details=details)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            backup = f"{path}.bak"
+            with open(path, "rb") as src, open(backup, "wb") as dst:
+                dst.write(src.read())
+            details["backup"] = backup
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2)
+            f.write("\n")
+        os.replace(tmp, path)
+    except OSError as e:
+        return StepResult.now(name="daemon_config", status="Failed", message="Could not write daemon.json",
+                              error=e, details=details)
+    return StepResult.now(name="daemon_config", status="Success",
+                          message=f"Applied '{name}': {summary} (restart Docker to take effect)", details=details)
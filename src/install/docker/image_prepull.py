@@ -0,0 +1,303 @@
+"""Warm the image store after an install or reset by pre-pulling the team's images.
+
+The team manifest (JSON) lists the images developers need::
+
+    {"bases": ["mcr.microsoft.com/devcontainers/base:ubuntu"],
+     "images": ["mcr.microsoft.com/devcontainers/python:3.12", "postgres:16"]}
+
+Images are pulled concurrently through the Engine API, but an image waits for
+every other listed image it is built on, so its shared layers are downloaded
+once and found locally by the later pull. "Built on" is read from the registry:
+A is a base of B when A's layer list is a prefix of B's. Images listed under
+``bases`` always go first, which also covers registries that cannot be queried.
+"""
+import http.client
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from cleanup.engine_api import EngineClient, EngineError
+
+DOCKER_HUB = "registry-1.docker.io"
+MANIFEST_TYPES = ", ".join([
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+])
+PROGRESS_INTERVAL = 0.25
+
+
+def split_reference(ref: str) -> Tuple[str, str]:
+    """Split ``name:tag`` / ``name@digest`` into (name, tag or digest); the tag defaults to latest."""
+    if "@" in ref:
+        name, _, digest = ref.partition("@")
+        return name, digest
+    if ref.rfind(":") > ref.rfind("/"):
+        name, _, tag = ref.rpartition(":")
+        return name, tag
+    return ref, "latest"
+
+
+class RegistryError(Exception):
+    """The registry could not be queried for an image's layers."""
+
+
+@dataclass(frozen=True)
+class ImageRef:
+    """A parsed image reference; `reference` is the tag or the ``sha256:`` digest."""
+    registry: str
+    repository: str
+    reference: str
+
+    @classmethod
+    def parse(cls, ref: str) -> "ImageRef":
+        name, reference = split_reference(ref)
+        first, _, rest = name.partition("/")
+        # the first component is a registry only if it looks like a host
+        if rest and ("." in first or ":" in first or first == "localhost"):
+            registry, repository = first, rest
+        else:
+            registry, repository = DOCKER_HUB, name
+        if registry == DOCKER_HUB and "/" not in repository:
+            repository = f"library/{repository}"
+        return cls(registry, repository, reference)
+
+
+def load_manifest(path: str) -> Tuple[List[str], List[str]]:
+    """Read a team image manifest; returns (images, bases) with bases also included in images."""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"images": data}
+    bases = [str(b) for b in data.get("bases") or []]
+    images = list(dict.fromkeys(bases + [str(i) for i in data.get("images") or []]))
+    return images, bases
+
+
+class RegistryClient:
+    """Reads image manifests over the Registry HTTP API v2 (anonymous bearer tokens)."""
+
+    def __init__(self, timeout: float = 15.0, platform: str = "linux/amd64"):
+        self.timeout = timeout
+        self.platform = platform
+        self._tokens: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _scheme(registry: str) -> str:
+        # like dockerd, a registry on the loopback interface is spoken to over plain HTTP
+        host = registry.rsplit(":", 1)[0] if registry.count(":") == 1 else registry
+        return "http" if host in ("localhost", "127.0.0.1", "[::1]") else "https"
+
+    def _token(self, challenge: str, ref: ImageRef) -> Optional[str]:
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        if not challenge.lower().startswith("bearer") or "realm" not in params:
+            return None
+        query = {k: v for k, v in params.items() if k in ("service", "scope")}
+        query.setdefault("scope", f"repository:{ref.repository}:pull")
+        url = f"{params['realm']}?{urllib.parse.urlencode(query)}"
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+                body = json.load(resp)
+        except (OSError, ValueError, http.client.HTTPException):
+            return None
+        return body.get("token") or body.get("access_token")
+
+    def _get(self, ref: ImageRef, reference: str) -> Dict[str, Any]:
+        url = f"{self._scheme(ref.registry)}://{ref.registry}/v2/{ref.repository}/manifests/{reference}"
+        key = (ref.registry, ref.repository)
+        for attempt in (1, 2):
+            headers = {"Accept": MANIFEST_TYPES}
+            with self._lock:
+                token = self._tokens.get(key)
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers),
+                                            timeout=self.timeout) as resp:
+                    return json.load(resp)
+            except urllib.error.HTTPError as e:
+                if e.code != 401 or attempt == 2:
+                    raise RegistryError(f"{url}: HTTP {e.code}") from e
+                token = self._token(e.headers.get("WWW-Authenticate", ""), ref)
+                if not token:
+                    raise RegistryError(f"{url}: authentication required") from e
+                with self._lock:
+                    self._tokens[key] = token
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                raise RegistryError(f"{url}: {e}") from e
+        raise RegistryError(f"{url}: authentication failed")
+
+    def layers(self, ref: str) -> List[str]:
+        """Return the layer digests of `ref` for this client's platform, base layer first."""
+        parsed = ImageRef.parse(ref)
+        manifest = self._get(parsed, parsed.reference)
+        if "manifests" in manifest:
+            # a multi-platform index: follow the entry for our platform
+            os_name, _, arch = self.platform.partition("/")
+            for entry in manifest["manifests"]:
+                p = entry.get("platform") or {}
+                if p.get("os") == os_name and p.get("architecture") == arch:
+                    manifest = self._get(parsed, entry["digest"])
+                    break
+            else:
+                raise RegistryError(f"{ref}: no {self.platform} image")
+        return [layer["digest"] for layer in manifest.get("layers") or []]
+
+
+def pull_order(images: Sequence[str], layers: Dict[str, List[str]], bases: Sequence[str] = ()) -> Dict[str, Set[str]]:
+    """Map every image to the images that must be pulled before it (no I/O).
+
+    An image waits for the listed images whose layers are a proper prefix of its own,
+    and every image not under `bases` waits for the `bases`.
+    """
+    deps: Dict[str, Set[str]] = {}
+    base_set = set(bases)
+    for image in images:
+        own = layers.get(image)
+        wait_for = set() if image in base_set else set(base_set)
+        if own:
+            for other in images:
+                theirs = layers.get(other)
+                if other != image and theirs and len(theirs) < len(own) and own[:len(theirs)] == theirs:
+                    wait_for.add(other)
+        deps[image] = wait_for
+    return deps
+
+
+def _emit(progress_cb, event: Dict[str, Any], event_type: str) -> None:
+    if not progress_cb:
+        return
+    try:
+        progress_cb(event, event_type)
+    except Exception:
+        # never let UI callback failures abort the pre-pull
+        pass
+
+
+def pull_image(client: EngineClient, ref: str, progress_cb=None, step_id: Optional[str] = None) -> StepResult:
+    """Pull one image through the Engine API, reporting byte progress across its layers."""
+    step_id = step_id or f"prepull:{ref}"
+    name, reference = split_reference(ref)
+    layers: Dict[str, Tuple[int, int]] = {}
+    reused = 0
+    last_emit = 0.0
+    started = time.monotonic()
+    try:
+        for msg in client.stream("POST", "/images/create", fromImage=name, tag=reference):
+            if msg.get("error"):
+                return StepResult.now(name=step_id, status="Failed", message=f"Pull failed: {ref}",
+                                      error=msg["error"], details={"image": ref})
+            layer, status = msg.get("id"), msg.get("status", "")
+            detail = msg.get("progressDetail") or {}
+            if layer and status == "Already exists":
+                reused += 1
+            elif layer and status == "Downloading" and detail.get("total"):
+                layers[layer] = (int(detail.get("current") or 0), int(detail["total"]))
+            elif layer and status in ("Download complete", "Pull complete") and layer in layers:
+                layers[layer] = (layers[layer][1], layers[layer][1])
+            now = time.monotonic()
+            if layers and now - last_emit >= PROGRESS_INTERVAL:
+                last_emit = now
+                _emit(progress_cb, {"step_id": step_id, "image": ref,
+                                    "current_bytes": sum(c for c, _ in layers.values()),
+                                    "total_bytes": sum(t for _, t in layers.values())}, "step-progress")
+    except EngineError as e:
+        return StepResult.now(name=step_id, status="Failed", message=f"Pull failed: {ref}", error=e,
+                              details={"image": ref})
+    downloaded = sum(t for _, t in layers.values())
+    return StepResult.now(name=step_id, status="Success",
+                          message=f"Pulled {ref} ({len(layers)} layers downloaded, {reused} reused)",
+                          details={"image": ref, "downloaded_bytes": downloaded, "layers_downloaded": len(layers),
+                                   "layers_reused": reused, "seconds": round(time.monotonic() - started, 2)})
+
+
+def prepull_images(images: Sequence[str], bases: Sequence[str] = (), max_concurrent: int = 3, dry_run: bool = True,
+                   client: Optional[EngineClient] = None, registry: Optional[RegistryClient] = None,
+                   progress_cb=None) -> List[StepResult]:
+    """Pull `images` concurrently, bases before the images built on them; one ``prepull:<ref>`` result each.
+
+    Args:
+        images: Image references to pull.
+        bases: Images to pull before all others regardless of what the registry reports.
+        max_concurrent: Upper bound on simultaneous pulls.
+        dry_run: Report the pull order only.
+        client: Engine API client (default: the local daemon).
+        registry: Registry client used to find shared layers (default: anonymous access).
+        progress_cb: Optional ``progress_cb(event, event_type)``.
+    """
+    images = list(dict.fromkeys(list(bases) + list(images)))
+    if not images:
+        return [StepResult.now(name="prepull", status="Skipped", message="No images in the manifest")]
+    registry = registry or RegistryClient()
+    layers: Dict[str, List[str]] = {}
+
+    def _layers(ref):
+        try:
+            return ref, registry.layers(ref)
+        except RegistryError:
+            return ref, None  # order falls back to the declared bases
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent)) as pool:
+        for ref, found in pool.map(_layers, images):
+            if found:
+                layers[ref] = found
+    deps = pull_order(images, layers, bases)
+
+    if dry_run:
+        return [StepResult.now(name=f"prepull:{ref}", status="Skipped",
+                               message=f"Dry-run: would pull {ref}" + (f" after {', '.join(sorted(deps[ref]))}"
+                                                                       if deps[ref] else ""),
+                               details={"image": ref, "after": sorted(deps[ref])}) for ref in images]
+
+    own_client = client is None
+    client = client or EngineClient()
+    results: Dict[str, StepResult] = {}
+    pending = list(images)
+    running: Dict[Any, str] = {}
+
+    def _run(ref):
+        step_id = f"prepull:{ref}"
+        _emit(progress_cb, {"step_id": step_id, "name": step_id, "image": ref}, "step-start")
+        try:
+            res = pull_image(client, ref, progress_cb, step_id)
+        except Exception as e:
+            # one bad pull must not abandon the rest of the manifest
+            res = StepResult.now(name=step_id, status="Failed", message=f"Pull failed: {ref}", error=e,
+                                 details={"image": ref})
+        _emit(progress_cb, {"step_id": step_id, "status": res.status}, "step-end")
+        return res
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrent)) as pool:
+            while pending or running:
+                # a failed base still unblocks its dependents; they just download its layers themselves
+                ready = [r for r in pending if deps[r] <= set(results)]
+                for ref in ready[:max(0, max_concurrent - len(running))]:
+                    pending.remove(ref)
+                    running[pool.submit(_run, ref)] = ref
+                if not running:
+                    break  # only reachable with a dependency cycle, which prefixes cannot form
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+    finally:
+        if own_client:
+            client.close()
+    return [results[ref] for ref in images if ref in results]
@@ -2,6 +2,8 @@
 
 This file is a Python placeholder for the Install orchestrator and returns StepResult objects.
 """
+import dataclasses
+import json
 import os
 import sys
 
@@ -11,6 +13,11 @@ if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
 from step_result import StepResult
+from status.host_facts import FactsError
+from install.convergence import DesiredState, converge, gather_state, plan
+from install.wsl.wslconfig_tuner import DEFAULT_WORKLOAD, WORKLOADS, tune_wslconfig
+from install.docker.daemon_config import DEFAULT_PROFILE, PROFILES, apply_profile
+from install.docker.image_prepull import load_manifest, prepull_images
 
 # Import UI library for consistent interface
 try:
@@ -33,6 +40,10 @@ except ImportError:
         input("Press Enter to continue...")
 
 
+# Desired install state lives under "installation" -> "desired_state" in the repository config file.
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(src_path), "wsl_docker_config.json")
+
+
 def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=None, progress_cb=None, interactive: bool = False) -> StepResult:
     if interactive:
         try:
@@ -65,6 +76,177 @@ def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=
         except Exception as e:
             return StepResult.now(name="install_orchestrator", status="Error", message=f"UI error: {str(e)}")
 
+    if dry_run:
+        return StepResult.now(name="install_orchestrator", status="Skipped", message="Dry-run: would converge host to the desired install state")
+    results = converge(_desired_state(), dry_run=False, progress_cb=progress_cb)
+    if not any(r.status in ("Failed", "Error") for r in results):
+        results += _prepull(progress_cb=progress_cb)
+    return _summarize(results, "install_orchestrator")
+
+
+def _desired_state(config_path: str = DEFAULT_CONFIG_PATH) -> DesiredState:
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return DesiredState.from_config(json.load(f))
+    except (OSError, ValueError):
+        return DesiredState()
+
+
+def _summarize(results, name: str) -> StepResult:
+    """Fold converge() step results into one StepResult for the menu."""
+    failed = [r for r in results if r.status in ("Failed", "Error")]
+    details = {"steps": [r.to_dict() for r in results]}
+    if failed:
+        return StepResult.now(name=name, status="Failed", message=f"{failed[0].name} failed: {failed[0].error or failed[0].message}",
+                              details=details)
+    if len(results) == 1 and results[0].name == "converge":
+        return StepResult.now(name=name, status="Success", message=results[0].message, details=details)
+    return StepResult.now(name=name, status="Success", message=f"Applied {len(results)} step(s)", details=details)
+
+
+def _show_plan_and_converge(name: str, desired: DesiredState) -> StepResult:
+    """Gather state, show only the steps still needed, confirm, then converge."""
+    import questionary  # type: ignore
+    
+    try:
+        state = gather_state()
+    except FactsError as e:
+        print(f"❌ Could not read host facts: {e}")
+        return _summarize([StepResult.now(name="plan", status="Failed", message="Could not read host facts", error=e)],
+                          name)
+    steps = plan(desired, state)
+    if not steps:
+        print("✅ Already in the desired state; nothing to do.")
+        return StepResult.now(name=name, status="Success", message="Already converged; nothing to do")
+    
+    print("Steps needed on this machine:")
+    for step in steps:
+        print(f"• {step.description} ({step.reason})")
+    print()
+    
+    confirm = questionary.confirm(f"Run {len(steps)} step(s)?").ask()
+    if not confirm:
+        return StepResult.now(name=name, status="Cancelled", message="Installation cancelled by user")
+    return _summarize(converge(desired, state=state, dry_run=False), name)
+
+
+def _configured_workload(config_path: str = DEFAULT_CONFIG_PATH) -> str:
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            workload = (json.load(f).get("wsl_config") or {}).get("workload_profile")
+    except (OSError, ValueError):
+        workload = None
+    return workload if workload in WORKLOADS else DEFAULT_WORKLOAD
+
+
+def _tune_wslconfig_interactive() -> StepResult:
+    """Pick a workload profile, show the .wslconfig diff, and write it on confirmation."""
+    import questionary  # type: ignore
+    
+    default = _configured_workload()
+    choices = [questionary.Choice(spec["label"], value=name) for name, spec in WORKLOADS.items()]
+    workload = questionary.select("Workload profile for WSL sizing:", choices=choices,
+                                  default=next(c for c in choices if c.value == default)).ask()
+    if workload is None:
+        return StepResult.now(name="tune_wslconfig", status="Cancelled", message="Installation cancelled by user")
+    
+    preview = tune_wslconfig(workload, dry_run=True)
+    if preview.status != "Skipped":
+        print(f"{'✅' if preview.status == 'Success' else '❌'} {preview.message}")
+        return preview
+    print(preview.details["diff"])
+    if not questionary.confirm(f"Write these settings to {preview.details['path']}?", default=True).ask():
+        return StepResult.now(name="tune_wslconfig", status="Skipped", message=".wslconfig left unchanged")
+    result = tune_wslconfig(workload, dry_run=False)
+    print(f"{'✅' if result.status == 'Success' else '❌'} {result.message}")
+    return result
+
+
+def _docker_config(config_path: str = DEFAULT_CONFIG_PATH) -> dict:
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("docker_config") or {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _apply_daemon_profile_interactive(profile: str, ask: bool = True) -> StepResult:
+    """Show what a daemon.json profile changes and apply it on confirmation."""
+    import questionary  # type: ignore
+    
+    docker_config = _docker_config()
+    overrides = {"dns": docker_config["dns"]} if docker_config.get("dns") else None
+    preview = apply_profile(profile, dry_run=True, overrides=overrides)
+    if preview.status != "Skipped":
+        print(f"{'✅' if preview.status == 'Success' else '❌'} {preview.message}")
+        return preview
+    print(f"Docker daemon settings ({profile}):")
+    for change in preview.details["changes"]:
+        print(f"• {change['setting']}: {change['old']!r} → {change['new']!r}")
+    if ask and not questionary.confirm(f"Update {preview.details['path']}?", default=True).ask():
+        return StepResult.now(name="daemon_config", status="Skipped", message="daemon.json left unchanged")
+    result = apply_profile(profile, dry_run=False, overrides=overrides)
+    print(f"{'✅' if result.status == 'Success' else '❌'} {result.message}")
+    return result
+
+
+def _installation_config(config_path: str = DEFAULT_CONFIG_PATH) -> dict:
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("installation") or {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _prepull(dry_run: bool = False, progress_cb=None, config_path: str = DEFAULT_CONFIG_PATH) -> list:
+    """Pull the images in the configured team manifest; nothing when none is configured."""
+    installation = _installation_config(config_path)
+    manifest = installation.get("image_manifest")
+    if not manifest:
+        return []
+    path = manifest if os.path.isabs(manifest) else os.path.join(os.path.dirname(config_path), manifest)
+    try:
+        images, bases = load_manifest(path)
+    except (OSError, ValueError) as e:
+        return [StepResult.now(name="prepull", status="Failed", message=f"Could not read image manifest {path}", error=e)]
+    return prepull_images(images, bases, max_concurrent=installation.get("prepull_concurrency") or 3,
+                          dry_run=dry_run, progress_cb=progress_cb)
+
+
+def _prepull_interactive() -> StepResult:
+    """Warm the image store from the team manifest, printing progress per image."""
+    import questionary  # type: ignore
+    
+    preview = _prepull(dry_run=True)
+    if not preview:
+        return StepResult.now(name="prepull", status="Skipped", message="No image manifest configured")
+    if preview[0].status == "Failed":
+        print(f"❌ {preview[0].message}")
+        return preview[0]
+    print(f"Team images to pre-pull ({len(preview)}):")
+    for r in preview:
+        print(f"• {r.message.replace('Dry-run: would pull ', '')}")
+    if not questionary.confirm("Pull them now?", default=True).ask():
+        return StepResult.now(name="prepull", status="Skipped", message="Image pre-pull skipped")
+    
+    def _print_step(event, event_type):
+        if event_type == "step-end":
+            print(f"  {'✅' if event.get('status') == 'Success' else '❌'} {event['step_id'].split(':', 1)[1]}")
+    
+    results = _prepull(progress_cb=_print_step)
+    failed = [r for r in results if r.status == "Failed"]
+    return StepResult.now(name="prepull", status="Failed" if failed else "Success",
+                          message=f"Pulled {len(results) - len(failed)}/{len(results)} image(s)",
+                          details={"results": [r.to_dict() for r in results]})
+
+
+def _with_follow_ups(result: StepResult, follow_ups: list) -> StepResult:
+    """Attach the results of the steps run after a converge to its result's details."""
+    details = dict(result.details or {})
+    details["follow_ups"] = [r.to_dict() for r in follow_ups]
+    return dataclasses.replace(result, details=details)
+
+
 def _handle_fresh_installation() -> StepResult:
     """Handle fresh installation with user confirmation."""
     try:
@@ -74,17 +256,26 @@ def _handle_fresh_installation() -> StepResult:
         render_header("Fresh Installation", icon="🚀", icon_color=get_icon_color("🚀"))
         print("This will install WSL2 and Docker Desktop with Microsoft's recommended defaults:")
         print("• WSL2 with Ubuntu 22.04 LTS")
-        print("• Docker Desktop with 50% RAM allocation")
-        print("• All available processors")
-        print("• Automatic memory reclaim enabled")
+        print("• WSL memory, processors and swap sized to this machine and your workload")
+        print("• Automatic memory reclaim and sparse virtual disks where they help")
         print()
         
         confirm = questionary.confirm("Do you want to proceed with fresh installation?").ask()
         if not confirm:
             return StepResult.now(name="fresh_installation", status="Cancelled", message="Fresh installation cancelled by user")
         
-        # TODO: Implement actual fresh installation logic here
-        return StepResult.now(name="fresh_installation", status="Success", message="MOCK: Fresh installation completed")
+        tuned = _tune_wslconfig_interactive()
+        if tuned.status == "Cancelled":
+            return StepResult.now(name="fresh_installation", status="Cancelled", message=tuned.message)
+        
+        # Only missing pieces are installed; installers come from the shared artifact cache when needed
+        result = _show_plan_and_converge("fresh_installation", _desired_state())
+        if result.status == "Success":
+            profile = _docker_config().get("daemon_profile") or DEFAULT_PROFILE
+            follow_ups = [_apply_daemon_profile_interactive(profile if profile in PROFILES else DEFAULT_PROFILE),
+                          _prepull_interactive()]
+            result = _with_follow_ups(result, follow_ups)
+        return result
         
     except Exception as e:
         return StepResult.now(name="fresh_installation", status="Error", message=f"Fresh installation failed: {str(e)}")
@@ -95,26 +286,60 @@ def _handle_system_reset() -> StepResult:
         # Render header with UI library for orange text
         render_header("System Reset", icon="🔄", icon_color=get_icon_color("🔄"))
         
-        # TODO: Implement actual system reset logic
-        print("Performing system reset...")
+        # Reset means returning to the configured desired state, including Docker settings that drifted
+        print("Checking this machine against the configured install state...")
         print()
+        result = _show_plan_and_converge("system_reset", _desired_state())
+        if result.status == "Success":
+            result = _with_follow_ups(result, [_prepull_interactive()])
         
-        # Show completion message
-        print("✅ MOCK: System reset completed")
+        print(f"{'✅' if result.status == 'Success' else '❌'} {result.message}")
         press_enter_to_continue()
         
-        return StepResult.now(name="system_reset", status="Success", message="MOCK: System reset completed")
+        return result
     except Exception as e:
         return StepResult.now(name="system_reset", status="Error", message=f"System reset failed: {str(e)}")
 
 def _handle_custom_installation() -> StepResult:
     """Handle custom installation options."""
-    # TODO: Implement custom installation logic  
-    return StepResult.now(name="custom_installation", status="Success", message="MOCK: Custom installation completed")
-
-    if dry_run:
-        return StepResult.now(name="install_orchestrator", status="Skipped", message="Dry-run: Install-Orchestrator placeholder")
-    return StepResult.now(name="install_orchestrator", status="Success", message="MOCK: Install-Orchestrator placeholder")
+    try:
+        import questionary  # type: ignore
+        
+        render_header("Custom Installation", icon="⚙️", icon_color=get_icon_color("⚙️"))
+        desired = _desired_state()
+        
+        distros = questionary.checkbox(
+            "WSL distros to have installed:",
+            choices=[questionary.Choice(d, checked=d in desired.distros)
+                     for d in dict.fromkeys(list(desired.distros) + ["Ubuntu-22.04", "Ubuntu-24.04", "Debian"])]
+        ).ask()
+        if distros is None:
+            return StepResult.now(name="custom_installation", status="Cancelled", message="Custom installation cancelled")
+        desired.distros = tuple(distros)
+        
+        docker = questionary.confirm("Install Docker Desktop?", default=desired.docker_installed).ask()
+        if docker is None:
+            return StepResult.now(name="custom_installation", status="Cancelled", message="Custom installation cancelled")
+        desired.docker_installed = docker
+        
+        profile = None
+        if docker:
+            configured = _docker_config().get("daemon_profile") or DEFAULT_PROFILE
+            profile = questionary.select(
+                "Docker daemon profile:",
+                choices=list(PROFILES) + ["Keep current daemon.json"],
+                default=configured if configured in PROFILES else DEFAULT_PROFILE,
+            ).ask()
+            if profile is None:
+                return StepResult.now(name="custom_installation", status="Cancelled", message="Custom installation cancelled")
+        
+        result = _show_plan_and_converge("custom_installation", desired)
+        if result.status == "Success" and profile in PROFILES:
+            result = _with_follow_ups(result, [_apply_daemon_profile_interactive(profile)])
+        return result
+        
+    except Exception as e:
+        return StepResult.now(name="custom_installation", status="Error", message=f"Custom installation failed: {str(e)}")
 
 
 if __name__ == '__main__':
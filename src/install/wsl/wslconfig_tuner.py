@@ -0,0 +1,223 @@
+"""Size the WSL2 VM to the host and the workload through ``%USERPROFILE%\\.wslconfig``.
+
+`recommend()` is a pure function of the host (RAM, logical processors, system
+disk type) and a workload profile from `WORKLOADS`; everything else here is I/O.
+The result is merged into an existing .wslconfig without touching unrelated
+keys, sections or comments, and the caller is shown a unified diff before
+anything is written. The previous file is kept as ``.wslconfig.bak``.
+"""
+import difflib
+import os
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from status.host_facts import FactsError, HostFacts, default_facts
+
+GIB = 1 << 30
+
+# Per-workload sizing. Fractions apply to host RAM / logical processors; the cap
+# bounds the VM on very large hosts, and `reserve_gb` is always left to Windows.
+WORKLOADS: Dict[str, Dict[str, object]] = {
+    "light_dev": {"label": "Light development", "mem_fraction": 0.25, "mem_cap_gb": 8, "reserve_gb": 4,
+                  "cpu_fraction": 0.5, "swap_fraction": 0.25, "reclaim": "gradual"},
+    "heavy_builds": {"label": "Heavy builds", "mem_fraction": 0.5, "mem_cap_gb": 32, "reserve_gb": 4,
+                     "cpu_fraction": 1.0, "swap_fraction": 0.5, "reclaim": "dropcache"},
+    "ml": {"label": "Machine learning", "mem_fraction": 0.75, "mem_cap_gb": 96, "reserve_gb": 6,
+           "cpu_fraction": 1.0, "swap_fraction": 0.25, "reclaim": "disabled"},
+}
+DEFAULT_WORKLOAD = "light_dev"
+
+
+@dataclass(frozen=True)
+class HostProfile:
+    """What the recommendation depends on."""
+    ram_bytes: int
+    cpu_count: int
+    disk_type: Optional[str] = None  # "SSD", "HDD" or None when unknown
+
+
+def _gb(value: float) -> str:
+    return f"{max(0, int(value))}GB"
+
+
+def recommend(host: HostProfile, workload: str = DEFAULT_WORKLOAD) -> Dict[str, Dict[str, str]]:
+    """Return .wslconfig settings as {section: {key: value}} for `host` and `workload`."""
+    try:
+        spec = WORKLOADS[workload]
+    except KeyError:
+        raise ValueError(f"Unknown workload profile {workload!r}; expected one of {', '.join(WORKLOADS)}")
+    ram_gb = host.ram_bytes / GIB
+    memory = min(ram_gb * spec["mem_fraction"], spec["mem_cap_gb"], ram_gb - spec["reserve_gb"])
+    memory = max(2, int(memory))
+    # leave one processor to Windows on small hosts with a full-CPU profile
+    cpus = round(host.cpu_count * spec["cpu_fraction"])
+    if host.cpu_count <= 4 and cpus >= host.cpu_count:
+        cpus = host.cpu_count - 1
+    cpus = max(1, min(cpus, host.cpu_count))
+    hdd = (host.disk_type or "").upper() == "HDD"
+    # swap on a spinning disk is slow enough that less of it is the better trade
+    swap = memory * spec["swap_fraction"] * (0.5 if hdd else 1)
+    return {
+        "wsl2": {
+            "memory": _gb(memory),
+            "processors": str(cpus),
+            "swap": _gb(max(1, round(swap))),
+        },
+        "experimental": {
+            "autoMemoryReclaim": str(spec["reclaim"]),
+            # sparse VHDs return freed blocks to the host; on HDDs they fragment badly
+            "sparseVhd": "false" if hdd else "true",
+        },
+    }
+
+
+def _section_of(line: str) -> Optional[str]:
+    stripped = line.strip()
+    if stripped.startswith("[") and stripped.endswith("]"):
+        return stripped[1:-1].strip().lower()
+    return None
+
+
+def _key_of(line: str) -> Optional[str]:
+    stripped = line.strip()
+    if not stripped or stripped[0] in "#;[" or "=" not in stripped:
+        return None
+    return stripped.split("=", 1)[0].strip().lower()
+
+
+def merge_wslconfig(text: str, settings: Dict[str, Dict[str, str]]) -> Tuple[str, List[str]]:
+    """Merge `settings` into .wslconfig text, keeping every other line as it is.
+
+    Returns:
+        (new_text, changed) where changed lists "section.key" entries that were added or modified.
+    """
+    wanted = {sec.lower(): {k.lower(): (k, v) for k, v in keys.items()} for sec, keys in settings.items()}
+    done: Dict[str, set] = {sec: set() for sec in wanted}
+    changed: List[str] = []
+    out: List[str] = []
+    section: Optional[str] = None
+    seen: set = set()
+
+    def _flush(sec: Optional[str]) -> None:
+        # append the keys this section is still missing, before any trailing blank lines
+        if sec not in wanted:
+            return
+        missing = [(k, v) for lk, (k, v) in wanted[sec].items() if lk not in done[sec]]
+        if not missing:
+            return
+        insert_at = len(out)
+        while insert_at > 0 and not out[insert_at - 1].strip():
+            insert_at -= 1
+        out[insert_at:insert_at] = [f"{k}={v}" for k, v in missing]
+        for lk, (k, _) in wanted[sec].items():
+            if lk not in done[sec]:
+                done[sec].add(lk)
+                changed.append(f"{sec}.{k}")
+
+    for line in text.splitlines():
+        new_section = _section_of(line)
+        if new_section is not None:
+            _flush(section)
+            section = new_section
+            seen.add(section)
+            out.append(line)
+            continue
+        key = _key_of(line)
+        if section in wanted and key in wanted[section]:
+            name, value = wanted[section][key]
+            done[section].add(key)
+            current = line.split("=", 1)[1].split("#", 1)[0].strip()
+            if current != value:
+                changed.append(f"{section}.{name}")
+                line = f"{line.split('=', 1)[0].rstrip()}={value}"
+        out.append(line)
+    _flush(section)
+    for sec, keys in wanted.items():
+        if sec in seen:
+            continue
+        if out and out[-1].strip():
+            out.append("")
+        out.append(f"[{sec}]")
+        for k, v in keys.values():
+            out.append(f"{k}={v}")
+            changed.append(f"{sec}.{k}")
+    return "\n".join(out) + "\n", changed
+
+
+def default_wslconfig_path() -> str:
+    home = os.environ.get("USERPROFILE") or os.path.expanduser("~")
+    return os.path.join(home, ".wslconfig")
+
+
+def host_profile(facts: Optional[HostFacts] = None) -> HostProfile:
+    """Build a HostProfile from the shared host facts (one batched query)."""
+    got = (facts or default_facts()).get("ram", "cpu_count", "system_disk_type")
+    ram = (got["ram"] or {}).get("total_bytes") or 8 * GIB
+    disk = got["system_disk_type"] if got["system_disk_type"] in ("SSD", "HDD") else None
+    return HostProfile(ram_bytes=int(ram), cpu_count=int(got["cpu_count"] or os.cpu_count() or 2), disk_type=disk)
+
+
+def plan_wslconfig(workload: str = DEFAULT_WORKLOAD, host: Optional[HostProfile] = None,
+                   path: Optional[str] = None, facts: Optional[HostFacts] = None) -> Tuple[str, str, List[str], str]:
+    """Compute the merged file without writing it.
+
+    Returns:
+        (path, new_text, changed_keys, unified_diff)
+    """
+    path = path or default_wslconfig_path()
+    host = host or host_profile(facts)
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            old = f.read()
+    except OSError:
+        old = ""
+    new, changed = merge_wslconfig(old, recommend(host, workload))
+    diff = "".join(difflib.unified_diff(old.splitlines(keepends=True), new.splitlines(keepends=True),
+                                        fromfile=f"{path} (current)", tofile=f"{path} (tuned)"))
+    return path, new, changed, diff
+
+
+def write_wslconfig(path: str, text: str) -> Optional[str]:
+    """Write atomically, keeping the previous file as ``<path>.bak``; returns the backup path."""
+    backup = None
+    if os.path.exists(path):
+        backup = f"{path}.bak"
+        with open(path, "rb") as src, open(backup, "wb") as dst:
+            dst.write(src.read())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return backup
+
+
+def tune_wslconfig(workload: str = DEFAULT_WORKLOAD, dry_run: bool = True, host: Optional[HostProfile] = None,
+                   path: Optional[str] = None, facts: Optional[HostFacts] = None) -> StepResult:
+    """Plan and (outside dry-run) write the tuned .wslconfig; the diff is in `details`."""
+    try:
+        path, new, changed, diff = plan_wslconfig(workload, host, path, facts)
+    except FactsError as e:
+        return StepResult.now(name="tune_wslconfig", status="Failed", message="Could not read host facts", error=e)
+    except ValueError as e:
+        return StepResult.now(name="tune_wslconfig", status="Failed", message=str(e), error=e)
+    details = {"path": path, "workload": workload, "changed": changed, "diff": diff}
+    if not changed:
+        return StepResult.now(name="tune_wslconfig", status="Success", message=".wslconfig already tuned",
+                              details=details)
+    if dry_run:
+        return StepResult.now(name="tune_wslconfig", status="Skipped",
+                              message=f"Dry-run: would update {', '.join(changed)}", details=details)
+    try:
+        details["backup"] = write_wslconfig(path, new)
+    except OSError as e:
+        return StepResult.now(name="tune_wslconfig", status="Failed", message="Could not write .wslconfig",
+                              error=e, details=details)
+    return StepResult.now(name="tune_wslconfig", status="Success", message=f"Updated {', '.join(changed)}",
+                          details=details)
@@ -0,0 +1,166 @@
+"""Follow a running process's log files (or pipes) while it runs.
+
+The elevated helper can only redirect output to files, and reading them back after
+exit makes long uninstalls look frozen and loads big logs into memory. `LogFollower`
+tails the files from a background thread instead:
+
+* every complete line is forwarded as a ``step-progress`` event to `progress_cb`;
+* only the last `tail_lines` lines per stream are kept in memory (ring buffers);
+* with `log_path`, every line is appended to a JSON-lines structured log, so the
+  full output is kept on disk rather than in memory.
+
+The encoding is taken from a BOM when there is one (Windows PowerShell writes
+UTF-16 when redirecting) and UTF-8 otherwise.
+"""
+import codecs
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, IO, List, Optional
+
+
+class _Source:
+    """Incremental reader for one stream; keeps its file offset and any partial line."""
+
+    def __init__(self, stream: str, path: Optional[str] = None, pipe: Optional[IO[bytes]] = None):
+        self.stream = stream
+        self.path = path
+        self.pipe = pipe
+        self.offset = 0
+        self.partial = ""
+        self.decoder = None
+        self.eof = False
+
+    def _decode(self, data: bytes, final: bool) -> str:
+        if self.decoder is None:
+            if not data and not final:
+                return ""
+            if data.startswith(codecs.BOM_UTF16_LE) or data.startswith(codecs.BOM_UTF16_BE):
+                self.decoder = codecs.getincrementaldecoder("utf-16")(errors="replace")
+            else:
+                self.decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        return self.decoder.decode(data, final)
+
+    def read_lines(self, final: bool = False) -> List[str]:
+        data = b""
+        if self.pipe is not None:
+            if not final:
+                # blocks until data arrives; pipes are read by their own thread
+                data = self.pipe.read1(65536) if hasattr(self.pipe, "read1") else self.pipe.read(65536)
+                data = data or b""
+                self.eof = not data
+        elif self.path:
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read(1 << 20)
+            except OSError:
+                data = b""  # not created yet
+            self.offset += len(data)
+        text = self.partial + self._decode(data, final)
+        lines = text.split("\n")
+        self.partial = "" if final else lines.pop()
+        if final and lines and lines[-1] == "":
+            lines.pop()
+        return [line.rstrip("\r") for line in lines]
+
+
+class LogFollower:
+    """Tail stdout/stderr sources in a background thread, forwarding lines as they appear."""
+
+    def __init__(self, sources: Dict[str, Any], step_id: str = "run_elevated", progress_cb=None,
+                 tail_lines: int = 200, log_path: Optional[str] = None, poll_interval: float = 0.2):
+        """
+        Args:
+            sources: stream name -> file path (str) or binary pipe to follow.
+            step_id: Step id attached to every event and log record.
+            progress_cb: Optional ``progress_cb(event, event_type)``.
+            tail_lines: Lines kept in memory per stream.
+            log_path: JSON-lines file receiving every line.
+            poll_interval: Seconds between polls of file sources.
+        """
+        self.step_id = step_id
+        self.progress_cb = progress_cb
+        self.log_path = log_path
+        self.poll_interval = poll_interval
+        self._sources = [_Source(name, path=src) if isinstance(src, str) else _Source(name, pipe=src)
+                         for name, src in sources.items()]
+        self._tails: Dict[str, Deque[str]] = {name: deque(maxlen=tail_lines) for name in sources}
+        self.line_counts: Dict[str, int] = {name: 0 for name in sources}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._log: Optional[IO[str]] = None
+
+    def start(self) -> "LogFollower":
+        if self.log_path:
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        files = [s for s in self._sources if s.pipe is None]
+        if files:
+            self._threads.append(threading.Thread(target=self._poll_files, args=(files,), daemon=True))
+        for source in self._sources:
+            if source.pipe is not None:
+                self._threads.append(threading.Thread(target=self._read_pipe, args=(source,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop following after a final drain (call once the process has exited)."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()  # pipe readers finish at EOF
+        for source in self._sources:
+            self._dispatch(source, source.read_lines(final=True))
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self) -> "LogFollower":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def tail(self, stream: str) -> List[str]:
+        return list(self._tails[stream])
+
+    def _poll_files(self, sources: List[_Source]) -> None:
+        while not self._stop.is_set():
+            for source in sources:
+                self._dispatch(source, source.read_lines())
+            self._stop.wait(self.poll_interval)
+
+    def _read_pipe(self, source: _Source) -> None:
+        while not source.eof:
+            self._dispatch(source, source.read_lines())
+
+    def _dispatch(self, source: _Source, lines: List[str]) -> None:
+        with self._lock:
+            self._dispatch_locked(source, lines)
+
+    def _dispatch_locked(self, source: _Source, lines: List[str]) -> None:
+        for line in lines:
+            self._tails[source.stream].append(line)
+            self.line_counts[source.stream] += 1
+            event = {"step_id": self.step_id, "stream": source.stream, "line": line,
+                     "line_no": self.line_counts[source.stream]}
+            if self._log:
+                self._log.write(json.dumps(dict(event, ts=time.time())) + "\n")
+            if self.progress_cb:
+                try:
+                    self.progress_cb(event, "step-progress")
+                except Exception:
+                    # never let UI callback failures stop the follower
+                    pass
+        if lines and self._log:
+            self._log.flush()
+
+    def summary(self) -> Dict[str, Any]:
+        """Tails and counts for StepResult details."""
+        out: Dict[str, Any] = {f"{name}_tail": self.tail(name) for name in self._tails}
+        out["line_counts"] = dict(self.line_counts)
+        if self.log_path:
+            out["log_path"] = self.log_path
+        return out
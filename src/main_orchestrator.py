@@ -33,6 +33,7 @@ class MainOrchestrator:
                     "🔄 Uninstall", 
                     "🔍 Check Status",
                     "💾 Backup",
+                    "🧹 Cleanup",
                     "❌ Exit"
                 ]
 
@@ -57,6 +58,8 @@ class MainOrchestrator:
                     result = self._handle_status()
                 elif "Backup" in choice:
                     result = self._handle_backup()
+                elif "Cleanup" in choice:
+                    result = self._handle_cleanup()
                 else:
                     continue
 
@@ -120,6 +123,18 @@ class MainOrchestrator:
             return StepResult.now(name="backup_delegate", status="Error", 
                                 message=f"Backup operation failed: {str(e)}")
 
+    def _handle_cleanup(self) -> StepResult:
+        """Delegate to cleanup orchestrator."""
+        try:
+            from cleanup.cleanup_orchestrator import main as cleanup_main
+            return cleanup_main(interactive=True)
+        except ImportError as e:
+            return StepResult.now(name="cleanup_delegate", status="Error", 
+                                message=f"Cleanup orchestrator not available: {str(e)}")
+        except Exception as e:
+            return StepResult.now(name="cleanup_delegate", status="Error", 
+                                message=f"Cleanup operation failed: {str(e)}")
+
 
 def main(interactive: bool = True) -> StepResult:
     """Main entry point for the main orchestrator.
@@ -0,0 +1,290 @@
+"""Persistent PowerShell worker processes with a framed command protocol.
+
+Starting pwsh costs several hundred milliseconds before any work is done, so steps
+that run PowerShell send commands to a long-lived worker instead of spawning one
+process per script.
+
+Protocol (UTF-8, one message per line):
+
+* client -> worker (stdin): a JSON object per line::
+
+      {"id": 1, "op": "run", "command": "...", "script": null, "args": [], "cwd": null}
+      {"id": 2, "op": "exit"}
+
+* worker -> client (stdout): frames are lines starting with the record separator
+  ``\\x1e`` followed by JSON::
+
+      {"type": "ready", "pid": 1234}
+      {"id": 1, "type": "output", "stream": "stdout" | "stderr", "line": "..."}
+      {"id": 1, "type": "result", "exit_code": 0, "error": null}
+
+  Lines without the marker (a native program writing straight to the console) are
+  attributed to the running command's stdout, so stray output cannot break framing.
+
+The reference worker is ``tools/elevate/ps_worker_host.ps1``; any program speaking
+the protocol works, which is how the tests run on Linux with a Python stand-in.
+"""
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from step_result import StepResult
+
+FRAME_MARK = "\x1e"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKER_HOST = os.path.join(REPO_ROOT, "tools", "elevate", "ps_worker_host.ps1")
+
+
+class WorkerError(Exception):
+    """The worker died, did not start, or timed out."""
+
+
+@dataclass
+class WorkerResult:
+    """Structured result of one command."""
+    exit_code: int
+    stdout: List[str] = field(default_factory=list)
+    stderr: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 and not self.error
+
+    def to_step_result(self, name: str) -> StepResult:
+        details = {"exit_code": self.exit_code, "elapsed": round(self.elapsed, 3),
+                   "stdout_tail": self.stdout[-20:], "stderr_tail": self.stderr[-20:]}
+        if self.ok:
+            return StepResult.now(name=name, status="Success", message=f"exit {self.exit_code}", details=details)
+        return StepResult.now(name=name, status="Failed", message=f"exit {self.exit_code}",
+                              error=self.error or "\n".join(self.stderr[-5:]) or None, details=details)
+
+
+def default_worker_argv() -> List[str]:
+    import shutil
+    exe = shutil.which("pwsh") or shutil.which("powershell.exe") or "pwsh"
+    return [exe, "-NoLogo", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-File", WORKER_HOST]
+
+
+class PsWorker:
+    """One worker process; runs one command at a time."""
+
+    def __init__(self, argv: Optional[List[str]] = None, start_timeout: float = 30.0, popen_kwargs=None):
+        self.argv = argv or default_worker_argv()
+        self.start_timeout = start_timeout
+        self.popen_kwargs = popen_kwargs or {}
+        self.uses = 0
+        self.pid: Optional[int] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._frames: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def start(self) -> "PsWorker":
+        self._proc = subprocess.Popen(self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT, text=True, encoding="utf-8",
+                                      errors="replace", bufsize=1, **self.popen_kwargs)
+        threading.Thread(target=self._read_loop, name="ps-worker-reader", daemon=True).start()
+        frame = self._next_frame(self.start_timeout)
+        if frame.get("type") != "ready":
+            self.kill()
+            raise WorkerError(f"worker did not report ready: {frame}")
+        self.pid = frame.get("pid", self._proc.pid)
+        return self
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _read_loop(self) -> None:
+        for raw in self._proc.stdout:
+            line = raw.rstrip("\r\n")
+            if line.startswith(FRAME_MARK):
+                try:
+                    self._frames.put(json.loads(line[1:]))
+                    continue
+                except ValueError:
+                    line = line[1:]
+            self._frames.put({"type": "output", "stream": "stdout", "line": line, "stray": True})
+        self._frames.put(None)  # EOF: the worker exited
+
+    def _next_frame(self, timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            frame = self._frames.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError("timed out waiting for the worker")
+        if frame is None:
+            raise WorkerError(f"worker exited (code {self._proc.poll()})")
+        return frame
+
+    def run(self, command: Optional[str] = None, script: Optional[str] = None, args: Optional[List[str]] = None,
+            cwd: Optional[str] = None, on_output: Optional[Callable[[str, str], None]] = None,
+            timeout: Optional[float] = None) -> WorkerResult:
+        """Run an inline command or a script file and wait for its result.
+
+        Args:
+            command: PowerShell source to run.
+            script: Path of a script to run instead of `command`.
+            args: Arguments for `script`.
+            cwd: Working directory for this command only.
+            on_output: Called as ``on_output(stream, line)`` for every line while the command runs.
+            timeout: Seconds to wait; on timeout the worker is killed (it may be mid-command).
+
+        Raises:
+            WorkerError: The worker is dead, died during the command, or timed out.
+        """
+        if (command is None) == (script is None):
+            raise ValueError("pass exactly one of command or script")
+        with self._lock:
+            if not self.alive:
+                raise WorkerError("worker is not running")
+            self._next_id += 1
+            req_id = self._next_id
+            self.uses += 1
+            request = {"id": req_id, "op": "run", "command": command, "script": script,
+                       "args": list(args or []), "cwd": cwd}
+            started = time.monotonic()
+            try:
+                self._proc.stdin.write(json.dumps(request) + "\n")
+                self._proc.stdin.flush()
+            except OSError as e:
+                raise WorkerError(f"worker stdin closed: {e}")
+            result = WorkerResult(exit_code=-1)
+            deadline = None if timeout is None else started + timeout
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    frame = self._next_frame(remaining)
+                except WorkerError:
+                    self.kill()
+                    raise
+                if frame.get("id") not in (req_id, None):
+                    continue  # late frame of an earlier, abandoned command
+                if frame.get("type") == "output":
+                    stream = "stderr" if frame.get("stream") == "stderr" else "stdout"
+                    (result.stderr if stream == "stderr" else result.stdout).append(frame.get("line", ""))
+                    if on_output:
+                        try:
+                            on_output(stream, frame.get("line", ""))
+                        except Exception:
+                            # never let output callback failures break the protocol stream
+                            pass
+                elif frame.get("type") == "result":
+                    result.exit_code = int(frame.get("exit_code", 1))
+                    result.error = frame.get("error")
+                    result.elapsed = time.monotonic() - started
+                    return result
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Ask the worker to exit, killing it if it does not."""
+        if not self._proc:
+            return
+        if self.alive:
+            try:
+                self._proc.stdin.write(json.dumps({"id": 0, "op": "exit"}) + "\n")
+                self._proc.stdin.flush()
+                self._proc.wait(timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+        self._close_pipes()
+
+    def kill(self) -> None:
+        if self._proc and self._proc.poll() is None:
+            self._proc.kill()
+            self._proc.wait()
+        self._close_pipes()
+
+    def _close_pipes(self) -> None:
+        for pipe in (self._proc.stdin, self._proc.stdout):
+            try:
+                pipe.close()
+            except Exception:
+                pass
+
+
+class WorkerPool:
+    """A small pool of warm workers; dead workers are replaced, busy ones recycled after `max_uses`."""
+
+    def __init__(self, size: int = 1, argv: Optional[List[str]] = None, max_uses: Optional[int] = 200,
+                 factory: Optional[Callable[[], PsWorker]] = None):
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self._factory = factory or (lambda: PsWorker(argv))
+        self._idle: "queue.LifoQueue[PsWorker]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.started = 0
+        self._closed = False
+
+    def _checkout(self) -> PsWorker:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    worker = self._factory().start()
+                    self.started += 1
+                    return worker
+                if worker.alive:
+                    return worker
+                worker.kill()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, worker: PsWorker) -> None:
+        try:
+            if self._closed or not worker.alive or (self.max_uses and worker.uses >= self.max_uses):
+                worker.close()
+            else:
+                self._idle.put(worker)
+        finally:
+            self._slots.release()
+
+    def run(self, *args, retry_on_crash: bool = True, **kwargs) -> WorkerResult:
+        """Run on a warm worker; if the worker dies before answering, retry once on a fresh one."""
+        for attempt in (0, 1):
+            worker = self._checkout()
+            try:
+                return worker.run(*args, **kwargs)
+            except WorkerError:
+                if attempt or not retry_on_crash or kwargs.get("timeout") is not None:
+                    raise
+            finally:
+                self._checkin(worker)
+        raise WorkerError("unreachable")
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_shared: Optional[WorkerPool] = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool() -> WorkerPool:
+    """Process-wide pool of PowerShell workers, closed at interpreter exit."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            import atexit
+            _shared = WorkerPool(size=2)
+            atexit.register(_shared.close)
+        return _shared
@@ -0,0 +1,188 @@
+"""Host facts gathered in a single batched PowerShell invocation.
+
+Process creation (pwsh start-up in particular) is the largest fixed cost of every
+check, so instead of one spawn per question the facts that are missing or stale
+are collected together by one script that prints a single JSON object. Each fact
+has its own TTL: slow-moving facts (RAM, CPU count, installed versions) are reused
+for a long time, volatile ones (service state, free disk) only briefly.
+
+A process-wide `HostFacts` instance (`default_facts()`) is shared by the install,
+status and uninstall orchestrators, so a menu session pays for the spawn once.
+Tests pass a stand-in ScriptRunner instead of running PowerShell.
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+# A script runner takes the script text and the requested fact names and returns its stdout.
+ScriptRunner = Callable[[str, List[str]], str]
+
+# Seconds each fact stays fresh.
+FACT_TTLS: Dict[str, float] = {
+    "windows_features": 3600,
+    "wsl_version": 3600,
+    "wsl_default_version": 600,
+    "wsl_distros": 60,
+    "docker_version": 600,
+    "docker_service": 10,
+    "free_disk": 30,
+    "system_disk_type": 86400,
+    "ram": 3600,
+    "cpu_count": 86400,
+}
+
+FACTS_SCRIPT = r"""
+$ErrorActionPreference = 'Stop'
+$env:WSL_UTF8 = '1'
+$out = @{}
+function Fact($name, [scriptblock]$body) {
+    if ($Facts -notcontains $name) { return }
+    try { $out[$name] = & $body } catch { $out[$name] = $null }
+}
+Fact 'windows_features' {
+    $r = @{}
+    foreach ($f in 'Microsoft-Windows-Subsystem-Linux', 'VirtualMachinePlatform') {
+        $r[$f] = ((Get-WindowsOptionalFeature -Online -FeatureName $f).State -eq 'Enabled')
+    }
+    $r
+}
+Fact 'wsl_version' {
+    $line = (& wsl.exe --version 2>$null | Select-Object -First 1)
+    if ($LASTEXITCODE -ne 0 -or -not $line) { $null } else { ($line -replace '[^0-9.]', '') }
+}
+$lxss = 'HKCU:\Software\Microsoft\Windows\CurrentVersion\Lxss'
+Fact 'wsl_default_version' { [int](Get-ItemProperty $lxss -ErrorAction Stop).DefaultVersion }
+Fact 'wsl_distros' {
+    # leading comma keeps a 0- or 1-element array from being unrolled on return
+    ,@(Get-ChildItem $lxss -ErrorAction SilentlyContinue | ForEach-Object { (Get-ItemProperty $_.PSPath).DistributionName })
+}
+Fact 'docker_version' {
+    (Get-ItemProperty 'HKLM:\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall\Docker Desktop' -ErrorAction Stop).DisplayVersion
+}
+Fact 'docker_service' { [string](Get-Service com.docker.service -ErrorAction Stop).Status }
+Fact 'free_disk' {
+    $d = Get-PSDrive ($env:SystemDrive.TrimEnd(':'))
+    @{ drive = $env:SystemDrive; free_bytes = [int64]$d.Free; total_bytes = [int64]($d.Free + $d.Used) }
+}
+Fact 'system_disk_type' {
+    $n = (Get-Partition -DriveLetter ($env:SystemDrive.TrimEnd(':'))).DiskNumber
+    [string](Get-PhysicalDisk | Where-Object DeviceId -eq "$n").MediaType
+}
+Fact 'ram' {
+    $os = Get-CimInstance Win32_OperatingSystem
+    @{ total_bytes = [int64]$os.TotalVisibleMemorySize * 1024; free_bytes = [int64]$os.FreePhysicalMemory * 1024 }
+}
+Fact 'cpu_count' { [Environment]::ProcessorCount }
+$out | ConvertTo-Json -Compress -Depth 4
+"""
+
+
+class FactsError(Exception):
+    """The facts script could not be run or did not return JSON."""
+
+
+def run_powershell(script: str, facts: List[str], timeout: float = 60.0) -> str:
+    """Default ScriptRunner: runs the script on a warm worker from the shared PowerShell pool."""
+    from ps_worker import WorkerError, shared_pool
+    if not (shutil.which("pwsh") or shutil.which("powershell.exe") or shutil.which("powershell")):
+        raise FactsError("PowerShell not found")
+    prelude = "$Facts = @(" + ", ".join(f"'{f}'" for f in facts) + ")\n"
+    try:
+        result = shared_pool().run(command=prelude + script, timeout=timeout)
+    except WorkerError as e:
+        raise FactsError(f"facts script failed: {e}") from e
+    if not result.ok:
+        raise FactsError(f"facts script exited {result.exit_code}: {result.error or ' '.join(result.stderr)}")
+    return "\n".join(result.stdout)
+
+
+class HostFacts:
+    """TTL cache of host facts; every refresh of stale facts is one script invocation."""
+
+    def __init__(self, runner: Optional[ScriptRunner] = None, ttls: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.runner = runner or run_powershell
+        self.ttls = dict(FACT_TTLS, **(ttls or {}))
+        self.clock = clock
+        self.invocations = 0
+        self._values: Dict[str, Any] = {}
+        self._stamps: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _stale(self, name: str, now: float) -> bool:
+        stamp = self._stamps.get(name)
+        return stamp is None or now - stamp >= self.ttls.get(name, 0)
+
+    def get(self, *names: str) -> Dict[str, Any]:
+        """Return the requested facts (all known facts when none are named), refreshing stale ones together."""
+        wanted = list(names or self.ttls)
+        unknown = [n for n in wanted if n not in self.ttls]
+        if unknown:
+            raise KeyError(f"Unknown host fact(s): {', '.join(unknown)}")
+        with self._lock:
+            stale = [n for n in wanted if self._stale(n, self.clock())]
+            if stale:
+                self._fetch(stale)
+            return {n: self._values.get(n) for n in wanted}
+
+    def fact(self, name: str) -> Any:
+        return self.get(name)[name]
+
+    def invalidate(self, *names: str) -> None:
+        """Forget facts (all when none are named), e.g. after a step changed the host."""
+        with self._lock:
+            for n in (names or list(self._stamps)):
+                self._stamps.pop(n, None)
+
+    def _fetch(self, names: List[str]) -> None:
+        self.invocations += 1
+        raw = self.runner(FACTS_SCRIPT, names)
+        try:
+            data = json.loads(raw) if raw.strip() else {}
+        except ValueError as e:
+            raise FactsError(f"facts script returned invalid JSON: {raw[:200]!r}") from e
+        now = self.clock()
+        for n in names:
+            self._values[n] = data.get(n)
+            self._stamps[n] = now
+
+
+_default: Optional[HostFacts] = None
+_default_lock = threading.Lock()
+
+
+def default_facts() -> HostFacts:
+    """The process-wide HostFacts shared by all orchestrators."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = HostFacts()
+        return _default
+
+
+def describe(facts: Dict[str, Any]) -> Iterable[str]:
+    """Human-readable lines for a facts dict (used by status reports)."""
+    gib = 1 << 30
+    for name, value in facts.items():
+        if value is None:
+            text = "unknown"
+        elif name in ("free_disk", "ram") and isinstance(value, dict):
+            text = f"{value.get('free_bytes', 0) / gib:.1f} GiB free of {value.get('total_bytes', 0) / gib:.1f} GiB"
+            if value.get("drive"):
+                text = f"{value['drive']} {text}"
+        elif isinstance(value, dict):
+            text = ", ".join(f"{k}={'on' if v is True else 'off' if v is False else v}" for k, v in value.items())
+        elif isinstance(value, list):
+            text = ", ".join(map(str, value)) or "none"
+        else:
+            text = str(value)
+        yield f"{name.replace('_', ' ')}: {text}"
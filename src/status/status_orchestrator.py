@@ -11,14 +11,19 @@ if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
 from step_result import StepResult
+from status.host_facts import FactsError, HostFacts, default_facts, describe
 from ui.ui_library import render_header, render_status_line, get_status_color, get_icon_color, press_enter_to_continue, render_selection_menu
 
 # Status functions - consolidated into orchestrator
-def get_system_status(dry_run: bool = False):
-    """Get system status - consolidated from get_system_status.py."""
+def get_system_status(dry_run: bool = False, facts: HostFacts = None):
+    """Get system status from the shared host facts (one batched query, cached per fact)."""
     if dry_run:
         return StepResult.now(name="get_system_status", status="Skipped", message="Dry-run: system status")
-    return StepResult.now(name="get_system_status", status="Success", message="MOCK: System status OK")
+    try:
+        got = (facts or default_facts()).get("cpu_count", "ram", "free_disk")
+    except FactsError as e:
+        return StepResult.now(name="get_system_status", status="Error", message="Could not gather host facts", error=e)
+    return StepResult.now(name="get_system_status", status="Success", message="; ".join(describe(got)), details=got)
 
 def get_docker_status():
     """Get docker status - wrapper for the existing function."""
@@ -181,6 +186,11 @@ def _handle_detailed_report() -> StepResult:
         render_header("Detailed System Report", icon="📊", icon_color=get_icon_color("📊"))
         print("Generating comprehensive system report...")
         print()
+        try:
+            # one batched query up front; every section below reads from the cache
+            default_facts().get()
+        except FactsError:
+            pass
         
         # Get all detailed information
         print("\n🐧 WSL DETAILS:")
@@ -207,6 +217,14 @@ def _handle_detailed_report() -> StepResult:
         if system_result.error:
             print(f"Error: {system_result.error}")
         
+        print("\n🖥️ HOST FACTS:")
+        print("-" * 20)
+        try:
+            for line in describe(default_facts().get()):
+                print(line)
+        except FactsError as e:
+            print(f"Error: {e}")
+        
         print("\n" + "=" * 50)
         print("📊 Report generation completed")
         
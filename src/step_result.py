@@ -9,6 +9,7 @@ class StepResult:
     message: str
     error: Optional[str] = None
     timestamp: float = 0.0
+    details: Optional[Dict[str, Any]] = None
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -17,9 +18,10 @@ class StepResult:
             "message": self.message,
             "error": self.error,
             "timestamp": self.timestamp,
+            "details": self.details,
         }
 
     @classmethod
-    def now(cls, name: str, status: str, message: str, error: Optional[Any] = None):
+    def now(cls, name: str, status: str, message: str, error: Optional[Any] = None, details: Optional[Dict[str, Any]] = None):
         ts = time.time()
-        return cls(name=name, status=status, message=message, error=None if error is None else str(error), timestamp=ts)
+        return cls(name=name, status=status, message=message, error=None if error is None else str(error), timestamp=ts, details=details)
@@ -1,13 +1,74 @@
-"""Simple StepRunner to invoke steps and return StepResult objects."""
+"""Simple StepRunner to invoke steps and return StepResult objects.
+
+A StepRunner honours a cooperative CancellationToken: once the token is
+cancelled, steps that have not started yet return a Cancelled result instead of
+running. Runners pick up the token of the flow they run in (see `use_token`),
+so orchestrators need no extra argument to become cancellable.
+"""
 from step_result import StepResult
+import contextlib
+import contextvars
+import threading
 import time
-from typing import Callable, Any
+from typing import Callable, Any, Iterator, Optional
+
+
+class StepCancelled(Exception):
+    """Raised by `CancellationToken.raise_if_cancelled` inside a long-running step."""
+
+
+class CancellationToken(threading.Event):
+    """Cooperative cancellation flag.
+
+    It is a threading.Event, so it can be passed wherever a ``cancel`` event is
+    accepted (backup pipeline, pre-scan, leftover sweeper).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.reason = None
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        self.reason = reason
+        self.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_set():
+            raise StepCancelled(self.reason or "Cancelled")
+
+
+_current_token: contextvars.ContextVar = contextvars.ContextVar("cancellation_token", default=None)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """The token of the flow running on this thread, if any."""
+    return _current_token.get()
+
+
+@contextlib.contextmanager
+def use_token(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    """Make `token` the current token for StepRunners created inside the block."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
 
 class StepRunner:
-    def __init__(self, dry_run: bool = True):
+    def __init__(self, dry_run: bool = True, token: Optional[CancellationToken] = None):
         self.dry_run = dry_run
+        self.token = token if token is not None else current_token()
 
     def invoke(self, name: str, func: Callable[..., Any] = None, *args, yes_required: bool = False, **kwargs) -> StepResult:
+        if self.token is not None and self.token.cancelled:
+            return StepResult.now(name=name, status="Cancelled", message=f"Cancelled before {name}",
+                                  error=self.token.reason)
+
         if self.dry_run:
             return StepResult.now(name=name, status="Skipped", message=f"Dry-run: would invoke {name}")
 
@@ -19,5 +80,7 @@ class StepRunner:
                 res = func(*args, **kwargs)
                 return StepResult.now(name=name, status="Success", message=str(res))
             return StepResult.now(name=name, status="Success", message=f"No-op {name}")
+        except StepCancelled as e:
+            return StepResult.now(name=name, status="Cancelled", message=f"{name} stopped on cancellation", error=e)
         except Exception as e:
             return StepResult.now(name=name, status="Failed", message="Exception during step", error=e)
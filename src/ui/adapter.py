@@ -1,37 +1,139 @@
 """Non-invasive UI adapter that maps flows to orchestrator entrypoints.
 
 This module does not change orchestrators; it only imports and calls them.
+Each flow's entrypoint is resolved once by the EntrypointRegistry: the module
+is imported, `main` (or `run`) is looked up, and the keyword arguments it
+accepts are read from its signature, so a call never has to be retried with
+fewer arguments. `prewarm()` resolves every flow on a background thread, which
+moves the orchestrator imports off the first run.
 """
-from typing import Any, Dict, List, Optional, Union
+import importlib
+import inspect
+import sys
+import threading
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Union
+
+FLOW_MODULES = {
+    "install": "src.install.install_orchestrator",
+    "uninstall": "src.uninstall.uninstall_orchestrator",
+    "status": "src.status.status_orchestrator",
+    "backup": "src.backup.backup_orchestrator",
+    "cleanup": "src.cleanup.cleanup_orchestrator",
+}
+DEFAULT_FLOW_MODULE = "src.status.status_orchestrator"
 
 
 def _module_for_flow(flow_name: str) -> str:
-    mapping = {
-        "install": "src.install.install_orchestrator",
-        "uninstall": "src.uninstall.uninstall_orchestrator",
-        "status": "src.status.status_orchestrator",
-    }
-    return mapping.get(flow_name, "src.status.status_orchestrator")
+    return FLOW_MODULES.get(flow_name, DEFAULT_FLOW_MODULE)
+
+
+class Entrypoint:
+    """A resolved orchestrator callable and the call arguments it accepts."""
+
+    def __init__(self, module: Any, attr: str, func: Callable[..., Any], accepts: Optional[FrozenSet[str]]):
+        self.module = module
+        self.attr = attr
+        self.func = func
+        self.accepts = accepts  # None: takes **kwargs
+
+    def current(self, module: Any) -> bool:
+        """Still valid for `module` (the module in sys.modules now), with the same callable?"""
+        return module is self.module and getattr(module, self.attr, None) is self.func
+
+    def __call__(self, **kwargs) -> Any:
+        if self.accepts is not None:
+            kwargs = {k: v for k, v in kwargs.items() if k in self.accepts}
+        return self.func(**kwargs)
+
+
+def _accepted_args(func: Callable[..., Any]) -> Optional[FrozenSet[str]]:
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None  # builtins and some C callables have no signature: pass everything
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params):
+        return None
+    return frozenset(p.name for p in params
+                     if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY))
+
+
+class EntrypointRegistry:
+    """Resolves and caches orchestrator entrypoints per module path.
+
+    A cached entry is reused only while ``sys.modules`` still holds the module it
+    was resolved from and that module still exposes the same callable, so reloads
+    and test doubles are picked up.
+    """
+
+    def __init__(self, modules: Optional[Dict[str, str]] = None):
+        self.modules = dict(FLOW_MODULES if modules is None else modules)
+        self._cache: Dict[str, Entrypoint] = {}
+        self._errors: Dict[str, BaseException] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, module_path: str) -> Entrypoint:
+        mod = importlib.import_module(module_path)
+        # prefer `main` entrypoint if available
+        for attr in ("main", "run"):
+            func = getattr(mod, attr, None)
+            if func is not None:
+                return Entrypoint(mod, attr, func, _accepted_args(func))
+        raise RuntimeError(f"Orchestrator entrypoint not found in {module_path}")
+
+    def get(self, module_path: str) -> Entrypoint:
+        entry = self._cache.get(module_path)
+        if entry is not None and entry.current(sys.modules.get(module_path)):
+            return entry
+        entry = self._resolve(module_path)
+        with self._lock:
+            self._cache[module_path] = entry
+            self._errors.pop(module_path, None)
+        return entry
+
+    def for_flow(self, flow_name: str) -> Entrypoint:
+        return self.get(self.modules.get(flow_name, DEFAULT_FLOW_MODULE))
+
+    def prewarm(self, flows: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """Resolve the given flows (default: all); failures are kept in `errors` and raised on use."""
+        paths = [self.modules[f] for f in (flows or list(self.modules)) if f in self.modules]
+
+        def _warm():
+            for path in dict.fromkeys(paths):
+                try:
+                    self.get(path)
+                except Exception as e:
+                    with self._lock:
+                        self._errors[path] = e
+
+        if not background:
+            _warm()
+            return None
+        th = threading.Thread(target=_warm, name="entrypoint-prewarm", daemon=True)
+        th.start()
+        return th
+
+    @property
+    def errors(self) -> Dict[str, BaseException]:
+        with self._lock:
+            return dict(self._errors)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._errors.clear()
+
+
+registry = EntrypointRegistry()
+
+
+def prewarm(flows: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+    """Resolve flow entrypoints ahead of the first run (on a daemon thread by default)."""
+    return registry.prewarm(flows, background)
 
 
 def _call_module(module_path: str, dry_run: bool, yes: bool, log_path: Optional[str], targets: Optional[List[str]], progress_cb=None):
-    import importlib
-
-    mod = importlib.import_module(module_path)
-    # prefer `main` entrypoint if available
-    if hasattr(mod, "main"):
-        # pass progress_cb if supported (orchestrators should accept it optionally)
-        try:
-            return mod.main(dry_run=dry_run, yes=yes, log_path=log_path, targets=targets, progress_cb=progress_cb)
-        except TypeError:
-            return mod.main(dry_run=dry_run, yes=yes, log_path=log_path, targets=targets)
-    # fallback: try calling with positional args
-    if hasattr(mod, "main"):
-        return mod.main(dry_run)
-    # last resort: try a call without args
-    if hasattr(mod, "run"):
-        return mod.run()
-    raise RuntimeError(f"Orchestrator entrypoint not found in {module_path}")
+    entry = registry.get(module_path)
+    return entry(dry_run=dry_run, yes=yes, log_path=log_path, targets=targets, progress_cb=progress_cb)
 
 
 def run_flow(flow_name: str, dry_run: bool = True, yes: bool = False, log_path: Optional[str] = None, targets: Optional[List[str]] = None, progress_cb=None) -> Union[Dict, List[Dict]]:
@@ -0,0 +1,429 @@
+"""In-process event bus with typed progress events and fan-out subscribers.
+
+Orchestrators report progress through a single ``progress_cb(event, event_type)``
+taking ad-hoc dicts. The bus turns those into typed, immutable events
+(RunStart, StepStart, StepProgress, StepEnd, RunEnd, ErrorEvent) and fans them
+out to any number of subscribers: the UI, a JSON log, metrics, tracing.
+
+Every subscriber has its own EventChannel and worker thread, so publishing only
+appends to bounded buffers and never waits for a handler. A slow subscriber
+(file logging on a busy disk) falls behind on its own: its progress events are
+coalesced or dropped, lifecycle events are always delivered, and neither the
+orchestrator thread nor the other subscribers are held up.
+
+Usage:
+    bus = EventBus()
+    bus.subscribe(JsonLogSubscriber("logs/events.jsonl"), name="jsonl")
+    metrics = MetricsSubscriber()
+    bus.subscribe(metrics, name="metrics")
+    run_flow("status", progress_cb=bus.as_progress_cb())
+    bus.close()
+    print(metrics.snapshot())
+"""
+import json
+import threading
+import time
+import queue
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    from src.ui.event_channel import EventChannel
+except ImportError:
+    from ui.event_channel import EventChannel
+
+EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+def _frozen(mapping: Optional[Mapping[str, Any]]) -> Mapping[str, Any]:
+    if not mapping:
+        return EMPTY
+    if isinstance(mapping, MappingProxyType):
+        return mapping
+    return MappingProxyType(dict(mapping))
+
+
+def _no_data() -> Mapping[str, Any]:
+    return EMPTY  # read-only proxies are unhashable, so dataclasses need a factory for them
+
+
+class _Event:
+    """Shared behaviour of the event types; `data` holds the fields a type does not model."""
+
+    __slots__ = ()
+    type: ClassVar[str] = ""
+
+    def __post_init__(self):
+        object.__setattr__(self, "data", _frozen(self.data))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat, JSON-friendly dict with a ``type`` key; None fields are left out."""
+        out: Dict[str, Any] = {"type": self.type}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if f.name == "data":
+                out.update(value)
+            elif isinstance(value, Mapping):
+                out[f.name] = dict(value)
+            elif isinstance(value, tuple):
+                out[f.name] = list(value)
+            elif value is not None:
+                out[f.name] = value
+        return out
+
+    def to_legacy(self) -> Tuple[Dict[str, Any], str]:
+        """The ``(event, event_type)`` pair a ``progress_cb`` expects."""
+        event = self.to_dict()
+        return event, event.pop("type")
+
+
+@dataclass(frozen=True, slots=True)
+class RunStart(_Event):
+    flow: Optional[str] = None
+    options: Mapping[str, Any] = field(default_factory=_no_data)
+    data: Mapping[str, Any] = field(default_factory=_no_data)
+    ts: float = field(default_factory=time.time)
+    type: ClassVar[str] = "run-start"
+
+    def __post_init__(self):
+        object.__setattr__(self, "options", _frozen(self.options))
+        object.__setattr__(self, "data", _frozen(self.data))
+
+
+@dataclass(frozen=True, slots=True)
+class StepStart(_Event):
+    step_id: str
+    name: Optional[str] = None
+    flow: Optional[str] = None
+    data: Mapping[str, Any] = field(default_factory=_no_data)
+    ts: float = field(default_factory=time.time)
+    type: ClassVar[str] = "step-start"
+
+
+@dataclass(frozen=True, slots=True)
+class StepProgress(_Event):
+    step_id: str
+    flow: Optional[str] = None
+    data: Mapping[str, Any] = field(default_factory=_no_data)
+    ts: float = field(default_factory=time.time)
+    type: ClassVar[str] = "step-progress"
+
+
+@dataclass(frozen=True, slots=True)
+class StepEnd(_Event):
+    step_id: str
+    status: Optional[str] = None
+    flow: Optional[str] = None
+    data: Mapping[str, Any] = field(default_factory=_no_data)
+    ts: float = field(default_factory=time.time)
+    type: ClassVar[str] = "step-end"
+
+
+@dataclass(frozen=True, slots=True)
+class RunEnd(_Event):
+    flow: Optional[str] = None
+    results: Tuple[Any, ...] = ()
+    cancelled: bool = False
+    data: Mapping[str, Any] = field(default_factory=_no_data)
+    ts: float = field(default_factory=time.time)
+    type: ClassVar[str] = "run-end"
+
+    def __post_init__(self):
+        if not isinstance(self.results, tuple):
+            # orchestrators return one result or a list of them
+            results = self.results
+            object.__setattr__(self, "results", tuple(results) if isinstance(results, list) else (results,))
+        object.__setattr__(self, "data", _frozen(self.data))
+
+
+@dataclass(frozen=True, slots=True)
+class ErrorEvent(_Event):
+    error: str
+    flow: Optional[str] = None
+    step_id: Optional[str] = None
+    data: Mapping[str, Any] = field(default_factory=_no_data)
+    ts: float = field(default_factory=time.time)
+    type: ClassVar[str] = "error"
+
+
+@dataclass(frozen=True, slots=True)
+class OtherEvent(_Event):
+    """Any event type the bus has no class for (e.g. ``file-progress``), kept as-is."""
+
+    kind: str
+    step_id: Optional[str] = None
+    flow: Optional[str] = None
+    data: Mapping[str, Any] = field(default_factory=_no_data)
+    ts: float = field(default_factory=time.time)
+
+    @property
+    def type(self) -> str:  # type: ignore[override]
+        return self.kind
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = _Event.to_dict(self)
+        del out["kind"]
+        return out
+
+
+def from_legacy(event: Any, event_type: str) -> _Event:
+    """Build the typed event for a ``progress_cb(event, event_type)`` call."""
+    d = dict(event) if isinstance(event, Mapping) else {"value": event}
+    flow = d.pop("flow", None)
+    ts = d.pop("ts", None)
+    kw: Dict[str, Any] = {} if ts is None else {"ts": ts}
+    if event_type == "run-start":
+        return RunStart(flow=flow, options=d.pop("options", None) or EMPTY, data=d, **kw)
+    if event_type == "step-start":
+        step_id = d.pop("step_id", None) or d.get("name") or ""
+        return StepStart(step_id=step_id, name=d.pop("name", None), flow=flow, data=d, **kw)
+    if event_type == "step-progress":
+        return StepProgress(step_id=d.pop("step_id", None) or "", flow=flow, data=d, **kw)
+    if event_type == "step-end":
+        return StepEnd(step_id=d.pop("step_id", None) or "", status=d.pop("status", None), flow=flow, data=d, **kw)
+    if event_type == "run-end":
+        results = d.pop("results", None)
+        return RunEnd(flow=flow, results=() if results is None else results,
+                      cancelled=bool(d.pop("cancelled", False)), data=d, **kw)
+    if event_type == "error":
+        return ErrorEvent(error=str(d.pop("error", "")), flow=flow, step_id=d.pop("step_id", None), data=d, **kw)
+    return OtherEvent(kind=event_type, step_id=d.pop("step_id", None), flow=flow, data=d, **kw)
+
+
+class Subscription:
+    """One subscriber: its bounded channel, worker thread and delivery counters."""
+
+    def __init__(self, handler: Callable[[Any], Any], name: str, types: Optional[FrozenSet[str]],
+                 capacity: int, batch_size: int):
+        self.handler = handler
+        self.name = name
+        self.types = types
+        self.batch_size = batch_size
+        self.channel = EventChannel(capacity)
+        self.handled = 0
+        self.errors = 0
+        self.last_error: Optional[BaseException] = None
+        self._processed = 0  # events taken from the channel and finished, errors included
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"event-bus-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = self.channel.get_batch(self.batch_size, timeout=0.2)
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+            for _, event in batch:
+                try:
+                    self.handler(event)
+                    self.handled += 1
+                except Exception as e:
+                    # never let a subscriber failure stop its worker
+                    self.errors += 1
+                    self.last_error = e
+                self._processed += 1
+
+    def idle(self) -> bool:
+        """Nothing buffered and nothing being handled."""
+        stats = self.channel.stats()
+        return stats["buffered"] == 0 and self._processed >= stats["delivered"]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.idle():
+            if not self._thread.is_alive():
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Deliver what is buffered, stop the worker and close the handler if it can be closed."""
+        self._closed.set()
+        self._thread.join(timeout)
+        closer = getattr(self.handler, "close", None)
+        if callable(closer) and not self._thread.is_alive():
+            try:
+                closer()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.channel.stats(), name=self.name, handled=self.handled, errors=self.errors)
+
+
+class EventBus:
+    """Fans published events out to subscribers without blocking the publisher."""
+
+    def __init__(self, capacity: int = 4096, batch_size: int = 256):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.published = 0
+        self._subs: Tuple[Subscription, ...] = ()  # replaced, never mutated, so publish needs no lock
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: Callable[[Any], Any], name: Optional[str] = None,
+                  types: Optional[Iterable[str]] = None, capacity: Optional[int] = None) -> Subscription:
+        """Register `handler(event)`; `types` limits it to those event types (default: all)."""
+        sub = Subscription(handler, name or getattr(handler, "__name__", type(handler).__name__),
+                           frozenset(types) if types is not None else None,
+                           capacity or self.capacity, self.batch_size)
+        with self._lock:
+            self._subs = self._subs + (sub,)
+        return sub
+
+    def unsubscribe(self, sub: Subscription, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+        sub.close(timeout)
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        return list(self._subs)
+
+    def publish(self, event: _Event) -> None:
+        """Queue `event` for every matching subscriber; returns without waiting for any handler."""
+        item = (event.type, event)
+        for sub in self._subs:
+            if sub.types is None or item[0] in sub.types:
+                sub.channel.put_nowait(item)
+        self.published += 1
+
+    def publish_legacy(self, event: Any, event_type: str) -> None:
+        self.publish(from_legacy(event, event_type))
+
+    def as_progress_cb(self) -> Callable[[Any, str], None]:
+        """A ``progress_cb(event, event_type)`` that publishes to this bus, for orchestrators."""
+        def _cb(event, event_type):
+            try:
+                self.publish_legacy(event, event_type)
+            except Exception:
+                # never let UI callback failures abort the flow
+                pass
+        return _cb
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every subscriber has handled what it was given; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for sub in self._subs:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not sub.flush(remaining):
+                return False
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            subs, self._subs = self._subs, ()
+        for sub in subs:
+            sub.close(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"published": self.published, "subscribers": [s.stats() for s in self._subs]}
+
+    def __enter__(self) -> "EventBus":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class JsonLogSubscriber:
+    """Appends each event as one JSON line to `path`."""
+
+    def __init__(self, path: str, flush_every: int = 256):
+        self.path = path
+        self.flush_every = flush_every
+        self._fh = None
+        self._pending = 0
+
+    def __call__(self, event: _Event) -> None:
+        if self._fh is None:
+            self._fh = open(self.path, "a", encoding="utf-8")
+        self._fh.write(json.dumps(event.to_dict(), default=_json_default) + "\n")
+        self._pending += 1
+        # lifecycle events reach the disk promptly, progress in chunks
+        if self._pending >= self.flush_every or not isinstance(event, (StepProgress, OtherEvent)):
+            self._fh.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _json_default(value: Any) -> Any:
+    to_dict = getattr(value, "to_dict", None)
+    if callable(to_dict):
+        return to_dict()
+    return str(value)
+
+
+class MetricsSubscriber:
+    """Counts events and step outcomes and records step durations in seconds."""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.durations: Dict[str, float] = {}
+        self._started: Dict[Tuple[Optional[str], str], float] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: _Event) -> None:
+        with self._lock:
+            self.counts[event.type] += 1
+            if isinstance(event, StepStart):
+                self._started[(event.flow, event.step_id)] = event.ts
+            elif isinstance(event, StepEnd):
+                self.statuses[event.status or "Unknown"] += 1
+                start = self._started.pop((event.flow, event.step_id), None)
+                if start is not None:
+                    self.durations[event.step_id] = event.ts - start
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"counts": dict(self.counts), "statuses": dict(self.statuses),
+                    "durations": dict(self.durations), "running": sorted(s for _, s in self._started)}
+
+
+class TraceSubscriber:
+    """Turns run and step start/end pairs into spans, exportable as a Chrome trace."""
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self._open: Dict[Tuple[str, Optional[str], str], float] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: _Event) -> None:
+        with self._lock:
+            if isinstance(event, RunStart):
+                self._open[("run", event.flow, event.flow or "")] = event.ts
+            elif isinstance(event, StepStart):
+                self._open[("step", event.flow, event.step_id)] = event.ts
+            elif isinstance(event, StepEnd):
+                self._close(("step", event.flow, event.step_id), event.ts, event.status)
+            elif isinstance(event, RunEnd):
+                self._close(("run", event.flow, event.flow or ""), event.ts,
+                            "Cancelled" if event.cancelled else None)
+
+    def _close(self, key: Tuple[str, Optional[str], str], end: float, status: Optional[str]) -> None:
+        start = self._open.pop(key, None)
+        if start is not None:
+            kind, flow, name = key
+            self.spans.append({"kind": kind, "flow": flow, "name": name, "start": start, "end": end,
+                               "status": status})
+
+    def to_chrome_trace(self) -> List[Dict[str, Any]]:
+        """Complete (``ph: X``) events in microseconds, one track per flow."""
+        with self._lock:
+            spans = list(self.spans)
+        return [{"name": s["name"], "cat": s["kind"], "ph": "X", "ts": int(s["start"] * 1e6),
+                 "dur": int((s["end"] - s["start"]) * 1e6), "pid": 1, "tid": s["flow"] or "main",
+                 "args": {"status": s["status"]} if s["status"] else {}}
+                for s in spans]
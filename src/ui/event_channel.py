@@ -0,0 +1,164 @@
+"""Bounded, coalescing channel for progress events between an orchestrator and the UI.
+
+Drop-in for the ``queue.Queue`` that `threaded_runner` feeds (``put_nowait`` /
+``get`` / ``get_nowait`` / ``empty`` / ``qsize`` on ``(event_type, event)``
+tuples), but memory stays bounded however slowly the UI drains it:
+
+* a ``step-progress`` event replaces the still-undelivered progress event of
+  the same ``step_id`` (a dict key or an attribute) in place, since only the
+  latest one matters;
+* when the buffer is full the oldest droppable event is discarded;
+* lifecycle events (``run-start``, ``step-start``, ``step-end``, ``run-end``,
+  ``error``) are never dropped or coalesced. They may take the buffer past
+  `capacity`, which is harmless because there are only a few per step.
+
+`dropped` and `coalesced` count what the UI never saw.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+PROTECTED_EVENTS = frozenset({"run-start", "step-start", "step-end", "run-end", "error"})
+COALESCED_EVENTS = frozenset({"step-progress"})
+
+
+class _Slot:
+    __slots__ = ("event_type", "event", "key", "live")
+
+    def __init__(self, event_type: str, event: Any, key: Optional[Any]):
+        self.event_type = event_type
+        self.event = event
+        self.key = key
+        self.live = True
+
+
+class EventChannel:
+    """Thread-safe ring buffer of ``(event_type, event)`` pairs with per-step coalescing."""
+
+    def __init__(self, capacity: int = 1024):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.dropped = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.high_water = 0
+        self._slots: Deque[_Slot] = deque()
+        self._droppable: Deque[_Slot] = deque()  # droppable slots in arrival order, oldest first
+        self._pending: Dict[Any, _Slot] = {}  # coalescing key -> undelivered slot
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def put(self, item: Tuple[str, Any], block: bool = True, timeout: Optional[float] = None) -> None:
+        """Add an ``(event_type, event)`` pair; never blocks (`block`/`timeout` exist for Queue parity)."""
+        event_type, event = item
+        key = None
+        if event_type in COALESCED_EVENTS:
+            step_id = event.get("step_id") if isinstance(event, dict) else getattr(event, "step_id", None)
+            if step_id is not None:
+                key = (event_type, step_id)
+        with self._cond:
+            slot = self._pending.get(key) if key is not None else None
+            if slot is not None:
+                slot.event = event
+                self.coalesced += 1
+                return
+            if self._size >= self.capacity and event_type not in PROTECTED_EVENTS and not self._evict():
+                self.dropped += 1  # nothing older may go, so the newcomer does
+                return
+            if self._size >= self.capacity and event_type in PROTECTED_EVENTS:
+                self._evict()
+            slot = _Slot(event_type, event, key)
+            self._slots.append(slot)
+            if event_type not in PROTECTED_EVENTS:
+                self._droppable.append(slot)
+            if key is not None:
+                self._pending[key] = slot
+            self._size += 1
+            self.high_water = max(self.high_water, self._size)
+            self._cond.notify()
+
+    put_nowait = put
+
+    def _evict(self) -> bool:
+        """Drop the oldest droppable event; the caller holds the lock."""
+        while self._droppable:
+            slot = self._droppable.popleft()
+            if slot.live:
+                self._discard(slot)
+                self.dropped += 1
+                # dead slots stay in the ring until read; compact when they dominate it
+                if len(self._slots) > 2 * self.capacity:
+                    self._slots = deque(s for s in self._slots if s.live)
+                return True
+        return False
+
+    def _discard(self, slot: _Slot) -> None:
+        slot.live = False
+        self._size -= 1
+        if slot.key is not None and self._pending.get(slot.key) is slot:
+            del self._pending[slot.key]
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Tuple[str, Any]:
+        """Remove and return the oldest ``(event_type, event)``; raises queue.Empty like Queue.get."""
+        with self._cond:
+            self._wait_nonempty(block, timeout)
+            return self._pop()
+
+    def get_batch(self, max_items: int = 256, timeout: Optional[float] = None) -> List[Tuple[str, Any]]:
+        """Wait for at least one event, then return up to `max_items` in one lock round-trip.
+
+        Raises:
+            queue.Empty: Nothing arrived within `timeout`.
+        """
+        with self._cond:
+            self._wait_nonempty(True, timeout)
+            return [self._pop() for _ in range(min(max_items, self._size))]
+
+    def _wait_nonempty(self, block: bool, timeout: Optional[float]) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._size == 0:
+            if not block:
+                raise queue.Empty
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            self._cond.wait(remaining)
+
+    def _pop(self) -> Tuple[str, Any]:
+        while True:
+            slot = self._slots.popleft()
+            if slot.live:
+                break
+        self._discard(slot)
+        # delivery is FIFO, so a delivered droppable slot is always the oldest one left
+        if self._droppable and self._droppable[0] is slot:
+            self._droppable.popleft()
+        self.delivered += 1
+        return slot.event_type, slot.event
+
+    def get_nowait(self) -> Tuple[str, Any]:
+        return self.get(block=False)
+
+    def drain(self) -> List[Tuple[str, Any]]:
+        """Return every buffered event without waiting."""
+        out = []
+        while True:
+            try:
+                out.append(self.get_nowait())
+            except queue.Empty:
+                return out
+
+    def qsize(self) -> int:
+        with self._cond:
+            return self._size
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"buffered": self._size, "capacity": self.capacity, "delivered": self.delivered,
+                    "dropped": self.dropped, "coalesced": self.coalesced, "high_water": self.high_water}
@@ -0,0 +1,170 @@
+"""Run several orchestrator flows side by side with cooperative cancellation.
+
+`run_flow_in_thread` starts one daemon thread per flow with no way to stop it.
+FlowExecutor runs `adapter.run_flow` calls on a bounded thread pool instead
+(e.g. status and backup together) and gives each one a FlowHandle holding:
+
+* the future with the flow's results;
+* an EventChannel with its progress events and a snapshot of the latest
+  event per step;
+* a CancellationToken. StepRunners created inside the flow pick it up, so a
+  cancelled flow stops at the next step boundary rather than mid-step.
+
+Ctrl+C while waiting cancels every flow, waits for the running steps to end,
+and then re-raises KeyboardInterrupt.
+
+Usage:
+    with FlowExecutor(max_workers=2) as ex:
+        status = ex.submit('status')
+        uninstall = ex.submit('uninstall', dry_run=True)
+        ex.wait()
+        print(status.result(), uninstall.snapshot())
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# StepRunner reads the token through the top-level `step_runner` module the orchestrators import
+src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_runner import CancellationToken, use_token
+
+try:
+    from src.ui.event_channel import EventChannel
+except ImportError:
+    from ui.event_channel import EventChannel
+
+
+class FlowHandle:
+    """A submitted flow: its future, progress events and cancellation token."""
+
+    def __init__(self, flow: str, options: Dict[str, Any], event_capacity: int = 1024):
+        self.flow = flow
+        self.options = options
+        self.token = CancellationToken()
+        self.events = EventChannel(event_capacity)
+        self.progress: Dict[str, Dict[str, Any]] = {}  # step_id -> latest event for that step
+        self.future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def _on_event(self, event: Dict[str, Any], event_type: str) -> None:
+        step_id = event.get("step_id") if isinstance(event, dict) else None
+        if step_id is not None:
+            with self._lock:
+                self.progress[step_id] = dict(event, event_type=event_type)
+        self.events.put_nowait((event_type, event))
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        """Ask the flow to stop; a flow still queued behind the pool limit does not start."""
+        self.token.cancel(reason)
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> List[Any]:
+        """The flow's results; raises concurrent.futures.CancelledError if it never started."""
+        return self.future.result(timeout)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self.progress)
+
+
+class FlowExecutor:
+    """Bounded pool of concurrently running flows."""
+
+    def __init__(self, max_workers: int = 2, run_flow: Optional[Callable[..., Any]] = None,
+                 event_capacity: int = 1024):
+        self.max_workers = max_workers
+        self.event_capacity = event_capacity
+        self._run_flow = run_flow
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flow")
+        self._handles: List[FlowHandle] = []
+        if run_flow is None:
+            # import the orchestrators in the background while the caller sets up its flows
+            importlib.import_module("src.ui.adapter").prewarm()
+
+    def _resolve_run_flow(self) -> Callable[..., Any]:
+        if self._run_flow is None:
+            # lazy import to avoid import cycles
+            self._run_flow = importlib.import_module("src.ui.adapter").run_flow
+        return self._run_flow
+
+    def submit(self, flow: str, dry_run: bool = True, yes: bool = False, log_path: Optional[str] = None,
+               targets: Optional[List[str]] = None, progress_cb=None) -> FlowHandle:
+        """Queue a flow; `progress_cb` (optional) also receives its events, tagged with the flow name."""
+        handle = FlowHandle(flow, {"dry_run": dry_run, "yes": yes, "log_path": log_path, "targets": targets},
+                            self.event_capacity)
+        run_flow = self._resolve_run_flow()
+
+        def _cb(event, event_type):
+            handle._on_event(event, event_type)
+            if progress_cb:
+                try:
+                    progress_cb(dict(event, flow=flow) if isinstance(event, dict) else event, event_type)
+                except Exception:
+                    # never let UI callback failures abort the flow
+                    pass
+
+        def _target():
+            with use_token(handle.token):
+                _cb({"flow": flow, "options": dict(handle.options)}, "run-start")
+                try:
+                    results = run_flow(flow, progress_cb=_cb, **handle.options)
+                except Exception as e:
+                    _cb({"flow": flow, "error": repr(e)}, "error")
+                    raise
+                _cb({"flow": flow, "results": results, "cancelled": handle.token.cancelled}, "run-end")
+                return results
+
+        handle.future = self._pool.submit(_target)
+        self._handles.append(handle)
+        return handle
+
+    @property
+    def handles(self) -> List[FlowHandle]:
+        return list(self._handles)
+
+    def cancel_all(self, reason: str = "Cancelled") -> None:
+        for handle in self._handles:
+            if not handle.done():
+                handle.cancel(reason)
+
+    def wait(self, handles: Optional[Iterable[FlowHandle]] = None, poll: float = 0.2) -> List[FlowHandle]:
+        """Wait for `handles` (default: all); Ctrl+C cancels every flow, waits for it, then re-raises."""
+        handles = list(handles) if handles is not None else self.handles
+        try:
+            for handle in handles:
+                # short timeouts keep the main thread responsive to Ctrl+C
+                while not handle.done():
+                    time.sleep(poll)
+        except KeyboardInterrupt:
+            self.cancel_all("Interrupted")
+            for handle in self._handles:
+                while not handle.done():
+                    try:
+                        time.sleep(poll)
+                    except KeyboardInterrupt:
+                        pass  # already stopping; let the running steps finish cleanly
+            raise
+        return handles
+
+    def shutdown(self, wait: bool = True, cancel: bool = False) -> None:
+        if cancel:
+            self.cancel_all("Executor shut down")
+        self._pool.shutdown(wait=wait, cancel_futures=cancel)
+
+    def __enter__(self) -> "FlowExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # leaving on an exception (Ctrl+C included) stops the flows instead of orphaning them
+        self.shutdown(wait=True, cancel=exc_type is not None)
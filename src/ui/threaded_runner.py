@@ -2,17 +2,23 @@
 
 Usage:
     from src.ui.threaded_runner import run_flow_in_thread
-    q = queue.Queue()
-    run_flow_in_thread('uninstall', {'dry_run': True}, q)
-    # drain q until you see a 'run-end' event
+    th = run_flow_in_thread('uninstall', {'dry_run': True})
+    # drain th.event_queue until you see a 'run-end' event
+
+Without an explicit queue the events go to a bounded EventChannel, so a chatty
+step cannot grow memory while the UI drains slowly.
 """
 from typing import Any, Dict, Optional
 import threading
-import queue
 import importlib
 
+try:
+    from src.ui.event_channel import EventChannel
+except ImportError:
+    from ui.event_channel import EventChannel
+
 
-def _make_queue_put(q: queue.Queue):
+def _make_queue_put(q):
     def put(event, event_type):
         try:
             q.put_nowait((event_type, event))
@@ -40,16 +46,18 @@ def _normalize_results(results):
     return out
 
 
-def run_flow_in_thread(flow_name: str, options: Optional[Dict] = None, event_queue: Optional[queue.Queue] = None) -> threading.Thread:
+def run_flow_in_thread(flow_name: str, options: Optional[Dict] = None, event_queue=None) -> threading.Thread:
     """Start adapter.run_flow in a daemon thread and stream events to event_queue.
 
     The thread will put ('run-start', {...}) at start and ('run-end', {'results': [...]}) when finished.
-    Returns the Thread object (daemon=True).
+    `event_queue` may be a queue.Queue or an EventChannel (the default, sized by
+    options['event_capacity']). Returns the Thread object (daemon=True) with the
+    queue as `event_queue`.
     """
     if options is None:
         options = {}
     if event_queue is None:
-        event_queue = queue.Queue()
+        event_queue = EventChannel(options.get('event_capacity', 1024))
 
     def target():
         # lazy import to avoid import cycles
@@ -65,5 +73,6 @@ def run_flow_in_thread(flow_name: str, options: Optional[Dict] = None, event_que
             qput({'flow': flow_name, 'error': repr(e)}, 'error')
 
     th = threading.Thread(target=target, daemon=True)
+    th.event_queue = event_queue
     th.start()
     return th
@@ -211,6 +211,7 @@ ICON_COLORS = {
     '🗑️': Colors.RED,        # Delete/Remove
     '📦': Colors.BROWN if hasattr(Colors, 'BROWN') else Colors.YELLOW,  # Containers
     '🗂️': Colors.CYAN,       # Files/Volumes
+    '🧹': Colors.GREEN,      # Cleanup
 }
 
 
@@ -0,0 +1,219 @@
+"""Find and delete the data Docker Desktop leaves behind after an uninstall.
+
+The uninstaller keeps per-user settings, the ProgramData state and the data root
+(WSL disk images, image layers), often several gigabytes. The sweeper measures
+those trees with the parallel scandir pre-scan used by backups, reports them in
+dry-run, and deletes them on a thread pool: each task lists one directory,
+unlinks its files and queues its subdirectories; directories are then removed
+deepest level first. Files that are locked or read-only (an antivirus scan, a
+service that has not exited yet) are retried with backoff after clearing the
+read-only bit. Symlinks and junctions are unlinked, never followed.
+
+Trees under ProgramData usually need elevation; without it their deletion fails
+and is reported per target with what was left behind.
+"""
+import os
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from backup.prescan import ScanCancelled, prescan
+
+
+def default_leftovers(env: Optional[Mapping[str, str]] = None, data_root: Optional[str] = None,
+                      include_user_config: bool = False) -> Dict[str, str]:
+    """Known Docker Desktop leftover directories, keyed by a short label.
+
+    ``~/.docker`` (credentials, contexts, daemon.json) is not Docker Desktop's
+    own data and is only included with `include_user_config`.
+    """
+    env = os.environ if env is None else env
+    home = env.get("USERPROFILE") or os.path.expanduser("~")
+    appdata = env.get("APPDATA") or os.path.join(home, "AppData", "Roaming")
+    local = env.get("LOCALAPPDATA") or os.path.join(home, "AppData", "Local")
+    programdata = env.get("ProgramData") or env.get("PROGRAMDATA") or r"C:\ProgramData"
+    targets = {
+        "appdata_docker": os.path.join(appdata, "Docker"),
+        "appdata_docker_desktop": os.path.join(appdata, "Docker Desktop"),
+        "localappdata_docker": os.path.join(local, "Docker"),
+        "programdata_dockerdesktop": os.path.join(programdata, "DockerDesktop"),
+        "data_root": data_root or os.path.join(programdata, "Docker"),
+    }
+    if include_user_config:
+        targets["user_docker_config"] = os.path.join(home, ".docker")
+    return targets
+
+
+def _human(n: int) -> str:
+    size = float(n)
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _with_retry(op, path: str, retries: int, delay: float) -> Optional[str]:
+    """Run op(path), clearing read-only and backing off on failure; returns the last error or None."""
+    for attempt in range(retries + 1):
+        try:
+            op(path)
+            return None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            if attempt == retries:
+                return f"{path}: {e}"
+            try:
+                os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+            except OSError:
+                pass
+            time.sleep(delay * (2 ** attempt))
+    return None
+
+
+def _is_link(entry: os.DirEntry) -> bool:
+    is_junction = getattr(entry, "is_junction", None)
+    return entry.is_symlink() or bool(is_junction and is_junction())
+
+
+def _clear_dir(directory: str, retries: int, delay: float) -> Tuple[int, int, List[str], List[str]]:
+    """Unlink the files in one directory; returns (files, bytes, subdirectories, errors)."""
+    files = nbytes = 0
+    subdirs: List[str] = []
+    errors: List[str] = []
+    with os.scandir(directory) as it:
+        entries = list(it)
+    for entry in entries:
+        try:
+            if _is_link(entry):
+                # remove the link itself; a directory junction is removed with rmdir
+                op = os.rmdir if os.name == "nt" and entry.is_dir() else os.unlink
+                err = _with_retry(op, entry.path, retries, delay)
+            elif entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+                continue
+            else:
+                size = entry.stat(follow_symlinks=False).st_size
+                err = _with_retry(os.unlink, entry.path, retries, delay)
+                if err is None:
+                    files += 1
+                    nbytes += size
+        except OSError as e:
+            err = f"{entry.path}: {e}"
+        if err:
+            errors.append(err)
+    return files, nbytes, subdirs, errors
+
+
+def delete_tree(root: str, workers: Optional[int] = None, retries: int = 3, retry_delay: float = 0.2,
+                cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """Delete `root` and everything below it in parallel.
+
+    Returns:
+        {"files": n, "bytes": n, "dirs": n, "errors": [...]} — errors lists what could not be removed.
+    """
+    stats: Dict[str, Any] = {"files": 0, "bytes": 0, "dirs": 0, "errors": []}
+    if not os.path.lexists(root):
+        return stats
+    if os.path.islink(root) or not os.path.isdir(root):
+        err = _with_retry(os.unlink, root, retries, retry_delay)
+        if err:
+            stats["errors"].append(err)
+        else:
+            stats["files"] = 1
+        return stats
+    levels: Dict[int, List[str]] = {0: [root]}
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4)) as pool:
+        pending = {pool.submit(_clear_dir, root, retries, retry_delay): 0}
+        while pending:
+            if cancel is not None and cancel.is_set():
+                raise ScanCancelled("sweep cancelled")
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for fut in done:
+                depth = pending.pop(fut)
+                try:
+                    files, nbytes, subdirs, errors = fut.result()
+                except OSError as e:
+                    stats["errors"].append(str(e))
+                    continue
+                stats["files"] += files
+                stats["bytes"] += nbytes
+                stats["errors"].extend(errors)
+                for sub in subdirs:
+                    levels.setdefault(depth + 1, []).append(sub)
+                    pending[pool.submit(_clear_dir, sub, retries, retry_delay)] = depth + 1
+        # directories are empty now (unless something was locked); remove deepest first
+        for depth in sorted(levels, reverse=True):
+            for err in pool.map(lambda d: _with_retry(os.rmdir, d, retries, retry_delay), levels[depth]):
+                if err:
+                    stats["errors"].append(err)
+                else:
+                    stats["dirs"] += 1
+    return stats
+
+
+def _emit(progress_cb, event: Dict[str, Any], event_type: str) -> None:
+    if not progress_cb:
+        return
+    try:
+        progress_cb(event, event_type)
+    except Exception:
+        # never let UI callback failures abort the sweep
+        pass
+
+
+def sweep_leftovers(targets: Optional[Dict[str, str]] = None, dry_run: bool = True, yes: bool = False,
+                    workers: Optional[int] = None, retries: int = 3, retry_delay: float = 0.2,
+                    progress_cb=None, cancel: Optional[threading.Event] = None) -> List[StepResult]:
+    """Measure (dry-run) or delete Docker leftovers; one StepResult per existing target.
+
+    Args:
+        targets: {label: directory}; defaults to `default_leftovers()`.
+        dry_run: Only report what exists and how big it is.
+        yes: Required to delete.
+        workers: Threads for scanning and deleting.
+        retries: Attempts per locked file or directory after the first.
+        retry_delay: Initial backoff in seconds (doubles per attempt).
+        progress_cb: Optional ``progress_cb(event, event_type)``.
+        cancel: Event that stops the scan or deletion.
+    """
+    targets = default_leftovers() if targets is None else targets
+    present = {label: path for label, path in targets.items() if os.path.isdir(path)}
+    if not present:
+        return [StepResult.now(name="sweep_leftovers", status="Skipped", message="No Docker leftovers found")]
+    scan = prescan(present, workers=workers, cancel=cancel)
+    results = []
+    for label, path in present.items():
+        step_id = f"sweep_leftovers:{label}"
+        found = scan.per_source.get(label, {"files": 0, "bytes": 0})
+        details = {"path": path, "files": found["files"], "bytes": found["bytes"]}
+        _emit(progress_cb, {"step_id": step_id, "name": step_id, "path": path, "bytes_total": found["bytes"]},
+              "step-start")
+        summary = f"{path} ({found['files']} files, {_human(found['bytes'])})"
+        if dry_run:
+            res = StepResult.now(name=step_id, status="Skipped", message=f"Dry-run: would remove {summary}",
+                                 details=details)
+        elif not yes:
+            res = StepResult.now(name=step_id, status="Skipped", message="Requires -Yes", details=details)
+        else:
+            removed = delete_tree(path, workers=workers, retries=retries, retry_delay=retry_delay, cancel=cancel)
+            details.update(removed=removed["bytes"], removed_files=removed["files"], errors=removed["errors"][:50])
+            if removed["errors"]:
+                res = StepResult.now(name=step_id, status="Failed",
+                                     message=f"Removed {_human(removed['bytes'])}; {len(removed['errors'])} item(s) left",
+                                     error=removed["errors"][0], details=details)
+            else:
+                res = StepResult.now(name=step_id, status="Success", message=f"Removed {summary}", details=details)
+        _emit(progress_cb, {"step_id": step_id, "status": res.status}, "step-end")
+        results.append(res)
+    return results
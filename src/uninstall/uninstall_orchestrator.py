@@ -10,8 +10,10 @@ src_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
-from step_runner import StepRunner
+from step_runner import StepRunner, current_token
 from step_result import StepResult
+from status.host_facts import FactsError, HostFacts, default_facts
+from elevation_broker import BrokerDeclined, BrokerError, BrokerOp, ElevationBroker
 
 # Import UI library for consistent interface
 try:
@@ -33,20 +35,45 @@ except ImportError:
     def press_enter_to_continue():
         input("Press Enter to continue...")
 from .docker.uninstall_docker import uninstall_docker
-from .wsl.uninstall_wsl import unregister_wsl
+from .docker.leftover_sweeper import default_leftovers, sweep_leftovers
+from .wsl.uninstall_wsl import DOCKER_DESKTOP_DISTROS, unregister_distros
+from .wsl.compact_disks import MIN_RECLAIM_BYTES, compact_disks
+from backup.wsl.export_distro import list_distros
+from backup.prescan import ScanCancelled
+from install.convergence import CommandRunner, run_command
 import subprocess
 import sys
 import os
 
 
-def _run_elevated_script(script_path: str, args=None) -> StepResult:
-    """Run a script with UAC elevation using the repository helper and return a StepResult."""
+def _is_elevated() -> bool:
+    if os.name != 'nt':
+        return False
+    try:
+        import ctypes
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    except Exception:
+        return False
+
+
+def _run_elevated_script(script_path: str, args=None, log_path: str = None) -> StepResult:
+    """Run a script with UAC elevation using the repository helper and return a StepResult.
+
+    When this process is already elevated there is nothing to prompt for, so the script
+    runs on a warm PowerShell worker instead of spawning a new interpreter.
+    """
     args = args or []
+    if _is_elevated():
+        from ps_worker import WorkerError, shared_pool
+        try:
+            return shared_pool().run(script=script_path, args=args).to_step_result(os.path.basename(script_path))
+        except WorkerError:
+            pass  # fall back to a fresh process below
     repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
     helper = os.path.join(repo_root, 'tools', 'elevate', 'run_elevated.py')
     if not os.path.exists(helper):
         return StepResult(name=os.path.basename(script_path), status='Error', message='elevate helper missing', error='helper not found')
-    cmd = [sys.executable, helper, script_path] + args
+    cmd = [sys.executable, helper] + (['--log', log_path] if log_path else []) + [script_path] + args
     try:
         proc = subprocess.run(cmd, check=False)
         if proc.returncode == 0:
@@ -55,10 +82,62 @@ def _run_elevated_script(script_path: str, args=None) -> StepResult:
     except Exception as e:
         return StepResult(name=os.path.basename(script_path), status='Error', message='exception during elevation', error=str(e))
 
-def uninstall_sequence(yes: bool = False, dry_run: bool = True, progress_cb=None):
-    """Run uninstall sequence. Optional progress_cb(event_dict, event_type) will be called if provided."""
+
+def _run_privileged(ops, emit, broker: ElevationBroker = None, log_path: str = None):
+    """Run privileged ops in one elevated batch; falls back to one elevation per script.
+
+    A declined UAC prompt cancels every op rather than prompting again once per script.
+    """
+    if not _is_elevated():
+        try:
+            return (broker or ElevationBroker()).run_batch(ops, progress_cb=emit)
+        except BrokerDeclined as e:
+            results = []
+            for op in ops:
+                emit({"step_id": op.step_id, "name": op.step_id}, "step-start")
+                results.append(StepResult.now(name=op.step_id, status="Cancelled",
+                                              message="Elevation declined", error=e))
+                emit({"step_id": op.step_id, "status": "Cancelled"}, "step-end")
+            return results
+        except BrokerError:
+            pass
+    results = []
+    for op in ops:
+        emit({"step_id": op.step_id, "name": op.step_id}, "step-start")
+        res = _run_elevated_script(op.script, op.args, log_path=log_path)
+        res.name = op.step_id
+        results.append(res)
+        emit({"step_id": op.step_id, "status": res.status}, "step-end")
+    return results
+
+
+def uninstall_sequence(yes: bool = False, dry_run: bool = True, progress_cb=None, facts: HostFacts = None,
+                       broker: ElevationBroker = None, log_path: str = None, leftovers: dict = None,
+                       wsl_run: CommandRunner = run_command):
+    """Run uninstall sequence. Optional progress_cb(event_dict, event_type) will be called if provided.
+
+    Outside dry-run, host facts (one batched query) let steps for components that are
+    not installed be skipped instead of spawning elevated scripts for nothing. The
+    privileged steps that remain run in one elevated broker (a single UAC prompt),
+    whose per-step events are forwarded to progress_cb. Once Docker Desktop is
+    uninstalled its leftover data (`leftovers`, default: `default_leftovers()`) is swept, and
+    WSL distros are unregistered one ``unregister_wsl:<distro>`` step each through
+    `wsl_run` (no elevation needed). A cancelled Docker uninstall (e.g. a declined
+    UAC prompt) cancels the WSL step too.
+    """
     runner = StepRunner(dry_run=dry_run)
     results = []
+    installed = {}
+    if not dry_run:
+        try:
+            got = (facts or default_facts()).get("docker_version", "docker_service", "wsl_distros")
+            installed = {
+                "docker": bool(got["docker_version"] or got["docker_service"]),
+                "wsl": bool(got["wsl_distros"]),
+                "distros": list(got["wsl_distros"] or []),
+            }
+        except FactsError:
+            installed = {}  # unknown: run every step as before
 
     def _emit(event: dict, event_type: str):
         if not progress_cb:
@@ -69,12 +148,34 @@ def uninstall_sequence(yes: bool = False, dry_run: bool = True, progress_cb=None
             # never let UI callback failures abort the orchestrator
             pass
 
+    def _absent(step_id: str, component: str, what: str):
+        if installed.get(component, True):
+            return None
+        _emit({"step_id": step_id, "name": step_id}, "step-start")
+        res = StepResult.now(name=step_id, status="Skipped", message=f"{what} not present")
+        _emit({"step_id": step_id, "status": res.status}, "step-end")
+        return res
+
+    # privileged steps are collected here and run together in one elevated batch
+    pending = []
+
+    def _privileged(step_id: str, script: str):
+        if not yes:
+            _emit({"step_id": step_id, "name": step_id}, "step-start")
+            res = runner.invoke(step_id, None, yes_required=True, yes=yes)
+            _emit({"step_id": step_id, "status": res.status}, "step-end")
+            return res
+        pending.append(BrokerOp(step_id, script=script))
+        return pending[-1]  # placeholder, replaced by the batch result
+
     repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 
     # stop_docker: no-op placeholder
-    _emit({"step_id": "stop_docker", "name": "stop_docker"}, "step-start")
-    res = runner.invoke("stop_docker", None)
-    _emit({"step_id": "stop_docker", "status": getattr(res, 'status', 'Unknown')}, "step-end")
+    res = _absent("stop_docker", "docker", "Docker Desktop")
+    if res is None:
+        _emit({"step_id": "stop_docker", "name": "stop_docker"}, "step-start")
+        res = runner.invoke("stop_docker", None)
+        _emit({"step_id": "stop_docker", "status": getattr(res, 'status', 'Unknown')}, "step-end")
     results.append(res)
 
     # uninstall_docker: requires explicit yes
@@ -84,26 +185,55 @@ def uninstall_sequence(yes: bool = False, dry_run: bool = True, progress_cb=None
         _emit({"step_id": "uninstall_docker", "status": getattr(res, 'status', 'Unknown')}, "step-end")
         results.append(res)
     else:
-        # call elevated PowerShell uninstall script (mock placeholder)
-        script = os.path.join(repo_root, 'tools', 'protect', 'uninstall_docker.ps1')
-        _emit({"step_id": "uninstall_docker", "name": "uninstall_docker"}, "step-start")
-        res = runner.invoke("uninstall_docker", lambda: _run_elevated_script(script), yes_required=True, yes=yes)
-        _emit({"step_id": "uninstall_docker", "status": getattr(res, 'status', 'Unknown')}, "step-end")
+        res = _absent("uninstall_docker", "docker", "Docker Desktop") or _privileged(
+            "uninstall_docker", os.path.join(repo_root, 'tools', 'protect', 'uninstall_docker.ps1'))
         results.append(res)
 
-    # unregister_wsl: requires explicit yes
-    if dry_run:
-        _emit({"step_id": "unregister_wsl", "name": "unregister_wsl"}, "step-start")
-        res = runner.invoke("unregister_wsl", unregister_wsl, yes_required=True, yes=yes)
-        _emit({"step_id": "unregister_wsl", "status": getattr(res, 'status', 'Unknown')}, "step-end")
-        results.append(res)
-    else:
-        script = os.path.join(repo_root, 'tools', 'protect', 'unregister_wsl.ps1')
-        _emit({"step_id": "unregister_wsl", "name": "unregister_wsl"}, "step-start")
-        res = runner.invoke("unregister_wsl", lambda: _run_elevated_script(script), yes_required=True, yes=yes)
-        _emit({"step_id": "unregister_wsl", "status": getattr(res, 'status', 'Unknown')}, "step-end")
+    if pending:
+        done = {r.name: r for r in _run_privileged(pending, _emit, broker, log_path)}
+        results = [done[r.step_id] if isinstance(r, BrokerOp) else r for r in results]
+
+    docker_res = results[-1]
+    # sweep_leftovers: deleting Docker Desktop's data under a still-installed Docker Desktop breaks it
+    if dry_run or docker_res.status in ("Success", "Ok") or installed.get("docker") is False:
+        targets = default_leftovers() if leftovers is None else leftovers
+        try:
+            results.extend(sweep_leftovers(targets, dry_run=dry_run, yes=yes, progress_cb=_emit,
+                                           cancel=current_token()))
+        except ScanCancelled as e:
+            results.append(StepResult.now(name="sweep_leftovers", status="Cancelled",
+                                          message="Leftover sweep stopped on cancellation", error=e))
+
+    # unregister_wsl: one unregister_wsl:<distro> step per distro, with a single wsl --shutdown
+    res = _absent("unregister_wsl", "wsl", "WSL distros")
+    if res is None and runner.token is not None and runner.token.cancelled:
+        res = StepResult.now(name="unregister_wsl", status="Cancelled", message="Cancelled before unregister_wsl",
+                             error=runner.token.reason)
+    elif res is None and docker_res.status == "Cancelled":
+        res = StepResult.now(name="unregister_wsl", status="Cancelled", message="Cancelled with uninstall_docker",
+                             error=docker_res.error)
+    if res is None:
+        try:
+            distros = installed.get("distros")
+            if distros is None:
+                code, out = wsl_run(["wsl.exe", "-l", "-q"])
+                if code != 0:
+                    raise OSError(out.strip() or f"exit {code}")
+                distros = [line.strip() for line in out.splitlines() if line.strip()]
+            results.extend(unregister_distros(distros, yes=yes, dry_run=dry_run, run=wsl_run, progress_cb=_emit))
+        except OSError as e:
+            # the distros could not be listed (no wsl.exe, or it failed)
+            _emit({"step_id": "unregister_wsl", "name": "unregister_wsl"}, "step-start")
+            res = StepResult.now(name="unregister_wsl", status="Skipped" if dry_run else "Failed",
+                                 message="Could not list WSL distros", error=e)
+            _emit({"step_id": "unregister_wsl", "status": res.status}, "step-end")
+    if res is not None:
         results.append(res)
 
+    if installed and not dry_run:
+        # uninstalling changed the host; later checks must not see the old facts
+        (facts or default_facts()).invalidate()
+
     return results
 
 
@@ -120,6 +250,7 @@ def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=
                 "🔄 Complete System Reset",
                 "🗑️ Remove WSL Only", 
                 "🐳 Remove Docker Only",
+                "💽 Compact WSL Disks",
                 "🔙 Back to Main Menu"
             ]
             
@@ -140,11 +271,13 @@ def main(dry_run: bool = True, yes: bool = False, log_path: str = None, targets=
                 return _handle_wsl_only_removal()
             elif "Remove Docker Only" in choice:
                 return _handle_docker_only_removal()
+            elif "Compact WSL Disks" in choice:
+                return _handle_compact_disks()
                 
         except Exception as e:
             return StepResult.now(name="uninstall_orchestrator", status="Error", message=f"UI error: {str(e)}")
 
-    return uninstall_sequence(yes=yes, dry_run=dry_run, progress_cb=progress_cb)
+    return uninstall_sequence(yes=yes, dry_run=dry_run, progress_cb=progress_cb, log_path=log_path)
 
 
 def _handle_complete_reset():
@@ -178,24 +311,58 @@ def _handle_complete_reset():
 
 
 def _handle_wsl_only_removal():
-    """Handle WSL-only removal."""
+    """Handle WSL-only removal: pick distros, then unregister them concurrently."""
     try:
         import questionary  # type: ignore
         
         print("🗑️ Remove WSL Only")
         print("This will remove WSL distributions while keeping Docker Desktop:")
-        print("• Unregister all WSL distributions")
-        print("• Keep Docker Desktop installation")
+        print("• Unregister the selected WSL distributions")
+        print("• Keep Docker Desktop installation (its own distros are not preselected)")
         print()
         
-        confirm = questionary.confirm("Do you want to proceed with WSL removal?").ask()
+        try:
+            distros = list_distros("wsl.exe")
+        except Exception as e:
+            return StepResult.now(name="wsl_removal", status="Error", message=f"Could not list WSL distros: {e}")
+        if not distros:
+            return StepResult.now(name="wsl_removal", status="Skipped", message="No WSL distros registered")
+
+        selected = questionary.checkbox(
+            "Select distros to unregister:",
+            choices=[questionary.Choice(f"{d} (used by Docker Desktop)" if d in DOCKER_DESKTOP_DISTROS else d,
+                                        value=d, checked=d not in DOCKER_DESKTOP_DISTROS)
+                     for d in distros],
+        ).ask()
+        if not selected:
+            return StepResult.now(name="wsl_removal", status="Cancelled", message="No distros selected")
+
+        confirm = questionary.confirm(f"Do you want to proceed with removing {len(selected)} distro(s)?").ask()
         if not confirm:
             return StepResult.now(name="wsl_removal", status="Cancelled", message="WSL removal cancelled by user")
         
+        export_dir = None
+        if questionary.confirm("Export each distro before unregistering?", default=True).ask():
+            export_dir = questionary.text("Export directory:").ask()
+            if not export_dir:
+                return StepResult.now(name="wsl_removal", status="Cancelled", message="No export directory given")
+
         dry_run = questionary.confirm("Dry-run (no changes)?", default=True).ask()
-        
-        # TODO: Implement WSL-only removal logic
-        return StepResult.now(name="wsl_removal", status="Success", message="MOCK: WSL removal completed")
+
+        def _print_step(event, event_type):
+            if event_type == "step-end":
+                print(f"  {event['step_id']}: {event.get('status')}")
+
+        results = unregister_distros(selected, yes=not dry_run, dry_run=dry_run, export_dir=export_dir,
+                                     progress_cb=_print_step)
+        failed = [r for r in results if r.status == "Failed"]
+        return StepResult.now(
+            name="wsl_removal",
+            status="Failed" if failed else ("Skipped" if dry_run else "Success"),
+            message=f"{len(results) - len(failed)}/{len(results)} distro(s) processed"
+                    + (" (dry-run)" if dry_run else ""),
+            details={"results": [r.to_dict() for r in results]},
+        )
         
     except Exception as e:
         return StepResult.now(name="wsl_removal", status="Error", message=f"WSL removal failed: {str(e)}")
@@ -217,9 +384,80 @@ def _handle_docker_only_removal():
             return StepResult.now(name="docker_removal", status="Cancelled", message="Docker removal cancelled by user")
         
         dry_run = questionary.confirm("Dry-run (no changes)?", default=True).ask()
-        
-        # TODO: Implement Docker-only removal logic
-        return StepResult.now(name="docker_removal", status="Success", message="MOCK: Docker removal completed")
+        sweep = questionary.confirm("Also delete leftover Docker data (settings, ProgramData, data root)?",
+                                    default=True).ask()
+        # ~/.docker holds credentials, contexts and daemon.json, which outlive Docker Desktop
+        user_config = sweep and questionary.confirm(
+            "Also delete ~/.docker (registry credentials, contexts, daemon.json)?", default=False).ask()
+
+        def _print_step(event, event_type):
+            if event_type == "step-end":
+                print(f"  {event['step_id']}: {event.get('status')}")
+
+        results = []
+        if dry_run:
+            results.append(StepResult.now(name="uninstall_docker", status="Skipped",
+                                          message="Dry-run: would invoke uninstall_docker"))
+        else:
+            repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+            script = os.path.join(repo_root, 'tools', 'protect', 'uninstall_docker.ps1')
+            results.extend(_run_privileged([BrokerOp("uninstall_docker", script=script)], _print_step))
+        # deleting ProgramData and the data root under a still-installed Docker Desktop breaks it
+        uninstalled = dry_run or results[0].status in ("Success", "Ok")
+        if sweep and uninstalled:
+            results.extend(sweep_leftovers(default_leftovers(include_user_config=bool(user_config)),
+                                           dry_run=dry_run, yes=not dry_run, progress_cb=_print_step,
+                                           cancel=current_token()))
+        elif sweep:
+            print(f"  Uninstall did not succeed ({results[0].status}); leftover data was not deleted")
+        for r in results[1:]:
+            print(f"  {r.message}")
+
+        failed = [r for r in results if r.status in ("Failed", "Error")]
+        return StepResult.now(
+            name="docker_removal",
+            status="Failed" if failed else ("Skipped" if dry_run else "Success"),
+            message=f"{len(results) - len(failed)}/{len(results)} step(s) completed" + (" (dry-run)" if dry_run else ""),
+            details={"results": [r.to_dict() for r in results]},
+        )
         
     except Exception as e:
         return StepResult.now(name="docker_removal", status="Error", message=f"Docker removal failed: {str(e)}")
+
+
+def _handle_compact_disks():
+    """Show reclaimable space per WSL disk, then trim, shut down and compact on confirmation."""
+    try:
+        import questionary  # type: ignore
+
+        render_header("Compact WSL Disks", icon="💽", icon_color=get_icon_color("💽"))
+        print("Measuring WSL disks...")
+        # preview and run use one threshold, so every disk shown as worth compacting is compacted
+        preview = compact_disks(dry_run=True, min_reclaim_bytes=MIN_RECLAIM_BYTES)
+        for r in preview:
+            print(f"• {r.name.split(':', 1)[-1]}: {r.message}")
+        worth = [r.details["distro"] for r in preview
+                 if r.details and (r.details.get("reclaimable_bytes") is None
+                                   or r.details["reclaimable_bytes"] >= MIN_RECLAIM_BYTES)]
+        if not worth:
+            return StepResult.now(name="compact_wsl", status="Skipped", message="Nothing to compact")
+        print()
+        print("⚠️  All WSL distros (and Docker Desktop) will be shut down while disks are compacted.")
+        if not questionary.confirm("Compact these disks now?", default=False).ask():
+            return StepResult.now(name="compact_wsl", status="Cancelled", message="Compaction cancelled by user")
+
+        def _print_step(event, event_type):
+            if event_type == "step-end":
+                print(f"  {event['step_id']}: {event.get('status')}")
+
+        results = compact_disks(distros=worth, dry_run=False, yes=True, min_reclaim_bytes=MIN_RECLAIM_BYTES,
+                                progress_cb=_print_step)
+        reclaimed = sum((r.details or {}).get("reclaimed_bytes") or 0 for r in results)
+        failed = [r for r in results if r.status == "Failed"]
+        for r in results:
+            print(f"• {r.name.split(':', 1)[-1]}: {r.message}")
+        return StepResult.now(name="compact_wsl", status="Failed" if failed else "Success",
+                              message=f"Reclaimed {reclaimed / (1 << 30):.1f} GiB",
+                              details={"results": [r.to_dict() for r in results]})
+    except Exception as e:
+        return StepResult.now(name="compact_wsl", status="Error", message=f"Compaction failed: {str(e)}")
@@ -0,0 +1,225 @@
+"""Compact WSL virtual disks (ext4.vhdx) to give freed space back to Windows.
+
+A vhdx only grows: files deleted inside a distro leave the disk file as large as
+it ever was. Compaction:
+
+1. locates each distro's disk (registry BasePath) and measures reclaimable space
+   as the file size minus the bytes used inside the distro (``df``);
+2. runs ``fstrim`` in each distro so freed blocks are marked unused;
+3. shuts WSL down once (disks must be detached);
+4. compacts every disk in one elevated batch (``tools/protect/compact_vhdx.ps1``
+   through the elevation broker);
+5. reports the bytes actually reclaimed per distro.
+
+Candidates are processed in order of expected savings, and disks with less than
+`min_reclaim_bytes` to gain are skipped. All commands go through a CommandRunner
+and the compaction through a callable, so tests use fakes.
+"""
+import json
+import os
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from step_result import StepResult
+from install.convergence import CommandRunner, run_command
+
+REPO_ROOT = os.path.dirname(src_path)
+COMPACT_SCRIPT = os.path.join(REPO_ROOT, "tools", "protect", "compact_vhdx.ps1")
+MIN_RECLAIM_BYTES = 512 << 20
+
+LOCATE_SCRIPT = (
+    "Get-ChildItem HKCU:\\Software\\Microsoft\\Windows\\CurrentVersion\\Lxss | ForEach-Object { "
+    "$p = Get-ItemProperty $_.PSPath; "
+    "[pscustomobject]@{ name = $p.DistributionName; path = (Join-Path $p.BasePath 'ext4.vhdx') } "
+    "} | ConvertTo-Json -Compress"
+)
+
+# Compactor: called as compact([(step_id, vhdx_path), ...], progress_cb=...) and returns one StepResult per entry.
+Compactor = Callable[..., List[StepResult]]
+
+
+@dataclass
+class DiskCandidate:
+    """A distro's disk and what compacting it is expected to reclaim."""
+    distro: str
+    path: str
+    file_bytes: int
+    used_bytes: Optional[int] = None
+
+    @property
+    def reclaimable(self) -> Optional[int]:
+        if self.used_bytes is None:
+            return None
+        return max(0, self.file_bytes - self.used_bytes)
+
+
+def _human(n: Optional[int]) -> str:
+    if n is None:
+        return "unknown"
+    return f"{n / (1 << 30):.1f} GiB"
+
+
+def locate_disks(run: CommandRunner = run_command) -> Dict[str, str]:
+    """Return {distro: vhdx path} from the per-user WSL registry."""
+    code, out = run(["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", LOCATE_SCRIPT])
+    if code != 0 or not out.strip():
+        return {}
+    data = json.loads(out)
+    if isinstance(data, dict):
+        data = [data]  # ConvertTo-Json unrolls single-element arrays
+    return {d["name"]: d["path"] for d in data if d.get("name") and d.get("path")}
+
+
+def _used_bytes(distro: str, run: CommandRunner, wsl_exe: str) -> Optional[int]:
+    code, out = run([wsl_exe, "-d", distro, "-u", "root", "--", "df", "-B1", "--output=used", "/"])
+    if code != 0:
+        return None
+    for line in reversed(out.splitlines()):
+        if line.strip().isdigit():
+            return int(line.strip())
+    return None
+
+
+def measure(disks: Dict[str, str], run: CommandRunner = run_command, wsl_exe: str = "wsl.exe",
+            size_of: Callable[[str], int] = os.path.getsize) -> List[DiskCandidate]:
+    """Measure every disk; candidates are ordered by expected savings (unknown last)."""
+    candidates = []
+    for distro, path in disks.items():
+        try:
+            file_bytes = size_of(path)
+        except OSError:
+            continue  # disk moved or distro half-removed
+        candidates.append(DiskCandidate(distro, path, file_bytes, _used_bytes(distro, run, wsl_exe)))
+    candidates.sort(key=lambda c: (c.reclaimable is None, -(c.reclaimable or 0), -c.file_bytes))
+    return candidates
+
+
+def compact_elevated(jobs: List[Any], progress_cb=None) -> List[StepResult]:
+    """Default Compactor: one elevated broker batch running compact_vhdx.ps1 per disk."""
+    from elevation_broker import BrokerDeclined, BrokerError, BrokerOp, ElevationBroker
+    ops = [BrokerOp(step_id, script=COMPACT_SCRIPT, args=["-Path", path]) for step_id, path in jobs]
+    try:
+        return ElevationBroker().run_batch(ops, progress_cb=progress_cb)
+    except BrokerDeclined as e:
+        return [StepResult.now(name=step_id, status="Cancelled", message="Elevation declined", error=e)
+                for step_id, _ in jobs]
+    except BrokerError as e:
+        return [StepResult.now(name=step_id, status="Failed", message="Elevation failed", error=e)
+                for step_id, _ in jobs]
+
+
+def _emit(progress_cb, event: Dict[str, Any], event_type: str) -> None:
+    if not progress_cb:
+        return
+    try:
+        progress_cb(event, event_type)
+    except Exception:
+        # never let UI callback failures abort the compaction
+        pass
+
+
+def compact_disks(distros: Optional[Sequence[str]] = None, dry_run: bool = True, yes: bool = False,
+                  min_reclaim_bytes: int = MIN_RECLAIM_BYTES, run: CommandRunner = run_command,
+                  compact: Optional[Compactor] = None, size_of: Callable[[str], int] = os.path.getsize,
+                  disks: Optional[Dict[str, str]] = None, wsl_exe: str = "wsl.exe",
+                  progress_cb=None) -> List[StepResult]:
+    """Measure, trim and compact WSL disks; one ``compact_wsl:<distro>`` StepResult per disk.
+
+    Args:
+        distros: Limit to these distros (default: all with a disk).
+        dry_run: Report expected savings only.
+        yes: Required to shut WSL down and compact.
+        min_reclaim_bytes: Skip disks expected to gain less than this.
+        run: CommandRunner for wsl/powershell commands.
+        compact: Compactor for the elevated step (default: `compact_elevated`).
+        size_of: File size function (tests substitute a fake).
+        disks: Pre-located {distro: vhdx path}; located from the registry when None.
+        wsl_exe: The `wsl` executable.
+        progress_cb: Optional ``progress_cb(event, event_type)``.
+    """
+    disks = locate_disks(run) if disks is None else dict(disks)
+    if distros is not None:
+        disks = {d: p for d, p in disks.items() if d in set(distros)}
+    if not disks:
+        return [StepResult.now(name="compact_wsl", status="Skipped", message="No WSL disks found")]
+
+    results: Dict[str, StepResult] = {}
+    todo: List[DiskCandidate] = []
+    candidates = measure(disks, run, wsl_exe, size_of)
+    for cand in candidates:
+        step_id = f"compact_wsl:{cand.distro}"
+        details = {"distro": cand.distro, "path": cand.path, "file_bytes": cand.file_bytes,
+                   "used_bytes": cand.used_bytes, "reclaimable_bytes": cand.reclaimable}
+        res = None
+        if cand.reclaimable is not None and cand.reclaimable < min_reclaim_bytes:
+            res = StepResult.now(name=step_id, status="Skipped",
+                                 message=f"Only {_human(cand.reclaimable)} reclaimable", details=details)
+        elif dry_run:
+            res = StepResult.now(name=step_id, status="Skipped",
+                                 message=f"Dry-run: would compact {cand.path} (~{_human(cand.reclaimable)})",
+                                 details=details)
+        elif not yes:
+            res = StepResult.now(name=step_id, status="Skipped", message="Requires -Yes", details=details)
+        if res is not None:
+            _emit(progress_cb, {"step_id": step_id, "name": step_id}, "step-start")
+            _emit(progress_cb, {"step_id": step_id, "status": res.status}, "step-end")
+            results[cand.distro] = res
+        else:
+            todo.append(cand)
+    if todo:
+        results.update(_compact(todo, run, compact or compact_elevated, size_of, wsl_exe, progress_cb))
+    return [results[c.distro] for c in candidates]
+
+
+def _compact(todo: List[DiskCandidate], run: CommandRunner, compact: Compactor, size_of, wsl_exe: str,
+             progress_cb) -> Dict[str, StepResult]:
+    for cand in todo:
+        _emit(progress_cb, {"step_id": f"compact_wsl:{cand.distro}", "name": f"compact_wsl:{cand.distro}",
+                            "reclaimable_bytes": cand.reclaimable}, "step-start")
+    # trim first so the blocks freed inside each distro are unused in the disk file
+    trimmed = {}
+    for cand in todo:
+        code, out = run([wsl_exe, "-d", cand.distro, "-u", "root", "--", "fstrim", "-av"])
+        trimmed[cand.distro] = out.strip() if code == 0 else f"fstrim failed: {out.strip() or code}"
+
+    results: Dict[str, StepResult] = {}
+    code, out = run([wsl_exe, "--shutdown"])
+    if code != 0:
+        for cand in todo:
+            results[cand.distro] = StepResult.now(name=f"compact_wsl:{cand.distro}", status="Failed",
+                                                  message="wsl --shutdown failed", error=out.strip() or f"exit {code}",
+                                                  details={"reclaimable_bytes": cand.reclaimable})
+    else:
+        def _forward(event, event_type):
+            # per-disk start/end are reported here, after the reclaimed bytes are known
+            if event_type not in ("step-start", "step-end"):
+                _emit(progress_cb, event, event_type)
+
+        outcomes = compact([(f"compact_wsl:{c.distro}", c.path) for c in todo], progress_cb=_forward)
+        for cand, outcome in zip(todo, outcomes):
+            step_id = f"compact_wsl:{cand.distro}"
+            try:
+                after = size_of(cand.path)
+            except OSError:
+                after = cand.file_bytes
+            reclaimed = max(0, cand.file_bytes - after)
+            details = {"distro": cand.distro, "path": cand.path, "file_bytes": cand.file_bytes, "after_bytes": after,
+                       "reclaimed_bytes": reclaimed, "reclaimable_bytes": cand.reclaimable,
+                       "fstrim": trimmed[cand.distro]}
+            if outcome.status == "Success":
+                results[cand.distro] = StepResult.now(name=step_id, status="Success",
+                                                      message=f"Reclaimed {_human(reclaimed)}", details=details)
+            else:
+                results[cand.distro] = StepResult.now(name=step_id, status="Failed", message=outcome.message,
+                                                      error=outcome.error, details=details)
+    for cand in todo:
+        res = results[cand.distro]
+        _emit(progress_cb, {"step_id": res.name, "status": res.status,
+                            "reclaimed_bytes": (res.details or {}).get("reclaimed_bytes")}, "step-end")
+    return results
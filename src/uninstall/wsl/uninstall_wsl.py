@@ -1,7 +1,114 @@
-"""Placeholder for src/uninstall/wsl/Uninstall-WSL.ps1"""
+"""WSL removal: the legacy single step plus per-distro concurrent unregistration.
+
+`unregister_distros` enumerates the registered distros (or takes a selection),
+shuts WSL down once, then unregisters the distros on a bounded worker pool. Each
+distro is its own step (``unregister_wsl:<distro>``) with its own step-start /
+step-end events and StepResult. With `export_dir`, a distro is exported first by
+the same worker that unregisters it, and is only unregistered if the export
+succeeded.
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Add parent src directory to path for imports
+src_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
 from step_result import StepResult
+from backup.wsl.export_distro import export_distro, list_distros
+from install.convergence import CommandRunner, run_command
+
+# distros Docker Desktop creates for itself; unregistering them breaks Docker Desktop
+DOCKER_DESKTOP_DISTROS = frozenset({"docker-desktop", "docker-desktop-data"})
+
 
 def unregister_wsl(yes: bool = False):
     if not yes:
         return StepResult.now(name="unregister_wsl", status="Skipped", message="Requires -Yes")
     return StepResult.now(name="unregister_wsl", status="Success", message="MOCK: unregistered WSL distros (no-op)")
+
+
+def _emit(progress_cb, event: Dict[str, Any], event_type: str) -> None:
+    if not progress_cb:
+        return
+    try:
+        progress_cb(event, event_type)
+    except Exception:
+        # never let UI callback failures abort the removal
+        pass
+
+
+def unregister_distros(distros: Optional[Sequence[str]] = None, yes: bool = False, dry_run: bool = True,
+                       max_concurrent: int = 4, export_dir: Optional[str] = None, wsl_exe: str = "wsl.exe",
+                       run: CommandRunner = run_command, progress_cb=None,
+                       exporter: Callable[..., StepResult] = export_distro) -> List[StepResult]:
+    """Unregister distros concurrently, one StepResult per distro.
+
+    Args:
+        distros: Distros to remove (default: every registered distro).
+        yes: Required to actually unregister.
+        dry_run: Report what would be removed without changing anything.
+        max_concurrent: Distros processed at the same time.
+        export_dir: Export each distro here before unregistering it.
+        wsl_exe: The `wsl` executable.
+        run: CommandRunner for wsl commands (tests substitute a fake).
+        progress_cb: Optional ``progress_cb(event, event_type)``.
+        exporter: Export implementation (default: backup.wsl.export_distro).
+    """
+    if distros is None:
+        distros = list_distros(wsl_exe)
+    distros = list(distros)
+    if not distros:
+        return [StepResult.now(name="unregister_wsl", status="Skipped", message="No WSL distros registered")]
+
+    if dry_run or not yes:
+        results = []
+        for distro in distros:
+            step_id = f"unregister_wsl:{distro}"
+            _emit(progress_cb, {"step_id": step_id, "name": step_id}, "step-start")
+            if dry_run:
+                what = f"export to {export_dir} and unregister" if export_dir else "unregister"
+                res = StepResult.now(name=step_id, status="Skipped", message=f"Dry-run: would {what} {distro}")
+            else:
+                res = StepResult.now(name=step_id, status="Skipped", message="Requires -Yes")
+            _emit(progress_cb, {"step_id": step_id, "status": res.status}, "step-end")
+            results.append(res)
+        return results
+
+    # one shutdown for the whole batch instead of one per distro
+    code, out = run([wsl_exe, "--shutdown"])
+    if code != 0:
+        return [StepResult.now(name="wsl_shutdown", status="Failed", message="wsl --shutdown failed",
+                               error=out.strip() or f"exit {code}")]
+
+    def _remove(distro: str) -> StepResult:
+        step_id = f"unregister_wsl:{distro}"
+        _emit(progress_cb, {"step_id": step_id, "name": step_id}, "step-start")
+        details: Dict[str, Any] = {"distro": distro}
+        try:
+            if export_dir:
+                exported = exporter(distro, export_dir, wsl_exe=wsl_exe, progress_cb=progress_cb)
+                details["export"] = exported.details
+                if exported.status != "Success":
+                    res = StepResult.now(name=step_id, status="Failed", message="Pre-export failed; not unregistered",
+                                         error=exported.error or exported.message, details=details)
+                    return res
+            code, out = run([wsl_exe, "--unregister", distro])
+            if code == 0:
+                res = StepResult.now(name=step_id, status="Success", message=f"Unregistered {distro}", details=details)
+            else:
+                res = StepResult.now(name=step_id, status="Failed", message=f"wsl --unregister {distro} failed",
+                                     error=out.strip() or f"exit {code}", details=details)
+            return res
+        except Exception as e:
+            res = StepResult.now(name=step_id, status="Failed", message="Exception during unregister", error=e,
+                                 details=details)
+            return res
+        finally:
+            _emit(progress_cb, {"step_id": step_id, "status": res.status}, "step-end")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent)) as pool:
+        return list(pool.map(_remove, distros))
@@ -0,0 +1,62 @@
+import os
+import sys
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.catalog import Catalog, catalog_path_for
+from backup.backup_pipeline import run_backup
+
+
+def test_batched_entries_are_flushed_per_batch(tmp_path):
+    with Catalog(str(tmp_path / 'c.sqlite3'), batch_size=100) as cat:
+        run_id = cat.begin_run('volumes', 'v.farc', {'volumes': '/data'})
+        cat.add_entries(run_id, ({'path': f'volumes/f{i:04d}', 'size': i, 'sha256': 'x'} for i in range(250)))
+        # two full batches written, the remainder is still buffered
+        assert len(cat.entries(run_id)) == 200
+        cat.finish_run(run_id, 'Success', files=250, bytes_total=sum(range(250)))
+        assert len(cat.entries(run_id)) == 250
+        run = cat.runs()[0]
+        assert run['scope'] == 'volumes' and run['files'] == 250 and run['sources'] == {'volumes': '/data'}
+
+
+def test_search_and_snapshot_listing(tmp_path):
+    with Catalog(str(tmp_path / 'c.sqlite3')) as cat:
+        first = cat.begin_run('config', 'a.farc')
+        cat.add_entries(first, [{'path': 'docker-config/daemon.json', 'size': 10}, {'path': 'docker-config/config.json', 'size': 20}])
+        cat.finish_run(first, 'Success')
+        second = cat.begin_run('config', 'b.farc')
+        cat.add_entries(second, [{'path': 'docker-config/daemon.json', 'size': 11}])
+        cat.finish_run(second, 'Success')
+        failed = cat.begin_run('full', 'c.farc')
+        cat.add_entries(failed, [{'path': 'docker-config/daemon.json', 'size': 12}])
+        cat.finish_run(failed, 'Failed')
+
+        assert [r['id'] for r in cat.runs()] == [second, first]
+        assert [r['id'] for r in cat.runs(status=None)][0] == failed
+        hits = cat.search('daemon.json')
+        assert [h['archive'] for h in hits] == ['b.farc', 'a.farc']
+        assert [h['path'] for h in cat.search('*/config.*')] == ['docker-config/config.json']
+        assert cat.search('daemon', run_id=first)[0]['size'] == 10
+        # wildcard patterns match anywhere in the path, like plain ones
+        assert [h['archive'] for h in cat.search('daemon*')] == ['b.farc', 'a.farc']
+        assert [h['archive'] for h in cat.search('daemon.json', status=None)][0] == 'c.farc'
+        # LIKE metacharacters in the pattern are literal
+        assert cat.search('daemon%') == []
+
+
+def test_run_backup_records_catalog(tmp_path):
+    src = tmp_path / 'src'
+    (src / 'sub').mkdir(parents=True)
+    (src / 'a.txt').write_text('a')
+    (src / 'sub' / 'b.txt').write_text('bb')
+    out = tmp_path / 'out'
+    res = run_backup('config', str(out), sources={'docker-config': str(src)})
+    assert res.status == 'Success'
+    with Catalog(catalog_path_for(str(out))) as cat:
+        runs = cat.runs(scope='config')
+        assert len(runs) == 1 and runs[0]['id'] == res.details['catalog_run']
+        assert runs[0]['archive'] == res.details['archive'] and runs[0]['bytes'] == 3
+        assert [e['path'] for e in cat.entries(runs[0]['id'])] == ['docker-config/a.txt', 'docker-config/sub/b.txt']
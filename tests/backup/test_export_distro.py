@@ -0,0 +1,111 @@
+import gzip
+import io
+import json
+import os
+import stat
+import sys
+import tarfile
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.wsl.export_distro import MemoryBudget, export_distro, export_distros, list_distros, verify_parts
+
+FAKE_WSL = '''#!{python}
+import io, random, sys, tarfile
+args = sys.argv[1:]
+if args[:2] == ['-l', '-q']:
+    sys.stdout.buffer.write('\\ufeffUbuntu\\r\\ndocker-desktop\\r\\n'.encode('utf-16-le'))
+    sys.exit(0)
+distro = args[1]
+if distro == 'Broken':
+    sys.stderr.write('There is no distribution with the supplied name.')
+    sys.exit(1)
+rnd = random.Random(distro)
+with tarfile.open(fileobj=sys.stdout.buffer, mode='w|') as tar:
+    for i in range(4):
+        data = bytes(rnd.getrandbits(8) for _ in range(60_000)) + bytes(60_000)
+        info = tarfile.TarInfo(f'{{distro}}/file{{i}}.bin')
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+'''
+
+
+@pytest.fixture
+def fake_wsl(tmp_path):
+    if os.name == 'nt':
+        pytest.skip('fake wsl executable relies on a shebang')
+    path = tmp_path / 'wsl'
+    path.write_text(FAKE_WSL.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def _reassemble(manifest_path):
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    folder = os.path.dirname(manifest_path)
+    blob = b''.join(open(os.path.join(folder, p['name']), 'rb').read() for p in manifest['parts'])
+    return manifest, gzip.decompress(blob)
+
+
+def test_list_distros_decodes_utf16(fake_wsl):
+    assert list_distros(fake_wsl) == ['Ubuntu', 'docker-desktop']
+
+
+def test_export_splits_into_checksummed_parts(fake_wsl, tmp_path):
+    events = []
+    res = export_distro('Ubuntu', str(tmp_path / 'out'), part_size=32 << 10, chunk_size=64 << 10,
+                        wsl_exe=fake_wsl, progress_cb=lambda e, t: events.append(t))
+    assert res.status == 'Success'
+    manifest, raw = _reassemble(res.details['manifest'])
+    assert len(manifest['parts']) > 1 and manifest['raw_bytes'] == len(raw)
+    assert all(p['size'] == 32 << 10 for p in manifest['parts'][:-1])
+    with tarfile.open(fileobj=io.BytesIO(raw)) as tar:
+        assert sorted(tar.getnames()) == [f'Ubuntu/file{i}.bin' for i in range(4)]
+    assert verify_parts(res.details['manifest']) == [] and 'step-progress' in events
+
+    first = os.path.join(tmp_path / 'out', manifest['parts'][0]['name'])
+    with open(first, 'r+b') as f:
+        f.write(b'\x00')
+    assert verify_parts(res.details['manifest']) == [manifest['parts'][0]['name']]
+
+
+def test_concurrent_exports_stay_within_budget(fake_wsl, tmp_path, monkeypatch):
+    budgets = []
+    original = MemoryBudget.__init__
+
+    def record(self, limit):
+        original(self, limit)
+        budgets.append(self)
+
+    monkeypatch.setattr(MemoryBudget, '__init__', record)
+    results = export_distros(['Ubuntu', 'docker-desktop'], str(tmp_path / 'out'), max_concurrent=2,
+                             memory_budget=256 << 10, chunk_size=32 << 10, part_size=100 << 10, wsl_exe=fake_wsl)
+    assert [r.status for r in results] == ['Success', 'Success']
+    assert 0 < budgets[0].peak <= 256 << 10 and budgets[0].in_use == 0
+    for r in results:
+        distro = r.details['distro']
+        _, raw = _reassemble(r.details['manifest'])
+        with tarfile.open(fileobj=io.BytesIO(raw)) as tar:
+            assert len(tar.getnames()) == 4 and tar.getnames()[0].startswith(distro)
+
+
+def test_failed_export_leaves_no_parts(fake_wsl, tmp_path):
+    out = tmp_path / 'out'
+    res = export_distro('Broken', str(out), part_size=1 << 10, chunk_size=1 << 10, wsl_exe=fake_wsl)
+    assert res.status == 'Failed' and 'no distribution' in str(res.error)
+    assert os.listdir(out) == []
+
+
+def test_cli_export(fake_wsl, tmp_path, monkeypatch):
+    from backup import backup_orchestrator
+    out = tmp_path / 'out'
+    monkeypatch.setattr(backup_orchestrator, 'export_distros',
+                        lambda distros, dest, **kw: export_distros(distros, dest, wsl_exe=fake_wsl, **kw))
+    assert backup_orchestrator._cli(['export-wsl', 'Ubuntu', '--output', str(out), '--config', str(tmp_path / 'none.json')]) == 0
+    assert any(name.endswith('.manifest.json') for name in os.listdir(out))
@@ -0,0 +1,118 @@
+import os
+import sys
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.frame_archive import FrameArchiveReader, FrameArchiveWriter, FrameArchiveError
+from backup.backup_pipeline import run_backup
+from backup.restore_engine import restore_archive, load_manifest
+from backup import backup_orchestrator
+
+
+def _make_tree(root):
+    files = {
+        'daemon.json': b'{"debug": true}',
+        'big/blob.bin': os.urandom(250_000),
+        'big/zeros.img': bytes(200_000),
+        'nested/deep/a.txt': b'a' * 10,
+    }
+    for name, data in files.items():
+        p = root / name
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(data)
+    return files
+
+
+def test_single_file_read_touches_only_its_frames(tmp_path):
+    src = tmp_path / 'src'
+    files = _make_tree(src)
+    archive = str(tmp_path / 'a.farc')
+    with FrameArchiveWriter(archive, frame_size=64 << 10, workers=3) as w:
+        w.add_directory(str(src))
+    with FrameArchiveReader(archive) as r:
+        assert len(r.index['frames']) > 5
+        touched = []
+        original = r.frame
+        r.frame = lambda i: touched.append(i) or original(i)
+        assert r.read('daemon.json') == files['daemon.json']
+        assert len(touched) == 1
+        for name, data in files.items():
+            assert r.read(name) == data
+
+
+def test_listing_reads_only_the_index(tmp_path):
+    src = tmp_path / 'src'
+    files = _make_tree(src)
+    archive = tmp_path / 'a.farc'
+    with FrameArchiveWriter(str(archive), frame_size=64 << 10) as w:
+        w.add_directory(str(src))
+    # wreck the frame region; the index and footer stay intact
+    raw = bytearray(archive.read_bytes())
+    raw[16:4096] = bytes(4080)
+    archive.write_bytes(bytes(raw))
+    with FrameArchiveReader(str(archive)) as r:
+        assert sorted(e['path'] for e in r.list()) == sorted(files)
+        with pytest.raises(Exception):
+            r.read('big/blob.bin')
+
+
+def test_truncated_archive_is_rejected(tmp_path):
+    archive = tmp_path / 'a.farc'
+    with FrameArchiveWriter(str(archive)) as w:
+        w.add_stream('x', __import__('io').BytesIO(b'data'))
+    archive.write_bytes(archive.read_bytes()[:-4])
+    with pytest.raises(FrameArchiveError):
+        FrameArchiveReader(str(archive))
+
+
+def test_pipeline_backup_and_parallel_restore(tmp_path):
+    src = tmp_path / 'src'
+    files = _make_tree(src)
+    res = run_backup('config', str(tmp_path / 'out'), sources={'docker-config': str(src)})
+    assert res.status == 'Success'
+    archive = res.details['archive']
+    assert archive.endswith('.farc') and res.details['files'] == len(files)
+
+    manifest = load_manifest(archive)
+    assert manifest['scope'] == 'config' and len(manifest['files']) == len(files)
+
+    target = tmp_path / 'restored'
+    report = restore_archive(archive, str(target), workers=3)
+    assert report.ok and report.verified == len(files)
+    for name, data in files.items():
+        assert (target / 'docker-config' / name).read_bytes() == data
+
+
+def test_cli_restore_single_path(tmp_path, capsys):
+    src = tmp_path / 'src'
+    files = _make_tree(src)
+    res = run_backup('config', str(tmp_path / 'out'), sources={'docker-config': str(src)})
+    dest = tmp_path / 'daemon.json'
+    rc = backup_orchestrator._cli(['restore', res.details['archive'], '--path', 'docker-config/daemon.json', '--target', str(dest)])
+    assert rc == 0
+    assert dest.read_bytes() == files['daemon.json']
+    assert backup_orchestrator._cli(['list', res.details['archive']]) == 0
+    assert 'docker-config/nested/deep/a.txt' in capsys.readouterr().out
+
+
+def test_corrupt_single_path_restore_leaves_the_live_file(tmp_path, monkeypatch, capsys):
+    src = tmp_path / 'src'
+    _make_tree(src)
+    res = run_backup('config', str(tmp_path / 'out'), sources={'docker-config': str(src)})
+    live = tmp_path / 'live'
+    live.mkdir()
+    dest = live / 'daemon.json'
+    dest.write_bytes(b'{"live": true}')
+    monkeypatch.setattr(FrameArchiveReader, 'iter_range', lambda self, offset, size: iter([b'x' * size]))
+    rc = backup_orchestrator._cli(['restore', res.details['archive'], '--path', 'docker-config/daemon.json',
+                                   '--target', str(dest)])
+    assert rc == 1 and 'Checksum mismatch' in capsys.readouterr().out
+    assert dest.read_bytes() == b'{"live": true}' and os.listdir(live) == ['daemon.json']
+    rc = backup_orchestrator._cli(['restore', res.details['archive'], '--path', 'docker-config/missing.json',
+                                   '--target', str(dest)])
+    assert rc == 1 and 'Path not in archive' in capsys.readouterr().out
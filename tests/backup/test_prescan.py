@@ -0,0 +1,84 @@
+import os
+import sys
+import threading
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.prescan import ProgressMeter, ScanCache, ScanCancelled, prescan
+from backup.backup_pipeline import run_backup
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'data'
+    for d in range(5):
+        sub = root / f'd{d}' / 'inner'
+        sub.mkdir(parents=True)
+        for f in range(4):
+            (sub / f'f{f}.bin').write_bytes(b'x' * (1000 * (f + 1)))
+    return root
+
+
+def test_prescan_counts_per_source(tree, tmp_path):
+    result = prescan({'a': str(tree / 'd0'), 'b': str(tree), 'gone': str(tmp_path / 'missing')}, workers=4)
+    assert result.per_source['a'] == {'files': 4, 'bytes': 10_000}
+    assert result.per_source['b'] == {'files': 20, 'bytes': 50_000}
+    assert result.per_source['gone'] == {'files': 0, 'bytes': 0}
+    assert result.files == 24 and result.bytes == 60_000
+
+
+def test_cache_reuses_unchanged_directories(tree, tmp_path):
+    cache_path = str(tmp_path / 'cache.json')
+    first = prescan({'data': str(tree)}, cache=ScanCache(cache_path))
+    assert first.cached_dirs == 0
+    second = prescan({'data': str(tree)}, cache=ScanCache(cache_path))
+    assert second.cached_dirs == second.dirs and second.bytes == first.bytes
+
+    (tree / 'd1' / 'inner' / 'new.bin').write_bytes(b'y' * 500)
+    third = prescan({'data': str(tree)}, cache=ScanCache(cache_path))
+    assert third.cached_dirs == third.dirs - 1 and third.bytes == first.bytes + 500
+
+
+def test_prescan_is_cancellable(tree):
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(ScanCancelled):
+        prescan({'data': str(tree)}, cancel=cancel)
+
+
+def test_progress_meter_throughput_and_eta():
+    now = [0.0]
+    events = []
+    meter = ProgressMeter(1000, 'step', lambda e, t: events.append(e), alpha=0.5, interval=1.0, clock=lambda: now[0])
+    for _ in range(4):
+        now[0] += 1.0
+        meter.advance(100)
+    assert events[-1]['throughput_bps'] == 100 and events[-1]['eta_seconds'] == 6.0
+    now[0] += 1.0
+    meter.advance(300)  # speed-up moves the average half-way
+    assert events[-1]['throughput_bps'] == 200 and events[-1]['eta_seconds'] == 1.5
+    assert events[-1]['percent'] == 70.0
+
+
+def test_backup_emits_progress_and_can_be_cancelled(tree, tmp_path):
+    events = []
+    res = run_backup('volumes', str(tmp_path / 'out'), sources={'volumes': str(tree)},
+                     progress_cb=lambda e, t: events.append(e))
+    assert res.status == 'Success' and res.details['prescan']['bytes'] == 50_000
+    final = events[-1]
+    assert final['bytes_done'] == final['bytes_total'] == 50_000 and final['eta_seconds'] in (0.0, None)
+
+    cancel = threading.Event()
+
+    def cancel_on_first(event, event_type):
+        cancel.set()
+
+    out = tmp_path / 'out2'
+    res = run_backup('volumes', str(out), sources={'volumes': str(tree)}, progress_cb=cancel_on_first, cancel=cancel)
+    assert res.status == 'Cancelled'
+    assert not [n for n in os.listdir(out) if n.endswith('.farc')]
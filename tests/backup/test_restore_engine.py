@@ -0,0 +1,153 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.backup_pipeline import run_backup
+from backup.restore_engine import RestoreError, find_latest_archive, restore_archive, restore_sources
+from backup import backup_orchestrator
+
+
+FILES = {
+    'config/daemon.json': b'{"log-driver": "json-file"}',
+    'volumes/db/data.bin': os.urandom(300_000),
+    'volumes/db/zeros.img': b'head' + bytes(2 << 20) + b'tail',
+    'empty.txt': b'',
+}
+
+
+def _build_archive(tmp_path, suffix='.tar', mode='w', corrupt=None):
+    archive = tmp_path / f'backup{suffix}'
+    with tarfile.open(archive, mode) as tf:
+        for name, data in FILES.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            tf.addfile(info, io.BytesIO(data))
+    digests = {name: hashlib.sha256(data).hexdigest() for name, data in FILES.items()}
+    if corrupt:
+        digests[corrupt] = '0' * 64
+    manifest = {'source': str(tmp_path / 'live'), 'files': digests}
+    (tmp_path / f'backup{suffix}.manifest.json').write_text(json.dumps(manifest))
+    return str(archive)
+
+
+def _assert_restored(root):
+    for name, data in FILES.items():
+        assert (root / name).read_bytes() == data
+
+
+def test_parallel_restore_verifies_and_swaps(tmp_path):
+    archive = _build_archive(tmp_path)
+    live = tmp_path / 'live'
+    live.mkdir()
+    (live / 'stale.txt').write_text('old')
+
+    events = []
+    report = restore_archive(archive, str(live), workers=4, progress_cb=lambda e, t: events.append(t))
+
+    assert report.ok and report.swapped
+    assert report.verified == len(FILES) and report.unverified == 0
+    _assert_restored(live)
+    assert not (live / 'stale.txt').exists()
+    # zero blocks are skipped rather than written
+    assert report.hole_bytes >= 1 << 20
+    assert report.bytes_written + report.hole_bytes == sum(len(d) for d in FILES.values())
+    assert events and set(events) == {'step-progress'}
+    assert not [p for p in os.listdir(tmp_path) if 'staging' in p or 'pre-restore' in p]
+
+
+def test_mismatch_leaves_live_tree_untouched(tmp_path):
+    archive = _build_archive(tmp_path, corrupt='config/daemon.json')
+    live = tmp_path / 'live'
+    live.mkdir()
+    (live / 'keep.txt').write_text('current')
+
+    report = restore_archive(archive, str(live))
+
+    assert not report.ok and report.mismatches == ['config/daemon.json']
+    assert report.to_step_result().status == 'Failed'
+    assert (live / 'keep.txt').read_text() == 'current'
+    assert not [p for p in os.listdir(tmp_path) if 'staging' in p]
+
+
+def test_compressed_archive_streams(tmp_path):
+    archive = _build_archive(tmp_path, suffix='.tar.gz', mode='w:gz')
+    target = tmp_path / 'out'
+    report = restore_archive(archive, str(target), staging=False)
+    assert report.ok and report.verified == len(FILES)
+    _assert_restored(target)
+
+
+def test_rejects_path_traversal(tmp_path):
+    archive = tmp_path / 'evil.tar'
+    with tarfile.open(archive, 'w') as tf:
+        info = tarfile.TarInfo('../escape.txt')
+        info.size = 1
+        tf.addfile(info, io.BytesIO(b'x'))
+    with pytest.raises(Exception):
+        restore_archive(str(archive), str(tmp_path / 'live'))
+    assert not (tmp_path / 'escape.txt').exists()
+
+
+def test_find_latest_archive(tmp_path):
+    assert find_latest_archive(str(tmp_path)) is None
+    archive = _build_archive(tmp_path)
+    assert find_latest_archive(str(tmp_path)) == archive
+
+
+def _multi_source_backup(tmp_path):
+    roots = {'docker-config': tmp_path / 'home' / '.docker', 'docker-data': tmp_path / 'data' / 'docker'}
+    (roots['docker-config'] / 'contexts').mkdir(parents=True)
+    (roots['docker-config'] / 'config.json').write_text('{"auths": {}}')
+    (roots['docker-config'] / 'contexts' / 'meta.json').write_text('{}')
+    (roots['docker-data'] / 'volumes').mkdir(parents=True)
+    (roots['docker-data'] / 'volumes' / 'db.bin').write_bytes(os.urandom(100_000))
+    originals = {label: {p.relative_to(root).as_posix(): p.read_bytes() for p in root.rglob('*') if p.is_file()}
+                 for label, root in roots.items()}
+    res = run_backup('full', str(tmp_path / 'out'), sources={k: str(v) for k, v in roots.items()})
+    assert res.status == 'Success'
+    for root in roots.values():
+        (root / 'stale.txt').write_text('written after the backup')
+    return res.details['archive'], roots, originals
+
+
+def test_multi_source_archive_round_trips_into_each_recorded_root(tmp_path):
+    archive, roots, originals = _multi_source_backup(tmp_path)
+    (tmp_path / 'home' / 'keep.txt').write_text('sibling of a source root')
+
+    reports = restore_sources(archive)
+
+    assert set(reports) == set(roots) and all(r.ok and r.swapped for r in reports.values())
+    for label, root in roots.items():
+        restored = {p.relative_to(root).as_posix(): p.read_bytes() for p in root.rglob('*') if p.is_file()}
+        assert restored == originals[label]
+    assert (tmp_path / 'home' / 'keep.txt').read_text() == 'sibling of a source root'
+
+
+def test_multi_source_archive_is_not_swapped_over_one_target(tmp_path):
+    archive, roots, _ = _multi_source_backup(tmp_path)
+    with pytest.raises(RestoreError):
+        restore_archive(archive, str(roots['docker-config']))
+    assert (roots['docker-config'] / 'config.json').exists() and (roots['docker-config'] / 'stale.txt').exists()
+
+
+def test_cli_restores_multi_source_archive_per_label(tmp_path):
+    archive, roots, originals = _multi_source_backup(tmp_path)
+    elsewhere = tmp_path / 'elsewhere'
+    rc = backup_orchestrator._cli(['restore', archive, '--target', str(tmp_path / 'restored'),
+                                   '--map', f'docker-data={elsewhere}'])
+    assert rc == 0
+    assert (tmp_path / 'restored' / 'docker-config' / 'config.json').read_text() == '{"auths": {}}'
+    assert (elsewhere / 'volumes' / 'db.bin').read_bytes() == originals['docker-data']['volumes/db.bin']
+    # recorded roots were not touched
+    assert (roots['docker-data'] / 'stale.txt').exists()
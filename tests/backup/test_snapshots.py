@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.snapshots import RetentionPolicy, create_snapshot, list_snapshots, plan_retention, prune_snapshots
+from backup import backup_orchestrator
+
+NOW = datetime(2026, 3, 18, 12, 30)  # a Wednesday
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    root = tmp_path / 'config'
+    (root / 'nested').mkdir(parents=True)
+    for i in range(20):
+        (root / 'nested' / f'c{i}.json').write_text(f'{{"n": {i}}}')
+    (root / 'daemon.json').write_text('{}')
+    return root
+
+
+def test_unchanged_files_are_hardlinked(config_dir, tmp_path):
+    snaps = tmp_path / 'snaps'
+    first = create_snapshot({'docker': str(config_dir)}, str(snaps), now=NOW)
+    assert first.status == 'Success' and first.details['copied'] == 21
+
+    (config_dir / 'daemon.json').write_text('{"debug": true}')
+    second = create_snapshot({'docker': str(config_dir)}, str(snaps), now=NOW + timedelta(hours=1))
+    assert second.details['linked'] == 20 and second.details['copied'] == 1
+
+    old, new = (p for _, p in list_snapshots(str(snaps)))
+    same = os.path.join('docker', 'nested', 'c0.json')
+    assert os.path.samefile(os.path.join(old, same), os.path.join(new, same))
+    with open(os.path.join(old, 'docker', 'daemon.json')) as f:
+        assert f.read() == '{}'  # earlier point in time is untouched
+    with open(os.path.join(new, 'docker', 'daemon.json')) as f:
+        assert f.read() == '{"debug": true}'
+
+
+@pytest.mark.parametrize('policy, expected', [
+    # 48 hourly snapshots; daily buckets add the newest of each older day
+    (RetentionPolicy(hourly=24, daily=0, weekly=0), 24),
+    (RetentionPolicy(hourly=0, daily=3, weekly=0), 3),
+    (RetentionPolicy(hourly=6, daily=3, weekly=0), 6 + 2),
+    (RetentionPolicy(hourly=0, daily=0, weekly=0), 1),
+])
+def test_plan_retention(policy, expected):
+    stamps = [NOW - timedelta(hours=h) for h in range(48)]
+    keep = plan_retention(stamps, NOW, policy)
+    assert len(keep) == expected and NOW in keep
+
+
+def test_prune_removes_expired_and_partials(config_dir, tmp_path):
+    snaps = tmp_path / 'snaps'
+    for days in (20, 10, 2, 1, 0):
+        assert create_snapshot({'docker': str(config_dir)}, str(snaps), now=NOW - timedelta(days=days)).status == 'Success'
+    (snaps / 'stale.partial').mkdir()
+    old = time.time() - 2 * 3600
+    os.utime(snaps / 'stale.partial', (old, old))
+    # a partial another run is still building is left alone
+    (snaps / 'live.partial').mkdir()
+    removed = prune_snapshots(str(snaps), RetentionPolicy(hourly=0, daily=3, weekly=0), now=NOW)
+    assert len(removed) == 2
+    assert sorted(os.listdir(snaps)) == sorted([os.path.basename(p) for _, p in list_snapshots(str(snaps))]
+                                               + ['.trash', 'live.partial'])
+    assert os.listdir(snaps / '.trash') == []
+
+
+def test_cli_snapshot(config_dir, tmp_path):
+    out = tmp_path / 'snaps'
+    assert backup_orchestrator._cli(['snapshot', '--output', str(out), '--only-sources',
+                                     '--source', f'bind-app={config_dir}']) == 0
+    (snap,) = list_snapshots(str(out))
+    assert os.path.isfile(os.path.join(snap[1], 'bind-app', 'daemon.json'))
@@ -0,0 +1,139 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.throttle import (ConfigWatcher, IOThrottle, TokenBucket, background_priority, load_throttle_config,
+                             pool_initializer, MB)
+from backup import backup_orchestrator
+from backup.backup_pipeline import run_backup
+from backup.restore_engine import restore_archive
+
+
+def test_unlimited_bucket_never_sleeps():
+    bucket = TokenBucket(None)
+    assert bucket.consume(10 ** 12) == 0.0
+
+
+def test_bandwidth_limit_delays_and_is_reported():
+    throttle = IOThrottle(max_mbps=20)
+    start = time.monotonic()
+    for _ in range(6):
+        throttle.throttle(MB)
+    elapsed = time.monotonic() - start
+    # 6 MB at 20 MB/s with a 5 MB burst allowance starting empty: ~0.3 s
+    assert 0.2 <= elapsed < 1.5
+    assert throttle.throttled_seconds > 0.15
+    assert throttle.stats()['max_mbps'] == 20
+
+
+def test_iops_limit():
+    throttle = IOThrottle(max_iops=200)
+    start = time.monotonic()
+    for _ in range(60):
+        throttle.throttle(1)
+    assert time.monotonic() - start >= 0.2
+
+
+def test_limit_can_be_lifted_while_waiting():
+    throttle = IOThrottle(max_mbps=0.01)
+    done = threading.Event()
+
+    def work():
+        throttle.throttle(10 * MB)  # ~1000 s at the initial rate
+        done.set()
+
+    threading.Thread(target=work, daemon=True).start()
+    time.sleep(0.1)
+    assert not done.is_set()
+    throttle.update(max_mbps=None)
+    assert done.wait(2)
+
+
+def test_config_watcher_applies_edits(tmp_path):
+    cfg = tmp_path / 'cfg.json'
+    cfg.write_text(json.dumps({'backup': {'max_mbps': 5}}))
+    assert load_throttle_config(str(cfg)) == {'max_mbps': 5}
+    throttle = IOThrottle(max_mbps=5)
+    watcher = ConfigWatcher(str(cfg), throttle)
+    assert not watcher.poll()
+    cfg.write_text(json.dumps({'backup': {'max_mbps': 50, 'max_iops': 10}}))
+    os.utime(cfg, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert watcher.poll()
+    assert throttle.max_mbps == 50 and throttle.max_iops == 10
+
+
+def test_config_edits_keep_command_line_overrides(tmp_path):
+    cfg = tmp_path / 'config.json'
+    cfg.write_text(json.dumps({'backup': {'max_mbps': 5, 'max_iops': 100}}))
+    throttle, watcher = backup_orchestrator._make_throttle(max_mbps=2, config_path=str(cfg))
+    watcher.stop()
+    assert throttle.max_mbps == 2 and throttle.max_iops == 100
+    cfg.write_text(json.dumps({'backup': {'max_mbps': 50, 'max_iops': 10}}))
+    os.utime(cfg, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    assert watcher.poll()
+    assert throttle.max_mbps == 2 and throttle.max_iops == 10
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='per-thread nice values are Linux-only')
+def test_background_priority_lowers_only_the_worker_thread():
+    before = os.getpriority(os.PRIO_PROCESS, 0)
+    seen = {}
+
+    def _worker():
+        with background_priority() as lowered:
+            seen['lowered'] = lowered
+            seen['nice'] = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+
+    th = threading.Thread(target=_worker)
+    th.start()
+    th.join()
+    assert seen['lowered'] and seen['nice'] == 19
+    assert os.getpriority(os.PRIO_PROCESS, 0) == before
+
+    throttle = IOThrottle(low_priority=True)
+    assert backup_orchestrator._run_in_worker(lambda: os.getpriority(os.PRIO_PROCESS, threading.get_native_id()),
+                                              throttle) == 19
+    assert os.getpriority(os.PRIO_PROCESS, 0) == before
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='per-thread nice values are Linux-only')
+def test_low_priority_pools_lower_their_own_threads(tmp_path):
+    before = os.getpriority(os.PRIO_PROCESS, 0)
+    assert pool_initializer(False) is None
+
+    class RecordingThrottle(IOThrottle):
+        def throttle(self, nbytes):
+            self.nice.add(os.getpriority(os.PRIO_PROCESS, threading.get_native_id()))
+            return super().throttle(nbytes)
+
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'blob.bin').write_bytes(os.urandom(MB))
+    res = run_backup('volumes', str(tmp_path / 'out'), sources={'volumes': str(src)})
+    throttle = RecordingThrottle(low_priority=True)
+    throttle.nice = set()
+    # called from this normal-priority thread: only the restore pool's threads are lowered
+    report = restore_archive(res.details['archive'], str(tmp_path / 'restored'), workers=2, throttle=throttle)
+    assert report.ok and throttle.nice == {19}
+    assert os.getpriority(os.PRIO_PROCESS, 0) == before
+
+
+def test_pipelines_report_throttled_time(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'blob.bin').write_bytes(os.urandom(3 * MB))
+    res = run_backup('volumes', str(tmp_path / 'out'), sources={'volumes': str(src)}, throttle=IOThrottle(max_mbps=20))
+    assert res.status == 'Success' and res.details['throttled_seconds'] > 0
+
+    report = restore_archive(res.details['archive'], str(tmp_path / 'restored'), throttle=IOThrottle(max_mbps=20))
+    assert report.ok and report.throttled_seconds > 0
+    assert report.to_step_result().details['throttled_seconds'] > 0
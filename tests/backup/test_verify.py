@@ -0,0 +1,94 @@
+import os
+import sys
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from backup.backup_pipeline import run_backup
+from backup.catalog import Catalog, catalog_path_for
+from backup.frame_archive import FrameArchiveReader
+from backup.merkle import merkle_root, leaf_hash, EMPTY_ROOT
+from backup.verify import verify_archive
+from backup import backup_orchestrator
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    src = tmp_path / 'src'
+    src.mkdir()
+    for i in range(6):
+        (src / f'f{i}.bin').write_bytes(os.urandom(40_000))
+    monkeypatch.setattr('backup.frame_archive.DEFAULT_FRAME_SIZE', 16 << 10)
+    res = run_backup('volumes', str(tmp_path / 'out'), sources={'volumes': str(src)})
+    assert res.status == 'Success'
+    return res
+
+
+def _corrupt_frame(path, i):
+    with FrameArchiveReader(path) as r:
+        coff = r.index['frames'][i][0]
+    with open(path, 'r+b') as f:
+        f.seek(coff + 5)
+        byte = f.read(1)
+        f.seek(coff + 5)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+@pytest.mark.parametrize('leaves, expect_root', [
+    ([], EMPTY_ROOT),
+    ([b'a' * 32], b'a' * 32),
+])
+def test_merkle_edge_cases(leaves, expect_root):
+    assert merkle_root(leaves) == expect_root
+
+
+def test_merkle_root_depends_on_every_leaf():
+    leaves = [leaf_hash(bytes([i])) for i in range(5)]
+    root = merkle_root(leaves)
+    for i in range(5):
+        changed = list(leaves)
+        changed[i] = leaf_hash(b'x')
+        assert merkle_root(changed) != root
+
+
+def test_root_is_stored_with_snapshot_and_full_verify_passes(archive, tmp_path):
+    path = archive.details['archive']
+    with Catalog(catalog_path_for(str(tmp_path / 'out'))) as cat:
+        assert cat.run(archive.details['catalog_run'])['merkle_root'] == archive.details['merkle_root']
+    report = verify_archive(path, expected_root=archive.details['merkle_root'], deep=True, workers=3)
+    assert report.ok and report.frames_checked == report.frames_total > 10
+    assert report.to_step_result().status == 'Success'
+
+
+def test_full_verify_finds_corrupt_frame(archive):
+    path = archive.details['archive']
+    _corrupt_frame(path, 3)
+    report = verify_archive(path, deep=True)
+    assert report.root_ok and report.bad_frames == [3]
+    assert report.bad_files and report.to_step_result().status == 'Failed'
+
+
+def test_quick_verify_checks_a_sample(archive):
+    path = archive.details['archive']
+    report = verify_archive(path, sample=4, seed=1)
+    assert report.ok and report.mode == 'quick' and report.frames_checked == 4
+    _corrupt_frame(path, 0)
+    # sampling every frame must catch it
+    assert verify_archive(path, sample=1.0).bad_frames == [0]
+
+
+def test_expected_root_mismatch_fails(archive):
+    report = verify_archive(archive.details['archive'], expected_root='0' * 64, sample=1)
+    assert not report.root_ok and not report.ok
+
+
+def test_cli_verify_uses_catalog_root(archive):
+    path = archive.details['archive']
+    assert backup_orchestrator._cli(['verify', path]) == 0
+    assert backup_orchestrator._cli(['verify', path, '--quick', '0.5', '--seed', '3']) == 0
+    _corrupt_frame(path, 1)
+    assert backup_orchestrator._cli(['verify', path]) == 1
@@ -0,0 +1,202 @@
+import json
+import os
+import socket
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from cleanup.docker_space import GB, PrunePolicy, SpaceItem, inventory, plan_prune, prune
+import cleanup.engine_api as engine_api
+from cleanup.engine_api import EngineClient
+
+NOW = 1_700_000_000.0
+DAY = 86400
+
+
+def _iso(ts):
+    from datetime import datetime, timezone
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.123456789Z')
+
+
+def _df():
+    return {
+        'Images': [
+            {'Id': 'sha256:app3', 'RepoTags': ['app:3'], 'Created': NOW - 1 * DAY, 'Size': 3 * GB, 'SharedSize': GB},
+            {'Id': 'sha256:app2', 'RepoTags': ['app:2'], 'Created': NOW - 10 * DAY, 'Size': 3 * GB, 'SharedSize': GB},
+            {'Id': 'sha256:app1', 'RepoTags': ['app:1', 'localhost:5000/app:1'], 'Created': NOW - 60 * DAY,
+             'Size': 3 * GB, 'SharedSize': GB},
+            {'Id': 'sha256:db', 'RepoTags': ['db:latest'], 'Created': NOW - 90 * DAY, 'Size': GB, 'SharedSize': 0},
+            {'Id': 'sha256:old', 'RepoTags': ['tool:1'], 'Created': NOW - 90 * DAY, 'Size': GB, 'SharedSize': -1},
+        ],
+        'Containers': [
+            {'Id': 'c-db', 'Names': ['/db'], 'ImageID': 'sha256:db', 'State': 'running', 'Created': NOW - 90 * DAY},
+            {'Id': 'c-tool', 'Names': ['/tool'], 'ImageID': 'sha256:old', 'State': 'exited',
+             'Created': NOW - 80 * DAY, 'SizeRw': 100},
+        ],
+        'Volumes': [
+            {'Name': 'orphan', 'CreatedAt': _iso(NOW - 40 * DAY), 'UsageData': {'Size': 5 * GB, 'RefCount': 0}},
+            {'Name': 'dbdata', 'CreatedAt': _iso(NOW - 90 * DAY), 'UsageData': {'Size': 9 * GB, 'RefCount': 1}},
+        ],
+        'BuildCache': [
+            {'ID': 'bc-old', 'Type': 'regular', 'Size': 2 * GB, 'InUse': False,
+             'CreatedAt': _iso(NOW - 50 * DAY), 'LastUsedAt': _iso(NOW - 45 * DAY)},
+            {'ID': 'bc-busy', 'Type': 'regular', 'Size': 4 * GB, 'InUse': True,
+             'CreatedAt': _iso(NOW - 50 * DAY), 'LastUsedAt': None},
+        ],
+    }
+
+
+class _Engine(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path == '/system/df':
+            return self._reply(200, _df())
+        if url.path == '/containers/c-tool/json':
+            return self._reply(200, {'State': {'FinishedAt': _iso(NOW - 20 * DAY)}})
+        self._reply(404, {'message': 'no such object'})
+
+    def do_DELETE(self):
+        url = urllib.parse.urlparse(self.path)
+        with self.server.lock:
+            self.server.calls.append(('DELETE', url.path, url.query))
+        if url.path == '/images/sha256:app1':
+            return self._reply(409, {'message': 'conflict: image has dependent child images'})
+        self._reply(200, [] if url.path.startswith('/images/') else None)
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        with self.server.lock:
+            self.server.calls.append(('POST', url.path, urllib.parse.unquote_plus(url.query)))
+        self._reply(200, {'CachesDeleted': ['bc-old'], 'SpaceReclaimed': 2 * GB - 7})
+
+
+@pytest.fixture
+def engine():
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Engine)
+    srv.calls, srv.lock = [], threading.Lock()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    client = EngineClient(f'tcp://127.0.0.1:{srv.server_address[1]}')
+    yield srv, client
+    client.close()
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_inventory_sizes_and_last_used(engine):
+    _, client = engine
+    items = {i.key: i for i in inventory(client)}
+    assert ('container', 'c-db') not in items and ('volume', 'dbdata') not in items
+    assert items[('image', 'sha256:app3')].size == 2 * GB  # shared layers are not counted
+    assert items[('image', 'sha256:db')].in_use
+    # the image was last used when its stopped container last ran, not when it was built
+    assert items[('image', 'sha256:old')].last_used == pytest.approx(NOW - 20 * DAY)
+    assert items[('image', 'sha256:app1')].repos == ('app', 'localhost:5000/app')
+    assert items[('build_cache', 'bc-old')].last_used == pytest.approx(NOW - 45 * DAY)
+    assert items[('build_cache', 'bc-busy')].in_use
+
+
+def test_plan_policies(engine):
+    _, client = engine
+    items = inventory(client)
+
+    def ids(policy):
+        return [i.id for i in plan_prune(items, policy, now=NOW).selected]
+
+    # app:1 is also the only image of localhost:5000/app, so it is kept for that repository
+    assert ids(PrunePolicy(keep_per_repo=1)) == ['sha256:app2']
+    assert ids(PrunePolicy(keep_per_repo=1, kinds=('container',))) == []
+    # the unused image stays because its container is newer than the cutoff
+    assert ids(PrunePolicy(unused_days=30)) == ['sha256:app1', 'orphan', 'bc-old']
+    assert ids(PrunePolicy(unused_days=15)) == ['c-tool', 'sha256:app1', 'sha256:old', 'orphan', 'bc-old']
+    plan = plan_prune(items, PrunePolicy(keep_per_repo=1, free_gb=8), now=NOW)
+    # app:2 by the keep rule, then least recently used objects until 8 GB are selected
+    assert [i.id for i in plan.selected] == ['sha256:app2', 'orphan', 'bc-old']
+    assert plan.reclaim_bytes == 9 * GB and plan.shortfall_bytes == 0
+    # kept images stay kept even when the target is missed
+    plan = plan_prune(items, PrunePolicy(keep_per_repo=2, free_gb=8), now=NOW)
+    assert [i.id for i in plan.selected] == ['c-tool', 'orphan', 'bc-old'] and plan.shortfall_bytes > 0
+    assert plan_prune(items, PrunePolicy(free_gb=500), now=NOW).shortfall_bytes > 0
+
+
+def test_image_kept_while_its_container_stays():
+    items = [SpaceItem('image', 'i', 'x:1', GB, last_used=0, containers=('c',)),
+             SpaceItem('container', 'c', 'c', 1, last_used=NOW)]
+    assert plan_prune(items, PrunePolicy(unused_days=1), now=NOW).selected == []
+
+
+def test_dry_run_simulates_without_deleting(engine):
+    srv, client = engine
+    [plan] = prune(PrunePolicy(unused_days=15), dry_run=True, client=client, now=NOW)
+    assert plan.status == 'Skipped' and plan.details['reclaim_bytes'] == 2 * GB + 100 + GB + 5 * GB + 2 * GB
+    assert plan.details['image']['count'] == 2 and srv.calls == []
+
+
+def test_prune_deletes_in_batches_through_engine_api(engine):
+    srv, client = engine
+    events = []
+    results = prune(PrunePolicy(unused_days=15), dry_run=False, yes=True, client=client,
+                    batch_size=1, now=NOW, progress_cb=lambda e, t: events.append((t, e['step_id'])))
+    by_name = {r.name: r for r in results}
+    assert list(by_name) == ['cleanup_plan', 'cleanup:container', 'cleanup:image', 'cleanup:volume',
+                             'cleanup:build_cache']
+    # the container goes before the image it pins
+    paths = [c[1] for c in srv.calls]
+    assert paths.index('/containers/c-tool') < paths.index('/images/sha256:old')
+    assert ('DELETE', '/images/sha256:app1', 'force=true') in srv.calls  # tagged in two repositories
+    assert ('POST', '/build/prune', 'filters={"id": ["bc-old"]}') in srv.calls
+    # app:1 has a child image: reported, the other images are still removed
+    image = by_name['cleanup:image']
+    assert image.status == 'Failed' and image.details['deleted'] == 1
+    assert 'dependent child images' in image.details['failures'][0]['error']
+    assert by_name['cleanup:build_cache'].details['freed_bytes'] == 2 * GB - 7
+    assert ('step-progress', 'cleanup:image') in events and events[-1] == ('step-end', 'cleanup:build_cache')
+
+
+def test_unreachable_engine_fails_cleanly():
+    [res] = prune(PrunePolicy(unused_days=1), client=EngineClient('tcp://127.0.0.1:1', timeout=1))
+    assert res.status == 'Failed' and res.name == 'cleanup_plan'
+
+
+def test_named_pipe_connection_is_reused_across_requests(monkeypatch):
+    # a socketpair stands in for the pipe: one unbuffered handle for reads and writes
+    client_end, server_end = socket.socketpair()
+    opened = []
+
+    def _open_pipe(path):
+        opened.append(path)
+        return client_end.makefile('rwb', buffering=0)
+
+    monkeypatch.setattr(engine_api, '_open_pipe', _open_pipe)
+    server = type('Server', (), {'calls': [], 'lock': threading.Lock()})()
+    threading.Thread(target=_Engine, args=(server_end, ('pipe', 0), server), daemon=True).start()
+
+    client = EngineClient('npipe:////./pipe/docker_engine', timeout=5)
+    try:
+        assert client.get('/containers/c-tool/json')['State']['FinishedAt']
+        assert client.get('/system/df')['Volumes'][0]['Name'] == 'orphan'
+        assert client.delete('/volumes/orphan') is None
+    finally:
+        client.close()
+        server_end.close()
+    assert opened == ['\\\\.\\pipe\\docker_engine']
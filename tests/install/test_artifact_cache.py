@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+import install.artifact_cache as artifact_cache
+from install.artifact_cache import ArtifactCache, ArtifactError, default_cache_dir
+
+PAYLOAD = os.urandom(3 * (1 << 20) + 12345)
+DIGEST = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _headers(self, status, length, extra=None):
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        self.send_header('ETag', self.server.etag)
+        if self.server.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, len(self.server.payload))
+
+    def do_GET(self):
+        payload = self.server.payload
+        spec = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        with self.server.lock:
+            self.server.requests.append(spec)
+        if not (spec and self.server.ranges) or (if_range and if_range != self.server.etag):
+            self._headers(200, len(payload))
+            self.wfile.write(payload)
+            return
+        start, end = (int(x) for x in spec.split('=')[1].split('-'))
+        body = payload[start:end + 1]
+        self._headers(206, len(body), {'Content-Range': f'bytes {start}-{end}/{len(payload)}'})
+        if self.server.fail_after is not None:
+            # send part of the body, then drop the connection
+            self.wfile.write(body[:self.server.fail_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    srv.payload, srv.etag, srv.ranges, srv.fail_after = PAYLOAD, '"v1"', True, None
+    srv.requests, srv.lock = [], threading.Lock()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}/installer.exe'
+
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch):
+    monkeypatch.setattr(artifact_cache, 'MIN_SEGMENT', 256 << 10)
+    monkeypatch.setattr(artifact_cache, 'BLOCK', 64 << 10)
+
+
+def test_segmented_download_is_verified_and_content_addressed(server, url, tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'), segments=4)
+    events = []
+    path = cache.fetch(url, DIGEST, progress_cb=lambda e, t: events.append(e))
+    assert path == cache.blob_path(DIGEST) and open(path, 'rb').read() == PAYLOAD
+    assert len([r for r in server.requests if r]) == 4
+    assert events[-1]['bytes_done'] == len(PAYLOAD)
+    assert os.listdir(tmp_path / 'cache' / 'partial') == []
+
+    server.requests.clear()
+    # a second cache object on the same (shared) directory needs no network at all
+    assert ArtifactCache(str(tmp_path / 'cache')).fetch(url, DIGEST) == path
+    assert server.requests == []
+
+
+def test_interrupted_download_resumes(server, url, tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache, 'STATE_FLUSH_BYTES', 1)
+    cache = ArtifactCache(str(tmp_path / 'cache'), segments=4, retries=0)
+    server.fail_after = 200_000
+    with pytest.raises(ArtifactError):
+        cache.fetch(url, DIGEST)
+    state = json.load(open(next((tmp_path / 'cache' / 'partial').glob('*.json'))))
+    assert all(done == 200_000 for _, _, done in state['segments'])
+
+    server.fail_after = None
+    server.requests.clear()
+    assert open(cache.fetch(url, DIGEST), 'rb').read() == PAYLOAD
+    starts = sorted(int(r.split('=')[1].split('-')[0]) for r in server.requests if r)
+    assert starts == [start + 200_000 for start, _, _ in state['segments']]
+
+
+def test_digest_mismatch_is_rejected(url, tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    with pytest.raises(ArtifactError):
+        cache.fetch(url, '0' * 64)
+    assert not os.listdir(tmp_path / 'cache' / 'partial')
+
+
+def test_unpinned_url_reused_while_etag_unchanged(server, url, tmp_path):
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    first = cache.fetch(url)
+    assert first == cache.blob_path(DIGEST)
+    server.requests.clear()
+    assert cache.fetch(url) == first and server.requests == []
+
+    server.payload, server.etag = PAYLOAD[::-1], '"v2"'
+    second = cache.fetch(url)
+    assert second != first and open(second, 'rb').read() == PAYLOAD[::-1]
+
+
+def test_server_without_ranges_downloads_whole_file(server, url, tmp_path):
+    server.ranges = False
+    assert open(ArtifactCache(str(tmp_path / 'cache')).fetch(url, DIGEST), 'rb').read() == PAYLOAD
+
+
+def test_cache_dir_from_env_and_config(tmp_path, monkeypatch):
+    cfg = tmp_path / 'cfg.json'
+    cfg.write_text(json.dumps({'installation': {'artifact_cache': str(tmp_path / 'shared')}}))
+    monkeypatch.delenv(artifact_cache.CACHE_ENV, raising=False)
+    assert default_cache_dir(str(cfg)) == str(tmp_path / 'shared')
+    monkeypatch.setenv(artifact_cache.CACHE_ENV, str(tmp_path / 'env'))
+    assert default_cache_dir(str(cfg)) == str(tmp_path / 'env')
+
+
+def test_lock_is_refreshed_while_downloading(server, url, tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache, 'LOCK_HEARTBEAT_SECONDS', 0)
+    touched = []
+    real_utime = os.utime
+    monkeypatch.setattr(artifact_cache.os, 'utime',
+                        lambda path, *a, **kw: (touched.append(path), real_utime(path, *a, **kw))[1])
+    cache = ArtifactCache(str(tmp_path / 'cache'), segments=4)
+    cache.fetch(url, DIGEST)
+    lock = str(tmp_path / 'cache' / 'partial' / f'{DIGEST}.lock')
+    # once per downloaded block and once per hashed block
+    assert touched.count(lock) >= 2 * (len(PAYLOAD) // (64 << 10))
+
+
+def test_installers_need_a_pinned_digest(url, tmp_path, monkeypatch):
+    monkeypatch.setitem(artifact_cache.ARTIFACTS, 'docker_desktop',
+                        artifact_cache.Artifact('docker_desktop', url, filename='installer.exe'))
+    cfg = tmp_path / 'cfg.json'
+    cfg.write_text(json.dumps({'installation': {'artifact_sha256': {'docker_desktop': None}}}))
+    with pytest.raises(ArtifactError, match='No pinned SHA-256 for docker_desktop'):
+        artifact_cache.require_digest('docker_desktop', str(cfg))
+    cache = ArtifactCache(str(tmp_path / 'cache'))
+    res = artifact_cache.ensure_artifacts(['docker_desktop'], cache, config_path=str(cfg))[0]
+    assert res.status == 'Success' and 'unverified' in res.message and res.details['verified'] is False
+
+    cfg.write_text(json.dumps({'installation': {'artifact_sha256': {'docker_desktop': DIGEST.upper()}}}))
+    assert artifact_cache.require_digest('docker_desktop', str(cfg)) == DIGEST
+    res = artifact_cache.ensure_artifacts(['docker_desktop'], cache, config_path=str(cfg))[0]
+    assert 'SHA-256 verified' in res.message and res.details['verified'] is True
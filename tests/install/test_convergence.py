@@ -0,0 +1,137 @@
+import json
+import os
+import sys
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from status.host_facts import FactsError, HostFacts
+from install.convergence import DesiredState, HostState, converge, gather_state, plan, WSL_FEATURES
+
+
+class FakeHost:
+    """Stand-in command runner that answers state queries and records changes."""
+
+    def __init__(self, features=True, default_version=2, distros=('Ubuntu-22.04',), docker='4.30.0'):
+        self.features = {f: features for f in WSL_FEATURES}
+        self.default_version = default_version
+        self.distros = list(distros)
+        self.docker = docker
+        self.calls = []
+        self.fact_queries = 0
+
+    def facts_runner(self, script, names):
+        self.fact_queries += 1
+        return json.dumps({
+            'windows_features': dict(self.features),
+            'wsl_default_version': self.default_version,
+            'wsl_distros': list(self.distros),
+            'docker_version': self.docker,
+        })
+
+    def __call__(self, args):
+        self.calls.append(args)
+        cmd = ' '.join(args)
+        if args[0] == 'dism.exe':
+            self.features[args[3].split(':')[1]] = True
+            return 3010, 'restart required'
+        if args[:2] == ['wsl.exe', '--set-default-version']:
+            self.default_version = int(args[2])
+            return 0, ''
+        if args[:2] == ['wsl.exe', '--install']:
+            self.distros.append(args[3])
+            return 0, ''
+        return 1, f'unexpected {cmd}'
+
+
+@pytest.fixture
+def settings(tmp_path):
+    path = tmp_path / 'settings-store.json'
+    path.write_text(json.dumps({'wslEngineEnabled': True, 'other': 1}))
+    return str(path)
+
+
+def test_converged_host_needs_no_steps(settings):
+    host = FakeHost()
+    state = gather_state(HostFacts(host.facts_runner), settings_path=settings)
+    assert plan(DesiredState(), state) == []
+    results = converge(DesiredState(), state=state, dry_run=False, run=host)
+    assert [r.status for r in results] == ['Success'] and 'nothing to do' in results[0].message
+    assert not [c for c in host.calls if c[0] == 'dism.exe' or '--install' in c]
+
+
+@pytest.mark.parametrize('state, expected', [
+    (HostState(features={f: True for f in WSL_FEATURES}, wsl_default_version=1, distros=['Ubuntu-22.04'],
+               docker_version='4.30', docker_settings={'wslEngineEnabled': True}), ['set_wsl_default_version']),
+    (HostState(features={f: True for f in WSL_FEATURES}, wsl_default_version=2, distros=[],
+               docker_version=None, docker_settings={}),
+     ['install_distro:Ubuntu-22.04', 'install_docker', 'configure_docker']),
+    (HostState(), [f'enable_feature:{f}' for f in WSL_FEATURES] +
+     ['set_wsl_default_version', 'install_distro:Ubuntu-22.04', 'install_docker', 'configure_docker']),
+])
+def test_plan_only_closes_the_gap(state, expected):
+    assert [s.id for s in plan(DesiredState(), state)] == expected
+
+
+def test_min_version_triggers_upgrade():
+    state = HostState(features={f: True for f in WSL_FEATURES}, wsl_default_version=2, distros=['Ubuntu-22.04'],
+                      docker_version='4.9.1', docker_settings={'wslEngineEnabled': True})
+    assert [s.id for s in plan(DesiredState(docker_min_version='4.10'), state)] == ['install_docker']
+    assert plan(DesiredState(docker_min_version='4.9'), state) == []
+
+
+def test_converge_runs_missing_steps_and_rerun_is_a_no_op(settings):
+    host = FakeHost(features=False, default_version=1, distros=())
+    with open(settings, 'w') as f:
+        json.dump({'other': 1}, f)
+    events = []
+    facts = HostFacts(host.facts_runner)
+    results = converge(DesiredState(), dry_run=False, run=host, settings_path=settings, facts=facts,
+                       progress_cb=lambda e, t: events.append((t, e['step_id'])))
+    # Docker is already installed, so only its settings are updated
+    assert [r.name for r in results] == [f'enable_feature:{f}' for f in WSL_FEATURES] + \
+        ['set_wsl_default_version', 'install_distro:Ubuntu-22.04', 'configure_docker']
+    assert all(r.status == 'Success' for r in results)
+    assert events[0] == ('step-start', f'enable_feature:{WSL_FEATURES[0]}')
+
+    results = converge(DesiredState(), dry_run=False, run=host, settings_path=settings, facts=facts)
+    assert [r.message for r in results] == ['Already converged; nothing to do']
+    # one batched query per gather, not one process per fact
+    assert host.fact_queries == 2
+
+
+def test_configure_docker_merges_settings(settings):
+    from install.convergence import default_actions
+    default_actions(settings_path=settings)['configure_docker']({'memoryMiB': 4096})
+    with open(settings) as f:
+        assert json.load(f) == {'wslEngineEnabled': True, 'other': 1, 'memoryMiB': 4096}
+
+
+def test_dry_run_reports_plan_without_changes():
+    host = FakeHost(distros=())
+    results = converge(DesiredState(docker_settings={}), dry_run=True, run=host, facts=HostFacts(host.facts_runner))
+    assert [(r.name, r.status) for r in results] == [('install_distro:Ubuntu-22.04', 'Skipped')]
+    assert host.distros == []
+
+
+def test_failed_step_stops_the_run():
+    def boom(**kwargs):
+        raise RuntimeError('no network')
+
+    state = HostState(features={f: True for f in WSL_FEATURES}, wsl_default_version=2, distros=[])
+    results = converge(DesiredState(), state=state, dry_run=False,
+                       actions={'install_distro': boom, 'install_docker': boom, 'configure_docker': boom})
+    assert [(r.name, r.status) for r in results] == [('install_distro:Ubuntu-22.04', 'Failed')]
+
+
+def test_unreadable_facts_fail_the_plan_step(settings):
+    def broken(script, names):
+        raise FactsError('pwsh not found')
+
+    results = converge(DesiredState(), facts=HostFacts(broken), settings_path=settings, dry_run=False)
+    assert [(r.name, r.status) for r in results] == [('plan', 'Failed')]
+    assert results[0].error == 'pwsh not found'
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from install.docker.daemon_config import PROFILES, apply_profile, deep_merge, validate
+
+
+@pytest.fixture
+def daemon_json(tmp_path):
+    path = tmp_path / 'daemon.json'
+    path.write_text(json.dumps({'registry-mirrors': ['https://mirror.local'], 'log-opts': {'labels': 'app'},
+                                'builder': {'gc': {'enabled': False, 'policy': [{'keepStorage': '1GB'}]}}}))
+    return path
+
+
+def test_profile_deep_merges_and_reports_changes(daemon_json):
+    res = apply_profile('balanced', path=str(daemon_json), dry_run=False, overrides={'dns': ['10.0.0.2']})
+    assert res.status == 'Success'
+    written = json.loads(daemon_json.read_text())
+    # keys the profile does not mention are kept, nested objects are merged
+    assert written['registry-mirrors'] == ['https://mirror.local']
+    assert written['log-opts'] == {'labels': 'app', 'max-size': '10m', 'max-file': '3'}
+    assert written['builder']['gc'] == {'enabled': True, 'defaultKeepStorage': '20GB',
+                                        'policy': [{'keepStorage': '1GB'}]}
+    changed = {c['setting']: (c['old'], c['new']) for c in res.details['changes']}
+    assert changed['builder.gc.enabled'] == (False, True)
+    assert changed['max-concurrent-downloads'] == (None, 6) and changed['dns'] == (None, ['10.0.0.2'])
+    assert 'log-opts.labels' not in changed
+    assert json.loads((daemon_json.parent / 'daemon.json.bak').read_text())['builder']['gc']['enabled'] is False
+    assert apply_profile('balanced', path=str(daemon_json), overrides={'dns': ['10.0.0.2']}).message == \
+        "daemon.json already matches 'balanced'"
+
+
+def test_dry_run_does_not_write(daemon_json):
+    before = daemon_json.read_text()
+    res = apply_profile('build_heavy', path=str(daemon_json), dry_run=True)
+    assert res.status == 'Skipped' and 'max-concurrent-downloads' in res.message
+    assert daemon_json.read_text() == before
+
+
+@pytest.mark.parametrize('config, problem', [
+    ({'log-opts': {'max-file': 3}}, 'log-opts.max-file must be a string'),
+    ({'max-concurrent-downloads': 0}, 'max-concurrent-downloads must be a positive integer'),
+    ({'dns': ['dns.example']}, "dns entry 'dns.example' is not an IP address"),
+    ({'builder': {'gc': {'defaultKeepStorage': 'lots'}}}, 'builder.gc.defaultKeepStorage must be a size'),
+])
+def test_validation_rejects_bad_settings(config, problem):
+    assert any(p.startswith(problem) for p in validate(config))
+
+
+def test_invalid_result_is_not_written(daemon_json):
+    before = daemon_json.read_text()
+    res = apply_profile('low_disk', path=str(daemon_json), dry_run=False, overrides={'dns': ['not-an-ip']})
+    assert res.status == 'Failed' and 'not an IP address' in res.error
+    assert daemon_json.read_text() == before and not (daemon_json.parent / 'daemon.json.bak').exists()
+
+
+def test_all_profiles_are_valid():
+    for profile in PROFILES.values():
+        assert validate(deep_merge({}, profile)) == []
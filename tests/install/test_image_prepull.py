@@ -0,0 +1,191 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from cleanup.engine_api import EngineClient
+from install.docker.image_prepull import ImageRef, RegistryClient, load_manifest, prepull_images, pull_order
+
+# repository -> layers; base <- python <- app share their first layers, db stands alone
+LAYERS = {
+    'team/base': ['sha256:l1', 'sha256:l2'],
+    'team/python': ['sha256:l1', 'sha256:l2', 'sha256:l3'],
+    'team/app': ['sha256:l1', 'sha256:l2', 'sha256:l3', 'sha256:l4'],
+    'team/db': ['sha256:d1'],
+    'team/tools': ['sha256:t1'],
+}
+
+
+class _Registry(BaseHTTPRequestHandler):
+    """Registry API v2 stand-in: bearer-token auth, and one repository served through an index."""
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path == '/token':
+            return self._json(200, {'token': 'anon'})
+        if self.headers.get('Authorization') != 'Bearer anon':
+            realm = f'http://{self.headers["Host"]}/token'
+            return self._json(401, {}, {'WWW-Authenticate': f'Bearer realm="{realm}",service="stand-in"'})
+        m = re.match(r'^/v2/(.+)/manifests/(.+)$', url.path)
+        repo, reference = m.group(1), m.group(2)
+        if repo == 'team/db' and not reference.startswith('sha256:'):
+            return self._json(200, {'manifests': [
+                {'digest': 'sha256:arm', 'platform': {'os': 'linux', 'architecture': 'arm64'}},
+                {'digest': 'sha256:amd', 'platform': {'os': 'linux', 'architecture': 'amd64'}}]})
+        if repo not in LAYERS or (reference.startswith('sha256:') and reference != 'sha256:amd'):
+            return self._json(404, {'errors': [{'code': 'MANIFEST_UNKNOWN'}]})
+        self._json(200, {'layers': [{'digest': d} for d in LAYERS[repo]]})
+
+
+class _Engine(BaseHTTPRequestHandler):
+    """Engine stand-in for POST /images/create: streams pull progress and records timing."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        q = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        ref = f"{q['fromImage'][0]}:{q['tag'][0]}"
+        srv = self.server
+        with srv.lock:
+            srv.active += 1
+            srv.peak = max(srv.peak, srv.active)
+            srv.log.append(('start', ref))
+        time.sleep(0.05)
+        repo = ref.split('/', 1)[1].rsplit(':', 1)[0]
+        msgs = [{'status': f'Pulling from {repo}'}]
+        if repo == 'team/broken':
+            msgs.append({'error': 'manifest unknown'})
+        for layer in LAYERS.get(repo, []):
+            with srv.lock:
+                have = layer in srv.store
+                srv.store.add(layer)
+            if have:
+                msgs.append({'status': 'Already exists', 'id': layer})
+            else:
+                msgs += [{'status': 'Downloading', 'id': layer, 'progressDetail': {'current': 50, 'total': 100}},
+                         {'status': 'Pull complete', 'id': layer}]
+        body = b''.join(json.dumps(m).encode() + b'\r\n' for m in msgs)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with srv.lock:
+            srv.active -= 1
+            srv.log.append(('end', ref))
+
+
+def _serve(handler):
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    srv.lock, srv.active, srv.peak, srv.log, srv.store = threading.Lock(), 0, 0, [], set()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+@pytest.fixture
+def stand_ins():
+    registry, engine = _serve(_Registry), _serve(_Engine)
+    client = EngineClient(f'tcp://127.0.0.1:{engine.server_address[1]}')
+    yield f'127.0.0.1:{registry.server_address[1]}', engine, client
+    client.close()
+    for srv in (registry, engine):
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_image_ref_parsing():
+    assert ImageRef.parse('postgres') == ImageRef('registry-1.docker.io', 'library/postgres', 'latest')
+    assert ImageRef.parse('grafana/grafana:11') == ImageRef('registry-1.docker.io', 'grafana/grafana', '11')
+    assert ImageRef.parse('localhost:5000/app@sha256:ab') == ImageRef('localhost:5000', 'app', 'sha256:ab')
+    assert ImageRef.parse('mcr.microsoft.com/dotnet/sdk:8.0').repository == 'dotnet/sdk'
+
+
+def test_pull_order_from_layer_prefixes():
+    deps = pull_order(['app', 'base', 'python', 'db', 'odd'],
+                      {'base': ['a'], 'python': ['a', 'b'], 'app': ['a', 'b', 'c'], 'db': ['x']}, bases=['db'])
+    assert deps == {'base': {'db'}, 'db': set(), 'python': {'base', 'db'}, 'app': {'base', 'python', 'db'},
+                    'odd': {'db'}}
+
+
+def test_registry_layers_with_token_and_index(stand_ins):
+    host, _, _ = stand_ins
+    registry = RegistryClient()
+    assert registry.layers(f'{host}/team/python:3.12') == LAYERS['team/python']
+    assert registry.layers(f'{host}/team/db:16') == ['sha256:d1']  # via the linux/amd64 entry
+
+
+def test_bases_pulled_first_and_layers_reused(stand_ins, tmp_path):
+    host, engine, client = stand_ins
+    manifest = tmp_path / 'team_images.json'
+    manifest.write_text(json.dumps({'bases': [f'{host}/team/tools:1'],
+                                    'images': [f'{host}/team/app:1', f'{host}/team/db:16',
+                                               f'{host}/team/python:3.12', f'{host}/team/base:1']}))
+    images, bases = load_manifest(str(manifest))
+    events = []
+    results = prepull_images(images, bases, max_concurrent=2, dry_run=False, client=client,
+                             progress_cb=lambda e, t: events.append((t, e['step_id'])))
+    assert [r.status for r in results] == ['Success'] * 5
+    log = [(kind, ref.split('/team/')[1]) for kind, ref in engine.log]
+    assert log[:2] == [('start', 'tools:1'), ('end', 'tools:1')]  # the declared base goes alone first
+    assert log.index(('end', 'base:1')) < log.index(('start', 'python:3.12'))
+    assert log.index(('end', 'python:3.12')) < log.index(('start', 'app:1'))
+    assert engine.peak <= 2
+    app = results[1]
+    assert app.name == f'prepull:{host}/team/app:1'
+    assert app.details['layers_reused'] == 3 and app.details['layers_downloaded'] == 1
+    assert ('step-progress', app.name) in events and ('step-end', app.name) in events
+
+
+def test_dry_run_reports_order_without_pulling(stand_ins):
+    host, engine, client = stand_ins
+    results = prepull_images([f'{host}/team/python:3.12', f'{host}/team/base:1'], client=client)
+    assert results[0].status == 'Skipped' and results[0].details['after'] == [f'{host}/team/base:1']
+    assert engine.log == []
+
+
+def test_failed_pull_and_unknown_registry_do_not_stop_the_rest(stand_ins):
+    host, _, client = stand_ins
+    broken, db = f'{host}/team/broken:1', f'{host}/team/db:16'
+    results = prepull_images([broken, db], dry_run=False, client=client)
+    assert [r.status for r in results] == ['Failed', 'Success']
+    assert results[0].error == 'manifest unknown'
+
+
+def test_unexpected_pull_error_fails_only_that_image(stand_ins, monkeypatch):
+    host, _, client = stand_ins
+    real_stream = client.stream
+
+    def stream(method, path, **params):
+        if params.get('fromImage', '').endswith('team/base'):
+            raise OSError('connection reset')
+        return real_stream(method, path, **params)
+
+    monkeypatch.setattr(client, 'stream', stream)
+    results = prepull_images([f'{host}/team/base:1', f'{host}/team/db:16'], dry_run=False, client=client)
+    assert [r.status for r in results] == ['Failed', 'Success']
+    assert results[0].name == f'prepull:{host}/team/base:1' and results[0].error == 'connection reset'
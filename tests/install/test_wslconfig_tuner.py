@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from status.host_facts import HostFacts
+from install.wsl.wslconfig_tuner import HostProfile, merge_wslconfig, recommend, tune_wslconfig
+
+GIB = 1 << 30
+
+
+@pytest.mark.parametrize('ram_gb, cpus, disk, workload, expected', [
+    # light dev: a quarter of RAM capped at 8GB, half the processors
+    (16, 8, 'SSD', 'light_dev', ('4GB', '4', '1GB', 'gradual', 'true')),
+    (64, 16, 'SSD', 'light_dev', ('8GB', '8', '2GB', 'gradual', 'true')),
+    # heavy builds: half of RAM, all processors except on small hosts
+    (32, 16, 'SSD', 'heavy_builds', ('16GB', '16', '8GB', 'dropcache', 'true')),
+    (8, 4, None, 'heavy_builds', ('4GB', '3', '2GB', 'dropcache', 'true')),
+    # spinning disks get less swap and no sparse VHD
+    (32, 16, 'HDD', 'heavy_builds', ('16GB', '16', '4GB', 'dropcache', 'false')),
+    # ML keeps page cache (no reclaim) and always leaves RAM to Windows
+    (16, 8, 'SSD', 'ml', ('10GB', '8', '2GB', 'disabled', 'true')),
+    (256, 64, 'SSD', 'ml', ('96GB', '64', '24GB', 'disabled', 'true')),
+    # tiny hosts still get a usable VM
+    (4, 2, 'SSD', 'light_dev', ('2GB', '1', '1GB', 'gradual', 'true')),
+])
+def test_recommendation_table(ram_gb, cpus, disk, workload, expected):
+    rec = recommend(HostProfile(ram_gb * GIB, cpus, disk), workload)
+    assert (rec['wsl2']['memory'], rec['wsl2']['processors'], rec['wsl2']['swap'],
+            rec['experimental']['autoMemoryReclaim'], rec['experimental']['sparseVhd']) == expected
+
+
+def test_unknown_workload_is_rejected():
+    with pytest.raises(ValueError):
+        recommend(HostProfile(16 * GIB, 8), 'gaming')
+
+
+def test_merge_keeps_unrelated_lines_and_reports_changes():
+    existing = '# my settings\n[wsl2]\nmemory=4GB\nkernel=C:\\\\k\n\n[user]\ndefault=me\n'
+    new, changed = merge_wslconfig(existing, {'wsl2': {'memory': '4GB', 'swap': '2GB'},
+                                              'experimental': {'sparseVhd': 'true'}})
+    assert new == ('# my settings\n[wsl2]\nmemory=4GB\nkernel=C:\\\\k\nswap=2GB\n\n[user]\ndefault=me\n\n'
+                   '[experimental]\nsparseVhd=true\n')
+    assert changed == ['wsl2.swap', 'experimental.sparseVhd']
+    assert merge_wslconfig(new, {'wsl2': {'Memory': '4GB'}})[1] == []
+
+
+def test_tune_shows_diff_then_writes_with_backup(tmp_path):
+    path = tmp_path / '.wslconfig'
+    path.write_text('[wsl2]\nmemory=2GB\n')
+    facts = HostFacts(lambda script, names: json.dumps(
+        {'ram': {'total_bytes': 16 * GIB}, 'cpu_count': 8, 'system_disk_type': 'SSD'}))
+    preview = tune_wslconfig('light_dev', dry_run=True, path=str(path), facts=facts)
+    assert preview.status == 'Skipped' and '-memory=2GB' in preview.details['diff']
+    assert path.read_text() == '[wsl2]\nmemory=2GB\n'
+    done = tune_wslconfig('light_dev', dry_run=False, path=str(path), facts=facts)
+    assert done.status == 'Success' and 'memory=4GB' in path.read_text()
+    assert (tmp_path / '.wslconfig.bak').read_text() == '[wsl2]\nmemory=2GB\n'
+    assert tune_wslconfig('light_dev', dry_run=False, path=str(path), facts=facts).message == '.wslconfig already tuned'
+
+
+def test_unreadable_facts_fail_the_step(tmp_path):
+    facts = HostFacts(lambda script, names: 'WARNING: not json')
+    res = tune_wslconfig('light_dev', dry_run=True, path=str(tmp_path / '.wslconfig'), facts=facts)
+    assert res.status == 'Failed' and res.message == 'Could not read host facts'
@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from status.host_facts import FACTS_SCRIPT, FactsError, HostFacts, describe
+from status.status_orchestrator import get_system_status
+from uninstall.uninstall_orchestrator import uninstall_sequence
+
+HOST = {
+    'windows_features': {'Microsoft-Windows-Subsystem-Linux': True, 'VirtualMachinePlatform': False},
+    'wsl_version': '2.0.14.0',
+    'wsl_default_version': 2,
+    'wsl_distros': ['Ubuntu'],
+    'docker_version': '4.30.0',
+    'docker_service': 'Running',
+    'free_disk': {'drive': 'C:', 'free_bytes': 50 << 30, 'total_bytes': 200 << 30},
+    'system_disk_type': 'SSD',
+    'ram': {'free_bytes': 8 << 30, 'total_bytes': 16 << 30},
+    'cpu_count': 8,
+}
+
+
+class StandInRunner:
+    """Records each script invocation and answers with the requested facts only."""
+
+    def __init__(self, host=None):
+        self.host = dict(HOST if host is None else host)
+        self.batches = []
+
+    def __call__(self, script, names):
+        assert script == FACTS_SCRIPT
+        self.batches.append(sorted(names))
+        return json.dumps({n: self.host.get(n) for n in names})
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_all_facts_in_one_invocation():
+    runner = StandInRunner()
+    facts = HostFacts(runner)
+    assert facts.get() == HOST
+    assert len(runner.batches) == 1 and runner.batches[0] == sorted(HOST)
+
+
+def test_per_fact_ttl_refreshes_only_stale_facts():
+    runner, clock = StandInRunner(), Clock()
+    facts = HostFacts(runner, ttls={'docker_service': 10, 'free_disk': 30}, clock=clock)
+    facts.get()
+    clock.now = 15
+    runner.host['docker_service'] = 'Stopped'
+    assert facts.get()['docker_service'] == 'Stopped'
+    assert runner.batches[-1] == ['docker_service']
+    clock.now = 20
+    facts.get('docker_service', 'cpu_count')
+    assert len(runner.batches) == 2  # both still fresh
+    clock.now = 45
+    facts.get()
+    assert runner.batches[-1] == ['docker_service', 'free_disk']
+
+
+def test_invalidate_and_unknown_facts():
+    runner = StandInRunner()
+    facts = HostFacts(runner)
+    facts.get('wsl_distros', 'cpu_count')
+    facts.invalidate('wsl_distros')
+    facts.get('wsl_distros', 'cpu_count')
+    assert runner.batches == [['cpu_count', 'wsl_distros'], ['wsl_distros']]
+    with pytest.raises(KeyError):
+        facts.get('gpu')
+
+
+def test_bad_output_raises_facts_error():
+    facts = HostFacts(lambda script, names: 'WARNING: not json')
+    with pytest.raises(FactsError):
+        facts.get('cpu_count')
+
+
+def test_describe_is_readable():
+    lines = list(describe({'ram': HOST['ram'], 'wsl_distros': [], 'docker_version': None}))
+    assert lines == ['ram: 8.0 GiB free of 16.0 GiB', 'wsl distros: none', 'docker version: unknown']
+
+
+def test_system_status_uses_shared_facts():
+    res = get_system_status(facts=HostFacts(StandInRunner()))
+    assert res.status == 'Success' and res.details['cpu_count'] == 8 and 'C: 50.0 GiB free' in res.message
+
+
+def test_uninstall_skips_components_that_are_absent(tmp_path):
+    host = dict(HOST, docker_version=None, docker_service=None, wsl_distros=[])
+    runner = StandInRunner(host)
+    results = uninstall_sequence(yes=True, dry_run=False, facts=HostFacts(runner),
+                                 leftovers={'appdata_docker': str(tmp_path / 'missing')})
+    assert [(r.name, r.status) for r in results] == [
+        ('stop_docker', 'Skipped'), ('uninstall_docker', 'Skipped'), ('sweep_leftovers', 'Skipped'),
+        ('unregister_wsl', 'Skipped')]
+    assert len(runner.batches) == 1
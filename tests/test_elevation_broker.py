@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from elevation_broker import BrokerDeclined, BrokerError, BrokerOp, ElevationBroker, local_launcher
+from status.host_facts import HostFacts
+from uninstall.uninstall_orchestrator import uninstall_sequence
+
+
+def py(code):
+    return [sys.executable, '-c', code]
+
+
+def test_batch_runs_in_one_broker_and_streams_events():
+    launched = []
+    broker = ElevationBroker(launcher=lambda argv: launched.append(argv) or local_launcher(argv))
+    events = []
+    results = broker.run_batch([
+        BrokerOp('first', argv=py("print('removing'); print('done')")),
+        BrokerOp('second', argv=py('raise SystemExit(3)')),
+        BrokerOp('third', argv=py('pass')),
+    ], progress_cb=lambda e, t: events.append((t, e['step_id'], e.get('line'))))
+    assert len(launched) == 1
+    assert [(r.name, r.status) for r in results] == [('first', 'Success'), ('second', 'Failed'), ('third', 'Success')]
+    assert events[:4] == [('step-start', 'first', None), ('step-progress', 'first', 'removing'),
+                          ('step-progress', 'first', 'done'), ('step-end', 'first', None)]
+    # the auth key file is gone once the broker has connected
+    key_file = launched[0][launched[0].index('--key-file') + 1]
+    assert not os.path.exists(key_file)
+
+
+def test_stop_on_failure_reports_unrun_steps():
+    broker = ElevationBroker(launcher=local_launcher)
+    results = broker.run_batch([BrokerOp('a', argv=py('raise SystemExit(1)')), BrokerOp('b', argv=py('pass'))],
+                               stop_on_failure=True)
+    assert [r.status for r in results] == ['Failed', 'Failed'] and 'before the step ran' in results[1].message
+
+
+def test_broker_that_never_connects_raises():
+    broker = ElevationBroker(launcher=lambda argv: local_launcher(py('raise SystemExit(5)')), connect_timeout=10)
+    with pytest.raises(BrokerError, match='exited with code 5'):
+        broker.run_batch([BrokerOp('a', argv=py('pass'))])
+
+
+def test_uninstall_sends_privileged_steps_as_one_batch(tmp_path):
+    host = {'docker_version': '4.30.0', 'docker_service': 'Running', 'wsl_distros': ['Ubuntu']}
+
+    class RecordingBroker:
+        batches = []
+
+        def run_batch(self, ops, progress_cb=None):
+            self.batches.append([op.step_id for op in ops])
+            from step_result import StepResult
+            return [StepResult.now(name=op.step_id, status='Success', message='ok') for op in ops]
+
+    leftover = tmp_path / 'Docker'
+    (leftover / 'log').mkdir(parents=True)
+    (leftover / 'log' / 'host.log').write_bytes(b'x' * 100)
+    broker = RecordingBroker()
+    wsl = []
+    results = uninstall_sequence(yes=True, dry_run=False, broker=broker, leftovers={'appdata_docker': str(leftover)},
+                                 facts=HostFacts(lambda script, names: json.dumps(host)),
+                                 wsl_run=lambda args: wsl.append(args[1:]) or (0, ''))
+    # unregistering distros needs no elevation, so only the Docker uninstall goes through the broker
+    assert broker.batches == [['uninstall_docker']]
+    assert [(r.name, r.status) for r in results] == [
+        ('stop_docker', 'Success'), ('uninstall_docker', 'Success'), ('sweep_leftovers:appdata_docker', 'Success'),
+        ('unregister_wsl:Ubuntu', 'Success')]
+    assert not leftover.exists() and wsl == [['--shutdown'], ['--unregister', 'Ubuntu']]
+
+
+def test_declined_prompt_cancels_the_batch_without_prompting_per_script(monkeypatch, tmp_path):
+    from uninstall import uninstall_orchestrator
+
+    class DecliningBroker:
+        def run_batch(self, ops, progress_cb=None):
+            raise BrokerDeclined('elevation was declined')
+
+    def no_fallback(*args, **kwargs):
+        raise AssertionError('declined elevation must not prompt again per script')
+
+    monkeypatch.setattr(uninstall_orchestrator, '_run_elevated_script', no_fallback)
+    host = {'docker_version': '4.30.0', 'docker_service': 'Running', 'wsl_distros': ['Ubuntu']}
+    results = uninstall_sequence(yes=True, dry_run=False, broker=DecliningBroker(),
+                                 leftovers={'appdata_docker': str(tmp_path)},
+                                 facts=HostFacts(lambda script, names: json.dumps(host)), wsl_run=no_fallback)
+    assert [(r.name, r.status) for r in results] == [
+        ('stop_docker', 'Success'), ('uninstall_docker', 'Cancelled'), ('unregister_wsl', 'Cancelled')]
+    assert tmp_path.exists()  # Docker Desktop is still installed, so its data stays
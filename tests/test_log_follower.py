@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from log_follower import LogFollower
+
+
+def test_lines_are_forwarded_while_the_file_grows(tmp_path):
+    out = tmp_path / 'out.log'
+    out.write_bytes(b'')
+    seen = threading.Event()
+    events = []
+
+    def cb(event, event_type):
+        events.append((event_type, event['stream'], event['line']))
+        if event['line'] == 'first':
+            seen.set()
+
+    with LogFollower({'stdout': str(out)}, progress_cb=cb, poll_interval=0.01):
+        with open(out, 'ab') as f:
+            f.write(b'first\npart')
+            f.flush()
+            # forwarded before the writer is done, i.e. the run does not look frozen
+            assert seen.wait(5)
+            f.write(b'ial\r\nlast without newline')
+    assert events == [('step-progress', 'stdout', 'first'), ('step-progress', 'stdout', 'partial'),
+                      ('step-progress', 'stdout', 'last without newline')]
+
+
+def test_tail_is_bounded_and_full_log_spills_to_disk(tmp_path):
+    err = tmp_path / 'err.log'
+    # Windows PowerShell redirection writes UTF-16 with a BOM
+    err.write_bytes('\n'.join(f'line {i}' for i in range(500)).encode('utf-16'))
+    log = tmp_path / 'run.jsonl'
+    follower = LogFollower({'stderr': str(err)}, step_id='uninstall_docker', tail_lines=10, log_path=str(log))
+    follower.start().stop()
+    assert follower.tail('stderr') == [f'line {i}' for i in range(490, 500)]
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert len(records) == 500 and records[0]['line'] == 'line 0'
+    assert records[-1]['step_id'] == 'uninstall_docker' and records[-1]['stream'] == 'stderr'
+    assert follower.summary()['line_counts'] == {'stderr': 500}
+
+
+def test_follows_a_pipe():
+    proc = subprocess.Popen([sys.executable, '-c', "print('a'); print('b')"], stdout=subprocess.PIPE)
+    events = []
+    with LogFollower({'stdout': proc.stdout}, progress_cb=lambda e, t: events.append(e['line'])):
+        proc.wait()
+    assert events == ['a', 'b']
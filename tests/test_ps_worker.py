@@ -0,0 +1,97 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from ps_worker import PsWorker, WorkerError, WorkerPool
+
+# Python stand-in speaking the worker protocol; "command" is Python source run with exec().
+STAND_IN = textwrap.dedent('''
+    import contextlib, io, json, os, sys
+    M = "\\x1e"
+    def send(frame):
+        sys.stdout.write(M + json.dumps(frame) + "\\n"); sys.stdout.flush()
+    send({"type": "ready", "pid": os.getpid()})
+    for line in sys.stdin:
+        req = json.loads(line)
+        if req["op"] == "exit":
+            break
+        if req["command"] == "crash":
+            os._exit(3)
+        if req["command"] == "raw":
+            print("not a frame", flush=True)
+            send({"id": req["id"], "type": "result", "exit_code": 0})
+            continue
+        buf, code, err = io.StringIO(), 0, None
+        try:
+            with contextlib.redirect_stdout(buf):
+                exec(req["command"], {})
+        except SystemExit as e:
+            code = int(e.code or 0)
+        except Exception as e:
+            code, err = 1, str(e)
+        for out in buf.getvalue().splitlines():
+            send({"id": req["id"], "type": "output", "stream": "stdout", "line": out})
+        if err:
+            send({"id": req["id"], "type": "output", "stream": "stderr", "line": err})
+        send({"id": req["id"], "type": "result", "exit_code": code, "error": err})
+''')
+
+
+@pytest.fixture
+def argv(tmp_path):
+    path = tmp_path / 'stand_in.py'
+    path.write_text(STAND_IN)
+    return [sys.executable, str(path)]
+
+
+def test_worker_streams_output_and_reports_exit_codes(argv):
+    worker = PsWorker(argv).start()
+    try:
+        seen = []
+        result = worker.run(command="print('a'); print('b')", on_output=lambda s, l: seen.append((s, l)))
+        assert result.ok and result.stdout == ['a', 'b'] and seen == [('stdout', 'a'), ('stdout', 'b')]
+        assert worker.run(command='raise SystemExit(4)').exit_code == 4
+        failed = worker.run(command="raise ValueError('nope')")
+        assert failed.stderr == ['nope'] and failed.to_step_result('x').status == 'Failed'
+        # unframed lines are attributed to the running command instead of breaking the stream
+        assert worker.run(command='raw').stdout == ['not a frame']
+        assert worker.uses == 4
+    finally:
+        worker.close()
+    assert not worker.alive
+
+
+def test_crash_raises_and_pool_replaces_worker(argv):
+    with WorkerPool(size=1, argv=argv) as pool:
+        first = pool.run(command='print(1)')
+        assert first.stdout == ['1'] and pool.started == 1
+        pool.run(command='print(2)')
+        assert pool.started == 1  # warm worker reused
+        with pytest.raises(WorkerError):
+            pool.run(command='crash', retry_on_crash=False)
+        assert pool.run(command='print(3)').stdout == ['3']
+        assert pool.started == 2
+
+
+def test_pool_retries_once_and_recycles_after_max_uses(argv):
+    with WorkerPool(size=1, argv=argv, max_uses=2) as pool:
+        with pytest.raises(WorkerError):
+            pool.run(command='crash')  # the retry crashes too
+        assert pool.started == 2
+        for _ in range(3):
+            pool.run(command='pass')
+        assert pool.started == 4
+
+
+def test_timeout_kills_worker(argv):
+    worker = PsWorker(argv).start()
+    with pytest.raises(WorkerError, match='timed out'):
+        worker.run(command='import time; time.sleep(5)', timeout=0.2)
+    assert not worker.alive
@@ -8,8 +8,8 @@ sys.path.insert(0, 'src')
 class TestUninstallOrchestrator(unittest.TestCase):
     def test_uninstall_sequence_dry_run(self):
         mod = importlib.import_module('uninstall.uninstall_orchestrator')
-        res = mod.uninstall_sequence(yes=False, dry_run=True)
-        self.assertEqual(len(res), 3)
+        res = mod.uninstall_sequence(yes=False, dry_run=True, leftovers={}, wsl_run=lambda args: (0, ''))
+        self.assertEqual(len(res), 4)
         for r in res:
             # ensure StepResult-like object
             self.assertTrue(hasattr(r, 'to_dict'))
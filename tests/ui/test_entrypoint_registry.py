@@ -0,0 +1,74 @@
+import os
+import sys
+import types
+
+import pytest
+
+from src.ui import adapter
+from src.ui.adapter import EntrypointRegistry
+
+
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    mod.__dict__.update(attrs)
+    return mod
+
+
+def test_main_is_called_once_with_only_the_arguments_it_accepts(monkeypatch):
+    calls = []
+
+    def main(dry_run=True, targets=None):
+        calls.append((dry_run, targets))
+        raise TypeError('bug inside the orchestrator')
+
+    monkeypatch.setitem(sys.modules, 'fake_flow_a', _module('fake_flow_a', main=main))
+    registry = EntrypointRegistry({'a': 'fake_flow_a'})
+    with pytest.raises(TypeError, match='bug inside'):
+        registry.for_flow('a')(dry_run=False, yes=True, targets=['x'], progress_cb=print)
+    # a TypeError from inside main is not mistaken for a signature mismatch and retried
+    assert calls == [(False, ['x'])]
+
+
+def test_resolution_is_cached_until_the_module_or_callable_changes(monkeypatch):
+    mod = _module('fake_flow_b', main=lambda **kw: sorted(kw))
+    monkeypatch.setitem(sys.modules, 'fake_flow_b', mod)
+    registry = EntrypointRegistry({'b': 'fake_flow_b'})
+    first = registry.get('fake_flow_b')
+    assert first.accepts is None and first(dry_run=True, progress_cb=None) == ['dry_run', 'progress_cb']
+    assert registry.get('fake_flow_b') is first
+
+    monkeypatch.setattr(mod, 'main', lambda dry_run=True: 'patched')
+    assert registry.get('fake_flow_b')(dry_run=True, yes=True) == 'patched'
+    monkeypatch.setitem(sys.modules, 'fake_flow_b', _module('fake_flow_b', run=lambda: 'run'))
+    assert registry.get('fake_flow_b')(dry_run=True) == 'run'
+
+
+def test_prewarm_resolves_in_background_and_records_failures(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'fake_flow_c', _module('fake_flow_c', main=lambda dry_run=True: 'c'))
+    registry = EntrypointRegistry({'c': 'fake_flow_c', 'missing': 'fake_flow_does_not_exist'})
+    registry.prewarm().join(timeout=10)
+    assert 'fake_flow_c' in registry._cache
+    assert isinstance(registry.errors['fake_flow_does_not_exist'], ImportError)
+    with pytest.raises(ImportError):
+        registry.for_flow('missing')
+
+
+def test_backup_flow_is_mapped():
+    assert adapter._module_for_flow('backup') == 'src.backup.backup_orchestrator'
+    adapter.prewarm(['backup', 'uninstall'], background=False)
+    entry = adapter.registry.for_flow('backup')
+    assert entry.accepts >= {'dry_run', 'yes', 'log_path', 'targets', 'progress_cb'}
+
+
+def test_backup_flow_runs_without_prompts(monkeypatch, tmp_path):
+    volumes = tmp_path / 'docker' / 'volumes' / 'db'
+    volumes.mkdir(parents=True)
+    (volumes / 'data.bin').write_bytes(b'x' * 4096)
+    monkeypatch.setenv('DOCKER_DATA_ROOT', str(tmp_path / 'docker'))
+    events = []
+    out = tmp_path / 'out'
+    results = adapter.run_flow('backup', dry_run=False, log_path=str(out), targets=['volumes', 'bogus'],
+                               progress_cb=lambda e, t: events.append(t))
+    assert [r.status for r in results] == ['Success', 'Failed']
+    assert results[0].name == 'volumes_backup' and os.path.isfile(results[0].details['archive'])
+    assert 'step-progress' in events
@@ -0,0 +1,99 @@
+import dataclasses
+import json
+import threading
+import time
+
+import pytest
+
+from src.ui.event_bus import (EventBus, JsonLogSubscriber, MetricsSubscriber, OtherEvent, RunEnd, RunStart,
+                              StepEnd, StepProgress, StepStart, TraceSubscriber, from_legacy)
+
+
+def test_legacy_events_become_typed_immutable_events_and_back():
+    ev = from_legacy({'step_id': 'prune', 'flow': 'cleanup', 'freed_bytes': 10}, 'step-progress')
+    assert isinstance(ev, StepProgress) and ev.step_id == 'prune' and ev.flow == 'cleanup'
+    assert ev.data['freed_bytes'] == 10
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        ev.step_id = 'other'
+    with pytest.raises(TypeError):
+        ev.data['freed_bytes'] = 0
+    event, event_type = ev.to_legacy()
+    assert event_type == 'step-progress' and event['freed_bytes'] == 10 and event['step_id'] == 'prune'
+
+    end = from_legacy({'flow': 'status', 'results': [{'name': 'a'}], 'cancelled': True}, 'run-end')
+    assert isinstance(end, RunEnd) and end.results == ({'name': 'a'},) and end.cancelled
+    other = from_legacy({'n': 1}, 'file-progress')
+    assert isinstance(other, OtherEvent) and other.type == 'file-progress' and other.to_dict()['n'] == 1
+
+
+def test_every_subscriber_gets_events_in_order_and_failures_stay_contained():
+    seen_a, seen_b = [], []
+    with EventBus() as bus:
+        bus.subscribe(seen_a.append, name='a')
+        bus.subscribe(seen_b.append, name='b', types={'step-end'})
+
+        def broken(event):
+            raise RuntimeError('boom')
+
+        bad = bus.subscribe(broken, name='broken')
+        cb = bus.as_progress_cb()
+        cb({'flow': 'status'}, 'run-start')
+        for i in range(3):
+            cb({'step_id': str(i), 'name': str(i)}, 'step-start')
+            cb({'step_id': str(i), 'status': 'Success'}, 'step-end')
+        cb({'flow': 'status', 'results': []}, 'run-end')
+        assert bus.flush(timeout=5)
+        assert [e.type for e in seen_a] == ['run-start'] + ['step-start', 'step-end'] * 3 + ['run-end']
+        assert [e.step_id for e in seen_b] == ['0', '1', '2']
+        assert bad.errors == 8 and bad.handled == 0
+
+
+def test_slow_subscriber_never_blocks_the_publisher():
+    release = threading.Event()
+    slow_seen, fast_seen = [], []
+
+    def slow(event):
+        release.wait(5)
+        slow_seen.append(event)
+
+    bus = EventBus(capacity=16)
+    bus.subscribe(slow, name='slow')
+    bus.subscribe(fast_seen.append, name='fast', capacity=100_000)
+    start = time.monotonic()
+    bus.publish(RunStart(flow='x'))
+    for step in range(20):
+        bus.publish(StepStart(step_id=str(step)))
+        for i in range(500):
+            bus.publish(StepProgress(step_id=str(step), data={'done': i}))
+        bus.publish(StepEnd(step_id=str(step), status='Success'))
+    bus.publish(RunEnd(flow='x'))
+    assert time.monotonic() - start < 2.0
+    assert bus.subscriptions[1].flush(timeout=5)
+    release.set()
+    assert bus.flush(timeout=5)
+    bus.close()
+    # the slow subscriber lost progress to coalescing but still saw the whole lifecycle
+    assert [e.type for e in slow_seen].count('step-end') == 20
+    assert slow_seen[-1].type == 'run-end' and len(slow_seen) < len(fast_seen)
+    assert bus.stats()['published'] == 10_042
+
+
+def test_builtin_subscribers(tmp_path):
+    log = tmp_path / 'events.jsonl'
+    metrics, trace = MetricsSubscriber(), TraceSubscriber()
+    with EventBus() as bus:
+        bus.subscribe(JsonLogSubscriber(str(log)), name='jsonl')
+        bus.subscribe(metrics, name='metrics')
+        bus.subscribe(trace, name='trace')
+        bus.publish(RunStart(flow='backup', ts=100.0))
+        bus.publish(StepStart(step_id='copy', flow='backup', ts=101.0))
+        bus.publish(StepEnd(step_id='copy', status='Failed', flow='backup', ts=103.5))
+        bus.publish(RunEnd(flow='backup', results=[{'status': 'Failed'}], ts=104.0))
+    lines = [json.loads(line) for line in log.read_text(encoding='utf-8').splitlines()]
+    assert [line['type'] for line in lines] == ['run-start', 'step-start', 'step-end', 'run-end']
+    assert lines[-1]['results'] == [{'status': 'Failed'}]
+    snap = metrics.snapshot()
+    assert snap['statuses'] == {'Failed': 1} and snap['durations'] == {'copy': 2.5} and snap['running'] == []
+    spans = {s['name']: s for s in trace.to_chrome_trace()}
+    assert spans['copy']['dur'] == 2_500_000 and spans['copy']['args'] == {'status': 'Failed'}
+    assert spans['backup']['cat'] == 'run' and spans['backup']['dur'] == 4_000_000
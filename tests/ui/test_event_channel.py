@@ -0,0 +1,63 @@
+import queue
+import threading
+
+import pytest
+
+from src.ui.event_channel import EventChannel
+from src.ui.threaded_runner import run_flow_in_thread
+
+
+def test_progress_coalesces_per_step_in_place():
+    ch = EventChannel(capacity=8)
+    ch.put_nowait(('step-start', {'step_id': 'a'}))
+    for i in range(100):
+        ch.put_nowait(('step-progress', {'step_id': 'a', 'done': i}))
+        ch.put_nowait(('step-progress', {'step_id': 'b', 'done': i}))
+    ch.put_nowait(('step-end', {'step_id': 'a'}))
+    assert ch.drain() == [('step-start', {'step_id': 'a'}), ('step-progress', {'step_id': 'a', 'done': 99}),
+                          ('step-progress', {'step_id': 'b', 'done': 99}), ('step-end', {'step_id': 'a'})]
+    assert ch.coalesced == 198 and ch.dropped == 0
+    # once delivered, the next progress event is queued again
+    ch.put_nowait(('step-progress', {'step_id': 'a', 'done': 100}))
+    assert ch.get_nowait()[1]['done'] == 100
+
+
+def test_full_channel_drops_oldest_droppable_but_never_lifecycle_events():
+    ch = EventChannel(capacity=3)
+    ch.put_nowait(('run-start', {}))
+    for i in range(5):
+        ch.put_nowait(('log', {'n': i}))
+    for i in range(4):
+        ch.put_nowait(('step-end', {'step_id': str(i)}))
+    ch.put_nowait(('log', {'n': 99}))
+    ch.put_nowait(('run-end', {'results': []}))
+    events = ch.drain()
+    assert [t for t, _ in events] == ['run-start', 'step-end', 'step-end', 'step-end', 'step-end', 'run-end']
+    assert ch.dropped == 6 and ch.high_water == 6
+    assert ch.stats()['delivered'] == 6 and ch.empty()
+
+
+def test_get_blocks_until_put_and_times_out():
+    ch = EventChannel()
+    with pytest.raises(queue.Empty):
+        ch.get(timeout=0.05)
+    threading.Timer(0.05, ch.put_nowait, args=(('run-end', {'x': 1}),)).start()
+    assert ch.get(timeout=2) == ('run-end', {'x': 1})
+
+
+def test_memory_stays_bounded_with_a_slow_reader():
+    ch = EventChannel(capacity=64)
+    for i in range(50_000):
+        ch.put_nowait(('file-progress', {'n': i}))
+        if i % 1000 == 0:
+            ch.get_nowait()
+    assert ch.qsize() <= 64 and len(ch._slots) <= 128 and len(ch._droppable) <= 128
+
+
+def test_threaded_runner_defaults_to_event_channel():
+    th = run_flow_in_thread('uninstall', {'dry_run': True, 'event_capacity': 16})
+    th.join(timeout=30)
+    assert isinstance(th.event_queue, EventChannel)
+    types = [t for t, _ in th.event_queue.drain()]
+    assert types[0] == 'run-start' and types[-1] == 'run-end'
+    assert 'step-start' in types and 'step-end' in types
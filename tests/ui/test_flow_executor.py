@@ -0,0 +1,116 @@
+import _thread
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from src.ui.flow_executor import FlowExecutor
+from step_runner import CancellationToken, StepRunner, current_token
+
+
+def _stepped_flow(started, steps=20, delay=0.02):
+    """A fake run_flow whose orchestrator runs `steps` slow steps through StepRunner."""
+    def run_flow(flow, dry_run=True, yes=False, log_path=None, targets=None, progress_cb=None):
+        runner = StepRunner(dry_run=False)
+        results = []
+        started.set()
+        for i in range(steps):
+            progress_cb({'step_id': f'{flow}:{i}'}, 'step-start')
+            results.append(runner.invoke(f'{flow}:{i}', time.sleep, delay))
+            progress_cb({'step_id': f'{flow}:{i}', 'status': results[-1].status}, 'step-end')
+        return results
+    return run_flow
+
+
+def test_flows_run_side_by_side_with_their_own_events():
+    started = threading.Event()
+    with FlowExecutor(max_workers=2, run_flow=_stepped_flow(started, steps=3)) as ex:
+        a, b = ex.submit('status'), ex.submit('backup')
+        ex.wait()
+    assert [r.status for r in a.result()] == ['Success'] * 3 and len(b.result()) == 3
+    types = [t for t, _ in a.events.drain()]
+    assert types[0] == 'run-start' and types[-1] == 'run-end' and types.count('step-end') == 3
+    assert a.snapshot()['status:2']['event_type'] == 'step-end'
+    assert 'backup:0' in b.snapshot() and 'backup:0' not in a.snapshot()
+
+
+def test_cancel_stops_at_the_next_step_and_skips_queued_flows():
+    started = threading.Event()
+    with FlowExecutor(max_workers=1, run_flow=_stepped_flow(started)) as ex:
+        running, queued = ex.submit('status'), ex.submit('uninstall')
+        started.wait(5)
+        time.sleep(0.05)
+        running.cancel()
+        queued.cancel()
+        ex.wait()
+    statuses = [r.status for r in running.result()]
+    assert statuses[0] == 'Success' and statuses[-1] == 'Cancelled' and 'Failed' not in statuses
+    assert queued.future.cancelled()
+
+
+def test_ctrl_c_cancels_every_flow_and_waits_for_running_steps():
+    started = threading.Event()
+    ex = FlowExecutor(max_workers=2, run_flow=_stepped_flow(started, steps=200))
+    a, b = ex.submit('status'), ex.submit('cleanup')
+    started.wait(5)
+    threading.Timer(0.1, _thread.interrupt_main).start()
+    with pytest.raises(KeyboardInterrupt):
+        ex.wait(poll=0.01)
+    # both flows ended on their own, inside StepRunner, rather than being killed
+    assert a.done() and b.done()
+    assert a.result()[-1].status == 'Cancelled' and a.token.reason == 'Interrupted'
+    assert len(a.result()) == 200 and sum(r.status == 'Success' for r in a.result()) < 200
+    ex.shutdown()
+
+
+def test_token_is_scoped_to_the_flow_thread():
+    seen = {}
+
+    def run_flow(flow, progress_cb=None, **_):
+        seen[flow] = current_token()
+        return []
+
+    with FlowExecutor(run_flow=run_flow) as ex:
+        h = ex.submit('status')
+        ex.wait()
+    assert seen['status'] is h.token and current_token() is None
+    token = CancellationToken()
+    token.cancel('stop')
+    assert StepRunner(dry_run=True, token=token).invoke('x').status == 'Cancelled'
+    assert token.is_set()  # usable wherever a `cancel` Event is accepted
+
+
+def test_cancelling_a_flow_stops_a_running_backup(tmp_path):
+    from backup.backup_orchestrator import _run_cancellable_backup
+
+    data = tmp_path / 'data'
+    for d in range(5):
+        (data / f'd{d}').mkdir(parents=True)
+        for f in range(4):
+            (data / f'd{d}' / f'f{f}.bin').write_bytes(b'x' * 1000)
+    started, release = threading.Event(), threading.Event()
+
+    def hold_first_progress(event, event_type):
+        if event_type == 'step-progress' and not started.is_set():
+            started.set()
+            release.wait(5)  # keep the backup mid-way until the flow is cancelled
+
+    def run_flow(flow, progress_cb=None, **_):
+        return [_run_cancellable_backup('volumes', str(tmp_path / 'out'), sources={'volumes': str(data)},
+                                        progress_cb=hold_first_progress)]
+
+    with FlowExecutor(run_flow=run_flow) as ex:
+        h = ex.submit('backup', dry_run=False)
+        assert started.wait(5)
+        h.cancel()
+        release.set()
+        ex.wait()
+    assert h.result()[0].status == 'Cancelled'
+    assert not [n for n in os.listdir(tmp_path / 'out') if n.endswith('.farc')]
@@ -0,0 +1,83 @@
+import os
+import sys
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from step_result import StepResult
+from uninstall.wsl.compact_disks import compact_disks, locate_disks
+
+GIB = 1 << 30
+
+
+class FakeHost:
+    """Fake wsl/powershell plus disk files whose size the fake compactor shrinks."""
+
+    def __init__(self, disks, shutdown_rc=0):
+        self.disks = disks  # distro -> [vhdx bytes, bytes used inside]
+        self.sizes = {f'C:\\wsl\\{d}\\ext4.vhdx': v[0] for d, v in disks.items()}
+        self.calls = []
+        self.shutdown_rc = shutdown_rc
+        self.compacted = []
+
+    def run(self, args):
+        self.calls.append(args)
+        if args[0] == 'powershell.exe':
+            return 0, '[' + ','.join(f'{{"name":"{d}","path":"C:\\\\wsl\\\\{d}\\\\ext4.vhdx"}}' for d in self.disks) + ']'
+        if args[1] == '--shutdown':
+            return self.shutdown_rc, 'busy' if self.shutdown_rc else ''
+        distro, tool = args[2], args[6]
+        if tool == 'df':
+            return 0, f'     Used\n{self.disks[distro][1]}\n'
+        return 0, f'/: {distro} trimmed'
+
+    def compact(self, jobs, progress_cb=None):
+        results = []
+        for step_id, path in jobs:
+            self.compacted.append(step_id)
+            distro = step_id.split(':', 1)[1]
+            if distro == 'Broken':
+                results.append(StepResult.now(name=step_id, status='Failed', message='exit 1', error='in use'))
+                continue
+            self.sizes[path] = self.disks[distro][1] + GIB // 4
+            results.append(StepResult.now(name=step_id, status='Success', message='exit 0'))
+        return results
+
+
+def test_compacts_by_expected_savings_and_reports_reclaimed_bytes():
+    host = FakeHost({'Ubuntu': [40 * GIB, 10 * GIB], 'Debian': [80 * GIB, 20 * GIB], 'Tiny': [2 * GIB, 2 * GIB]})
+    events = []
+    results = compact_disks(dry_run=False, yes=True, run=host.run, compact=host.compact, size_of=host.sizes.get,
+                            progress_cb=lambda e, t: events.append((t, e['step_id'])))
+    assert [(r.name, r.status) for r in results] == [
+        ('compact_wsl:Debian', 'Success'), ('compact_wsl:Ubuntu', 'Success'), ('compact_wsl:Tiny', 'Skipped')]
+    assert results[0].details['reclaimed_bytes'] == 60 * GIB - GIB // 4
+    assert host.compacted == ['compact_wsl:Debian', 'compact_wsl:Ubuntu']
+    # trim happens before the single shutdown, which happens before compaction
+    kinds = [c[6] if len(c) > 6 else c[1] for c in host.calls if c[0] == 'wsl.exe']
+    assert kinds.count('--shutdown') == 1 and kinds.index('fstrim') < kinds.index('--shutdown')
+    assert ('step-end', 'compact_wsl:Debian') in events and ('step-start', 'compact_wsl:Tiny') in events
+
+
+def test_dry_run_only_measures():
+    host = FakeHost({'Ubuntu': [40 * GIB, 10 * GIB]})
+    results = compact_disks(dry_run=True, run=host.run, compact=host.compact, size_of=host.sizes.get)
+    assert results[0].status == 'Skipped' and '~30.0 GiB' in results[0].message
+    assert host.compacted == [] and not any('--shutdown' in c or 'fstrim' in c for c in host.calls)
+
+
+def test_failures_are_reported_per_distro():
+    host = FakeHost({'Ubuntu': [40 * GIB, 10 * GIB], 'Broken': [50 * GIB, 10 * GIB]})
+    results = compact_disks(dry_run=False, yes=True, run=host.run, compact=host.compact, size_of=host.sizes.get)
+    assert {r.name: r.status for r in results} == {'compact_wsl:Broken': 'Failed', 'compact_wsl:Ubuntu': 'Success'}
+
+    host = FakeHost({'Ubuntu': [40 * GIB, 10 * GIB]}, shutdown_rc=1)
+    results = compact_disks(dry_run=False, yes=True, run=host.run, compact=host.compact, size_of=host.sizes.get)
+    assert results[0].status == 'Failed' and results[0].message == 'wsl --shutdown failed' and host.compacted == []
+
+
+def test_locate_handles_single_distro_json():
+    run = lambda args: (0, '{"name":"Ubuntu","path":"C:\\\\wsl\\\\ext4.vhdx"}')
+    assert locate_disks(run) == {'Ubuntu': 'C:\\wsl\\ext4.vhdx'}
@@ -0,0 +1,101 @@
+import os
+import sys
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from uninstall.docker import leftover_sweeper
+from uninstall.docker.leftover_sweeper import default_leftovers, delete_tree, sweep_leftovers
+
+
+def make_tree(root, dirs=4, depth=3, files=5, size=100):
+    count = 0
+    for i in range(dirs):
+        path = root
+        for d in range(depth):
+            path = path / f'd{i}_{d}'
+            path.mkdir(parents=True, exist_ok=True)
+            for f in range(files):
+                (path / f'f{f}.bin').write_bytes(b'x' * size)
+                count += 1
+    return count
+
+
+def test_dry_run_reports_sizes_and_keeps_files(tmp_path):
+    n = make_tree(tmp_path / 'appdata')
+    targets = {'appdata_docker': str(tmp_path / 'appdata'), 'data_root': str(tmp_path / 'missing')}
+    results = sweep_leftovers(targets, dry_run=True)
+    assert [(r.name, r.status) for r in results] == [('sweep_leftovers:appdata_docker', 'Skipped')]
+    assert results[0].details['files'] == n and results[0].details['bytes'] == n * 100
+    assert 'would remove' in results[0].message and os.path.isdir(tmp_path / 'appdata')
+
+
+def test_uninstall_sequence_dry_run_reports_leftover_sizes(tmp_path):
+    from uninstall.uninstall_orchestrator import uninstall_sequence
+
+    n = make_tree(tmp_path / 'appdata')
+    results = uninstall_sequence(dry_run=True, leftovers={'appdata_docker': str(tmp_path / 'appdata')})
+    sweep = [r for r in results if r.name == 'sweep_leftovers:appdata_docker']
+    assert sweep[0].status == 'Skipped' and sweep[0].details['bytes'] == n * 100
+    assert os.path.isdir(tmp_path / 'appdata')
+
+
+def test_sweep_deletes_trees_and_links_without_following(tmp_path):
+    make_tree(tmp_path / 'programdata')
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'keep.txt').write_text('keep')
+    os.symlink(outside, tmp_path / 'programdata' / 'link')
+    events = []
+    results = sweep_leftovers({'programdata_dockerdesktop': str(tmp_path / 'programdata')}, dry_run=False,
+                              yes=True, workers=4, progress_cb=lambda e, t: events.append(t))
+    assert results[0].status == 'Success' and results[0].details['removed_files'] == 60
+    assert not os.path.exists(tmp_path / 'programdata')
+    assert (outside / 'keep.txt').read_text() == 'keep'
+    assert events == ['step-start', 'step-end']
+
+
+def test_locked_files_are_retried(tmp_path, monkeypatch):
+    make_tree(tmp_path / 'data', dirs=1, depth=1, files=3)
+    real_unlink = os.unlink
+    attempts = {}
+
+    def flaky(path):
+        attempts[path] = attempts.get(path, 0) + 1
+        if path.endswith('f1.bin') and attempts[path] < 3:
+            raise PermissionError(13, 'file in use')
+        real_unlink(path)
+
+    monkeypatch.setattr(leftover_sweeper.os, 'unlink', flaky)
+    stats = delete_tree(str(tmp_path / 'data'), retries=3, retry_delay=0.001)
+    assert stats['errors'] == [] and stats['files'] == 3 and not os.path.exists(tmp_path / 'data')
+    assert max(attempts.values()) == 3
+
+
+def test_permanently_locked_file_is_reported(tmp_path, monkeypatch):
+    make_tree(tmp_path / 'data', dirs=1, depth=1, files=2)
+    real_unlink = os.unlink
+
+    def locked(path):
+        if path.endswith('f0.bin'):
+            raise PermissionError(13, 'file in use')
+        real_unlink(path)
+
+    monkeypatch.setattr(leftover_sweeper.os, 'unlink', locked)
+    results = sweep_leftovers({'data_root': str(tmp_path / 'data')}, dry_run=False, yes=True, retries=1,
+                              retry_delay=0.001)
+    assert results[0].status == 'Failed' and 'f0.bin' in results[0].error
+    assert os.listdir(tmp_path / 'data' / 'd0_0') == ['f0.bin']
+
+
+def test_default_leftovers_follow_environment():
+    targets = default_leftovers({'APPDATA': '/a', 'LOCALAPPDATA': '/l', 'ProgramData': '/p', 'USERPROFILE': '/h'})
+    assert targets['appdata_docker'] == os.path.join('/a', 'Docker')
+    assert targets['programdata_dockerdesktop'] == os.path.join('/p', 'DockerDesktop')
+    assert targets['data_root'] == os.path.join('/p', 'Docker')
+    # ~/.docker (credentials, contexts) is only swept on request
+    assert 'user_docker_config' not in targets
+    assert default_leftovers({'USERPROFILE': '/h'}, include_user_config=True)['user_docker_config'] == \
+        os.path.join('/h', '.docker')
@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+import time
+
+repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+src_root = os.path.join(repo_root, 'src')
+if src_root not in sys.path:
+    sys.path.insert(0, src_root)
+
+from step_result import StepResult
+from uninstall.wsl.uninstall_wsl import unregister_distros
+
+
+class FakeWsl:
+    """Records wsl invocations and how many unregisters overlap."""
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, args):
+        self.calls.append(args[1:])
+        if args[1] != '--unregister':
+            return 0, ''
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return (1, 'in use') if args[2] in self.fail else (0, '')
+
+
+def test_distros_are_unregistered_concurrently_with_one_shutdown():
+    wsl = FakeWsl(fail={'Debian'})
+    events = []
+    distros = ['Ubuntu', 'Debian', 'Alpine', 'Kali', 'Arch']
+    results = unregister_distros(distros, yes=True, dry_run=False, max_concurrent=3, run=wsl,
+                                 progress_cb=lambda e, t: events.append((t, e['step_id'])))
+    assert [(r.name, r.status) for r in results] == [
+        ('unregister_wsl:Ubuntu', 'Success'), ('unregister_wsl:Debian', 'Failed'), ('unregister_wsl:Alpine', 'Success'),
+        ('unregister_wsl:Kali', 'Success'), ('unregister_wsl:Arch', 'Success')]
+    assert wsl.calls.count(['--shutdown']) == 1 and wsl.calls[0] == ['--shutdown']
+    assert 1 < wsl.peak <= 3
+    assert sorted(events) == sorted([(t, f'unregister_wsl:{d}') for d in distros for t in ('step-start', 'step-end')])
+
+
+def test_pre_export_gates_unregister():
+    wsl = FakeWsl()
+    exported = []
+
+    def exporter(distro, dest, **kwargs):
+        exported.append((distro, dest))
+        ok = distro != 'Debian'
+        return StepResult.now(name=f'wsl_export:{distro}', status='Success' if ok else 'Failed',
+                              message='exported' if ok else 'disk full', details={'bytes': 1})
+
+    results = unregister_distros(['Ubuntu', 'Debian'], yes=True, dry_run=False, export_dir='/backups', run=wsl,
+                                 exporter=exporter)
+    assert sorted(exported) == [('Debian', '/backups'), ('Ubuntu', '/backups')]
+    assert [r.status for r in results] == ['Success', 'Failed']
+    assert results[1].message.startswith('Pre-export failed') and ['--unregister', 'Debian'] not in wsl.calls
+
+
+def test_dry_run_and_missing_yes_change_nothing():
+    wsl = FakeWsl()
+    dry = unregister_distros(['Ubuntu'], dry_run=True, export_dir='/b', run=wsl)
+    assert dry[0].status == 'Skipped' and 'export to /b and unregister Ubuntu' in dry[0].message
+    assert unregister_distros(['Ubuntu'], yes=False, dry_run=False, run=wsl)[0].message == 'Requires -Yes'
+    assert unregister_distros([], yes=True, dry_run=False, run=wsl)[0].message == 'No WSL distros registered'
+    assert wsl.calls == []
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for the progress event bus.
+
+Publishes a synthetic run (steps of start / progress... / end) to an EventBus
+with the metrics, tracing and JSON log subscribers plus a counting one, then
+reports how fast the publisher went, how long the subscribers took to catch
+up, and what each subscriber saw.
+
+Two passes are reported. "publish + coalesce" uses --progress-per-step, so
+most progress events are folded into the latest one for their step and never
+reach the subscribers. "lossless" publishes the same number of events as
+lifecycle events only (no progress), which the bus never coalesces or drops,
+so every subscriber handles every event.
+
+Usage: python tools/dev/bench_event_bus.py [--events 1000000] [--progress-per-step 100]
+                                           [--capacity 4096] [--no-jsonl]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from src.ui.event_bus import (EventBus, JsonLogSubscriber, MetricsSubscriber, RunEnd, RunStart,
+                              StepEnd, StepProgress, StepStart, TraceSubscriber)
+
+
+def publish_run(bus, events, progress_per_step):
+    """Publish `events` events in total; returns the number published."""
+    bus.publish(RunStart(flow='bench'))
+    sent, step = 1, 0
+    while sent < events - 1:
+        step_id = f'step-{step}'
+        bus.publish(StepStart(step_id=step_id, flow='bench'))
+        sent += 1
+        for i in range(min(progress_per_step, events - sent - 2)):
+            bus.publish(StepProgress(step_id=step_id, flow='bench', data={'done': i}))
+            sent += 1
+        bus.publish(StepEnd(step_id=step_id, status='Success', flow='bench'))
+        sent += 1
+        step += 1
+    bus.publish(RunEnd(flow='bench'))
+    return sent + 1
+
+
+def run_pass(label, events, progress_per_step, capacity, jsonl):
+    """Publish one synthetic run and print what the publisher and each subscriber saw."""
+    counted = [0]
+
+    def count(_event):
+        counted[0] += 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = EventBus(capacity=capacity)
+        bus.subscribe(count, name='count')
+        metrics = MetricsSubscriber()
+        bus.subscribe(metrics, name='metrics')
+        bus.subscribe(TraceSubscriber(), name='trace')
+        if jsonl:
+            bus.subscribe(JsonLogSubscriber(os.path.join(tmp, 'events.jsonl')), name='jsonl')
+
+        start = time.perf_counter()
+        sent = publish_run(bus, events, progress_per_step)
+        published = time.perf_counter() - start
+        bus.flush()
+        drained = time.perf_counter() - start
+        stats = bus.stats()
+        bus.close()
+
+    print(f'{label} (progress per step: {progress_per_step})')
+    print(f'  published {sent:,} events in {published:.2f}s ({sent / published:,.0f} events/s)')
+    print(f'  all subscribers caught up after {drained:.2f}s ({sent / drained:,.0f} events/s end to end)')
+    print(f'  count subscriber handled {counted[0]:,} of {sent:,} ({100 * counted[0] / sent:.1f}%)')
+    for sub in stats['subscribers']:
+        print(f"    {sub['name']:8} handled={sub['handled']:,} coalesced={sub['coalesced']:,} "
+              f"dropped={sub['dropped']:,} high_water={sub['high_water']:,} errors={sub['errors']}")
+    print(f"  steps ended: {metrics.snapshot()['statuses']}")
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--events', type=int, default=1_000_000)
+    ap.add_argument('--progress-per-step', type=int, default=100)
+    ap.add_argument('--capacity', type=int, default=4096)
+    ap.add_argument('--no-jsonl', action='store_true', help='skip the JSON log subscriber')
+    args = ap.parse_args(argv)
+
+    run_pass('publish + coalesce', args.events, args.progress_per_step, args.capacity, not args.no_jsonl)
+    run_pass('lossless', args.events, 0, args.capacity, not args.no_jsonl)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+<#
+.SYNOPSIS
+  Long-lived PowerShell worker for src/ps_worker.py.
+
+.DESCRIPTION
+  Reads one JSON request per line from stdin and runs it, so callers pay the
+  interpreter start-up cost once instead of once per script. Every message written
+  back is a frame: the record separator (0x1E) followed by one line of JSON.
+
+    request : {"id":1,"op":"run","command":"...","script":null,"args":[],"cwd":null}
+              {"id":2,"op":"exit"}
+    frames  : {"type":"ready","pid":1234}
+              {"id":1,"type":"output","stream":"stdout"|"stderr","line":"..."}
+              {"id":1,"type":"result","exit_code":0,"error":null}
+
+  Each command runs in a child scope, so variables do not leak between commands.
+#>
+$ErrorActionPreference = 'Continue'
+$ProgressPreference = 'SilentlyContinue'
+[Console]::InputEncoding = [Text.UTF8Encoding]::new($false)
+[Console]::OutputEncoding = [Text.UTF8Encoding]::new($false)
+$Mark = [char]0x1E
+
+function Send-Frame([hashtable]$Frame) {
+    [Console]::Out.WriteLine($Mark + ($Frame | ConvertTo-Json -Compress -Depth 4))
+    [Console]::Out.Flush()
+}
+
+function Invoke-Request($Request) {
+    $id = $Request.id
+    $exitCode = 0
+    $failure = $null
+    $global:LASTEXITCODE = 0
+    $previous = Get-Location
+    try {
+        if ($Request.cwd) { Set-Location -LiteralPath $Request.cwd }
+        if ($Request.script) {
+            $argList = @($Request.args)
+            $block = { param($path, $rest) & $path @rest }
+            $invoke = { & $block $Request.script $argList *>&1 }
+        } else {
+            $block = [scriptblock]::Create([string]$Request.command)
+            $invoke = { & $block *>&1 }
+        }
+        & $invoke | ForEach-Object {
+            if ($_ -is [System.Management.Automation.ErrorRecord]) {
+                Send-Frame @{ id = $id; type = 'output'; stream = 'stderr'; line = [string]$_ }
+                $exitCode = 1
+            } else {
+                foreach ($line in ((Out-String -InputObject $_ -Width 4096).TrimEnd() -split "`r?`n")) {
+                    Send-Frame @{ id = $id; type = 'output'; stream = 'stdout'; line = $line }
+                }
+            }
+        }
+        if ($LASTEXITCODE) { $exitCode = [int]$LASTEXITCODE }
+    } catch {
+        $failure = [string]$_
+        $exitCode = 1
+    } finally {
+        Set-Location -LiteralPath $previous
+    }
+    Send-Frame @{ id = $id; type = 'result'; exit_code = $exitCode; error = $failure }
+}
+
+Send-Frame @{ type = 'ready'; pid = $PID }
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($null -eq $line) { break }
+    if (-not $line.Trim()) { continue }
+    try {
+        $request = $line | ConvertFrom-Json
+    } catch {
+        Send-Frame @{ id = $null; type = 'result'; exit_code = 2; error = "bad request: $_" }
+        continue
+    }
+    if ($request.op -eq 'exit') { break }
+    Invoke-Request $request
+}
@@ -2,12 +2,13 @@
 """Run a PowerShell script with elevation (UAC) and wait for completion.
 
 This helper launches PowerShell to Start-Process the requested script with the
-runas verb (UAC). It redirects stdout/stderr to temporary files and prints them
-after completion. Use this from your manager when you need a one-click elevation
-for install/uninstall actions.
+runas verb (UAC). It redirects stdout/stderr to temporary files and follows them
+while the script runs, printing lines as they appear (only a bounded tail is kept
+in memory; --log appends every line to a JSON-lines file). Use this from your
+manager when you need a one-click elevation for install/uninstall actions.
 
 Usage:
-  python tools/elevate/run_elevated.py "C:\path\to\script.ps1" arg1 arg2
+  python tools/elevate/run_elevated.py [--log run.jsonl] "C:\path\to\script.ps1" arg1 arg2
 
 The script will prompt Windows UAC; the user must confirm.
 """
@@ -16,44 +17,22 @@ import sys
 import tempfile
 import shlex
 import subprocess
+
+# Make the src modules importable when run as a script
+src_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'src')
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
 from step_result import StepResult
+from log_follower import LogFollower
 
 
 def build_ps_command(script_path, script_args, out_file, err_file):
-    # Build a PowerShell command string that runs pwsh (or powershell) to execute
-    # the script and redirect output to files. Use Start-Process -Verb RunAs -Wait
-    # and pass-through the exit code.
-    # Use pwsh if available, otherwise powershell.
-    pwsh = 'pwsh'
-    # Quote paths
+    # Build a one-liner for Windows PowerShell that uses Start-Process -Verb RunAs -Wait
+    # to launch pwsh elevated; the elevated pwsh runs the script and redirects its
+    # output to the given files, and the exit code is passed through.
     script_path_q = script_path.replace("'", "''")
     args_quoted = ' '.join([shlex.quote(a) for a in script_args])
-    # Construct inner argument list for pwsh: -NoProfile -ExecutionPolicy Bypass -File 'script' args
-    inner = f"-NoProfile -ExecutionPolicy Bypass -File '{script_path_q}' {args_quoted}"
-
-    # Use Start-Process to elevate and wait; redirect output within the elevated pwsh
-    # We'll wrap the inner command in quotes and use Out-File for output redirection
-    # Build the argument string passed to Start-Process as a single string
-    inner_escaped = inner.replace("'", "''")
-    # The elevated process will run pwsh with the inner args and redirect output to files
-    elevated_args = f"-NoProfile -Command \"& {{ & {pwsh} {inner_escaped} *> '{out_file}' 2> '{err_file}' }}\""
-
-    # Build the command that calls Start-Process to run pwsh elevated
-    # We call powershell.exe (present on Windows) to invoke Start-Process
-    ps_command = (
-        "Start-Process -FilePath 'pwsh' -ArgumentList @(' -NoProfile -Command ', \"& { & 'pwsh' -NoProfile -ExecutionPolicy Bypass -File '" + script_path_q + "' '" + "' '.join(script_args) + "' ) -Verb RunAs -Wait -PassThru | Select-Object -ExpandProperty ExitCode"
-    )
-    # The above is complex to compose robustly; instead, we'll build a simpler command
-    # that uses Start-Process with a single string argument and lets pwsh handle redirection.
-    ps_command = (
-        "$arg = '-NoProfile -ExecutionPolicy Bypass -File \"" + script_path_q + "\" ' + ' '.join(@('""') ) ; "
-        "Start-Process -FilePath 'pwsh' -ArgumentList \"-NoProfile -ExecutionPolicy Bypass -File '" + script_path_q + "' " + ' '.join([shlex.quote(a) for a in script_args]) + "\" -Verb RunAs -Wait -NoNewWindow"
-    )
-    # The above attempts to start elevated and wait — we'll instead use a slightly different approach
-    # Compose a powershell command that calls Start-Process with -Verb RunAs and -Wait and that
-    # launches pwsh which runs the script and redirects inside it.
-
-    # Final approach: build a one-liner that Start-Process runs pwsh -Command "& { & 'script' args *> out 2>err }"
     inner_cmd = f"& {{ & '{script_path_q}' {args_quoted} *> '{out_file}' 2> '{err_file}' }}"
     inner_cmd_escaped = inner_cmd.replace("'", "''")
     ps_command = f"Start-Process -FilePath 'pwsh' -ArgumentList '-NoProfile','-Command','{inner_cmd_escaped}' -Verb RunAs -Wait -PassThru | Select-Object -ExpandProperty ExitCode"
@@ -61,7 +40,18 @@ def build_ps_command(script_path, script_args, out_file, err_file):
     return ps_command
 
 
-def run_elevated(script_path, script_args):
+def _print_line(event, event_type):
+    prefix = '! ' if event.get('stream') == 'stderr' else '  '
+    print(prefix + event.get('line', ''), flush=True)
+
+
+def run_elevated(script_path, script_args, progress_cb=None, log_path=None, tail_lines=200):
+    """Run the script elevated, streaming its output while it runs.
+
+    Output lines are forwarded to progress_cb as step-progress events (printed when
+    no callback is given); only the last `tail_lines` lines per stream are kept in
+    memory, and every line is appended to the JSON-lines `log_path` when given.
+    """
     script_path = os.path.abspath(script_path)
     if not os.path.exists(script_path):
         msg = f"Script not found: {script_path}"
@@ -84,22 +74,14 @@ def run_elevated(script_path, script_args):
     ]
 
     print('Requesting elevation (UAC). Please accept the UAC prompt to continue...')
-    proc = subprocess.run(cmd)
-    exit_code = proc.returncode
-
-    print('\n--- elevated stdout (tail) ---')
-    try:
-        with open(out_path, 'r', encoding='utf-8', errors='replace') as f:
-            print(f.read())
-    except Exception:
-        print('(no stdout)')
-
-    print('\n--- elevated stderr (tail) ---')
-    try:
-        with open(err_path, 'r', encoding='utf-8', errors='replace') as f:
-            print(f.read())
-    except Exception:
-        print('(no stderr)')
+    follower = LogFollower({'stdout': out_path, 'stderr': err_path}, step_id='run_elevated',
+                           progress_cb=progress_cb or _print_line, tail_lines=tail_lines, log_path=log_path)
+    with follower:
+        try:
+            exit_code = subprocess.run(cmd).returncode
+        except OSError as e:
+            exit_code = None
+            error = str(e)
 
     # Cleanup temp files
     try:
@@ -108,10 +90,15 @@ def run_elevated(script_path, script_args):
     except Exception:
         pass
 
+    details = dict(follower.summary(), exit_code=exit_code)
+    if exit_code is None:
+        return StepResult.now(name="run_elevated", status="Failed", message="could not start powershell",
+                              error=error, details=details)
     # Return a StepResult with exit code info
     if exit_code == 0:
-        return StepResult.now(name="run_elevated", status="Success", message=f"elevated exit {exit_code}")
-    return StepResult.now(name="run_elevated", status="Failed", message=f"elevated exit {exit_code}")
+        return StepResult.now(name="run_elevated", status="Success", message=f"elevated exit {exit_code}", details=details)
+    return StepResult.now(name="run_elevated", status="Failed", message=f"elevated exit {exit_code}",
+                          error="\n".join(follower.tail('stderr')[-5:]) or None, details=details)
 
 
 def main(argv):
@@ -121,9 +108,12 @@ def main(argv):
         res = StepResult.now(name="run_elevated", status="Failed", message="Usage: run_elevated.py <script.ps1> [args...]")
         print(res.to_dict())
         return 2
+    log_path = None
+    if argv[0] == '--log' and len(argv) > 2:
+        log_path, argv = argv[1], argv[2:]
     script = argv[0]
     args = argv[1:]
-    res = run_elevated(script, args)
+    res = run_elevated(script, args, log_path=log_path)
     # If run_elevated returns a StepResult, print and return a compatible exit code
     if isinstance(res, StepResult):
         print(res.to_dict())
@@ -0,0 +1,32 @@
+param(
+    [Parameter(Mandatory = $true)][string]$Path,
+    [switch]$WhatIf
+)
+
+# Compacts a WSL virtual disk. Requires elevation and WSL to be shut down.
+# Uses Optimize-VHD when the Hyper-V module is present, otherwise diskpart.
+if (-not (Test-Path -LiteralPath $Path)) { Write-Error "Disk not found: $Path"; exit 2 }
+if ($WhatIf) { Write-Host "WhatIf: would compact $Path"; exit 0 }
+
+if (Get-Command Optimize-VHD -ErrorAction SilentlyContinue) {
+    Optimize-VHD -Path $Path -Mode Full -ErrorAction Stop
+    Write-Host "Compacted $Path with Optimize-VHD"
+    exit 0
+}
+
+$script = @"
+select vdisk file="$Path"
+attach vdisk readonly
+compact vdisk
+detach vdisk
+"@
+$tmp = [IO.Path]::GetTempFileName()
+try {
+    Set-Content -LiteralPath $tmp -Value $script -Encoding ASCII
+    & diskpart.exe /s $tmp
+    if ($LASTEXITCODE -ne 0) { exit $LASTEXITCODE }
+    Write-Host "Compacted $Path with diskpart"
+} finally {
+    Remove-Item -LiteralPath $tmp -ErrorAction SilentlyContinue
+}
+exit 0